@@ -6,33 +6,80 @@ from typing import Optional
 import typer
 from dependency_injector import containers, providers
 from dependency_injector.wiring import Provide, inject
+from tabulate import tabulate
 
-from ansible_self_service.l1_entrypoints.cli import app, collection, state
+from ansible_self_service.l1_entrypoints.cli import app, collection, run, state
+from ansible_self_service.l2_infrastructure.ansible_engine import (
+    AnsibleWorkerPool,
+    ReusableAnsibleRunner,
+    ReusableAsyncAnsibleRunner,
+)
 from ansible_self_service.l2_infrastructure.ansible_result_analyzer import (
     JMESPathAnsibleResultAnalyzer,
 )
-from ansible_self_service.l2_infrastructure.ansible_runner import AnsibleRunner
+from ansible_self_service.l2_infrastructure.ansible_runner import (
+    AnsibleRunner,
+    AsyncAnsibleRunner,
+)
 from ansible_self_service.l2_infrastructure.app_collection_config_parser import (
     YamlAppCollectionConfigParser,
 )
 from ansible_self_service.l2_infrastructure.app_dir_locator import (
     AppdirsAppDirLocatorProtocol,
 )
+from ansible_self_service.l2_infrastructure.app_search_index import (
+    InvertedAppSearchIndex,
+)
 from ansible_self_service.l2_infrastructure.app_state_persister import (
     YamlAppStatePersister,
+    YamlFleetStatePersister,
+)
+from ansible_self_service.l2_infrastructure.catalog_watcher import InotifyCatalogWatcher
+from ansible_self_service.l2_infrastructure.collection_bundle_archive import (
+    TarCollectionBundleArchive,
 )
 from ansible_self_service.l2_infrastructure.git_client import GitPythonGitClient
+from ansible_self_service.l2_infrastructure.lock_manager import FileLockManager
 from ansible_self_service.l2_infrastructure.logger import BasicLogger
+from ansible_self_service.l2_infrastructure.privileged_helper import (
+    PrivilegedAnsibleRunner,
+    PrivilegedAsyncAnsibleRunner,
+    PrivilegedHelperClient,
+)
+from ansible_self_service.l2_infrastructure.profiler import Profiler
+from ansible_self_service.l2_infrastructure.playbook_dependency_resolver import (
+    YamlPlaybookDependencyResolver,
+)
+from ansible_self_service.l2_infrastructure.playbook_validator import (
+    AnsiblePlaybookValidator,
+    JsonPlaybookValidationCache,
+)
+from ansible_self_service.l2_infrastructure.resource_governor import (
+    GovernedAnsibleRunner,
+    GovernedAsyncAnsibleRunner,
+    ResourceGovernor,
+)
+from ansible_self_service.l2_infrastructure.requirements_installer import (
+    AnsibleGalaxyRequirementsInstaller,
+)
+from ansible_self_service.l2_infrastructure.run_artifact_store import (
+    CompressedRunArtifactStore,
+)
+from ansible_self_service.l2_infrastructure.status_history import BinaryStatusHistory
 from ansible_self_service.l3_services.app import AppService
 from ansible_self_service.l3_services.app_catalog import AppCatalogService
 from ansible_self_service.l3_services.config import ConfigService
+from ansible_self_service.l3_services.fleet import FleetService
+from ansible_self_service.l3_services.run import RunService
 from ansible_self_service.l4_core.factories import AppFactory
-from ansible_self_service.l4_core.models import AppCatalog, Config
+from ansible_self_service.l4_core.catalog import AppCatalog
+from ansible_self_service.l4_core.models import Config, ResourceClass
 
 typer_app = typer.Typer()
 
 typer_app.add_typer(app.app, name="app")
 typer_app.add_typer(collection.app, name="collection")
+typer_app.add_typer(run.app, name="run")
 
 
 class Container(containers.DeclarativeContainer):
@@ -45,37 +92,132 @@ class Container(containers.DeclarativeContainer):
         Config,
         app_dir_locator=app_dir_locator,
         override_app_data_dir=cli_config.with_custom_data_dir,  # pylint: disable=no-member
+        keep_run_artifacts=cli_config.keep_run_artifacts,  # pylint: disable=no-member
+        resource_class=cli_config.resource_class,  # pylint: disable=no-member
+    )
+    git_client = providers.Singleton(
+        GitPythonGitClient,
+        mirror_directory=config.provided.git_mirror_directory,  # pylint: disable=no-member
+    )
+    ansible_worker_pool = providers.Singleton(AnsibleWorkerPool)
+    reusable_ansible_runner = providers.Singleton(
+        ReusableAnsibleRunner, worker_pool=ansible_worker_pool
+    )
+    privileged_helper_client = providers.Singleton(
+        PrivilegedHelperClient, config=config, logger=logger
+    )
+    privileged_ansible_runner = providers.Singleton(
+        PrivilegedAnsibleRunner,
+        client=privileged_helper_client,
+        local_runner=reusable_ansible_runner,
+    )
+    engine_ansible_runner = providers.Selector(
+        cli_config.ansible_engine,  # pylint: disable=no-member
+        reusable=reusable_ansible_runner,
+        isolated=providers.Singleton(AnsibleRunner),
+        privileged=privileged_ansible_runner,
+    )
+    engine_async_ansible_runner = providers.Selector(
+        cli_config.ansible_engine,  # pylint: disable=no-member
+        reusable=providers.Singleton(
+            ReusableAsyncAnsibleRunner, worker_pool=ansible_worker_pool
+        ),
+        isolated=providers.Singleton(AsyncAnsibleRunner),
+        privileged=providers.Singleton(
+            PrivilegedAsyncAnsibleRunner, runner=privileged_ansible_runner
+        ),
+    )
+    resource_governor = providers.Singleton(
+        ResourceGovernor,
+        limits=config.provided.resource_limits,  # pylint: disable=no-member
+        logger=logger,
+    )
+    ansible_runner = providers.Singleton(
+        GovernedAnsibleRunner,
+        runner=engine_ansible_runner,
+        governor=resource_governor,
+    )
+    async_ansible_runner = providers.Singleton(
+        GovernedAsyncAnsibleRunner,
+        runner=engine_async_ansible_runner,
+        governor=resource_governor,
     )
-    git_client = providers.Singleton(GitPythonGitClient)
-    ansible_runner = providers.Singleton(AnsibleRunner)
     ansible_result_analyzer = providers.Singleton(
         JMESPathAnsibleResultAnalyzer,
         logger=logger,
     )
+    lock_manager = providers.Singleton(
+        FileLockManager,
+        config=config,
+        logger=logger,
+    )
     app_state_persister = providers.Singleton(
         YamlAppStatePersister,
         config=config,
+        lock_manager=lock_manager,
+    )
+    status_history = providers.Singleton(
+        BinaryStatusHistory,
+        config=config,
+        lock_manager=lock_manager,
+    )
+    run_artifact_store = providers.Singleton(
+        CompressedRunArtifactStore,
+        config=config,
+        logger=logger,
+        lock_manager=lock_manager,
+    )
+    fleet_state_persister = providers.Singleton(
+        YamlFleetStatePersister,
+        config=config,
+        lock_manager=lock_manager,
+    )
+    app_search_index = providers.Singleton(
+        InvertedAppSearchIndex,
+        config=config,
     )
     app_factory = providers.Singleton(
         AppFactory,
         app_state_persister=app_state_persister,
         ansible_runner=ansible_runner,
         ansible_result_analyzer=ansible_result_analyzer,
+        run_artifacts_directory=config.provided.run_artifacts_directory,  # pylint: disable=no-member
+        async_ansible_runner=async_ansible_runner,
+        status_history=status_history,
+        run_artifact_store=run_artifact_store,
     )
     app_collection_config_parser = providers.Singleton(
         YamlAppCollectionConfigParser,
         app_factory=app_factory,
     )
+    playbook_dependency_resolver = providers.Singleton(YamlPlaybookDependencyResolver)
+    requirements_installer = providers.Singleton(AnsibleGalaxyRequirementsInstaller)
+    collection_bundle_archive = providers.Singleton(TarCollectionBundleArchive)
+    playbook_validator = providers.Singleton(
+        AnsiblePlaybookValidator, worker_pool=ansible_worker_pool
+    )
+    playbook_validation_cache = providers.Singleton(
+        JsonPlaybookValidationCache, config=config
+    )
+    catalog_watcher = providers.Singleton(InotifyCatalogWatcher, logger=logger)
 
     app_catalog = providers.Singleton(
         AppCatalog,
         _config=config,
         _git_client=git_client,
         _app_collection_config_parser=app_collection_config_parser,
+        _playbook_dependency_resolver=playbook_dependency_resolver,
+        _requirements_installer=requirements_installer,
+        _collection_bundle_archive=collection_bundle_archive,
+        _playbook_validator=playbook_validator,
+        _playbook_validation_cache=playbook_validation_cache,
+        _lock_manager=lock_manager,
+        _catalog_watcher=catalog_watcher,
     )
     config_service = providers.Singleton(
         ConfigService,
         config=config,
+        lock_manager=lock_manager,
     )
     app_catalog_service = providers.Singleton(
         AppCatalogService,
@@ -84,6 +226,17 @@ class Container(containers.DeclarativeContainer):
     app_service = providers.Singleton(
         AppService,
         app_catalog=app_catalog,
+        app_search_index=app_search_index,
+        status_history=status_history,
+    )
+    fleet_service = providers.Singleton(
+        FleetService,
+        app_catalog=app_catalog,
+        fleet_state_persister=fleet_state_persister,
+    )
+    run_service = providers.Singleton(
+        RunService,
+        run_artifact_store=run_artifact_store,
     )
 
 
@@ -111,8 +264,66 @@ def get_app_service(
     return app_service
 
 
+@inject
+def get_fleet_service(
+    fleet_service: FleetService = Provide[Container.fleet_service],
+) -> FleetService:
+    """Let the DI framework inject an instance of FleetService and return it."""
+    return fleet_service
+
+
+@inject
+def get_run_service(
+    run_service: RunService = Provide[Container.run_service],
+) -> RunService:
+    """Let the DI framework inject an instance of RunService and return it."""
+    return run_service
+
+
+@inject
+def get_resource_governor(
+    resource_governor: ResourceGovernor = Provide[Container.resource_governor],
+) -> ResourceGovernor:
+    """Let the DI framework inject an instance of ResourceGovernor and return it."""
+    return resource_governor
+
+
+def start_profiling(ctx: typer.Context, directory: Path):
+    """Profile until the command finished, then report the hot spots on stderr."""
+    profiler = Profiler(directory)
+
+    def report():
+        profiler.stop()
+        report_file = profiler.report()
+        typer.echo(f"Profile report written to {report_file}", err=True)
+
+    profiler.start()
+    ctx.call_on_close(report)
+
+
+def report_lock_statistics(ctx: typer.Context):
+    """Print how long the command waited for locks held by other processes on stderr once it finished."""
+
+    def report():
+        statistics = state.app_catalog_service.lock_statistics()
+        table = [["Lock", "Acquired", "Contended", "Total Wait", "Max Wait"]]
+        for lock in statistics:
+            table.append(
+                [
+                    lock.name,
+                    lock.acquisitions,
+                    lock.contended,
+                    f"{lock.total_wait:.3f}s",
+                    f"{lock.max_wait:.3f}s",
+                ]
+            )
+        typer.echo(tabulate(table, headers="firstrow"), err=True)
+
+    ctx.call_on_close(report)
+
+
 @typer_app.callback()
-def set_state(
+def set_state(  # pylint: disable=too-many-arguments
     ctx: typer.Context,  # pylint: disable=W0613
     data_dir: Optional[Path] = typer.Option(
         default=None,
@@ -122,18 +333,72 @@ def set_state(
         default=None,
         help="Set current working directory to this path. Only needed for privilege escalation.",
     ),
+    keep_run_artifacts: bool = typer.Option(
+        default=False,
+        help="Also write the raw output of the latest run of each app as plain JSON to the cache directory, the "
+        "output of all runs is kept compressed regardless, see run list.",
+    ),
+    reuse_ansible: bool = typer.Option(
+        default=True,
+        help="Run playbooks through long-lived Ansible workers instead of initializing Ansible for every run. "
+        "Ignored with ansible-core releases that do not support reusing Ansible.",
+    ),
+    elevate: bool = typer.Option(
+        default=False,
+        help="Run playbooks as root through a privileged helper, which asks for the password once and serves all "
+        "commands until it has been idle for 15 minutes. The helper always reuses Ansible workers.",
+    ),
+    resource_class: ResourceClass = typer.Option(
+        default=ResourceClass.INTERACTIVE,
+        help="background runs Ansible with a lower CPU and I/O priority, cgroup limits where available and at most "
+        "two runs at a time, so it only takes what interactive work leaves idle.",
+    ),
+    lock_stats: bool = typer.Option(
+        default=False,
+        help="Report how long the command waited for locks held by other processes.",
+    ),
+    profile: Optional[Path] = typer.Option(
+        default=None,
+        help="Profile this process and all Ansible workers, then write the merged stats and a hot spot report here.",
+    ),
 ):
     """This runs before each command and sets the initial application state."""
     if chdir:
         os.chdir(chdir)
+    if profile:
+        start_profiling(ctx, profile)
     container = Container()
     container.cli_config.from_dict(
-        {"with_custom_data_dir": Path(data_dir) if data_dir else None}
+        {
+            "with_custom_data_dir": Path(data_dir) if data_dir else None,
+            "keep_run_artifacts": keep_run_artifacts,
+            "resource_class": resource_class,
+            "ansible_engine": "privileged"
+            if elevate
+            else "reusable"
+            if reuse_ansible
+            else "isolated",
+        }
     )
     container.wire(modules=[sys.modules[__name__]])  # pylint: disable=E1101
+    # niceness and I/O priority are per thread, only threads and processes started afterwards inherit them
+    get_resource_governor().apply()
     state.config_service = get_config_service()
     state.app_catalog_service = get_app_catalog_service()
     state.app_service = get_app_service()
+    state.fleet_service = get_fleet_service()
+    state.run_service = get_run_service()
+    # global options a detached background process has to be started with to share this process's setup
+    state.global_options = (
+        (["--data-dir", str(Path(data_dir).absolute())] if data_dir else [])
+        + (["--keep-run-artifacts"] if keep_run_artifacts else [])
+        + ([] if reuse_ansible else ["--no-reuse-ansible"])
+        + (["--elevate"] if elevate else [])
+        + (["--profile", str(Path(profile).absolute())] if profile else [])
+    )
+    state.elevated = elevate
+    if lock_stats:
+        report_lock_statistics(ctx)
 
 
 def main():
@@ -1,7 +1,12 @@
+import asyncio
+import contextlib
 import itertools
 import operator
 import os
+import subprocess
 import sys
+import time
+from pathlib import Path
 from typing import List, Optional
 
 import click_spinner
@@ -9,15 +14,89 @@ import typer
 from tabulate import tabulate
 
 from ansible_self_service.l1_entrypoints.cli import state
-from ansible_self_service.l2_infrastructure.elevate import elevate
-from ansible_self_service.l3_services.dto import AppStatus, App
+from ansible_self_service.l1_entrypoints.cli.output import (
+    APP_FIELDS,
+    FIELD_OPTION_HELP,
+    OUTPUT_OPTION_HELP,
+    OutputFormat,
+    app_record,
+    check_fields,
+    echo_record,
+    echo_records,
+    fleet_app_record,
+    status_statistics_record,
+)
+from ansible_self_service.l3_services.dto import (
+    AppStatus,
+    App,
+    AppRefreshResult,
+    InstallOutcome,
+)
+from ansible_self_service.l3_services.exceptions import (
+    AppNotFoundException,
+    AmbiguousAppNameException,
+    AppDependencyCycleException,
+)
 
 app = typer.Typer()
 
 
 @app.command()
-def install(app_name: str, collection: Optional[str] = None):
-    """Install an app via Ansible."""
+def install(
+    app_names: List[str],
+    collection: Optional[str] = None,
+    jobs: int = typer.Option(
+        default=1,
+        help="Maximum number of apps that are installed in parallel.",
+    ),
+):
+    """Install apps and their prerequisites via Ansible.
+
+    Apps that do not depend on each other are installed in parallel.
+    """
+    try:
+        apps = [
+            state.app_service.get_app(app_name, collection_name=collection)
+            for app_name in app_names
+        ]
+    except AppNotFoundException as exception:
+        typer.echo(f"✗ Unknown app {exception}")
+        raise typer.Exit(code=1)
+    except AmbiguousAppNameException as exception:
+        name, collections = exception.args
+        typer.echo(
+            f"✗ {name} exists in several collections ({', '.join(collections)}), please select one with --collection"
+        )
+        raise typer.Exit(code=1)
+    try:
+        typer.echo("⟳  Installing...")
+        with click_spinner.spinner():
+            results = state.app_service.install(apps, max_workers=jobs)
+        typer.echo("\r ")
+    except AppDependencyCycleException as exception:
+        typer.echo(f"✗ Apps depend on each other in a cycle: {exception}")
+        raise typer.Exit(code=1)
+    symbols = {
+        InstallOutcome.INSTALLED: "✓",
+        InstallOutcome.ALREADY_INSTALLED: "✓",
+        InstallOutcome.FAILED: "✗",
+        InstallOutcome.SKIPPED: "-",
+    }
+    table = [["Name", "Collection", "Result"]]
+    for result in results:
+        table.append(
+            [
+                result.name,
+                result.collection_name,
+                f"{symbols[result.outcome]} {result.outcome.value}",
+            ]
+        )
+    typer.echo(tabulate(table, headers="firstrow"))
+    if any(
+        result.outcome in (InstallOutcome.FAILED, InstallOutcome.SKIPPED)
+        for result in results
+    ):
+        raise typer.Exit(code=1)
 
 
 @app.command()
@@ -43,49 +122,397 @@ def app_status_to_symbol(app_status: AppStatus):
         return "?"
 
 
-def elevate_with_current_data_dir():
-    """Rerun process with privileged user.
+@app.command()
+def search(query: str, limit: int = 20):
+    """Search apps of all collections by name, description and category."""
+    results = state.app_service.search(query, limit=limit)
+    if not results:
+        typer.echo(f'No apps found for "{query}"')
+        raise typer.Exit(code=1)
+    table = [["Name", "Collection", "Categories", "Description"]]
+    for result in results:
+        description = result.description.splitlines()[0] if result.description else ""
+        table.append(
+            [
+                result.name,
+                result.collection_name,
+                ",".join(result.categories),
+                description,
+            ]
+        )
+    typer.echo(tabulate(table, headers="firstrow"))
+
+
+def progress(message: str, output: OutputFormat):
+    """Show a spinner while the context runs, unless the output is machine-readable."""
+    if output.is_machine_readable:
+        return contextlib.nullcontext()
+    typer.echo(message)
+    return click_spinner.spinner()
+
+
+def list_fleet_apps(
+    inventory: Path, refresh: bool, forks: Optional[int], output: OutputFormat
+):
+    """Print how many hosts of a fleet are in each status per app."""
+    if refresh:
+        with progress(
+            f"⟳  Refreshing app state on all hosts of {inventory}...", output
+        ):
+            fleet_status = state.fleet_service.refresh(inventory, forks=forks)
+        if not output.is_machine_readable:
+            typer.echo("\r ")
+    else:
+        fleet_status = state.fleet_service.get_status(inventory)
+    if output.is_machine_readable:
+        echo_records(
+            (
+                fleet_app_record(fleet_app, fleet_status.hosts)
+                for fleet_app in fleet_status.apps
+            ),
+            output,
+        )
+        return
+
+    statuses = [
+        AppStatus.INSTALLED,
+        AppStatus.UPGRADABLE,
+        AppStatus.NOT_INSTALLED,
+        AppStatus.UNKNOWN,
+    ]
+    table = [
+        ["Name", "Collection"] + [app_status_to_symbol(status) for status in statuses]
+    ]
+    for fleet_app in fleet_status.apps:
+        unchecked_hosts = len(fleet_status.hosts) - len(fleet_app.statuses)
+        counts = [fleet_app.count(status) for status in statuses]
+        counts[-1] += unchecked_hosts  # hosts without a result are unknown
+        table.append([fleet_app.name, fleet_app.collection_name] + counts)
+    typer.echo(tabulate(table, headers="firstrow"))
+    typer.echo("")
+    typer.echo(f"Number of hosts per status across {len(fleet_status.hosts)} hosts")
+
+
+async def refresh_apps(
+    apps: List[App], jobs: int, timeout: Optional[float], budget: Optional[float]
+) -> List[AppRefreshResult]:
+    """Refresh the state of apps concurrently on one event loop."""
+    return [
+        result
+        async for result in state.app_service.refresh_app_states(
+            apps, concurrency=jobs, timeout=timeout, budget=budget
+        )
+    ]
+
+
+async def stream_refreshed_apps(
+    apps: List[App],
+    jobs: int,
+    timeout: Optional[float],
+    budget: Optional[float],
+    fields: Optional[List[str]] = None,
+):
+    """Write each app as NDJSON as soon as its refresh finished."""
+    async for result in state.app_service.refresh_app_states(
+        apps, concurrency=jobs, timeout=timeout, budget=budget
+    ):
+        echo_record(app_record(result.app, result.error, fields))
+
+
+def format_time_ago(timestamp: Optional[float]) -> str:
+    """Time since an epoch timestamp in its largest unit."""
+    if timestamp is None:
+        return "never"
+    seconds = max(0, time.time() - timestamp)
+    for unit, unit_seconds in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= unit_seconds:
+            return f"{seconds // unit_seconds:.0f}{unit} ago"
+    return f"{seconds:.0f}s ago"
+
+
+def format_age(application: App) -> str:
+    """Time since the last check, marked with * if the status is stale."""
+    age = format_time_ago(application.checked_at)
+    return f"{age} *" if application.stale else age
+
 
-    Keep the same data directory by providing it via CLI argument.
+def revalidation_running() -> bool:
+    pid_file = state.config_service.get_revalidation_pid_file()
+    try:
+        os.kill(int(pid_file.read_text(encoding="utf-8")), 0)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def revalidate_in_background(max_age: float) -> bool:
+    """Refresh stale statuses in a detached CLI process, unless one is running already.
+
+    Returns True if a process was started.
     """
-    position_of_this_subcommand = sys.argv.index("app")
-    args = (
-            sys.argv[:position_of_this_subcommand]
-            + ["--data-dir", str(state.config_service.get_app_data_dir())]
-            + ["--chdir", os.getcwd()]
-            + sys.argv[position_of_this_subcommand:]
+    # without the lock, two listings could both find no revalidation running and each start one
+    with state.config_service.revalidation_lock():
+        if revalidation_running():
+            return False
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                "from ansible_self_service.l1_entrypoints.cli import main; main()",
+                # only the options given to this process, so both resolve the same data and cache directories
+                *state.global_options,
+                "--resource-class",
+                "background",
+                "app",
+                "revalidate",
+                "--max-age",
+                str(max_age),
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,  # survive the end of this process and its terminal
+        )
+        state.config_service.get_revalidation_pid_file().write_text(
+            str(process.pid), encoding="utf-8"
+        )
+    return True
+
+
+def format_status(application: App) -> str:
+    symbol = app_status_to_symbol(application.status)
+    if application.playbook_error is not None:
+        return f"{symbol} (invalid playbook)"
+    if application.timed_out and application.duration is not None:
+        return f"{symbol} (timed out after {application.duration:.1f}s)"
+    return symbol
+
+
+@app.command()
+def revalidate(
+    max_age: float = typer.Option(
+        default=3600,
+        help="Seconds after which a status is stale.",
+    ),
+    jobs: int = typer.Option(
+        default=1,
+        help="Maximum number of apps that are refreshed in parallel.",
+    ),
+    timeout: Optional[float] = typer.Option(
+        default=None,
+        help="Seconds after which a single Ansible run of a refresh is aborted, overrides the timeouts of the apps.",
+    ),
+    budget: Optional[float] = typer.Option(
+        default=None,
+        help="Seconds after which the whole revalidation is aborted.",
+    ),
+):
+    """Refresh the stale app states, the stalest, quickest and most used apps first."""
+    apps = state.app_service.get_stale_apps(max_age=max_age)
+    try:
+        results = asyncio.run(
+            refresh_apps(apps, jobs=jobs, timeout=timeout, budget=budget)
+        )
+    finally:
+        pid_file = state.config_service.get_revalidation_pid_file()
+        if pid_file.exists() and pid_file.read_text(encoding="utf-8") == str(
+            os.getpid()
+        ):
+            pid_file.unlink()
+    typer.echo(f"✓ Revalidated {len(results)} app states")
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds:.1f}s"
+
+
+@app.command()
+def stats(
+    app_name: Optional[str] = typer.Argument(default=None, help="Only show this app."),
+    collection: Optional[str] = typer.Option(
+        default=None, help="Only show apps of this collection."
+    ),
+    days: float = typer.Option(
+        default=7, help="Only include checks of this many past days."
+    ),
+    compact: bool = typer.Option(
+        default=False,
+        help="Compact the history of all apps first, which otherwise happens while checks are recorded.",
+    ),
+    output: OutputFormat = typer.Option(
+        default=OutputFormat.TABLE, help=OUTPUT_OPTION_HELP
+    ),
+):
+    """Show how long status checks took, how often statuses changed and since when upgrades are available."""
+    if compact:
+        dropped = state.app_service.compact_status_history()
+        typer.echo(
+            f"✓ Compacted the status history, dropped {dropped} checks", err=True
+        )
+    statistics = state.app_service.get_status_statistics(
+        since=time.time() - days * 86400, collection_name=collection, app_name=app_name
+    )
+    if output.is_machine_readable:
+        echo_records(
+            (status_statistics_record(app_statistics) for app_statistics in statistics),
+            output,
+        )
+        return
+    if not statistics:
+        typer.echo(f"No status checks in the past {days:g} days")
+        return
+    table: List[list] = [
+        [
+            "Name",
+            "Collection",
+            "Checks",
+            "p50",
+            "p95",
+            "Flaps",
+            "Timeouts",
+            "Status",
+            "Upgradable",
+        ]
+    ]
+    for app_statistics in statistics:
+        upgradable = app_statistics.upgradable_since
+        table.append(
+            [
+                app_statistics.name,
+                app_statistics.collection_name,
+                app_statistics.checks,
+                format_duration(app_statistics.p50_duration),
+                format_duration(app_statistics.p95_duration),
+                app_statistics.flaps,
+                app_statistics.timeouts,
+                app_status_to_symbol(app_statistics.last_status),
+                "-" if upgradable is None else f"since {format_time_ago(upgradable)}",
+            ]
+        )
+    typer.echo(tabulate(table, headers="firstrow"))
+    typer.echo("")
+    typer.echo(
+        f"Status checks of the past {days:g} days, flaps are status changes between consecutive checks"
     )
-    elevate(with_args=args)
 
 
 @app.command(name="list")
-def list_apps(refresh: bool = False):  # pylint: disable=W0622
-    """List all aps and their status."""
-    collections = state.app_catalog_service.list_collections()
-    apps_nested = [
-        state.app_service.get_apps_for_collection(collection)
-        for collection in collections
-    ]
-    apps: List[App] = list(itertools.chain(*apps_nested))  # flatten list of lists
+def list_apps(
+    refresh: bool = False,
+    hosts: Optional[Path] = typer.Option(
+        default=None,
+        help="Summarise the app status on all hosts of this Ansible inventory instead of the local machine.",
+    ),
+    forks: Optional[int] = typer.Option(
+        default=None,
+        help="Number of parallel Ansible forks when refreshing the status on many hosts.",
+    ),
+    category: Optional[str] = typer.Option(
+        default=None,
+        help="Only list (and refresh) apps in this category.",
+    ),
+    jobs: int = typer.Option(
+        default=1,
+        help="Maximum number of apps that are refreshed in parallel.",
+    ),
+    timeout: Optional[float] = typer.Option(
+        default=None,
+        help="Seconds after which a single Ansible run of a refresh is aborted, overrides the timeouts of the apps.",
+    ),
+    budget: Optional[float] = typer.Option(
+        default=None,
+        help="Seconds after which the whole refresh is aborted, "
+        "apps that were not checked by then are marked as timed out.",
+    ),
+    output: OutputFormat = typer.Option(
+        default=OutputFormat.TABLE, help=OUTPUT_OPTION_HELP
+    ),
+    revalidate: bool = typer.Option(
+        default=False,
+        help="Without --refresh, refresh stale statuses in a background process after listing the cached ones. "
+        "Not supported with --elevate, as the background process cannot ask for the password.",
+    ),
+    max_age: float = typer.Option(
+        default=3600,
+        help="Seconds after which a status is stale.",
+    ),
+    field: Optional[List[str]] = typer.Option(default=None, help=FIELD_OPTION_HELP),
+):  # pylint: disable=W0622
+    """List all aps and their status.
 
+    Cached statuses are shown immediately, stale ones are marked with * and can be revalidated in the background.
+    """
+    fields = field or None
+    check_fields(fields, [*APP_FIELDS, "error"])
+    if hosts is not None:
+        list_fleet_apps(hosts, refresh=refresh, forks=forks, output=output)
+        return
+    if category is not None:
+        apps: List[App] = state.app_service.get_apps_for_category(category)
+    else:
+        collections = state.app_catalog_service.list_collections()
+        apps_nested = [
+            state.app_service.get_apps_for_collection(collection)
+            for collection in collections
+        ]
+        apps = list(itertools.chain(*apps_nested))  # flatten list of lists
+
+    if refresh and output == OutputFormat.NDJSON:
+        asyncio.run(
+            stream_refreshed_apps(
+                apps, jobs=jobs, timeout=timeout, budget=budget, fields=fields
+            )
+        )
+        return
+    errors = {}
     if refresh:
-        # refreshing app state requires root for ansible dry runs
-        # if not is_root():
-        #    typer.echo('🚀 Elevating privileges for app refresh...')
-        #    elevate_with_current_data_dir()
-        typer.echo("⟳  Refreshing app state...")
-        with click_spinner.spinner():
-            apps = [
-                state.app_service.refresh_app_state(app_to_refresh)
-                for app_to_refresh in apps
-            ]
-        typer.echo("\r ")
+        # refreshing app state may require root for ansible dry runs, which --elevate provides
+        with progress("⟳  Refreshing app state...", output):
+            results = asyncio.run(
+                refresh_apps(apps, jobs=jobs, timeout=timeout, budget=budget)
+            )
+        apps = [result.app for result in results]
+        errors = {
+            (result.app.collection.name, result.app.name): result.error
+            for result in results
+            if result.error is not None
+        }
+        if not output.is_machine_readable:
+            typer.echo("\r ")
+            for result in results:
+                if result.error is not None:
+                    typer.echo(f"✗ {result.app.name}: {result.error}")
+
+    if not refresh and revalidate and any(application.stale for application in apps):
+        if state.elevated:
+            typer.echo(
+                "✗ Stale app states are not revalidated in the background with --elevate, use --refresh",
+                err=True,
+            )
+        elif revalidate_in_background(max_age):
+            typer.echo("⟳  Revalidating stale app states in the background", err=True)
+
+    if output.is_machine_readable:
+        apps = sorted(apps, key=operator.attrgetter("name"))
+        echo_records(
+            (
+                app_record(
+                    application,
+                    errors.get((application.collection.name, application.name)),
+                    fields,
+                )
+                for application in apps
+            ),
+            output,
+        )
+        return
 
-    table = [["Name", "Status", "Collection", "Categories"]]
+    table = [["Name", "Status", "Checked", "Collection", "Categories"]]
     table_data = [
         [
             application.name,
-            app_status_to_symbol(application.status),
+            format_status(application),
+            format_age(application),
             application.collection.name,
             ",".join(application.categories),
         ]
@@ -99,7 +526,8 @@ def list_apps(refresh: bool = False):  # pylint: disable=W0622
         f"{app_status_to_symbol(AppStatus.INSTALLED)} installed, "
         f"{app_status_to_symbol(AppStatus.UPGRADABLE)} can be upgraded, "
         f"{app_status_to_symbol(AppStatus.NOT_INSTALLED)} not installed, "
-        f"{app_status_to_symbol(AppStatus.UNKNOWN)} unknown"
+        f"{app_status_to_symbol(AppStatus.UNKNOWN)} unknown, "
+        "* stale"
     )
     # pylint: skip-file
     # TODO: run playbook with tag status to get status (not installed, installed, dysfunctional) and
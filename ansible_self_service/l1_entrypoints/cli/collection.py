@@ -1,20 +1,58 @@
-from typing import Optional
+import time
+from pathlib import Path
+from typing import List, Optional
 
 import typer
 from giturlparse import validate  # type: ignore
 from tabulate import tabulate
 
 from . import state
-from ...l3_services.exceptions import AppCollectionsAlreadyExistsException
+from .output import (
+    COLLECTION_FIELDS,
+    FIELD_OPTION_HELP,
+    OUTPUT_OPTION_HELP,
+    OutputFormat,
+    check_fields,
+    collection_record,
+    echo_records,
+)
+from ...l3_services.dto import AppCollection, AppCollectionUpdate, CatalogChange
+from ...l3_services.exceptions import (
+    AppCollectionsAlreadyExistsException,
+    CollectionBundleException,
+    RequirementsInstallationException,
+)
 
 app = typer.Typer()
 
 
+def format_playbooks_valid(collection: AppCollection) -> str:
+    if collection.playbook_errors is None:
+        return "? (not validated)"
+    if not collection.playbook_errors:
+        return "✓"
+    return f"✗ ({', '.join(sorted(collection.playbook_errors))})"
+
+
 @app.command()
-def list(wide: bool = False):  # pylint: disable=W0622
+def list(
+    wide: bool = False,
+    output: OutputFormat = typer.Option(
+        default=OutputFormat.TABLE, help=OUTPUT_OPTION_HELP
+    ),
+    field: Optional[List[str]] = typer.Option(default=None, help=FIELD_OPTION_HELP),
+):  # pylint: disable=W0622
     """List all registered app collections."""
+    fields = field or None
+    check_fields(fields, COLLECTION_FIELDS)
     collections = state.app_catalog_service.list_collections()
-    header = ["Name", "Config Valid", "Revision"]
+    if output.is_machine_readable:
+        echo_records(
+            (collection_record(collection, fields) for collection in collections),
+            output,
+        )
+        return
+    header = ["Name", "Config Valid", "Playbooks Valid", "Revision"]
     if wide:  # in wide mode we add extra columns
         header += ["URL", "Directory"]
     table = [header]
@@ -24,7 +62,12 @@ def list(wide: bool = False):  # pylint: disable=W0622
             if collection.validation_error is None
             else f"✗ ({collection.validation_error})"
         )
-        row = [collection.name, config_valid, collection.revision[:7]]
+        row = [
+            collection.name,
+            config_valid,
+            format_playbooks_valid(collection),
+            collection.revision[:7],
+        ]
         if wide:
             row += [collection.url, str(collection.path)]
         table.append(row)
@@ -49,6 +92,10 @@ def add(url: str, name: Optional[str] = None):
         typer.echo(f'✓ The app collection "{name}" already exists')
         raise typer.Exit(code=1)  # pylint: disable=W0707
     typer.echo(f'✓ Successfully added "{name}" at revsision {collection.revision}')
+    if collection.requirements_error is not None:
+        typer.echo(
+            f"✗ Could not install the requirements: {collection.requirements_error}"
+        )
     typer.echo("⚠️Please make sure that the authors of this collection are trustworthy")
 
 
@@ -60,23 +107,160 @@ def remove(name: str):
     state.app_catalog_service.remove(name=name)
 
 
-def report_update(name, new_revision, old_revision):
+def report_update(collection_update: AppCollectionUpdate):
     """Helper function to print information about an updated app collection."""
-    if old_revision == new_revision:
-        typer.echo(f"{name} is already up-to-date at revision {new_revision}")
-    else:
+    name = collection_update.name
+    if collection_update.old_revision == collection_update.new_revision:
         typer.echo(
-            f"Updated {name} from revision {old_revision} to revision {new_revision}"
+            f"{name} is already up-to-date at revision {collection_update.new_revision}"
         )
+        return
+    typer.echo(
+        f"Updated {name} from revision {collection_update.old_revision} "
+        f"to revision {collection_update.new_revision}"
+    )
+    if collection_update.requirements_error is not None:
+        typer.echo(
+            f"✗ Could not install the requirements of {name}: {collection_update.requirements_error}"
+        )
+    if collection_update.affected_apps:
+        typer.echo(
+            f"Apps affected by the changes: {', '.join(collection_update.affected_apps)}"
+        )
+    else:
+        typer.echo("No apps are affected by the changes")
 
 
 @app.command()
 def update(name: str, revision: Optional[str] = None):
     """Update an app collection."""
-    old_revision, new_revision = state.app_catalog_service.update(
-        name=name, revision=revision
+    collection_update = state.app_catalog_service.update(name=name, revision=revision)
+    report_update(collection_update)
+
+
+@app.command()
+def export(
+    name: str,
+    revision: Optional[str] = None,
+    output: Optional[Path] = typer.Option(
+        default=None,
+        help="Bundle file to write, defaults to <name>-<revision>.tar.gz in the current directory.",
+    ),
+):
+    """Pack an app collection with its Galaxy requirements into a bundle for machines without network access."""
+    bundle_file = output or Path(f"{name}-{revision or 'current'}.tar.gz")
+    try:
+        bundle = state.app_catalog_service.export(name, bundle_file, revision=revision)
+    except RequirementsInstallationException as exception:
+        typer.echo(f"✗ Could not install the requirements of {name}: {exception}")
+        raise typer.Exit(code=1)  # pylint: disable=W0707
+    typer.echo(
+        f'✓ Exported "{name}" at revision {bundle.revision} with {len(bundle.apps)} apps to {bundle_file}'
     )
-    report_update(name, new_revision, old_revision)
+
+
+@app.command(name="import")
+def import_(bundle_file: Path, name: Optional[str] = None):
+    """Add an app collection from a bundle created by export, without network access.
+
+    If no name is provided the name of the exported collection is used.
+    """
+    try:
+        bundle = state.app_catalog_service.import_bundle(bundle_file, name=name)
+    except AppCollectionsAlreadyExistsException:
+        typer.echo(
+            "✗ The app collection already exists, choose another name with --name"
+        )
+        raise typer.Exit(code=1)  # pylint: disable=W0707
+    except CollectionBundleException as exception:
+        typer.echo(f"✗ Invalid bundle: {exception}")
+        raise typer.Exit(code=1)  # pylint: disable=W0707
+    typer.echo(f'✓ Successfully imported "{bundle.name}" at revision {bundle.revision}')
+    if bundle.validation_error is not None:
+        typer.echo(
+            f"✗ The config of the collection is invalid: {bundle.validation_error}"
+        )
+    else:
+        typer.echo(f"Apps: {', '.join(bundle.apps)}")
+    typer.echo("⚠️Please make sure that the authors of this collection are trustworthy")
+
+
+@app.command(name="validate")
+def validate_playbooks(
+    name: Optional[str] = typer.Argument(
+        default=None, help="Only validate this collection."
+    ),
+    force: bool = typer.Option(
+        default=False, help="Validate again even if the revision was validated before."
+    ),
+):
+    """Syntax check the playbooks of all apps including their roles and imports, without running them.
+
+    Results are kept per revision, so listings report invalid apps and Ansible does not run their playbooks.
+    Exits with 1 if any playbook is invalid.
+    """
+    names = [
+        collection.name for collection in state.app_catalog_service.list_collections()
+    ]
+    if name is not None:
+        if name not in names:
+            typer.echo(f'✗ The app collection "{name}" does not exist')
+            raise typer.Exit(code=1)
+        names = [name]
+    invalid = False
+    for collection_name in names:
+        collection = state.app_catalog_service.validate(collection_name, force=force)
+        if not collection.playbook_errors:
+            typer.echo(
+                f"✓ All playbooks of {collection_name} are valid at revision {collection.revision[:7]}"
+            )
+            continue
+        invalid = True
+        for app_name, error in sorted(collection.playbook_errors.items()):
+            typer.echo(f"✗ {collection_name}/{app_name}: {error}")
+    if invalid:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def maintain():
+    """Repack the git mirror shared by all collections and remove requirements they no longer use."""
+    report = state.app_catalog_service.maintain()
+    typer.echo(
+        f"✓ Git mirror repacked from {report.mirror_size_before / 1024:.0f} KiB "
+        f"to {report.mirror_size_after / 1024:.0f} KiB"
+    )
+    typer.echo(
+        f"✓ Removed {len(report.removed_requirements)} unused requirement installations"
+    )
+
+
+def report_change(change: CatalogChange):
+    """Helper function to print the changes a watched catalog picked up."""
+    for name in change.added:
+        typer.echo(f"+ {name} was added")
+    for name in change.removed:
+        typer.echo(f"- {name} was removed")
+    for name, apps in sorted(change.reloaded.items()):
+        typer.echo(f"~ {name}: reloaded {', '.join(apps)}")
+
+
+@app.command()
+def watch():
+    """Keep the app collections loaded and report changes made on disk until interrupted.
+
+    Added or removed repos, HEAD moves and config edits are picked up and only the affected apps are reloaded.
+    """
+    collections = state.app_catalog_service.list_collections()
+    typer.echo(f"Watching {len(collections)} app collections, press Ctrl+C to stop")
+    state.app_catalog_service.watch(report_change)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        state.app_catalog_service.unwatch()
 
 
 @app.command()
@@ -84,7 +268,5 @@ def update_all():
     """Update all app collections."""
     collections = state.app_catalog_service.list_collections()
     for collection in collections:
-        old_revision, new_revision = state.app_catalog_service.update(
-            name=collection.name
-        )
-        report_update(collection.name, new_revision, old_revision)
+        collection_update = state.app_catalog_service.update(name=collection.name)
+        report_update(collection_update)
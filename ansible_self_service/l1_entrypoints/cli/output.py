@@ -0,0 +1,153 @@
+import json
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+import typer
+
+from ansible_self_service.l3_services.dto import (
+    App,
+    AppCollection,
+    FleetAppStatus,
+    AppStatus,
+    Run,
+    StatusStatistics,
+)
+
+
+class OutputFormat(str, Enum):
+    """How listing commands print their results."""
+
+    TABLE = "table"
+    JSON = "json"  # a single array once all rows are known
+    NDJSON = "ndjson"  # one object per line as soon as each row is known
+
+    @property
+    def is_machine_readable(self) -> bool:
+        return self != OutputFormat.TABLE
+
+
+OUTPUT_OPTION_HELP = (
+    "table for humans, json for a single array "
+    "or ndjson for one object per line written as soon as it is known."
+)
+FIELD_OPTION_HELP = (
+    "Only include this field in json and ndjson output, can be repeated. "
+    "Fields left out are not computed."
+)
+
+
+def status_name(app_status: AppStatus) -> str:
+    return app_status.name.lower()
+
+
+APP_FIELDS: Dict[str, Callable[[App], Any]] = {
+    "name": lambda application: application.name,
+    "collection": lambda application: application.collection.name,
+    "categories": lambda application: application.categories,
+    "status": lambda application: status_name(application.status),
+    "duration": lambda application: application.duration,
+    "timed_out": lambda application: application.timed_out,
+    "checked_at": lambda application: application.checked_at,
+    "stale": lambda application: application.stale,
+    "playbook_error": lambda application: application.playbook_error,
+}
+
+COLLECTION_FIELDS: Dict[str, Callable[[AppCollection], Any]] = {
+    "name": lambda collection: collection.name,
+    "revision": lambda collection: collection.revision,
+    "url": lambda collection: collection.url,
+    "path": lambda collection: str(collection.path),
+    "validation_error": lambda collection: collection.validation_error,
+    "requirements_error": lambda collection: collection.requirements_error,
+    "playbook_errors": lambda collection: collection.playbook_errors,
+}
+
+
+def check_fields(fields: Optional[Sequence[str]], known: Iterable[str]):
+    unknown = sorted(set(fields or ()) - set(known))
+    if unknown:
+        raise typer.BadParameter(
+            f"Unknown fields {', '.join(unknown)}, choose from {', '.join(known)}"
+        )
+
+
+def app_record(
+    application: App,
+    error: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """The app as plain data, restricted to fields if given."""
+    record = {
+        name: getter(application)
+        for name, getter in APP_FIELDS.items()
+        if fields is None or name in fields
+    }
+    if fields is None or "error" in fields:
+        record["error"] = error
+    return record
+
+
+def collection_record(
+    collection: AppCollection, fields: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """The collection as plain data, restricted to fields if given."""
+    return {
+        name: getter(collection)
+        for name, getter in COLLECTION_FIELDS.items()
+        if fields is None or name in fields
+    }
+
+
+def fleet_app_record(fleet_app: FleetAppStatus, hosts: Iterable[str]) -> Dict[str, Any]:
+    """Status per host, hosts without a result are unknown."""
+    return {
+        "name": fleet_app.name,
+        "collection": fleet_app.collection_name,
+        "statuses": {
+            host: status_name(fleet_app.statuses.get(host, AppStatus.UNKNOWN))
+            for host in hosts
+        },
+    }
+
+
+def status_statistics_record(statistics: StatusStatistics) -> Dict[str, Any]:
+    return {
+        "name": statistics.name,
+        "collection": statistics.collection_name,
+        "checks": statistics.checks,
+        "timeouts": statistics.timeouts,
+        "flaps": statistics.flaps,
+        "p50_duration": statistics.p50_duration,
+        "p95_duration": statistics.p95_duration,
+        "last_status": status_name(statistics.last_status),
+        "upgradable_since": statistics.upgradable_since,
+    }
+
+
+def run_record(run: Run) -> Dict[str, Any]:
+    return {
+        "id": run.run_id,
+        "name": run.name,
+        "collection": run.collection_name,
+        "tag": run.tag,
+        "check_mode": run.check_mode,
+        "revision": run.revision,
+        "started_at": run.started_at,
+        "duration": run.duration,
+        "return_code": run.return_code,
+        "size": run.size,
+        "stored_size": run.stored_size,
+    }
+
+
+def echo_record(record: Dict[str, Any]):
+    """Write a single NDJSON line, echo flushes it, so consumers see it immediately."""
+    typer.echo(json.dumps(record, sort_keys=True))
+
+
+def echo_records(records: Iterable[Dict[str, Any]], output: OutputFormat):
+    if output == OutputFormat.NDJSON:
+        for record in records:
+            echo_record(record)
+    else:
+        typer.echo(json.dumps(list(records), indent=2, sort_keys=True))
@@ -0,0 +1,136 @@
+import time
+from typing import List, Optional
+
+import typer
+from tabulate import tabulate
+
+from ansible_self_service.l3_services.exceptions import (
+    AmbiguousRunIdException,
+    RunNotFoundException,
+)
+from . import state
+from .app import format_duration, format_time_ago
+from .output import OUTPUT_OPTION_HELP, OutputFormat, echo_records, run_record
+
+app = typer.Typer()
+
+# characters of a run id shown in tables, like an abbreviated git revision
+SHORT_ID_LENGTH = 12
+
+
+def format_size(size: int) -> str:
+    for unit, unit_size in (("M", 1024 * 1024), ("K", 1024)):
+        if size >= unit_size:
+            return f"{size / unit_size:.1f}{unit}"
+    return f"{size}B"
+
+
+@app.command(name="list")
+def list_runs(  # pylint: disable=too-many-arguments
+    app_name: Optional[str] = typer.Argument(
+        default=None, help="Only show runs of this app."
+    ),
+    collection: Optional[str] = typer.Option(
+        default=None, help="Only show runs of apps of this collection."
+    ),
+    tag: Optional[str] = typer.Option(
+        default=None,
+        help="Only show runs of this playbook tag, e.g. status or install.",
+    ),
+    revision: Optional[str] = typer.Option(
+        default=None, help="Only show runs at this (abbreviated) revision."
+    ),
+    failed: Optional[bool] = typer.Option(
+        None,
+        "--failed/--succeeded",
+        help="Only show runs that failed or succeeded.",
+        show_default=False,
+    ),
+    days: float = typer.Option(
+        default=7, help="Only include runs of this many past days."
+    ),
+    limit: int = typer.Option(
+        default=20, help="Show at most this many runs, the newest first."
+    ),
+    output: OutputFormat = typer.Option(
+        default=OutputFormat.TABLE, help=OUTPUT_OPTION_HELP
+    ),
+):
+    """List the Ansible runs whose output has been kept."""
+    runs = state.run_service.list_runs(
+        since=time.time() - days * 86400,
+        collection_name=collection,
+        app_name=app_name,
+        tag=tag,
+        revision=revision,
+        failed=failed,
+    )
+    runs = runs[::-1][:limit]
+    if output.is_machine_readable:
+        echo_records((run_record(run) for run in runs), output)
+        return
+    if not runs:
+        typer.echo(f"No matching runs in the past {days:g} days")
+        return
+    table: List[list] = [
+        ["Id", "Name", "Collection", "Tag", "Result", "Started", "Duration", "Stored"]
+    ]
+    for run in runs:
+        table.append(
+            [
+                run.run_id[:SHORT_ID_LENGTH],
+                run.name,
+                run.collection_name,
+                f"{run.tag} (check)" if run.check_mode else run.tag,
+                "✓" if run.was_successful else f"✗ {run.return_code}",
+                format_time_ago(run.started_at),
+                format_duration(run.duration),
+                format_size(run.stored_size),
+            ]
+        )
+    typer.echo(tabulate(table, headers="firstrow"))
+
+
+@app.command()
+def show(
+    run_id: str = typer.Argument(..., help="Id of the run, may be abbreviated."),
+    stdout: bool = typer.Option(
+        default=True, help="Print the output of the JSON callback on stdout."
+    ),
+    stderr: bool = typer.Option(
+        default=True, help="Print the stderr of the run on stderr."
+    ),
+):
+    """Print the raw output of a past Ansible run without running it again."""
+    try:
+        run_output = state.run_service.get_run_output(
+            run_id, stdout=stdout, stderr=stderr
+        )
+    except RunNotFoundException as exception:
+        typer.echo(f"✗ Unknown run {run_id}", err=True)
+        raise typer.Exit(code=1) from exception
+    except AmbiguousRunIdException as exception:
+        run_ids = exception.args[1]
+        typer.echo(
+            f"✗ {run_id} matches several runs ({', '.join(run_ids)}), please give more of the id",
+            err=True,
+        )
+        raise typer.Exit(code=1) from exception
+    run = run_output.run
+    typer.echo(
+        f"{run.tag} run of {run.name} in {run.collection_name} at revision {run.revision or 'unknown'}, started "
+        f"{format_time_ago(run.started_at)}, took {format_duration(run.duration)}, return code {run.return_code}",
+        err=True,
+    )
+    if stderr and run_output.stderr:
+        typer.echo(run_output.stderr, err=True, nl=False)
+    if stdout:
+        typer.echo(run_output.stdout, nl=False)
+
+
+@app.command()
+def prune():
+    """Drop the oldest runs until the kept output is within its size limit, which otherwise happens once it is
+    exceeded."""
+    dropped = state.run_service.prune_runs()
+    typer.echo(f"✓ Dropped {dropped} runs")
@@ -1,7 +1,15 @@
+from typing import List
+
 from ansible_self_service.l3_services.app import AppService
 from ansible_self_service.l3_services.app_catalog import AppCatalogService
 from ansible_self_service.l3_services.config import ConfigService
+from ansible_self_service.l3_services.fleet import FleetService
+from ansible_self_service.l3_services.run import RunService
 
 app_catalog_service: "AppCatalogService"
 app_service: "AppService"
 config_service: "ConfigService"
+fleet_service: "FleetService"
+run_service: "RunService"
+global_options: List[str]
+elevated: bool
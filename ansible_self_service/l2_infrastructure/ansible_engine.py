@@ -0,0 +1,514 @@
+"""Run many playbooks through long-lived Ansible contexts instead of initializing Ansible for every run."""
+import asyncio
+import atexit
+import functools
+import io
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ansible_self_service.l2_infrastructure.ansible_runner import (
+    AnsibleRunner,
+    AsyncAnsibleRunner,
+    playbook_arguments,
+)
+from ansible_self_service.l2_infrastructure.profiler import profiled
+from ansible_self_service.l4_core.exceptions import AnsibleRunTimeoutException
+from ansible_self_service.l4_core.models import AnsibleRunResult
+from ansible_self_service.l4_core.protocols import (
+    AnsibleRunnerProtocol,
+    AsyncAnsibleRunnerProtocol,
+)
+
+WorkerKey = Tuple[str, Optional[str]]
+
+# ansible-core releases (lower bound inclusive, upper bound exclusive) whose internal loader and variable manager
+# state AnsibleContext is known to reset between runs
+SUPPORTED_ANSIBLE_CORE = ((2, 11), (2, 16))
+
+
+@functools.lru_cache(maxsize=None)
+def reusable_contexts_supported() -> bool:
+    """True if the installed ansible-core allows reusing an Ansible context for several runs.
+
+    Only ansible.release is imported, which neither reads the Ansible config nor initializes plugins.
+    """
+    try:
+        # pylint: disable=import-outside-toplevel
+        from ansible.release import __version__
+    except ImportError:
+        return False
+    try:
+        version = tuple(int(part) for part in __version__.split(".")[:2])
+    except ValueError:
+        return False
+    lower, upper = SUPPORTED_ANSIBLE_CORE
+    return lower <= version < upper
+
+
+class AnsibleWorkerError(Exception):
+    """Raised when an Ansible worker failed or died during a run."""
+
+
+class AnsibleContext:
+    """Ansible loader, inventory and variable manager shared by all runs within one worker process.
+
+    Ansible reads ansible.cfg and the ANSIBLE_* env vars once on import, so a context is bound to the working
+    directory and requirements it was created for. Only runs against the implicit localhost are supported. Before
+    every run but the first the context clears state Ansible keeps in private attributes, which is only done for the
+    ansible-core releases in SUPPORTED_ANSIBLE_CORE. The pool gives every run a fresh context with other releases.
+    """
+
+    def __init__(self, working_directory: Path, requirements_directory: Optional[Path]):
+        for env_var in list(os.environ):
+            if env_var.startswith("ANSIBLE_"):
+                del os.environ[env_var]
+        os.environ["ANSIBLE_STDOUT_CALLBACK"] = "ansible.posix.json"
+        # the inventory is left empty on purpose
+        os.environ["ANSIBLE_INVENTORY_UNPARSED_WARNING"] = "False"
+        os.environ.update(
+            AnsibleRunner._requirements_env(  # pylint: disable=protected-access
+                working_directory, requirements_directory
+            )
+        )
+        os.chdir(working_directory)
+        # pylint: disable=import-outside-toplevel
+        from ansible.cli import CLI
+        from ansible.plugins import loader
+
+        # ansible-core 2.15 and later initialize the plugin loader on request, earlier releases on import
+        if hasattr(loader, "init_plugin_loader"):
+            loader.init_plugin_loader([])
+        self._version_info = CLI.version_info(gitinfo=False)
+        # created for the first run, whose CLI args the variable manager takes the options from
+        self._loader: Any = None
+        self._inventory: Any = None
+        self._variable_manager: Any = None
+
+    def _create(self):
+        # pylint: disable=import-outside-toplevel
+        from ansible.inventory.manager import InventoryManager
+        from ansible.parsing.dataloader import DataLoader
+        from ansible.vars.manager import VariableManager
+
+        self._loader = DataLoader()
+        # without sources only the implicit localhost exists
+        self._inventory = InventoryManager(loader=self._loader, sources=[])
+        self._variable_manager = VariableManager(
+            loader=self._loader,
+            inventory=self._inventory,
+            version_info=self._version_info,
+        )
+
+    def _prepare(self):
+        """Create the loader, inventory and variable manager for the first run, reset them for later ones."""
+        if self._variable_manager is None:
+            self._create()
+        elif reusable_contexts_supported():
+            self._reset()
+        else:
+            raise AnsibleWorkerError(
+                "The installed ansible-core does not support reusing an Ansible context"
+            )
+
+    def _reset(self):
+        """Drop everything a previous run may have left behind: parsed files, facts, host changes and options."""
+        # pylint: disable=import-outside-toplevel,protected-access
+        from ansible.utils.vars import load_extra_vars, load_options_vars
+
+        self._loader.cleanup_all_tmp_files()
+        self._loader._FILE_CACHE.clear()  # playbooks change with collection updates
+        self._inventory.refresh_inventory()
+        variable_manager = self._variable_manager
+        if hasattr(variable_manager._fact_cache, "flush"):
+            variable_manager._fact_cache.flush()
+        else:
+            variable_manager._fact_cache.clear()
+        variable_manager._nonpersistent_fact_cache.clear()
+        # options vars carry e.g. ansible_check_mode, Ansible caches both on the loader functions for the process
+        load_options_vars.options_vars = None  # type: ignore[attr-defined]
+        load_extra_vars.extra_vars = None  # type: ignore[attr-defined]
+        variable_manager._options_vars = load_options_vars(self._version_info)
+        variable_manager._extra_vars = load_extra_vars(loader=self._loader)
+
+    @staticmethod
+    def _exit_code(exception: Exception) -> int:
+        """Exit code ansible-playbook reports for an error raised while loading or running playbooks."""
+        # pylint: disable=import-outside-toplevel
+        from ansible.errors import AnsibleOptionsError, AnsibleParserError
+
+        if isinstance(exception, AnsibleOptionsError):
+            return 5
+        if isinstance(exception, AnsibleParserError):
+            return 4
+        return 1
+
+    @staticmethod
+    def _set_cli_args(
+        playbook_path: Path,
+        tags: Sequence[str],
+        check_mode: bool,
+        syntax_check: bool,
+    ):
+        """Parse the command line of the run like ansible-playbook and make it the CLI args of the process."""
+        # pylint: disable=import-outside-toplevel
+        from ansible import context
+        from ansible.cli.playbook import PlaybookCLI
+        from ansible.utils.context_objects import CLIArgs
+
+        cli = PlaybookCLI(
+            playbook_arguments(
+                playbook_path, tags, check_mode, syntax_check=syntax_check
+            )
+        )
+        cli.init_parser()
+        options = cli.post_process_args(cli.parser.parse_args(cli.args[1:]))
+        # the global CLI args are a singleton that can only be initialized once per process
+        context.CLIARGS = CLIArgs.from_options(options)
+
+    def _executor(self, playbook_path: Path) -> Any:
+        """Playbook executor with the plugins and collections next to the playbook."""
+        # pylint: disable=import-outside-toplevel
+        from ansible.executor.playbook_executor import PlaybookExecutor
+        from ansible.plugins.loader import add_all_plugin_dirs
+        from ansible.utils.collection_loader import AnsibleCollectionConfig
+
+        playbook_directory = str(playbook_path.parent.absolute())
+        add_all_plugin_dirs(playbook_directory)
+        AnsibleCollectionConfig.playbook_paths = [playbook_directory]
+        return PlaybookExecutor(
+            playbooks=[str(playbook_path)],
+            inventory=self._inventory,
+            variable_manager=self._variable_manager,
+            loader=self._loader,
+            passwords={},
+        )
+
+    def run(
+        self,
+        playbook_path: Path,
+        tags: Sequence[str],
+        check_mode: bool,
+        syntax_check: bool = False,
+    ) -> AnsibleRunResult:
+        """Run a playbook or, with syntax_check, only load it including its roles and imports."""
+        # pylint: disable=import-outside-toplevel
+        from ansible.errors import AnsibleError
+
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            self._set_cli_args(playbook_path, tags, check_mode, syntax_check)
+            self._prepare()
+            try:
+                result = self._executor(playbook_path).run()
+                # a syntax check returns the loaded plays instead of an exit code, loading them succeeded
+                return_code = 0 if syntax_check else result
+            except AnsibleError as exception:
+                # e.g. a syntax error or a missing role, reported like ansible-playbook does
+                stderr.write(f"ERROR! {exception}\n")
+                return_code = self._exit_code(exception)
+        return AnsibleRunResult(stdout.getvalue(), stderr.getvalue(), return_code)
+
+
+def _detach_stdio():
+    """Point stdin, stdout and stderr at /dev/null.
+
+    Runs capture their output anyway, and Ansible refuses to start if the caller's stdio is non-blocking.
+    """
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for descriptor in range(3):
+        os.dup2(devnull, descriptor)
+    os.close(devnull)
+
+
+def serve(
+    connection: Connection,
+    working_directory: str,
+    requirements_directory: Optional[str],
+):
+    """Main loop of a worker process: run the playbooks received on the connection until it is closed.
+
+    If the Ansible context cannot be created, every job is answered with that error.
+    """
+    os.setsid()  # a timeout kills the worker together with the processes Ansible started
+    _detach_stdio()
+    ansible_context: Optional[AnsibleContext] = None
+    context_error = None
+    try:
+        ansible_context = AnsibleContext(
+            Path(working_directory),
+            Path(requirements_directory) if requirements_directory else None,
+        )
+    except BaseException:  # pylint: disable=broad-except  # Ansible exits on some setup errors
+        context_error = traceback.format_exc()
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        if ansible_context is None:
+            connection.send((None, context_error))
+            continue
+        try:
+            with profiled("ansible-worker"):
+                connection.send((ansible_context.run(*job), None))
+        except Exception:  # pylint: disable=broad-except
+            connection.send((None, traceback.format_exc()))
+
+
+class AnsibleWorker:
+    """Handle of a worker process running playbooks for one working directory."""
+
+    def __init__(self, key: WorkerKey):
+        self.key = key
+        # spawned, so the worker neither inherits threads nor locks of the caller, which breaks Ansible's forks
+        context = multiprocessing.get_context("spawn")
+        self.connection, child_connection = context.Pipe()
+        self._process = context.Process(
+            target=serve,
+            args=(child_connection, *key),
+            name=f"ansible-worker {key[0]}",
+        )
+        self._process.start()
+        child_connection.close()
+        self.runs = 0
+
+    def submit(
+        self,
+        playbook_path: Path,
+        tags: Sequence[str],
+        check_mode: bool,
+        syntax_check: bool = False,
+    ):
+        self.runs += 1
+        try:
+            self.connection.send((playbook_path, tuple(tags), check_mode, syntax_check))
+        except OSError as exception:
+            raise AnsibleWorkerError(
+                f"Ansible worker for {self.key[0]} died"
+            ) from exception
+
+    def result(self) -> AnsibleRunResult:
+        """Receive the result of the submitted run, call only once the connection is readable."""
+        try:
+            result, error = self.connection.recv()
+        except (EOFError, OSError) as exception:
+            raise AnsibleWorkerError(
+                f"Ansible worker for {self.key[0]} died"
+            ) from exception
+        if error is not None:
+            raise AnsibleWorkerError(error)
+        return result
+
+    def kill(self):
+        try:
+            if self._process.pid is not None:
+                os.killpg(self._process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass  # already gone
+        self._process.join()
+        self.connection.close()
+
+    def close(self, timeout: float = 5.0):
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass  # the worker is gone already
+        self._process.join(timeout)
+        self.kill()
+
+
+class AnsibleWorkerPool:
+    """Idle workers per working directory and requirements, reused until they served max_runs runs.
+
+    A worker handles one run at a time, concurrent runs for the same directory get a worker each. With an ansible-core
+    release that does not support reusing contexts every worker serves a single run.
+    """
+
+    def __init__(self, max_runs: int = 100):
+        self._max_runs = max_runs if reusable_contexts_supported() else 1
+        self._idle: Dict[WorkerKey, List[AnsibleWorker]] = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def acquire(
+        self, working_directory: Path, requirements_directory: Optional[Path]
+    ) -> AnsibleWorker:
+        key = (
+            str(working_directory.absolute()),
+            str(requirements_directory) if requirements_directory else None,
+        )
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()
+        return AnsibleWorker(key)
+
+    def release(self, worker: AnsibleWorker):
+        if worker.runs >= self._max_runs:
+            worker.close()
+            return
+        with self._lock:
+            self._idle.setdefault(worker.key, []).append(worker)
+
+    def run(  # pylint: disable=too-many-arguments
+        self,
+        working_directory: Path,
+        requirements_directory: Optional[Path],
+        playbook_path: Path,
+        tags: Sequence[str] = tuple(),
+        check_mode: bool = False,
+        syntax_check: bool = False,
+        timeout: Optional[float] = None,
+    ) -> AnsibleRunResult:
+        """Run a playbook on an idle worker and wait for the result.
+
+        A worker that timed out or failed is killed instead of being returned to the pool.
+        """
+        start = time.monotonic()
+        worker = self.acquire(working_directory, requirements_directory)
+        try:
+            worker.submit(playbook_path, tags, check_mode, syntax_check)
+            if not worker.connection.poll(timeout):
+                raise AnsibleRunTimeoutException(time.monotonic() - start)
+            result = worker.result()
+        except BaseException:
+            worker.kill()
+            raise
+        self.release(worker)
+        return result
+
+    def close(self):
+        with self._lock:
+            workers = [worker for idle in self._idle.values() for worker in idle]
+            self._idle.clear()
+        for worker in workers:
+            worker.close()
+
+
+class ReusableAnsibleRunner(AnsibleRunnerProtocol):
+    """Run playbooks through long-lived Ansible contexts of a worker pool.
+
+    Runs against an inventory, and all runs if the installed ansible-core does not support reusing contexts, are passed
+    on to the isolated AnsibleRunner.
+    """
+
+    def __init__(self, worker_pool: AnsibleWorkerPool):
+        self._worker_pool = worker_pool
+        self._isolated_runner = AnsibleRunner()
+
+    def run(  # pylint: disable=too-many-arguments
+        self,
+        working_directory: Path,
+        playbook_path: Path,
+        tags=tuple(),
+        check_mode: bool = False,
+        inventory: Optional[Path] = None,
+        limit: Optional[Sequence[str]] = None,
+        forks: Optional[int] = None,
+        requirements_directory: Optional[Path] = None,
+        timeout: Optional[float] = None,
+    ) -> AnsibleRunResult:
+        if (
+            inventory is not None
+            or limit
+            or forks is not None
+            or not reusable_contexts_supported()
+        ):
+            return self._isolated_runner.run(
+                working_directory,
+                playbook_path,
+                tags,
+                check_mode,
+                inventory,
+                limit,
+                forks,
+                requirements_directory,
+                timeout=timeout,
+            )
+        return self._worker_pool.run(
+            working_directory,
+            requirements_directory,
+            playbook_path,
+            tags,
+            check_mode,
+            timeout=timeout,
+        )
+
+
+class ReusableAsyncAnsibleRunner(AsyncAnsibleRunnerProtocol):
+    """Like ReusableAnsibleRunner but waits for results on the event loop.
+
+    Runs against an inventory, and all runs if the installed ansible-core does not support reusing contexts, are passed
+    on to the AsyncAnsibleRunner.
+    """
+
+    def __init__(self, worker_pool: AnsibleWorkerPool):
+        self._worker_pool = worker_pool
+        self._isolated_runner = AsyncAnsibleRunner()
+
+    @staticmethod
+    async def _readable(connection: Connection):
+        loop = asyncio.get_event_loop()
+        readable = loop.create_future()
+        loop.add_reader(connection.fileno(), readable.set_result, None)
+        try:
+            await readable
+        finally:
+            loop.remove_reader(connection.fileno())
+
+    async def run(  # pylint: disable=too-many-arguments
+        self,
+        working_directory: Path,
+        playbook_path: Path,
+        tags=tuple(),
+        check_mode: bool = False,
+        inventory: Optional[Path] = None,
+        limit: Optional[Sequence[str]] = None,
+        forks: Optional[int] = None,
+        requirements_directory: Optional[Path] = None,
+        timeout: Optional[float] = None,
+    ) -> AnsibleRunResult:
+        if (
+            inventory is not None
+            or limit
+            or forks is not None
+            or not reusable_contexts_supported()
+        ):
+            return await self._isolated_runner.run(
+                working_directory,
+                playbook_path,
+                tags,
+                check_mode,
+                inventory,
+                limit,
+                forks,
+                requirements_directory,
+                timeout=timeout,
+            )
+        start = time.monotonic()
+        worker = self._worker_pool.acquire(working_directory, requirements_directory)
+        try:
+            worker.submit(playbook_path, tags, check_mode)
+            try:
+                await asyncio.wait_for(self._readable(worker.connection), timeout)
+            except asyncio.TimeoutError as exception:
+                raise AnsibleRunTimeoutException(
+                    time.monotonic() - start
+                ) from exception
+            result = worker.result()
+        except BaseException:  # includes the cancellation of the awaiting task
+            worker.kill()
+            raise
+        self._worker_pool.release(worker)
+        return result
@@ -1,6 +1,12 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Tuple, Dict
+
 import jmespath
 
 from ansible_self_service.l4_core import models  # pylint: disable=unused-import
+from ansible_self_service.l4_core.models import AnsibleRunSummary, ResourceLimits
 from ansible_self_service.l4_core.protocols import (
     AnsibleResultAnalyzerProtocol,
     LoggerProtocol,
@@ -9,14 +15,31 @@ from ansible_self_service.l4_core.protocols import (
 
 class JMESPathAnsibleResultAnalyzer(AnsibleResultAnalyzerProtocol):
     JMESPATH_QUERY_NUMBER_OF_TASKS_CONTAINING_MESSAGE = (
-        "length(plays[].tasks[?hosts.localhost.msg=='{msg}'][])"
+        "length(plays[].tasks[?hosts.{host}.msg=='{msg}'][])"
+    )
+    JMESPATH_QUERY_MESSAGES = "plays[].tasks[].hosts.{host}.msg"
+    JMESPATH_QUERY_TASK_DURATIONS = (
+        "plays[].tasks[].task.[name, duration.start, duration.end]"
     )
+    JMESPATH_QUERY_STATS = "stats.{host}"
+    JMESPATH_QUERY_HOSTS = "keys(stats)"
+    DEFAULT_HOST = "localhost"
+    TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
 
     def __init__(self, logger: LoggerProtocol):
         self._logger = logger
 
-    def _get_number_of_tasks_with_message(self, msg: str, data: dict):
-        query = self.JMESPATH_QUERY_NUMBER_OF_TASKS_CONTAINING_MESSAGE.format(msg=msg)
+    @staticmethod
+    def _quote(host: str) -> str:
+        """Quote a host name, so it can be used as JMESPath identifier even if it contains dots or dashes."""
+        return json.dumps(host)
+
+    def _get_number_of_tasks_with_message(
+        self, msg: str, data: dict, host: str = DEFAULT_HOST
+    ):
+        query = self.JMESPATH_QUERY_NUMBER_OF_TASKS_CONTAINING_MESSAGE.format(
+            host=self._quote(host), msg=msg
+        )
         return jmespath.search(query, data)
 
     def signaling_installed(
@@ -38,9 +61,108 @@ class JMESPathAnsibleResultAnalyzer(AnsibleResultAnalyzerProtocol):
     def has_changes(self, ansible_run_result: "models.AnsibleRunResult") -> bool:
         try:
             return (
-                int(jmespath.search("stats.localhost.changed", ansible_run_result.data))
+                int(
+                    jmespath.search(
+                        f"stats.{self._quote(self.DEFAULT_HOST)}.changed",
+                        ansible_run_result.data,
+                    )
+                )
                 > 0
             )
         except TypeError as err:
             self._logger.error(f"Could not parse Ansible result: {err}")
             return False
+
+    def _task_durations(self, data: dict) -> Tuple[Tuple[str, float], ...]:
+        durations = []
+        for name, start, end in (
+            jmespath.search(self.JMESPATH_QUERY_TASK_DURATIONS, data) or []
+        ):
+            if not start or not end:
+                continue  # task has not finished, e.g. because the run was aborted
+            delta = datetime.strptime(end, self.TIMESTAMP_FORMAT) - datetime.strptime(
+                start, self.TIMESTAMP_FORMAT
+            )
+            durations.append((name, delta.total_seconds()))
+        return tuple(durations)
+
+    def _summarize_host(  # pylint: disable=too-many-arguments
+        self,
+        data: dict,
+        host: str,
+        return_code: int,
+        task_durations: Tuple[Tuple[str, float], ...],
+        artifact_path: Optional[Path] = None,
+        resource_limits: Optional[ResourceLimits] = None,
+    ) -> AnsibleRunSummary:
+        quoted_host = self._quote(host)
+        messages = (
+            jmespath.search(self.JMESPATH_QUERY_MESSAGES.format(host=quoted_host), data)
+            or []
+        )
+        stats = (
+            jmespath.search(self.JMESPATH_QUERY_STATS.format(host=quoted_host), data)
+            or {}
+        )
+        return AnsibleRunSummary(
+            return_code=return_code,
+            signals=frozenset(
+                msg
+                for msg in messages
+                if isinstance(msg, str) and msg.startswith(self.SIGNAL_PREFIX)
+            ),
+            changed=int(stats.get("changed", 0)),
+            failed=int(stats.get("failures", 0)) + int(stats.get("unreachable", 0)),
+            task_durations=task_durations,
+            artifact_path=artifact_path,
+            resource_limits=resource_limits,
+        )
+
+    def _parse(self, ansible_run_result: "models.AnsibleRunResult") -> Optional[dict]:
+        try:
+            return ansible_run_result.data
+        except ValueError as err:
+            self._logger.error(f"Could not parse Ansible result: {err}")
+            return None
+
+    def summarize(
+        self,
+        ansible_run_result: "models.AnsibleRunResult",
+        artifact_path: Optional[Path] = None,
+    ) -> AnsibleRunSummary:
+        if artifact_path is not None:
+            ansible_run_result.write_artifact(artifact_path)
+        data = self._parse(ansible_run_result)
+        if data is None:
+            return AnsibleRunSummary(
+                return_code=ansible_run_result.return_code,
+                artifact_path=artifact_path,
+                resource_limits=ansible_run_result.resource_limits,
+            )
+        summary = self._summarize_host(
+            data,
+            self.DEFAULT_HOST,
+            ansible_run_result.return_code,
+            self._task_durations(data),
+            artifact_path,
+            ansible_run_result.resource_limits,
+        )
+        # drop the parsed document cached on the result, only the summary is kept
+        ansible_run_result.__dict__.pop("data", None)
+        return summary
+
+    def summarize_hosts(
+        self, ansible_run_result: "models.AnsibleRunResult"
+    ) -> Dict[str, AnsibleRunSummary]:
+        data = self._parse(ansible_run_result)
+        if data is None:
+            return {}
+        task_durations = self._task_durations(data)
+        summaries = {
+            host: self._summarize_host(
+                data, host, ansible_run_result.return_code, task_durations
+            )
+            for host in jmespath.search(self.JMESPATH_QUERY_HOSTS, data) or []
+        }
+        ansible_run_result.__dict__.pop("data", None)
+        return summaries
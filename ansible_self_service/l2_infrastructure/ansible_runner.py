@@ -1,11 +1,27 @@
+import asyncio
+import configparser
 import io
 import os
+import signal
+import sys
+import time
 from contextlib import contextmanager, redirect_stdout, redirect_stderr
 from pathlib import Path
+from asyncio.subprocess import Process
+from typing import Dict, List, Optional, Sequence
 
-from ansible_self_service.l2_infrastructure.utils import processify, set_env
+from ansible_self_service.l2_infrastructure.profiler import profiled_command
+from ansible_self_service.l2_infrastructure.utils import (
+    ProcessTimeoutError,
+    processify,
+    set_env,
+)
+from ansible_self_service.l4_core.exceptions import AnsibleRunTimeoutException
 from ansible_self_service.l4_core.models import AnsibleRunResult
-from ansible_self_service.l4_core.protocols import AnsibleRunnerProtocol
+from ansible_self_service.l4_core.protocols import (
+    AnsibleRunnerProtocol,
+    AsyncAnsibleRunnerProtocol,
+)
 
 
 @contextmanager
@@ -27,9 +43,77 @@ def set_directory(path: Path):
         os.chdir(origin)
 
 
+def playbook_arguments(  # pylint: disable=too-many-arguments
+    playbook_path: Path,
+    tags: Sequence[str] = tuple(),
+    check_mode: bool = False,
+    inventory: Optional[Path] = None,
+    limit: Optional[Sequence[str]] = None,
+    forks: Optional[int] = None,
+    syntax_check: bool = False,
+) -> List[str]:
+    """Command line of an ansible-playbook run."""
+    args = ["ansible-playbook", str(playbook_path)]
+    if len(tags) > 0:
+        args += ["--tags", ",".join(tags)]
+    if check_mode:
+        args.append("--check")
+    if inventory is not None:
+        args += ["--inventory", str(inventory)]
+    if limit:
+        args += ["--limit", ",".join(limit)]
+    if forks is not None:
+        args += ["--forks", str(forks)]
+    if syntax_check:
+        args.append("--syntax-check")
+    return args
+
+
 class AnsibleRunner(AnsibleRunnerProtocol):
     """Run ansible-playbook."""
 
+    DEFAULT_ROLES_PATH = "~/.ansible/roles:/usr/share/ansible/roles:/etc/ansible/roles"
+    DEFAULT_COLLECTIONS_PATH = "~/.ansible/collections:/usr/share/ansible/collections"
+
+    @staticmethod
+    def _configured_path(
+        working_directory: Path, keys: Sequence[str], default: str
+    ) -> str:
+        """Search path from the ansible.cfg of the working directory with relative entries made absolute."""
+        parser = configparser.ConfigParser()
+        parser.read(working_directory / "ansible.cfg")
+        for key in keys:
+            if parser.has_option("defaults", key):
+                return ":".join(
+                    str(working_directory / os.path.expanduser(entry))
+                    for entry in parser.get("defaults", key).split(":")
+                    if entry
+                )
+        return default
+
+    @classmethod
+    def _requirements_env(
+        cls, working_directory: Path, requirements_directory: Optional[Path]
+    ) -> Dict[str, str]:
+        """Env vars putting installed requirements in front of the search paths a collection would use otherwise.
+
+        Setting the env vars overrides the collection's ansible.cfg, so the paths configured there are kept.
+        """
+        if requirements_directory is None:
+            return {}
+        roles_path = cls._configured_path(
+            working_directory, ("roles_path",), cls.DEFAULT_ROLES_PATH
+        )
+        collections_path = cls._configured_path(
+            working_directory,
+            ("collections_path", "collections_paths"),
+            cls.DEFAULT_COLLECTIONS_PATH,
+        )
+        return {
+            "ANSIBLE_ROLES_PATH": f"{requirements_directory / 'roles'}:{roles_path}",
+            "ANSIBLE_COLLECTIONS_PATH": f"{requirements_directory / 'collections'}:{collections_path}",
+        }
+
     @staticmethod
     def __clear_ansible_env_vars():
         """Unset ANSIBLE_XXX env vars, so they do not interfere with our run."""
@@ -37,13 +121,47 @@ class AnsibleRunner(AnsibleRunnerProtocol):
             if env_var.startswith("ANSIBLE_"):
                 del os.environ[env_var]
 
+    def run(  # pylint: disable=too-many-arguments
+        self,
+        working_directory: Path,
+        playbook_path: Path,
+        tags=tuple(),
+        check_mode: bool = False,
+        inventory: Optional[Path] = None,
+        limit: Optional[Sequence[str]] = None,
+        forks: Optional[int] = None,
+        requirements_directory: Optional[Path] = None,
+        timeout: Optional[float] = None,
+    ) -> AnsibleRunResult:
+        """Run a single Ansible playbook in a separate process group, which is killed if timeout expires."""
+        start = time.monotonic()
+        try:
+            # processify adds the timeout argument, which pylint cannot see through the decorator
+            return self._run_in_process(  # pylint: disable=unexpected-keyword-arg
+                working_directory,
+                playbook_path,
+                tags,
+                check_mode,
+                inventory,
+                limit,
+                forks,
+                requirements_directory,
+                timeout=timeout,
+            )
+        except ProcessTimeoutError as exception:
+            raise AnsibleRunTimeoutException(time.monotonic() - start) from exception
+
     @processify
-    def run(
+    def _run_in_process(  # pylint: disable=too-many-arguments
         self,
         working_directory: Path,
         playbook_path: Path,
         tags=tuple(),
         check_mode: bool = False,
+        inventory: Optional[Path] = None,
+        limit: Optional[Sequence[str]] = None,
+        forks: Optional[int] = None,
+        requirements_directory: Optional[Path] = None,
     ) -> AnsibleRunResult:
         """Run a single Ansible playbook.
 
@@ -54,7 +172,10 @@ class AnsibleRunner(AnsibleRunnerProtocol):
         self.__clear_ansible_env_vars()
         stdout = io.StringIO()
         stderr = io.StringIO()
-        with set_env(ANSIBLE_STDOUT_CALLBACK="ansible.posix.json"):
+        with set_env(
+            ANSIBLE_STDOUT_CALLBACK="ansible.posix.json",
+            **self._requirements_env(working_directory, requirements_directory),
+        ):
             with redirect_stdout(stdout):
                 with redirect_stderr(stderr):
                     with set_directory(working_directory):
@@ -62,11 +183,101 @@ class AnsibleRunner(AnsibleRunnerProtocol):
                             PlaybookCLI,
                         )
 
-                        args = ["ansible-playbook", str(playbook_path)]
-                        if len(tags) > 0:
-                            args += ["--tags", ",".join(tags)]
-                        if check_mode:
-                            args.append("--check")
+                        args = playbook_arguments(
+                            playbook_path, tags, check_mode, inventory, limit, forks
+                        )
                         cli = PlaybookCLI(args)
                         result = cli.run()
         return AnsibleRunResult(stdout.getvalue(), stderr.getvalue(), result)
+
+
+class AsyncAnsibleRunner(AsyncAnsibleRunnerProtocol):
+    """Run ansible-playbook as a child process of the event loop.
+
+    Every run gets its own process group, so a timeout or cancellation kills Ansible together with everything it
+    started (forks, package managers, ...).
+    """
+
+    @staticmethod
+    def _executable() -> str:
+        """Prefer the ansible-playbook of the running interpreter's environment, even if it is not on the PATH."""
+        candidate = Path(sys.executable).parent / "ansible-playbook"
+        return str(candidate) if candidate.exists() else "ansible-playbook"
+
+    @staticmethod
+    def _env(
+        working_directory: Path, requirements_directory: Optional[Path]
+    ) -> Dict[str, str]:
+        env = {
+            key: value
+            for key, value in os.environ.items()
+            if not key.startswith("ANSIBLE_")
+        }
+        env["ANSIBLE_STDOUT_CALLBACK"] = "ansible.posix.json"
+        env.update(
+            AnsibleRunner._requirements_env(  # pylint: disable=protected-access
+                working_directory, requirements_directory
+            )
+        )
+        return env
+
+    @staticmethod
+    async def _kill(process: Process):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass  # already gone
+        await process.wait()
+
+    @classmethod
+    async def _start(
+        cls,
+        args: List[str],
+        working_directory: Path,
+        requirements_directory: Optional[Path],
+    ) -> Process:
+        """Start ansible-playbook with the arguments in a new process group."""
+        args[0] = cls._executable()
+        return await asyncio.create_subprocess_exec(
+            *profiled_command(args, "ansible-playbook"),
+            cwd=working_directory,
+            env=cls._env(working_directory, requirements_directory),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+
+    async def run(  # pylint: disable=too-many-arguments
+        self,
+        working_directory: Path,
+        playbook_path: Path,
+        tags=tuple(),
+        check_mode: bool = False,
+        inventory: Optional[Path] = None,
+        limit: Optional[Sequence[str]] = None,
+        forks: Optional[int] = None,
+        requirements_directory: Optional[Path] = None,
+        timeout: Optional[float] = None,
+    ) -> AnsibleRunResult:
+        start = time.monotonic()
+        process = await self._start(
+            playbook_arguments(
+                playbook_path, tags, check_mode, inventory, limit, forks
+            ),
+            working_directory,
+            requirements_directory,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError as exception:
+            await self._kill(process)
+            raise AnsibleRunTimeoutException(time.monotonic() - start) from exception
+        except asyncio.CancelledError:
+            await self._kill(process)
+            raise
+        return AnsibleRunResult(
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"),
+            process.returncode if process.returncode is not None else -1,
+        )
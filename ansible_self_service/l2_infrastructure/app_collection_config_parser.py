@@ -1,5 +1,7 @@
+import hashlib
+import json
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Tuple, Optional, Set, Dict
 
 import yaml
 from cerberus.validator import Validator, DocumentError  # type: ignore
@@ -8,7 +10,9 @@ from ansible_self_service.l4_core.exceptions import (
     AppCollectionConfigValidationException,
 )
 from ansible_self_service.l4_core.factories import AppFactory
-from ansible_self_service.l4_core.models import AppCategory, App, AppCollection
+from ansible_self_service.l4_core.install_graph import find_cycle
+from ansible_self_service.l4_core.collection import AppCollection
+from ansible_self_service.l4_core.models import AppCategory, App
 from ansible_self_service.l4_core.protocols import AppCollectionConfigParserProtocol
 
 
@@ -17,13 +21,36 @@ class YamlAppCollectionConfigParser(AppCollectionConfigParserProtocol):
 
     CATEGORIES = "categories"
     ITEMS = "items"
-    schema = {CATEGORIES: {"type": "dict"}, ITEMS: {"type": "dict"}}
+    DEPENDS_ON = "depends_on"
+    TIMEOUTS = "timeouts"
+    schema = {
+        CATEGORIES: {"type": "dict"},
+        ITEMS: {
+            "type": "dict",
+            "valuesrules": {
+                "type": "dict",
+                "allow_unknown": True,
+                "schema": {
+                    DEPENDS_ON: {"type": "list", "schema": {"type": "string"}},
+                    # seconds per playbook tag
+                    TIMEOUTS: {
+                        "type": "dict",
+                        "keysrules": {
+                            "type": "string",
+                            "allowed": ["status", "install"],
+                        },
+                        "valuesrules": {"type": "number", "min": 1},
+                    },
+                },
+            },
+        },
+    }
 
     def __init__(self, app_factory: AppFactory):
         self._app_factory = app_factory
 
     def from_file(
-        self, app_collection: AppCollection
+        self, app_collection: AppCollection, only: Optional[Set[str]] = None
     ) -> Tuple[List[AppCategory], List[App]]:
         """Read a repo config file, validate it and transform it into domain models."""
         # read
@@ -38,21 +65,72 @@ class YamlAppCollectionConfigParser(AppCollectionConfigParserProtocol):
             raise AppCollectionConfigValidationException from err
         if not is_valid:
             raise AppCollectionConfigValidationException(validator.errors)
+        self.validate_dependencies(config_dict)
 
         # parse & return
-        return self.parse(config_dict, app_collection)
+        return self.parse(config_dict, app_collection, only)
+
+    def item_fingerprints(self, config_text: Optional[str]) -> Dict[str, str]:
+        """Map each item of a config document to a digest of its entry.
+
+        Returns an empty dict if the document is missing or not a valid mapping of items.
+        """
+        try:
+            document = yaml.safe_load(config_text) if config_text else None
+        except yaml.YAMLError:
+            return {}
+        if not isinstance(document, dict) or not isinstance(
+            document.get(self.ITEMS), dict
+        ):
+            return {}
+        return {
+            item_name: hashlib.sha1(
+                json.dumps(item_data, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()
+            for item_name, item_data in document[self.ITEMS].items()
+        }
+
+    def validate_dependencies(self, document: dict):
+        """Make sure items only depend on existing items of the same collection and there are no cycles."""
+        items = document[self.ITEMS]
+        dependencies = {
+            item_name: item_data.get(self.DEPENDS_ON, [])
+            for item_name, item_data in items.items()
+        }
+        errors = {
+            item_name: [
+                f"depends on unknown item {prerequisite}"
+                for prerequisite in prerequisites
+                if prerequisite not in items
+            ]
+            for item_name, prerequisites in dependencies.items()
+        }
+        errors = {
+            item_name: messages for item_name, messages in errors.items() if messages
+        }
+        if errors:
+            raise AppCollectionConfigValidationException({self.ITEMS: [errors]})
+        cycle = find_cycle(dependencies)
+        if cycle:
+            raise AppCollectionConfigValidationException(
+                {self.DEPENDS_ON: [f"dependency cycle: {' -> '.join(cycle)}"]}
+            )
 
     def parse(
-        self, document: dict, app_collection: AppCollection
+        self,
+        document: dict,
+        app_collection: AppCollection,
+        only: Optional[Set[str]] = None,
     ) -> Tuple[List[AppCategory], List[App]]:
         """Parse the dict we receive from cerberus."""
         categories = [
-            AppCategory(name=category_name)
+            AppCategory.intern(category_name)
             for category_name, category_data in document[self.CATEGORIES].items()
         ]
         items = [
             self.parse_item(item_name, item_data, app_collection)
             for item_name, item_data in document[self.ITEMS].items()
+            if only is None or item_name in only
         ]
         return categories, items
 
@@ -66,6 +144,8 @@ class YamlAppCollectionConfigParser(AppCollectionConfigParserProtocol):
             playbook_path=self.to_absolute_path(
                 app_collection.directory, Path(item_data["playbook"])
             ),
+            depends_on=item_data.get(self.DEPENDS_ON, []),
+            timeouts=item_data.get(self.TIMEOUTS, {}),
         )
 
     @staticmethod
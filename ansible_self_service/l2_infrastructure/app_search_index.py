@@ -0,0 +1,219 @@
+import json
+import os
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ansible_self_service.l4_core.models import AppSearchDocument, Config
+from ansible_self_service.l4_core.protocols import AppSearchIndexProtocol
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lower case alphanumeric terms."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def deletes(term: str) -> Set[str]:
+    """All variants of a term with a single character removed."""
+    return {term[:position] + term[position + 1 :] for position in range(len(term))}
+
+
+def within_one_edit(first: str, second: str) -> bool:
+    """True if the terms differ by at most one insertion, deletion, substitution or transposition."""
+    if abs(len(first) - len(second)) > 1:
+        return False
+    if len(first) == len(second):
+        mismatches = [
+            position
+            for position, (char_a, char_b) in enumerate(zip(first, second))
+            if char_a != char_b
+        ]
+        if len(mismatches) <= 1:
+            return True
+        return (
+            len(mismatches) == 2
+            and mismatches[1] == mismatches[0] + 1
+            and first[mismatches[0]] == second[mismatches[1]]
+            and first[mismatches[1]] == second[mismatches[0]]
+        )
+    shorter, longer = sorted((first, second), key=len)
+    return any(
+        longer[:position] + longer[position + 1 :] == shorter
+        for position in range(len(longer))
+    )
+
+
+class InvertedAppSearchIndex(AppSearchIndexProtocol):
+    """Inverted index over app names, descriptions and categories stored as JSON in the cache directory.
+
+    Matches query terms exactly, as prefix or with a single typo. The typo lookup uses a precomputed map from
+    single-character deletions to terms (symmetric delete), so no distance has to be computed for the whole vocabulary.
+    All query terms have to match for an app to be returned.
+
+    Postings and deletion variants are stored as space separated strings and only decoded for the terms a query
+    touches, which keeps loading the index from disk cheap.
+    """
+
+    FIELD_WEIGHTS = {"name": 3, "categories": 2, "description": 1}
+    EXACT_MATCH = 1.0
+    PREFIX_MATCH = 0.75
+    FUZZY_MATCH = 0.5
+    MAX_PREFIX_EXPANSIONS = 50
+    MIN_FUZZY_TERM_LENGTH = 4
+
+    def __init__(self, config: Config):
+        self._config = config
+        self._loaded_mtime: Optional[int] = None
+        self._revision: Optional[str] = None
+        self._documents: List[List] = []
+        self._postings: Dict[str, str] = {}
+        self._terms: List[str] = []
+        self._deletes: Dict[str, str] = {}
+
+    def _load(self):
+        """Read the index from disk unless the version in memory is already the latest one."""
+        index_file = self._config.search_index_file
+        try:
+            mtime = os.stat(index_file).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+        with open(index_file, "r", encoding="utf-8") as infile:
+            document = json.load(infile)
+        self._revision = document["revision"]
+        self._documents = document["documents"]
+        self._postings = document["postings"]
+        self._terms = list(self._postings)  # stored in sorted order
+        self._deletes = document["deletes"]
+        self._loaded_mtime = mtime
+
+    def is_current(self, catalog_revision: str) -> bool:
+        self._load()
+        return self._revision == catalog_revision
+
+    @classmethod
+    def _index_documents(
+        cls, documents: Iterable[AppSearchDocument]
+    ) -> Tuple[List[List], Dict[str, Dict[int, int]]]:
+        """Documents as stored and the weight of each term per document id."""
+        stored_documents = []
+        postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        for doc_id, search_document in enumerate(documents):
+            stored_documents.append(
+                [
+                    search_document.collection_name,
+                    search_document.name,
+                    search_document.description,
+                    list(search_document.categories),
+                ]
+            )
+            fields = {
+                "name": search_document.name,
+                "categories": " ".join(search_document.categories),
+                "description": search_document.description,
+            }
+            for field_name, text in fields.items():
+                for term in set(tokenize(text)):
+                    doc_weights = postings[term]
+                    doc_weights[doc_id] = (
+                        doc_weights.get(doc_id, 0) + cls.FIELD_WEIGHTS[field_name]
+                    )
+        return stored_documents, postings
+
+    @classmethod
+    def _delete_map(cls, terms: Iterable[str]) -> Dict[str, List[str]]:
+        """Map the single-character deletions of the terms long enough for typos to the terms."""
+        delete_map: Dict[str, List[str]] = defaultdict(list)
+        for term in sorted(terms):
+            if len(term) >= cls.MIN_FUZZY_TERM_LENGTH:
+                for variant in deletes(term):
+                    delete_map[variant].append(term)
+        return delete_map
+
+    def build(self, catalog_revision: str, documents: Iterable[AppSearchDocument]):
+        stored_documents, postings = self._index_documents(documents)
+        index_file = self._config.search_index_file
+        tmp_file = index_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as outfile:
+            json.dump(
+                {
+                    "revision": catalog_revision,
+                    "documents": stored_documents,
+                    "postings": {
+                        term: " ".join(
+                            f"{doc_id}:{weight}"
+                            for doc_id, weight in sorted(postings[term].items())
+                        )
+                        for term in sorted(postings)
+                    },
+                    "deletes": {
+                        variant: " ".join(terms)
+                        for variant, terms in self._delete_map(postings).items()
+                    },
+                },
+                outfile,
+                separators=(",", ":"),
+            )
+        os.replace(tmp_file, index_file)
+
+    def _expand(self, query_term: str) -> Dict[str, float]:
+        """Find all indexed terms matching a query term and how well they match."""
+        matches: Dict[str, float] = {}
+        start = bisect_left(self._terms, query_term)
+        for term in self._terms[start : start + self.MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(query_term):
+                break
+            matches[term] = (
+                self.EXACT_MATCH if term == query_term else self.PREFIX_MATCH
+            )
+        if len(query_term) >= self.MIN_FUZZY_TERM_LENGTH:
+            candidates = set(self._deletes.get(query_term, "").split())
+            for variant in deletes(query_term):
+                candidates.update(self._deletes.get(variant, "").split())
+                if variant in self._postings:
+                    candidates.add(variant)
+            for term in candidates:
+                if term not in matches and within_one_edit(term, query_term):
+                    matches[term] = self.FUZZY_MATCH
+        return matches
+
+    def search(self, query: str, limit: int) -> List[AppSearchDocument]:
+        self._load()
+        scores: Optional[Dict[int, float]] = None
+        for query_term in set(tokenize(query)):
+            term_scores: Dict[int, float] = defaultdict(float)
+            for term, match_quality in self._expand(query_term).items():
+                for posting in self._postings[term].split():
+                    doc_id, weight = posting.split(":")
+                    term_scores[int(doc_id)] = max(
+                        term_scores[int(doc_id)], int(weight) * match_quality
+                    )
+            if scores is None:
+                scores = dict(term_scores)
+            else:  # every query term has to match
+                scores = {
+                    doc_id: score + term_scores[doc_id]
+                    for doc_id, score in scores.items()
+                    if doc_id in term_scores
+                }
+        if not scores:
+            return []
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (-item[1], self._documents[item[0]][1].lower()),
+        )
+        return [
+            AppSearchDocument(
+                collection_name=collection_name,
+                name=name,
+                description=description,
+                categories=tuple(categories),
+            )
+            for collection_name, name, description, categories in (
+                self._documents[doc_id] for doc_id, _ in ranked[:limit]
+            )
+        ]
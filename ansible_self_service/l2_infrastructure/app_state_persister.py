@@ -1,25 +1,117 @@
+import os
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, Optional
 
 import yaml
 
-from ansible_self_service.l4_core.models import AppState, AppStatus
-from ansible_self_service.l4_core.protocols import AppStatePersisterProtocol
+from ansible_self_service.l4_core.fleet import FleetStatusMatrix
+from ansible_self_service.l4_core.models import AppState, AppStatus, Config
+from ansible_self_service.l4_core.protocols import (
+    AppStatePersisterProtocol,
+    FleetStatePersisterProtocol,
+    LockManagerProtocol,
+)
+from ansible_self_service.l4_core.utils import locked
 
 
 class YamlAppStatePersister(AppStatePersisterProtocol):
     def load(self, app_state_file_path: Path) -> AppState:
         with open(app_state_file_path, "r", encoding="utf-8") as app_state_file:
             app_state_dict: Dict = yaml.safe_load(app_state_file) or {}
-        status = app_state_dict.get("status", AppStatus.UNKNOWN)
-        return AppState(status=status)
+        # statuses are stored by name, so the file can be read with the safe loader
+        status = AppStatus.__members__.get(
+            app_state_dict.get("status", ""), AppStatus.UNKNOWN
+        )
+        return AppState(
+            status=status,
+            duration=app_state_dict.get("duration"),
+            timed_out=app_state_dict.get("timed_out", False),
+            checked_at=app_state_dict.get("checked_at"),
+            revision=app_state_dict.get("revision"),
+            uses=app_state_dict.get("uses", 0),
+        )
 
     def save(self, app_state: AppState, app_state_file_path: Path):
-        with open(app_state_file_path, "w", encoding="utf-8") as outfile:
-            yaml.dump(
+        # replace the file atomically, so readers in other processes never see a partially written state
+        tmp_file = app_state_file_path.with_name(
+            f"{app_state_file_path.name}.{os.getpid()}.tmp"
+        )
+        with open(tmp_file, "w", encoding="utf-8") as outfile:
+            yaml.safe_dump(
                 {
-                    "status": app_state.status,
+                    "status": app_state.status.name,
+                    "duration": app_state.duration,
+                    "timed_out": app_state.timed_out,
+                    "checked_at": app_state.checked_at,
+                    "revision": app_state.revision,
+                    "uses": app_state.uses,
                 },
                 outfile,
                 default_flow_style=False,
             )
+        os.replace(tmp_file, app_state_file_path)
+
+
+class YamlFleetStatePersister(FleetStatePersisterProtocol):
+    """Store the status matrix of a fleet in a single YAML file per inventory.
+
+    Statuses are stored by name, grouped by collection and app: {collection: {app: {host: status}}}.
+    """
+
+    def __init__(
+        self, config: Config, lock_manager: Optional[LockManagerProtocol] = None
+    ):
+        self._config = config
+        self._lock_manager = lock_manager
+
+    def _lock_name(self, inventory: Path) -> str:
+        return f"fleet/{self._config.fleet_state_file(inventory).stem}"
+
+    def load(self, inventory: Path) -> FleetStatusMatrix:
+        with locked(self._lock_manager, self._lock_name(inventory), exclusive=False):
+            return self._load(inventory)
+
+    def _load(self, inventory: Path) -> FleetStatusMatrix:
+        fleet_state_file = self._config.fleet_state_file(inventory)
+        matrix = FleetStatusMatrix(inventory=inventory)
+        if not fleet_state_file.exists():
+            return matrix
+        with open(fleet_state_file, "r", encoding="utf-8") as infile:
+            document: Dict = yaml.safe_load(infile) or {}
+        for collection_name, apps in document.items():
+            for app_name, host_statuses in apps.items():
+                matrix.statuses[(collection_name, app_name)] = {
+                    host: AppStatus[status_name]
+                    for host, status_name in host_statuses.items()
+                }
+        return matrix
+
+    def save(self, matrix: FleetStatusMatrix):
+        with locked(
+            self._lock_manager, self._lock_name(matrix.inventory), exclusive=True
+        ):
+            self._save(matrix)
+
+    def update(
+        self, inventory: Path, change: Callable[[FleetStatusMatrix], None]
+    ) -> FleetStatusMatrix:
+        with locked(self._lock_manager, self._lock_name(inventory), exclusive=True):
+            matrix = self._load(inventory)
+            change(matrix)
+            self._save(matrix)
+        return matrix
+
+    def _save(self, matrix: FleetStatusMatrix):
+        document: Dict[str, Dict[str, Dict[str, str]]] = {}
+        for (collection_name, app_name), host_statuses in matrix.statuses.items():
+            document.setdefault(collection_name, {})[app_name] = {
+                host: status.name for host, status in host_statuses.items()
+            }
+        fleet_state_file = self._config.fleet_state_file(matrix.inventory)
+        # replace the file atomically, so readers in other processes never see a partially written matrix
+        tmp_file = fleet_state_file.with_name(
+            f"{fleet_state_file.name}.{os.getpid()}.tmp"
+        )
+        with open(tmp_file, "w", encoding="utf-8") as outfile:
+            yaml.safe_dump(document, outfile, default_flow_style=False)
+        os.replace(tmp_file, fleet_state_file)
@@ -0,0 +1,335 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from ansible_self_service.l4_core.collection import AppCollection
+from ansible_self_service.l4_core.protocols import (
+    CatalogWatcherProtocol,
+    LoggerProtocol,
+)
+
+# files of a repo that change when HEAD moves, relative to its .git directory
+GIT_HEAD_FILES = ("HEAD", "packed-refs")
+GIT_BRANCHES_DIRECTORY = Path("refs") / "heads"
+
+
+def _notify(
+    callback: Callable[[Set[str]], None], names: Set[str], logger: LoggerProtocol
+):
+    """Run the callback without letting an error in it end the watcher thread."""
+    try:
+        callback(names)
+    except Exception as exception:  # pylint: disable=broad-except
+        logger.error(
+            f"Could not reload the collections {', '.join(sorted(names))}: {exception}"
+        )
+
+
+class PollingCatalogWatcher(CatalogWatcherProtocol):
+    """Compare cheap stat snapshots of the repos in the git directory at a fixed interval.
+
+    Works on every platform and file system but notices changes only after up to one interval.
+    """
+
+    def __init__(self, logger: LoggerProtocol, interval: float = 2.0):
+        self._logger = logger
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def snapshot(git_directory: Path) -> Dict[str, Tuple]:
+        """Map each repo directory to the modification times and sizes of its config and the files HEAD lives in."""
+        snapshots = {}
+        for directory in git_directory.iterdir():
+            if not directory.is_dir():
+                continue
+            git = directory / ".git"
+            paths = [directory / AppCollection.CONFIG_FILE_NAME]
+            paths += [git / name for name in GIT_HEAD_FILES]
+            paths += sorted((git / GIT_BRANCHES_DIRECTORY).rglob("*"))
+            stats = []
+            for path in paths:
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                stats.append((str(path), stat.st_mtime_ns, stat.st_size))
+            snapshots[directory.name] = tuple(stats)
+        return snapshots
+
+    def start(self, git_directory: Path, callback: Callable[[Set[str]], None]):
+        self._stop.clear()
+        snapshot = self.snapshot(git_directory)
+
+        def poll():
+            nonlocal snapshot
+            while not self._stop.wait(self._interval):
+                new_snapshot = self.snapshot(git_directory)
+                changed = {
+                    name
+                    for name in set(snapshot) | set(new_snapshot)
+                    if snapshot.get(name) != new_snapshot.get(name)
+                }
+                snapshot = new_snapshot
+                if changed:
+                    _notify(callback, changed, self._logger)
+
+        self._thread = threading.Thread(
+            target=poll, name="catalog-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class _Inotify:
+    """Minimal binding of the Linux inotify API through the C library."""
+
+    NONBLOCK = os.O_NONBLOCK
+    CLOEXEC = 0o2000000
+    MODIFY = 0x00000002
+    CLOSE_WRITE = 0x00000008
+    MOVED_FROM = 0x00000040
+    MOVED_TO = 0x00000080
+    CREATE = 0x00000100
+    DELETE = 0x00000200
+    DELETE_SELF = 0x00000400
+    MOVE_SELF = 0x00000800
+    Q_OVERFLOW = 0x00004000
+    IGNORED = 0x00008000
+    ONLYDIR = 0x01000000
+    ISDIR = 0x40000000
+    # everything that adds, removes, replaces or rewrites an entry of a watched directory
+    CHANGES = (
+        MODIFY
+        | CLOSE_WRITE
+        | MOVED_FROM
+        | MOVED_TO
+        | CREATE
+        | DELETE
+        | DELETE_SELF
+        | MOVE_SELF
+        | ONLYDIR
+    )
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self):
+        library = ctypes.util.find_library("c")
+        if library is None:
+            raise OSError("C library not found")
+        self._libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not supported on this platform")
+        self.file_descriptor = self._libc.inotify_init1(self.NONBLOCK | self.CLOEXEC)
+        if self.file_descriptor < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def add_watch(self, path: Path) -> int:
+        watch_descriptor = self._libc.inotify_add_watch(
+            self.file_descriptor, os.fsencode(path), self.CHANGES
+        )
+        if watch_descriptor < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(path))
+        return watch_descriptor
+
+    def read_events(self):
+        """Yield (watch descriptor, mask, name) of all queued events."""
+        try:
+            data = os.read(self.file_descriptor, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            watch_descriptor, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = (
+                data[offset : offset + length]
+                .rstrip(b"\0")
+                .decode("utf-8", "surrogateescape")
+            )
+            offset += length
+            yield watch_descriptor, mask, name
+
+    def close(self):
+        os.close(self.file_descriptor)
+
+
+class InotifyCatalogWatcher(CatalogWatcherProtocol):
+    """Watch the git directory and the parts of each repo that matter with inotify.
+
+    Per repo the repo directory (for the config), its .git directory (for HEAD and packed refs) and .git/refs/heads
+    with all its subdirectories (for branches like feature/x) are watched. Changes are reported once no further
+    event arrived for debounce seconds, but at the latest after max_delay seconds of continuous changes. Falls back
+    to polling where inotify is not available, e.g. on other platforms or when the watch limit is exhausted.
+    """
+
+    def __init__(
+        self,
+        logger: LoggerProtocol,
+        debounce: float = 0.5,
+        max_delay: float = 5.0,
+        poll_interval: float = 2.0,
+    ):
+        self._logger = logger
+        self._debounce = debounce
+        self._max_delay = max_delay
+        self._poll_interval = poll_interval
+        self._fallback: Optional[PollingCatalogWatcher] = None
+        self._inotify: Optional[_Inotify] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_pipe: Optional[Tuple[int, int]] = None
+        self._git_directory = Path()
+        # watch descriptor -> repo name, None for the git directory itself
+        self._watches: Dict[int, Optional[str]] = {}
+        self._git_watches: Set[int] = set()
+        self._branch_watches: Set[int] = set()
+
+    def _watch(self, path: Path, name: Optional[str]) -> Optional[int]:
+        assert self._inotify is not None
+        try:
+            watch_descriptor = self._inotify.add_watch(path)
+        except FileNotFoundError:
+            return None
+        except OSError as exception:
+            if name is None:
+                raise
+            self._logger.warning(f"Cannot watch {path} for changes: {exception}")
+            return None
+        self._watches[watch_descriptor] = name
+        return watch_descriptor
+
+    def _watch_repo(self, name: str):
+        """Add the watches of a repo, parts that do not exist yet (e.g. during a clone) are added on a later change."""
+        directory = self._git_directory / name
+        if not directory.is_dir():
+            return
+        self._watch(directory, name)
+        git_watch = self._watch(directory / ".git", name)
+        if git_watch is not None:
+            self._git_watches.add(git_watch)
+        self._watch_branches(name)
+
+    def _watch_branches(self, name: str):
+        """Watch the branch directory of a repo and the directories nested in it, as inotify is not recursive."""
+        branches = self._git_directory / name / ".git" / GIT_BRANCHES_DIRECTORY
+        if not branches.is_dir():
+            return
+        for directory in [branches, *sorted(branches.rglob("*"))]:
+            if not directory.is_dir():
+                continue
+            branch_watch = self._watch(directory, name)
+            if branch_watch is not None:
+                self._branch_watches.add(branch_watch)
+
+    def _changed_repo(
+        self, watch_descriptor: int, mask: int, name: str
+    ) -> Optional[str]:
+        """Name of the repo an event is relevant for or None if it can be ignored."""
+        if mask & _Inotify.IGNORED:
+            self._watches.pop(watch_descriptor, None)
+            self._git_watches.discard(watch_descriptor)
+            self._branch_watches.discard(watch_descriptor)
+            return None
+        repo = self._watches.get(watch_descriptor)
+        if repo is None:
+            return name or None  # an entry of the git directory
+        if watch_descriptor in self._branch_watches:
+            if mask & _Inotify.ISDIR and mask & (_Inotify.CREATE | _Inotify.MOVED_TO):
+                # watched right away, so branches created in it before the changes are reported are not missed
+                self._watch_branches(repo)
+            return repo
+        if watch_descriptor in self._git_watches:
+            return repo if name in GIT_HEAD_FILES else None
+        return repo if name in (AppCollection.CONFIG_FILE_NAME, ".git", "") else None
+
+    def _loop(self, callback: Callable[[Set[str]], None]):
+        assert self._inotify is not None and self._stop_pipe is not None
+        pending: Set[str] = set()
+        first_event = last_event = 0.0
+        while True:
+            timeout = None
+            if pending:
+                now = time.monotonic()
+                timeout = max(
+                    0.0,
+                    min(last_event + self._debounce, first_event + self._max_delay)
+                    - now,
+                )
+            readable, _, _ = select.select(
+                [self._inotify.file_descriptor, self._stop_pipe[0]], [], [], timeout
+            )
+            if self._stop_pipe[0] in readable:
+                return
+            if readable:
+                for watch_descriptor, mask, name in self._inotify.read_events():
+                    if mask & _Inotify.Q_OVERFLOW:
+                        changed = {path.name for path in self._git_directory.iterdir()}
+                    else:
+                        repo = self._changed_repo(watch_descriptor, mask, name)
+                        changed = set() if repo is None else {repo}
+                    if changed:
+                        now = time.monotonic()
+                        if not pending:
+                            first_event = now
+                        last_event = now
+                        pending |= changed
+                continue
+            for name in pending:
+                self._watch_repo(name)
+            _notify(callback, pending, self._logger)
+            pending = set()
+
+    def start(self, git_directory: Path, callback: Callable[[Set[str]], None]):
+        self._git_directory = git_directory
+        try:
+            self._inotify = _Inotify()
+            self._watch(git_directory, None)
+        except OSError as exception:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+            self._logger.warning(
+                f"Cannot watch {git_directory} with inotify ({exception}), polling instead"
+            )
+            self._fallback = PollingCatalogWatcher(self._logger, self._poll_interval)
+            self._fallback.start(git_directory, callback)
+            return
+        for directory in git_directory.iterdir():
+            self._watch_repo(directory.name)
+        self._stop_pipe = os.pipe()
+        self._thread = threading.Thread(
+            target=self._loop, args=(callback,), name="catalog-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._fallback is not None:
+            self._fallback.stop()
+            self._fallback = None
+        if (
+            self._thread is not None
+            and self._stop_pipe is not None
+            and self._inotify is not None
+        ):
+            os.write(self._stop_pipe[1], b"\0")
+            self._thread.join()
+            for pipe_fd in self._stop_pipe:
+                os.close(pipe_fd)
+            self._inotify.close()
+            self._thread = self._stop_pipe = self._inotify = None
+            self._watches.clear()
+            self._git_watches.clear()
+            self._branch_watches.clear()
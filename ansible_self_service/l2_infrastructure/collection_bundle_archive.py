@@ -0,0 +1,35 @@
+import tarfile
+from pathlib import Path
+
+from ansible_self_service.l4_core.exceptions import CollectionBundleException
+from ansible_self_service.l4_core.protocols import CollectionBundleArchiveProtocol
+
+
+class TarCollectionBundleArchive(CollectionBundleArchiveProtocol):
+    """Store bundles as gzip compressed tar files."""
+
+    def pack(self, directory: Path, bundle_file: Path):
+        with tarfile.open(bundle_file, "w:gz") as archive:
+            for child in sorted(directory.iterdir()):
+                archive.add(child, arcname=child.name)
+
+    def unpack(self, bundle_file: Path, directory: Path):
+        try:
+            with tarfile.open(bundle_file, "r:gz") as archive:
+                if hasattr(tarfile, "data_filter"):
+                    archive.extractall(directory, filter="data")
+                    return
+                for member in archive.getmembers():
+                    # never write outside of the target directory, whatever the bundle says
+                    target = (directory / member.name).resolve()
+                    if directory.resolve() not in (target, *target.parents) or (
+                        member.islnk() or member.isdev()
+                    ):
+                        raise CollectionBundleException(
+                            f"Refusing to extract {member.name}"
+                        )
+                archive.extractall(directory)
+        except (OSError, tarfile.TarError) as exception:
+            raise CollectionBundleException(
+                f"Cannot read bundle {bundle_file}: {exception}"
+            ) from exception
@@ -32,5 +32,24 @@ def elevate(show_console=True, graphical=True, with_args=None):
     elevate_impl(show_console, graphical, with_args)
 
 
+def run_elevated(args, graphical=True):
+    """
+    Run a command with root privileges in a child process and wait for it.
+    Unlike elevate, the current process keeps running unprivileged. Only
+    supported on Linux / macOS.
+    :param args: The command and its arguments.
+    :param graphical: If True, attempt to use graphical programs (pkexec,
+        etc) to ask for the password.
+    :return: The exit code of the command.
+    """
+    if sys.platform.startswith("win"):
+        raise OSError("Running commands as root is not supported on Windows")
+    from .posix import (  # pylint: disable=(import-outside-toplevel
+        run_elevated as run_elevated_impl,
+    )
+
+    return run_elevated_impl(args, graphical)
+
+
 def is_root():
     return os.getuid() == 0
@@ -1,5 +1,6 @@
 import errno
 import os
+import subprocess
 import sys
 
 try:
@@ -23,13 +24,8 @@ def quote_applescript(string):
     return f'"{"".join(charmap.get(char, char) for char in string)}"'
 
 
-def elevate(_=True, graphical=True, with_args=None):
-    if with_args is None:
-        with_args = sys.argv
-    if os.getuid() == 0:
-        return
-
-    args = [sys.executable] + with_args
+def elevation_commands(args, graphical=True):
+    """Commands running args as root, in the order they should be tried."""
     commands = []
 
     if graphical:
@@ -50,10 +46,31 @@ def elevate(_=True, graphical=True, with_args=None):
             commands.append(["kdesudo"] + args)
 
     commands.append(["sudo"] + args)
+    return commands
+
 
-    for args in commands:
+def elevate(_=True, graphical=True, with_args=None):
+    if with_args is None:
+        with_args = sys.argv
+    if os.getuid() == 0:
+        return
+
+    for args in elevation_commands([sys.executable] + with_args, graphical):
         try:
             os.execlp(args[0], *args)
         except OSError as err:
             if err.errno != errno.ENOENT or args[0] == "sudo":
                 raise
+
+
+def run_elevated(args, graphical=True):
+    """Run args as root in a child process and return its exit code, prompting for a password if needed."""
+    if os.getuid() == 0:
+        return subprocess.call(args)
+    for command in elevation_commands(args, graphical):
+        try:
+            return subprocess.call(command)
+        except OSError as err:
+            if err.errno != errno.ENOENT or command[0] == "sudo":
+                raise
+    return 1
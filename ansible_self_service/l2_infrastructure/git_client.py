@@ -1,8 +1,10 @@
+import hashlib
 import shutil
 from pathlib import Path
-from typing import List, Optional
+from string import hexdigits
+from typing import Dict, List, Optional, Tuple
 
-from git import Repo, InvalidGitRepositoryError  # type: ignore
+from git import Repo, InvalidGitRepositoryError, GitCommandError  # type: ignore
 
 from ansible_self_service.l4_core.protocols import GitClientProtocol
 
@@ -11,8 +13,77 @@ class GitPythonGitClient(GitClientProtocol):
     """Implementation of GitClientProtocol via GitPython.
 
     See: https://gitpython.readthedocs.io
+
+    If a mirror directory is given, all clones borrow their objects from a single bare repo there (via git
+    alternates). Each remote is fetched into the mirror under its own ref namespace first, so objects already known
+    from another clone or fork of the same history are not transferred or stored again.
     """
 
+    MIRROR_NAMESPACE = "refs/mirrors"
+    CHECKOUT_NAMESPACE = "refs/checkouts"
+    DEFAULT_BRANCHES = ("master", "main")
+    EXPORT_REF = "refs/self-service/export"
+
+    def __init__(self, mirror_directory: Optional[Path] = None):
+        self._mirror_directory = mirror_directory
+
+    @staticmethod
+    def _key(value: str) -> str:
+        return hashlib.sha1(value.encode("utf-8")).hexdigest()[:16]
+
+    def _mirror(self) -> Repo:
+        """Open the mirror, creating it on first use."""
+        assert self._mirror_directory is not None
+        if self._mirror_directory.exists():
+            return Repo(self._mirror_directory)
+        mirror = Repo.init(self._mirror_directory, bare=True)
+        # objects are only ever pruned by maintain_mirror, which knows which of them clones still use
+        mirror.git.config("gc.auto", "0")
+        return mirror
+
+    def _fetch_into_mirror(self, url: str) -> str:
+        """Fetch branches and tags of a remote into its namespace of the mirror and return that namespace."""
+        namespace = f"{self.MIRROR_NAMESPACE}/{self._key(url)}"
+        self._mirror().git.fetch(
+            "--no-tags",
+            url,
+            f"+refs/heads/*:{namespace}/heads/*",
+            f"+refs/tags/*:{namespace}/tags/*",
+        )
+        return namespace
+
+    def _use_mirror_objects(self, repo: Repo):
+        """Let a clone borrow objects from the mirror; also covers clones made before the mirror existed."""
+        alternates = Path(repo.git_dir) / "objects" / "info" / "alternates"
+        mirror_objects = str(
+            (Path(self._mirror().git_dir) / "objects").resolve()  # type: ignore
+        )
+        existing = (
+            alternates.read_text(encoding="utf-8").split()
+            if alternates.exists()
+            else []
+        )
+        if mirror_objects not in existing:
+            alternates.parent.mkdir(parents=True, exist_ok=True)
+            alternates.write_text(
+                "\n".join(existing + [mirror_objects]) + "\n", encoding="utf-8"
+            )
+
+    def _fetch(self, repo: Repo):
+        """Fetch origin, going through the mirror if there is one."""
+        if self._mirror_directory is None:
+            repo.remote().fetch()
+            return
+        namespace = self._fetch_into_mirror(self.get_origin_url(Path(repo.working_dir)))
+        self._use_mirror_objects(repo)
+        # objects are already local, so this only updates the remote tracking refs
+        repo.git.fetch(
+            "--no-tags",
+            str(self._mirror_directory),
+            f"+{namespace}/heads/*:refs/remotes/origin/*",
+            f"+{namespace}/tags/*:refs/tags/*",
+        )
+
     def get_origin_url(self, directory: Path) -> str:
         return str(list(Repo(directory).remote().urls)[0])
 
@@ -20,7 +91,16 @@ class GitPythonGitClient(GitClientProtocol):
         return str(Repo(directory).head.commit)
 
     def clone_repo(self, url: str, target_dir: Path):
-        Repo.clone_from(url=url, to_path=target_dir)
+        if self._mirror_directory is None:
+            Repo.clone_from(url=url, to_path=target_dir)
+            return
+        self._fetch_into_mirror(url)
+        # the mirror's refs are offered as known objects, so the clone itself transfers next to nothing
+        Repo.clone_from(
+            url=url,
+            to_path=target_dir,
+            multi_options=[f"--reference={self._mirror_directory}"],
+        )
 
     def remove_repo(self, directory: Path):
         shutil.rmtree(directory)
@@ -28,26 +108,74 @@ class GitPythonGitClient(GitClientProtocol):
     def list_revisions(self, directory: Path) -> List:
         raise NotImplementedError()
 
+    @staticmethod
+    def _resolve(repo: Repo, revision: str) -> Optional[str]:
+        """Hash of the commit a revision points to locally or None if it is unknown."""
+        try:
+            return str(
+                repo.git.rev_parse("--verify", "--quiet", f"{revision}^{{commit}}")
+            )
+        except GitCommandError:
+            return None
+
+    def _local_commit(self, repo: Repo, revision: str) -> Optional[str]:
+        """Resolve a revision that names a commit by its hash without asking the remote."""
+        if len(revision) < 7 or any(char not in hexdigits for char in revision):
+            return None  # branch and tag names have to be looked up on the remote
+        commit = self._resolve(repo, revision)
+        return commit if commit and commit.startswith(revision.lower()) else None
+
+    def _remote_branch_tips(self, repo: Repo) -> Dict[str, str]:
+        """Ask the remote for the tips of its default branches without fetching any objects."""
+        output = str(
+            repo.git.ls_remote(
+                "origin", *(f"refs/heads/{branch}" for branch in self.DEFAULT_BRANCHES)
+            )
+        )
+        tips = {}
+        for line in output.splitlines():
+            commit, ref = line.split("\t", 1)
+            tips[ref[len("refs/heads/") :]] = commit
+        return tips
+
+    def _checkout_revision(self, repo: Repo, revision: str):
+        head = repo.head.commit.hexsha
+        local_commit = self._local_commit(repo, revision)
+        if local_commit == head:
+            return
+        if local_commit is None:
+            self._fetch(repo)
+        repo.git.checkout(revision, force=True)
+
+    def _update_branch(self, repo: Repo):
+        tips = self._remote_branch_tips(repo)
+        branch = next(
+            (branch for branch in self.DEFAULT_BRANCHES if branch in tips), None
+        )
+        if branch is None:
+            raise Exception('Either "master" or "main" branch must exist in origin')
+        on_branch = not repo.head.is_detached and repo.head.ref.name == branch
+        if on_branch and repo.head.commit.hexsha == tips[branch]:
+            return  # already up-to-date, neither fetch nor touch the working tree
+        remote_ref = f"refs/remotes/origin/{branch}"
+        if self._resolve(repo, remote_ref) != tips[branch]:
+            self._fetch(repo)
+        if not on_branch:
+            if branch in repo.heads:  # type: ignore
+                repo.git.checkout(branch)
+            else:
+                repo.git.checkout("-b", branch, remote_ref)
+        if not repo.head.ref.tracking_branch():
+            repo.git.branch("--set-upstream-to", f"origin/{branch}")
+        if repo.head.commit.hexsha != tips[branch]:
+            repo.git.merge("--ff-only", remote_ref)
+
     def update(self, directory: Path, revision: Optional[str] = None):
         repo = Repo(directory)
-        repo.remote().fetch()
         if revision:
-            repo.git.checkout(revision, force=True)
+            self._checkout_revision(repo, revision)
         else:
-            if "master" in repo.remote().refs:
-                branch = "master"
-            elif "main" in repo.remote().refs:
-                branch = "main"
-            else:
-                raise Exception('Either "master" or "main" branch must exist in origin')
-            if repo.head.is_detached:
-                if branch in repo.refs: # type: ignore
-                    repo.git.checkout(branch)
-                else:
-                    repo.git.checkout("-b", branch)
-            if not repo.head.ref.tracking_branch():
-                repo.head.ref.set_tracking_branch(repo.remote().refs[branch])
-            repo.remote().pull(force=True)
+            self._update_branch(repo)
 
     def is_git_directory(self, directory: Path) -> bool:
         try:
@@ -55,3 +183,79 @@ class GitPythonGitClient(GitClientProtocol):
         except InvalidGitRepositoryError:
             return False
         return True
+
+    def create_bundle(self, directory: Path, revision: str, bundle_file: Path):
+        repo = Repo(directory)
+        # a bundle can only contain refs, so point a temporary one at the revision
+        repo.git.update_ref(self.EXPORT_REF, f"{revision}^{{commit}}")
+        try:
+            repo.git.bundle("create", str(bundle_file), self.EXPORT_REF)
+        finally:
+            repo.git.update_ref("-d", self.EXPORT_REF)
+
+    def clone_bundle(self, bundle_file: Path, url: str, target_dir: Path):
+        repo = Repo.init(target_dir)
+        repo.git.fetch(str(bundle_file), self.EXPORT_REF)
+        repo.git.checkout("--detach", "FETCH_HEAD")
+        repo.create_remote("origin", url)
+
+    @staticmethod
+    def _object_size(repo: Repo) -> int:
+        """Bytes used by loose and packed objects of a repo."""
+        counts = dict(
+            line.split(": ", 1) for line in repo.git.count_objects("-v").splitlines()
+        )
+        return (int(counts["size"]) + int(counts["size-pack"])) * 1024
+
+    def maintain_mirror(self, directories: List[Path]) -> Tuple[int, int]:
+        if self._mirror_directory is None or not self._mirror_directory.exists():
+            return 0, 0
+        mirror = self._mirror()
+        size_before = self._object_size(mirror)
+        # pin everything the clones reference (it may no longer be on any upstream branch) and forget remotes
+        # no clone uses anymore
+        used_namespaces = set()
+        checkout_refs = {}
+        for directory in directories:
+            repo = Repo(directory)
+            used_namespaces.add(
+                f"{self.MIRROR_NAMESPACE}/{self._key(self.get_origin_url(directory))}/"
+            )
+            directory_key = self._key(str(directory.resolve()))
+            objects = {repo.head.commit.hexsha} | set(
+                repo.git.for_each_ref("--format=%(objectname)").split()
+            )
+            for obj in sorted(objects):
+                checkout_refs[f"{self.CHECKOUT_NAMESPACE}/{directory_key}/{obj}"] = obj
+        for ref in mirror.git.for_each_ref("--format=%(refname)").splitlines():
+            if ref.startswith(self.CHECKOUT_NAMESPACE) and ref not in checkout_refs:
+                mirror.git.update_ref("-d", ref)
+            elif ref.startswith(self.MIRROR_NAMESPACE) and not any(
+                ref.startswith(namespace) for namespace in used_namespaces
+            ):
+                mirror.git.update_ref("-d", ref)
+        for ref, obj in checkout_refs.items():
+            try:
+                mirror.git.cat_file("-e", obj)
+            except GitCommandError:
+                continue  # the clone stores this object itself, e.g. because it predates the mirror
+            mirror.git.update_ref(ref, obj)
+        # objects nothing references anymore are only pruned after git's grace period (gc.pruneExpire), so clones
+        # and fetches running meanwhile or not known to the caller keep the objects they borrow
+        mirror.git.gc("--quiet")
+        return size_before, self._object_size(mirror)
+
+    def changed_files(
+        self, directory: Path, old_revision: str, new_revision: str
+    ) -> List[Path]:
+        # without rename detection a moved file shows up as removed and added, so both paths are reported
+        output = Repo(directory).git.diff(
+            "--name-only", "--no-renames", old_revision, new_revision
+        )
+        return [Path(line) for line in output.splitlines() if line]
+
+    def read_file(self, directory: Path, revision: str, path: Path) -> Optional[str]:
+        try:
+            return Repo(directory).git.show(f"{revision}:{path.as_posix()}")
+        except GitCommandError:
+            return None
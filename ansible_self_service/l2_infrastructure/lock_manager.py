@@ -0,0 +1,123 @@
+import contextlib
+import os
+import threading
+import time
+from dataclasses import replace
+from typing import Dict, Iterator, List, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore # pylint: disable=invalid-name
+
+from ansible_self_service.l4_core.models import Config, LockStatistics
+from ansible_self_service.l4_core.protocols import LockManagerProtocol, LoggerProtocol
+
+
+class FileLockManager(LockManagerProtocol):
+    """Reader/writer locks backed by flock on one lock file per resource in the cache directory.
+
+    Locks are released by the OS when a process dies, so a crashed command never leaves a stale lock behind. Locks
+    are reentrant per thread: taking a lock that is already held in the same or a stronger mode does nothing,
+    upgrading a read lock to a write lock is refused because two upgrading readers would deadlock. Without fcntl
+    (e.g. on Windows) locks only work between threads of the same process and readers exclude each other.
+    """
+
+    def __init__(self, config: Config, logger: LoggerProtocol):
+        self._config = config
+        self._logger = logger
+        self._held = threading.local()
+        self._statistics: Dict[str, LockStatistics] = {}
+        self._statistics_lock = threading.Lock()
+        self._thread_locks: Dict[str, threading.Lock] = {}
+
+    def _held_locks(self) -> Dict[str, Tuple[bool, int]]:
+        """Locks of the current thread by name, mapping to (exclusive, nesting depth)."""
+        if not hasattr(self._held, "locks"):
+            self._held.locks = {}
+        return self._held.locks
+
+    def _record(self, name: str, wait: float, contended: bool):
+        with self._statistics_lock:
+            self._statistics.setdefault(name, LockStatistics(name=name)).record(
+                wait, contended
+            )
+        if contended:
+            self._logger.info(f"Waited {wait:.3f}s for lock {name}")
+
+    @contextlib.contextmanager
+    def _acquire_file_lock(self, name: str, exclusive: bool) -> Iterator[None]:
+        mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        file_descriptor = os.open(
+            self._config.lock_file(name), os.O_RDONLY | os.O_CREAT, 0o666
+        )
+        try:
+            start = time.perf_counter()
+            try:
+                fcntl.flock(file_descriptor, mode | fcntl.LOCK_NB)
+                contended = False
+            except BlockingIOError:
+                fcntl.flock(file_descriptor, mode)
+                contended = True
+            self._record(name, time.perf_counter() - start, contended)
+            try:
+                yield
+            finally:
+                fcntl.flock(file_descriptor, fcntl.LOCK_UN)
+        finally:
+            os.close(file_descriptor)
+
+    @contextlib.contextmanager
+    def _acquire_thread_lock(self, name: str) -> Iterator[None]:
+        with self._statistics_lock:
+            lock = self._thread_locks.setdefault(name, threading.Lock())
+        start = time.perf_counter()
+        contended = not lock.acquire(blocking=False)
+        if contended:
+            lock.acquire()
+        self._record(name, time.perf_counter() - start, contended)
+        try:
+            yield
+        finally:
+            lock.release()
+
+    @contextlib.contextmanager
+    def _lock(self, name: str, exclusive: bool) -> Iterator[None]:
+        held_locks = self._held_locks()
+        held = held_locks.get(name)
+        if held is not None:
+            held_exclusive, depth = held
+            if exclusive and not held_exclusive:
+                raise RuntimeError(
+                    f"Cannot upgrade the read lock on {name} to a write lock"
+                )
+            held_locks[name] = (held_exclusive, depth + 1)
+            try:
+                yield
+            finally:
+                held_locks[name] = (held_exclusive, depth)
+            return
+        acquire = (
+            self._acquire_file_lock(name, exclusive)
+            if fcntl is not None
+            else self._acquire_thread_lock(name)
+        )
+        with acquire:
+            held_locks[name] = (exclusive, 1)
+            try:
+                yield
+            finally:
+                del held_locks[name]
+
+    def read(self, name: str):
+        return self._lock(name, exclusive=False)
+
+    def write(self, name: str):
+        return self._lock(name, exclusive=True)
+
+    def statistics(self) -> List[LockStatistics]:
+        with self._statistics_lock:
+            return [
+                replace(statistics)
+                for _, statistics in sorted(self._statistics.items())
+            ]
@@ -0,0 +1,206 @@
+from pathlib import Path
+from typing import Any, List, Optional, Set
+
+import yaml
+
+from ansible_self_service.l4_core.protocols import PlaybookDependencyResolverProtocol
+
+
+class YamlPlaybookDependencyResolver(PlaybookDependencyResolverProtocol):
+    """Statically collect the files a playbook uses by walking its YAML.
+
+    Follows imported playbooks, vars files, roles (including their meta dependencies), included/imported tasks and
+    vars as well as the group_vars/host_vars directories next to the playbook. References that contain Jinja
+    expressions cannot be resolved statically. In that case the directory of the referencing file is returned, so
+    the result errs on the side of too many dependencies.
+    """
+
+    PLAYBOOK_IMPORTS = ("import_playbook", "include", "ansible.builtin.import_playbook")
+    ROLE_MODULES = (
+        "include_role",
+        "import_role",
+        "ansible.builtin.include_role",
+        "ansible.builtin.import_role",
+    )
+    TASK_MODULES = (
+        "include_tasks",
+        "import_tasks",
+        "ansible.builtin.include_tasks",
+        "ansible.builtin.import_tasks",
+    )
+    VARS_MODULES = ("include_vars", "ansible.builtin.include_vars")
+    TASK_LISTS = ("tasks", "pre_tasks", "post_tasks", "handlers")
+    BLOCK_KEYS = ("block", "rescue", "always")
+    VARS_DIRECTORIES = ("group_vars", "host_vars")
+
+    def resolve(self, working_directory: Path, playbook_path: Path) -> Set[Path]:
+        dependencies: Set[Path] = set()
+        self._resolve_playbook(working_directory, playbook_path, dependencies)
+        return dependencies
+
+    @staticmethod
+    def _is_dynamic(reference: Any) -> bool:
+        return not isinstance(reference, str) or "{{" in reference or "{%" in reference
+
+    @staticmethod
+    def _load(path: Path) -> Any:
+        try:
+            with open(path, encoding="utf-8") as infile:
+                return yaml.safe_load(infile)
+        except (OSError, yaml.YAMLError):
+            return None
+
+    def _add_reference(
+        self, base_directory: Path, reference: Any, dependencies: Set[Path]
+    ) -> Optional[Path]:
+        """Add a file referenced relative to base_directory. Returns the path if it could be resolved."""
+        if self._is_dynamic(reference):
+            dependencies.add(base_directory)
+            return None
+        path = base_directory / reference
+        dependencies.add(path)
+        return path
+
+    def _resolve_playbook(
+        self, working_directory: Path, playbook_path: Path, dependencies: Set[Path]
+    ):
+        if playbook_path in dependencies:
+            return
+        dependencies.add(playbook_path)
+        playbook_directory = playbook_path.parent
+        for vars_directory in self.VARS_DIRECTORIES:
+            dependencies.add(playbook_directory / vars_directory)
+        for play in self._as_list(self._load(playbook_path)):
+            if not isinstance(play, dict):
+                continue
+            for import_key in self.PLAYBOOK_IMPORTS:
+                if import_key in play:
+                    imported = self._add_reference(
+                        playbook_directory, play[import_key], dependencies
+                    )
+                    if imported is not None:
+                        dependencies.discard(imported)
+                        self._resolve_playbook(
+                            working_directory, imported, dependencies
+                        )
+            for vars_file in self._as_list(play.get("vars_files")):
+                for reference in self._as_list(vars_file):
+                    self._add_reference(playbook_directory, reference, dependencies)
+            for role in self._as_list(play.get("roles")):
+                role_name = (
+                    role.get("role", role.get("name"))
+                    if isinstance(role, dict)
+                    else role
+                )
+                self._resolve_role(
+                    working_directory, playbook_directory, role_name, dependencies
+                )
+            for task_list in self.TASK_LISTS:
+                self._resolve_tasks(
+                    working_directory,
+                    playbook_directory,
+                    playbook_directory,
+                    play.get(task_list),
+                    dependencies,
+                )
+
+    @staticmethod
+    def _role_directory(
+        working_directory: Path, playbook_directory: Path, role_name: str
+    ) -> Optional[Path]:
+        for candidate in (
+            playbook_directory / "roles" / role_name,
+            working_directory / "roles" / role_name,
+        ):
+            if candidate.is_dir():
+                return candidate
+        if "." in role_name:
+            # a Galaxy or collection role that is installed via requirements
+            return None
+        return playbook_directory / "roles" / role_name
+
+    def _resolve_role(
+        self,
+        working_directory: Path,
+        playbook_directory: Path,
+        role_name: Any,
+        dependencies: Set[Path],
+    ):
+        if self._is_dynamic(role_name):
+            dependencies.add(playbook_directory / "roles")
+            return
+        role_directory = self._role_directory(
+            working_directory, playbook_directory, role_name
+        )
+        if role_directory is None or role_directory in dependencies:
+            return
+        # any change within the role affects the playbook
+        dependencies.add(role_directory)
+        meta = self._load(role_directory / "meta" / "main.yml")
+        if isinstance(meta, dict):
+            for dependency in self._as_list(meta.get("dependencies")):
+                dependency_name = (
+                    dependency.get("role", dependency.get("name"))
+                    if isinstance(dependency, dict)
+                    else dependency
+                )
+                self._resolve_role(
+                    working_directory, playbook_directory, dependency_name, dependencies
+                )
+
+    def _resolve_tasks(  # pylint: disable=too-many-arguments
+        self,
+        working_directory: Path,
+        playbook_directory: Path,
+        base_directory: Path,
+        tasks: Any,
+        dependencies: Set[Path],
+    ):
+        for task in self._as_list(tasks):
+            if not isinstance(task, dict):
+                continue
+            for block_key in self.BLOCK_KEYS:
+                if block_key in task:
+                    self._resolve_tasks(
+                        working_directory,
+                        playbook_directory,
+                        base_directory,
+                        task[block_key],
+                        dependencies,
+                    )
+            for module in self.ROLE_MODULES:
+                if module in task:
+                    arguments = task[module]
+                    role_name = (
+                        arguments.get("name")
+                        if isinstance(arguments, dict)
+                        else arguments
+                    )
+                    self._resolve_role(
+                        working_directory, playbook_directory, role_name, dependencies
+                    )
+            for module in self.TASK_MODULES + self.VARS_MODULES:
+                if module in task:
+                    arguments = task[module]
+                    reference = (
+                        arguments.get("file", arguments.get("_raw_params"))
+                        if isinstance(arguments, dict)
+                        else arguments
+                    )
+                    path = self._add_reference(base_directory, reference, dependencies)
+                    if path is not None and module in self.TASK_MODULES:
+                        self._resolve_tasks(
+                            working_directory,
+                            playbook_directory,
+                            path.parent,
+                            self._load(path),
+                            dependencies,
+                        )
+
+    @staticmethod
+    def _as_list(value: Any) -> List:
+        if value is None:
+            return []
+        if isinstance(value, list):
+            return value
+        return [value]
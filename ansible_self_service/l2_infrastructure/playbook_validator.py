@@ -0,0 +1,112 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+from ansible_self_service.l2_infrastructure.ansible_engine import (
+    AnsibleWorkerError,
+    AnsibleWorkerPool,
+)
+from ansible_self_service.l4_core.exceptions import AnsibleRunTimeoutException
+from ansible_self_service.l4_core.models import Config
+from ansible_self_service.l4_core.protocols import (
+    PlaybookValidationCacheProtocol,
+    PlaybookValidatorProtocol,
+)
+
+
+class AnsiblePlaybookValidator(PlaybookValidatorProtocol):
+    """Syntax check playbooks with ansible-playbook --syntax-check semantics on pooled Ansible workers.
+
+    Loading a playbook resolves its roles and static imports, dynamic includes are only checked when they run.
+    """
+
+    def __init__(
+        self,
+        worker_pool: AnsibleWorkerPool,
+        concurrency: int = 4,
+        timeout: float = 120.0,
+    ):
+        self._worker_pool = worker_pool
+        self._concurrency = concurrency
+        self._timeout = timeout
+
+    def _validate(
+        self,
+        working_directory: Path,
+        playbook_path: Path,
+        requirements_directory: Optional[Path],
+    ) -> Optional[str]:
+        try:
+            result = self._worker_pool.run(
+                working_directory,
+                requirements_directory,
+                playbook_path,
+                syntax_check=True,
+                timeout=self._timeout,
+            )
+        except (AnsibleRunTimeoutException, AnsibleWorkerError) as exception:
+            return f"Syntax check failed: {exception}"
+        if result.was_successful:
+            return None
+        return result.stderr.strip() or result.stdout.strip()
+
+    def validate(
+        self,
+        working_directory: Path,
+        playbook_paths: Sequence[Path],
+        requirements_directory: Optional[Path] = None,
+    ) -> Dict[Path, Optional[str]]:
+        if not playbook_paths:
+            return {}
+        with ThreadPoolExecutor(
+            max_workers=min(self._concurrency, len(playbook_paths))
+        ) as executor:
+            errors = executor.map(
+                lambda playbook_path: self._validate(
+                    working_directory, playbook_path, requirements_directory
+                ),
+                playbook_paths,
+            )
+            return dict(zip(playbook_paths, errors))
+
+
+class JsonPlaybookValidationCache(PlaybookValidationCacheProtocol):
+    """Validation results stored as one JSON file per collection, keeping the most recent keys only."""
+
+    MAX_KEYS = 8
+
+    def __init__(self, config: Config):
+        self._config = config
+        # collection name -> (mtime of the loaded file, results by key)
+        self._loaded: Dict[str, Tuple[int, Dict[str, Dict[str, str]]]] = {}
+
+    def _results(self, collection_name: str) -> Dict[str, Dict[str, str]]:
+        """Read the results of a collection unless the version in memory is already the latest one."""
+        validation_file = self._config.playbook_validation_file(collection_name)
+        try:
+            mtime = os.stat(validation_file).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        loaded = self._loaded.get(collection_name)
+        if loaded is None or loaded[0] != mtime:
+            with open(validation_file, "r", encoding="utf-8") as infile:
+                loaded = (mtime, json.load(infile))
+            self._loaded[collection_name] = loaded
+        return loaded[1]
+
+    def load(self, collection_name: str, key: str) -> Optional[Dict[str, str]]:
+        errors = self._results(collection_name).get(key)
+        return None if errors is None else dict(errors)
+
+    def save(self, collection_name: str, key: str, errors: Dict[str, str]):
+        results = dict(self._results(collection_name))
+        results.pop(key, None)
+        results[key] = dict(errors)  # the most recent key comes last
+        results = dict(list(results.items())[-self.MAX_KEYS :])
+        validation_file = self._config.playbook_validation_file(collection_name)
+        tmp_file = validation_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as outfile:
+            json.dump(results, outfile, indent=2)
+        os.replace(tmp_file, validation_file)
@@ -0,0 +1,508 @@
+"""Run playbooks as root in a helper process that is elevated once and then serves many runs over a Unix socket."""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from ansible_self_service.l2_infrastructure.ansible_engine import (
+    AnsibleWorkerPool,
+    ReusableAnsibleRunner,
+    _detach_stdio,
+)
+from ansible_self_service.l2_infrastructure.elevate import run_elevated
+from ansible_self_service.l4_core.exceptions import AnsibleRunTimeoutException
+from ansible_self_service.l4_core.models import AnsibleRunResult, Config
+from ansible_self_service.l4_core.protocols import (
+    AnsibleRunnerProtocol,
+    AsyncAnsibleRunnerProtocol,
+    LoggerProtocol,
+)
+
+# every message is a JSON object prefixed with its length
+FRAME_HEADER = struct.Struct("!I")
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+PATH_ARGUMENTS = ("working_directory", "inventory", "requirements_directory")
+
+
+class PrivilegedHelperError(Exception):
+    """Raised when the privileged helper cannot be started, refuses a client or fails a job."""
+
+
+def send_message(connection: socket.socket, message: Dict[str, Any]):
+    data = json.dumps(message).encode("utf-8")
+    connection.sendall(FRAME_HEADER.pack(len(data)) + data)
+
+
+def _receive_exactly(connection: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size > 0:
+        chunk = connection.recv(min(size, 1024 * 1024))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def receive_message(connection: socket.socket) -> Optional[Dict[str, Any]]:
+    """The next message or None once the peer closed the connection."""
+    header = _receive_exactly(connection, FRAME_HEADER.size)
+    if header is None:
+        return None
+    (size,) = FRAME_HEADER.unpack(header)
+    if size > MAX_FRAME_SIZE:
+        raise PrivilegedHelperError(f"Message of {size} bytes is too large")
+    data = _receive_exactly(connection, size)
+    if data is None:
+        return None
+    message = json.loads(data.decode("utf-8"))
+    if not isinstance(message, dict):
+        raise PrivilegedHelperError("Messages have to be JSON objects")
+    return message
+
+
+def encode_job(  # pylint: disable=too-many-arguments
+    working_directory: Path,
+    playbook_path: Path,
+    tags=tuple(),
+    check_mode: bool = False,
+    inventory: Optional[Path] = None,
+    limit: Optional[Sequence[str]] = None,
+    forks: Optional[int] = None,
+    requirements_directory: Optional[Path] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """The arguments of AnsibleRunnerProtocol.run as plain data.
+
+    Paths are made absolute, since the helper does not share the working directory of the client. The playbook path
+    stays relative to the working directory of the run.
+    """
+    return {
+        "working_directory": str(working_directory.absolute()),
+        "playbook_path": str(playbook_path),
+        "tags": list(tags),
+        "check_mode": check_mode,
+        "inventory": str(inventory.absolute()) if inventory else None,
+        "limit": list(limit) if limit else None,
+        "forks": forks,
+        "requirements_directory": (
+            str(requirements_directory.absolute()) if requirements_directory else None
+        ),
+        "timeout": timeout,
+    }
+
+
+def decode_job(job: Any) -> Dict[str, Any]:
+    """Check a job received from a client and turn it back into the arguments of AnsibleRunnerProtocol.run."""
+    if not isinstance(job, dict) or not isinstance(job.get("playbook_path"), str):
+        raise PrivilegedHelperError("A job needs a playbook_path")
+    arguments: Dict[str, Any] = {"playbook_path": Path(job["playbook_path"])}
+    for name in PATH_ARGUMENTS:
+        value = job.get(name)
+        if value is None and name != "working_directory":
+            arguments[name] = None
+        elif isinstance(value, str) and Path(value).is_absolute():
+            arguments[name] = Path(value)
+        else:
+            raise PrivilegedHelperError(f"{name} has to be an absolute path")
+    for name, value in (("tags", job.get("tags") or []), ("limit", job.get("limit"))):
+        if value is not None and not (
+            isinstance(value, list) and all(isinstance(item, str) for item in value)
+        ):
+            raise PrivilegedHelperError(f"{name} has to be a list of strings")
+    arguments["tags"] = tuple(job.get("tags") or ())
+    arguments["limit"] = job.get("limit")
+    arguments["check_mode"] = bool(job.get("check_mode"))
+    forks, timeout = job.get("forks"), job.get("timeout")
+    if forks is not None and not isinstance(forks, int):
+        raise PrivilegedHelperError("forks has to be an integer")
+    if timeout is not None and not isinstance(timeout, (int, float)):
+        raise PrivilegedHelperError("timeout has to be a number")
+    arguments["forks"], arguments["timeout"] = forks, timeout
+    return arguments
+
+
+def peer_uid(connection: socket.socket) -> Optional[int]:
+    """User id of the process on the other end of a Unix socket, None where the platform cannot tell."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    credentials = struct.Struct("3i")
+    _, uid, _ = credentials.unpack(
+        connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, credentials.size)
+    )
+    return uid
+
+
+class PrivilegedHelper:
+    """Serve Ansible runs to the one user that started the helper, until no client connected for idle_timeout seconds.
+
+    The socket lives in a directory only that user can access and is owned by them with mode 0600, where the platform
+    supports it the user id of every client is checked as well. A client sends a batch of jobs per request and
+    receives the result of each job as soon as it is known. Runs go through the given runner, so a reusable runner
+    keeps its Ansible workers warm across all commands of a session. A run keeps going until it finished or timed out
+    if its client disconnects.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        socket_path: Path,
+        allowed_uid: int,
+        runner: AnsibleRunnerProtocol,
+        idle_timeout: float = 900.0,
+        max_workers: int = 4,
+    ):
+        self._socket_path = socket_path
+        self._allowed_uid = allowed_uid
+        self._runner = runner
+        self._idle_timeout = idle_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="privileged-run"
+        )
+        self._server: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+        self._active_connections = 0
+        self._last_activity = time.monotonic()
+
+    def _check_directory(self):
+        """Refuse to listen in a directory other users could swap the socket in."""
+        directory = self._socket_path.parent
+        stat = directory.stat()
+        if stat.st_uid not in (self._allowed_uid, 0) or stat.st_mode & 0o022:
+            raise PrivilegedHelperError(
+                f"{directory} has to belong to the user and must not be writable by others"
+            )
+
+    def _is_listening(self) -> bool:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(str(self._socket_path))
+            except OSError:
+                return False
+        return True
+
+    def bind(self) -> bool:
+        """Listen on the socket, returns False if another helper already does."""
+        self._check_directory()
+        if self._socket_path.is_socket():
+            if self._is_listening():
+                return False
+            self._socket_path.unlink()  # left behind by a helper that was killed
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(self._socket_path))
+        os.chmod(self._socket_path, 0o600)
+        if os.getuid() != self._allowed_uid:
+            os.chown(self._socket_path, self._allowed_uid, -1)
+        server.listen()
+        server.settimeout(1.0)
+        self._server = server
+        return True
+
+    def _is_allowed(self, connection: socket.socket) -> bool:
+        uid = peer_uid(connection)
+        return uid is None or uid in (self._allowed_uid, 0)
+
+    def _run(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            result = self._runner.run(**decode_job(job))
+        except AnsibleRunTimeoutException as exception:
+            return {"timeout": exception.duration}
+        except Exception as exception:  # pylint: disable=broad-except
+            return {"error": str(exception) or type(exception).__name__}
+        return {
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+            "return_code": result.return_code,
+        }
+
+    def _handle(self, connection: socket.socket):
+        with connection:
+            if not self._is_allowed(connection):
+                send_message(connection, {"error": "Permission denied"})
+                return
+            while True:
+                request = receive_message(connection)
+                if request is None:
+                    return
+                jobs = request.get("jobs")
+                if not isinstance(jobs, list):
+                    send_message(connection, {"error": "A request needs jobs"})
+                    return
+                futures = {
+                    self._executor.submit(self._run, job): index
+                    for index, job in enumerate(jobs)
+                }
+                for future in as_completed(futures):
+                    send_message(
+                        connection, {"index": futures[future], **future.result()}
+                    )
+
+    def _serve_connection(self, connection: socket.socket):
+        try:
+            self._handle(connection)
+        except (OSError, ValueError, PrivilegedHelperError):
+            pass  # the client went away or spoke garbage, other clients are not affected
+        finally:
+            with self._lock:
+                self._active_connections -= 1
+                self._last_activity = time.monotonic()
+
+    def _is_idle(self) -> bool:
+        with self._lock:
+            return (
+                self._active_connections == 0
+                and time.monotonic() - self._last_activity > self._idle_timeout
+            )
+
+    def serve(self):
+        """Accept clients until the helper has been idle for idle_timeout seconds, then remove the socket."""
+        assert self._server is not None, "bind first"
+        try:
+            while not self._is_idle():
+                try:
+                    connection, _ = self._server.accept()
+                except socket.timeout:
+                    continue
+                connection.settimeout(None)
+                with self._lock:
+                    self._active_connections += 1
+                threading.Thread(
+                    target=self._serve_connection, args=(connection,), daemon=True
+                ).start()
+        finally:
+            self._server.close()
+            try:
+                self._socket_path.unlink()
+            except FileNotFoundError:
+                pass
+            self._executor.shutdown(wait=False)
+
+
+class PrivilegedHelperClient:
+    """Send jobs to the privileged helper of the current user, starting it if it is not running.
+
+    The helper is started through sudo, pkexec or a similar program, which asks for the password once per session
+    instead of once per command.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        config: Config,
+        logger: LoggerProtocol,
+        idle_timeout: float = 900.0,
+        max_workers: int = 4,
+        start_timeout: float = 120.0,
+    ):
+        self._config = config
+        self._logger = logger
+        self._idle_timeout = idle_timeout
+        self._max_workers = max_workers
+        self._start_timeout = start_timeout
+        self._start_lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(str(self._config.privileged_helper_socket))
+        except OSError:
+            connection.close()
+            raise
+        return connection
+
+    def _start(self):
+        socket_path = self._config.privileged_helper_socket
+        self._logger.info(
+            "Starting the privileged helper, which may ask for a password"
+        )
+        return_code = run_elevated(
+            [
+                sys.executable,
+                "-m",
+                __name__,
+                "--socket",
+                str(socket_path),
+                "--uid",
+                str(os.getuid()),
+                "--idle-timeout",
+                str(self._idle_timeout),
+                "--jobs",
+                str(self._max_workers),
+            ]
+        )
+        if return_code != 0:
+            raise PrivilegedHelperError(
+                f"The privileged helper could not be started (exit code {return_code})"
+            )
+
+    def connect(self) -> socket.socket:
+        """Connect to the running helper or start one, only one thread starts it at a time."""
+        try:
+            return self._connect()
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass
+        with self._start_lock:
+            try:
+                return self._connect()
+            except (FileNotFoundError, ConnectionRefusedError):
+                self._start()
+            deadline = time.monotonic() + self._start_timeout
+            while True:
+                try:
+                    return self._connect()
+                except (FileNotFoundError, ConnectionRefusedError) as exception:
+                    if time.monotonic() > deadline:
+                        raise PrivilegedHelperError(
+                            "The privileged helper did not start listening"
+                        ) from exception
+                    time.sleep(0.1)
+
+    def run_batch(
+        self, jobs: List[Dict[str, Any]]
+    ) -> List[Union[AnsibleRunResult, Exception]]:
+        """Run jobs made by encode_job in the helper, returns the result or the exception of each job in order."""
+        results: List[Union[AnsibleRunResult, Exception, None]] = [None] * len(jobs)
+        with self.connect() as connection:
+            send_message(connection, {"jobs": jobs})
+            for _ in jobs:
+                response = receive_message(connection)
+                if response is None or "index" not in response:
+                    error = (response or {}).get("error", "connection closed")
+                    raise PrivilegedHelperError(
+                        f"The privileged helper failed: {error}"
+                    )
+                index = response["index"]
+                if "timeout" in response:
+                    results[index] = AnsibleRunTimeoutException(response["timeout"])
+                elif "error" in response:
+                    results[index] = PrivilegedHelperError(response["error"])
+                else:
+                    results[index] = AnsibleRunResult(
+                        response["stdout"], response["stderr"], response["return_code"]
+                    )
+        return results  # type: ignore # every index has been answered
+
+
+class PrivilegedAnsibleRunner(AnsibleRunnerProtocol):
+    """Run playbooks as root through the privileged helper, or through local_runner if this process is root."""
+
+    def __init__(
+        self, client: PrivilegedHelperClient, local_runner: AnsibleRunnerProtocol
+    ):
+        self._client = client
+        self._local_runner = local_runner
+
+    def run(  # pylint: disable=too-many-arguments
+        self,
+        working_directory: Path,
+        playbook_path: Path,
+        tags=tuple(),
+        check_mode: bool = False,
+        inventory: Optional[Path] = None,
+        limit: Optional[Sequence[str]] = None,
+        forks: Optional[int] = None,
+        requirements_directory: Optional[Path] = None,
+        timeout: Optional[float] = None,
+    ) -> AnsibleRunResult:
+        arguments = {
+            "working_directory": working_directory,
+            "playbook_path": playbook_path,
+            "tags": tags,
+            "check_mode": check_mode,
+            "inventory": inventory,
+            "limit": limit,
+            "forks": forks,
+            "requirements_directory": requirements_directory,
+            "timeout": timeout,
+        }
+        if os.getuid() == 0:
+            return self._local_runner.run(**arguments)
+        (result,) = self._client.run_batch([encode_job(**arguments)])
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class PrivilegedAsyncAnsibleRunner(AsyncAnsibleRunnerProtocol):
+    """Like PrivilegedAnsibleRunner but waits for results on the event loop.
+
+    A cancelled run is not aborted in the helper, it ends there once it finished or timed out.
+    """
+
+    def __init__(self, runner: PrivilegedAnsibleRunner):
+        self._runner = runner
+
+    async def run(  # pylint: disable=too-many-arguments
+        self,
+        working_directory: Path,
+        playbook_path: Path,
+        tags=tuple(),
+        check_mode: bool = False,
+        inventory: Optional[Path] = None,
+        limit: Optional[Sequence[str]] = None,
+        forks: Optional[int] = None,
+        requirements_directory: Optional[Path] = None,
+        timeout: Optional[float] = None,
+    ) -> AnsibleRunResult:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: self._runner.run(
+                working_directory,
+                playbook_path,
+                tags,
+                check_mode,
+                inventory,
+                limit,
+                forks,
+                requirements_directory,
+                timeout,
+            ),
+        )
+
+
+def _requesting_uid(uid: int) -> int:
+    """The uid the helper was asked to serve, refusing one that differs from the user sudo or pkexec authenticated."""
+    for variable in ("SUDO_UID", "PKEXEC_UID"):
+        authenticated = os.environ.get(variable)
+        if authenticated is not None and int(authenticated) != uid:
+            raise PrivilegedHelperError(
+                f"--uid {uid} does not match the user who elevated ({authenticated})"
+            )
+    return uid
+
+
+def main(arguments: Optional[Sequence[str]] = None):
+    """Entrypoint of the helper: listen on the socket, then detach, so the elevating command returns."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--socket", type=Path, required=True)
+    parser.add_argument("--uid", type=int, required=True)
+    parser.add_argument("--idle-timeout", type=float, default=900.0)
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--foreground", action="store_true")
+    options = parser.parse_args(arguments)
+    helper = PrivilegedHelper(
+        options.socket,
+        _requesting_uid(options.uid),
+        ReusableAnsibleRunner(AnsibleWorkerPool()),
+        idle_timeout=options.idle_timeout,
+        max_workers=options.jobs,
+    )
+    if not helper.bind():
+        return  # started concurrently by another command
+    if not options.foreground:
+        if os.fork() != 0:
+            os._exit(0)  # pylint: disable=protected-access
+        os.setsid()
+        _detach_stdio()
+    helper.serve()
+
+
+if __name__ == "__main__":
+    main()
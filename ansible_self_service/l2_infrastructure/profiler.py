@@ -0,0 +1,102 @@
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import shutil
+import sys
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+# inherited by worker processes, deliberately without the ANSIBLE_ prefix since runners clear those
+PROFILE_DIRECTORY_ENV_VAR = "SELF_SERVICE_PROFILE_DIR"
+PROFILE_SUFFIX = ".prof"
+MERGED_PROFILE = "merged.stats"
+REPORT_FILE = "report.txt"
+
+
+def profile_directory() -> Optional[Path]:
+    """Directory receiving profiles if profiling was enabled in this or a parent process."""
+    directory = os.environ.get(PROFILE_DIRECTORY_ENV_VAR)
+    return Path(directory) if directory else None
+
+
+def _profile_file(directory: Path, name: str) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"{name}-{os.getpid()}-{uuid.uuid4().hex[:8]}{PROFILE_SUFFIX}"
+
+
+@contextlib.contextmanager
+def profiled(name: str):
+    """Profile the code within the context if profiling is enabled and write the stats to the profile directory."""
+    directory = profile_directory()
+    if directory is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(str(_profile_file(directory, name)))
+
+
+def profiled_command(args: List[str], name: str) -> List[str]:
+    """Prefix the command line of a Python program, so it writes a profile if profiling is enabled."""
+    directory = profile_directory()
+    if directory is None:
+        return args
+    executable = shutil.which(args[0]) or args[0]
+    return [
+        sys.executable,
+        "-m",
+        "cProfile",
+        "-o",
+        str(_profile_file(directory, name)),
+        executable,
+        *args[1:],
+    ]
+
+
+class Profiler:
+    """Profile the current process and every worker process started while the profiler is active.
+
+    Each process writes its own stats file to the directory. report merges them into a single stats file and a
+    text report of the hot spots.
+    """
+
+    def __init__(self, directory: Path):
+        self._directory = directory.absolute()
+        self._profiler = cProfile.Profile()
+
+    def start(self):
+        self._directory.mkdir(parents=True, exist_ok=True)
+        os.environ[PROFILE_DIRECTORY_ENV_VAR] = str(self._directory)
+        self._profiler.enable()
+
+    def stop(self):
+        self._profiler.disable()
+        self._profiler.dump_stats(str(_profile_file(self._directory, "main")))
+        os.environ.pop(PROFILE_DIRECTORY_ENV_VAR, None)
+
+    def report(self, limit: int = 25) -> Path:
+        """Merge all profiles of the directory and write the top functions by own and cumulative time.
+
+        Returns the path of the text report.
+        """
+        profile_files = sorted(self._directory.glob(f"*{PROFILE_SUFFIX}"))
+        stream = io.StringIO()
+        stats = pstats.Stats(*map(str, profile_files), stream=stream)
+        stats.dump_stats(str(self._directory / MERGED_PROFILE))
+        stream.write(
+            f"Merged {len(profile_files)} profiles from {self._directory}\n\n"
+            f"Hot spots by own time\n"
+        )
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(limit)
+        stream.write("Hot spots by cumulative time\n")
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        report_file = self._directory / REPORT_FILE
+        report_file.write_text(stream.getvalue(), encoding="utf-8")
+        return report_file
@@ -0,0 +1,66 @@
+import subprocess
+from pathlib import Path
+from typing import List
+
+import yaml
+
+from ansible_self_service.l2_infrastructure.profiler import profiled_command
+from ansible_self_service.l4_core.exceptions import RequirementsInstallationException
+from ansible_self_service.l4_core.protocols import RequirementsInstallerProtocol
+
+
+class AnsibleGalaxyRequirementsInstaller(RequirementsInstallerProtocol):
+    """Install requirements files via the ansible-galaxy CLI.
+
+    A requirements file is either a list of roles or a mapping with "roles" and/or "collections".
+    """
+
+    ROLES_DIRECTORY = "roles"
+    COLLECTIONS_DIRECTORY = "collections"
+
+    @staticmethod
+    def _galaxy(working_directory: Path, *args: str):
+        process = subprocess.run(
+            profiled_command(["ansible-galaxy", *args], "ansible-galaxy"),
+            cwd=working_directory,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if process.returncode != 0:
+            raise RequirementsInstallationException(
+                process.stderr.strip() or process.stdout.strip()
+            )
+
+    def install(
+        self,
+        working_directory: Path,
+        requirements_files: List[Path],
+        target_directory: Path,
+    ):
+        target_directory.mkdir(parents=True, exist_ok=True)
+        for requirements_file in requirements_files:
+            with open(requirements_file, encoding="utf-8") as infile:
+                requirements = yaml.safe_load(infile) or {}
+            if isinstance(requirements, list):
+                requirements = {"roles": requirements}
+            if requirements.get("roles"):
+                self._galaxy(
+                    working_directory,
+                    "role",
+                    "install",
+                    "--role-file",
+                    str(requirements_file),
+                    "--roles-path",
+                    str(target_directory / self.ROLES_DIRECTORY),
+                )
+            if requirements.get("collections"):
+                self._galaxy(
+                    working_directory,
+                    "collection",
+                    "install",
+                    "--requirements-file",
+                    str(requirements_file),
+                    "--collections-path",
+                    str(target_directory / self.COLLECTIONS_DIRECTORY),
+                )
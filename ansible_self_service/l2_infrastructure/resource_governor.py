@@ -0,0 +1,253 @@
+import asyncio
+import contextlib
+import os
+import shutil
+import subprocess
+import threading
+from dataclasses import replace
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, Optional, Sequence
+
+from ansible_self_service.l4_core.models import AnsibleRunResult, ResourceLimits
+from ansible_self_service.l4_core.protocols import (
+    AnsibleRunnerProtocol,
+    AsyncAnsibleRunnerProtocol,
+    LoggerProtocol,
+)
+
+# period of cgroup v2 cpu.max in microseconds
+CPU_PERIOD = 100000
+
+
+class CgroupV2:
+    """Move the current process into a cgroup v2 next to its own one.
+
+    A sibling is used because a cgroup whose children get controllers must not contain processes itself. This only
+    works where the parent cgroup is delegated to the user, e.g. within a systemd user service, or for root.
+    """
+
+    def __init__(
+        self,
+        root: Path = Path("/sys/fs/cgroup"),
+        proc_cgroup: Path = Path("/proc/self/cgroup"),
+    ):
+        self._root = root
+        self._proc_cgroup = proc_cgroup
+
+    def current(self) -> Path:
+        """Directory of the cgroup of this process, raises OSError without a unified cgroup v2 hierarchy."""
+        if not (self._root / "cgroup.controllers").exists():
+            raise OSError("no cgroup v2 hierarchy")
+        for line in self._proc_cgroup.read_text(encoding="utf-8").splitlines():
+            if line.startswith("0::"):
+                return self._root / line[3:].lstrip("/")
+        raise OSError("the process is not in a cgroup v2")
+
+    def join(self, name: str, settings: Dict[str, str]):
+        """Apply settings like {"cpu.weight": "10"} to the sibling cgroup name and move this process into it."""
+        parent = self.current().parent
+        if parent == self._root.parent:
+            raise OSError("the process is in the root cgroup")
+        controllers = sorted({setting.split(".")[0] for setting in settings})
+        subtree_control = parent / "cgroup.subtree_control"
+        enabled = subtree_control.read_text(encoding="utf-8").split()
+        missing = [
+            controller for controller in controllers if controller not in enabled
+        ]
+        if missing:
+            subtree_control.write_text(
+                " ".join(f"+{controller}" for controller in missing), encoding="utf-8"
+            )
+        cgroup = parent / name
+        cgroup.mkdir(exist_ok=True)
+        for setting, value in settings.items():
+            (cgroup / setting).write_text(value, encoding="utf-8")
+        (cgroup / "cgroup.procs").write_text(str(os.getpid()), encoding="utf-8")
+
+
+class ResourceGovernor:
+    """Keep the Ansible runs of this process within the limits of its resource class.
+
+    Niceness, I/O priority and the cgroup are applied once before the first run. On Linux niceness and I/O priority
+    belong to the calling thread and are only inherited by the threads and processes it starts afterwards, so apply
+    has to be called on the main thread before any executor or Ansible worker exists. The cgroup covers all threads.
+    Limits the platform or the permissions do not allow are skipped and reported as None in the limits in force.
+    max_concurrency caps the runs of this process at a time.
+    """
+
+    def __init__(
+        self,
+        limits: ResourceLimits,
+        logger: LoggerProtocol,
+        cgroup: Optional[CgroupV2] = None,
+    ):
+        self._limits = limits
+        self._logger = logger
+        self._cgroup = cgroup or CgroupV2()
+        self._lock = threading.Lock()
+        self._in_force: Optional[ResourceLimits] = None
+        self._semaphore = (
+            threading.BoundedSemaphore(limits.max_concurrency)
+            if limits.max_concurrency
+            else None
+        )
+        self._async_semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+    def _apply_nice(self) -> int:
+        if not hasattr(os, "nice"):
+            raise OSError("niceness is not supported on this platform")
+        current = os.nice(0)
+        if self._limits.nice > current:
+            current = os.nice(self._limits.nice - current)
+        return current
+
+    def _apply_ionice(self):
+        ionice = shutil.which("ionice")
+        if ionice is None:
+            raise OSError("ionice not found")
+        command = [ionice, "-c", str(self._limits.io_class), "-p", str(os.getpid())]
+        if self._limits.io_level is not None:
+            command[3:3] = ["-n", str(self._limits.io_level)]
+        subprocess.run(command, check=True, capture_output=True)
+
+    def _cgroup_settings(self) -> Dict[str, str]:
+        settings = {}
+        if self._limits.cpu_weight is not None:
+            settings["cpu.weight"] = str(self._limits.cpu_weight)
+        if self._limits.cpu_quota is not None:
+            settings[
+                "cpu.max"
+            ] = f"{int(self._limits.cpu_quota * CPU_PERIOD)} {CPU_PERIOD}"
+        if self._limits.memory_max is not None:
+            settings["memory.max"] = str(self._limits.memory_max)
+        return settings
+
+    def _apply(self) -> ResourceLimits:
+        in_force = self._limits
+        try:
+            in_force = replace(in_force, nice=self._apply_nice())
+        except OSError as exception:
+            self._logger.info(f"Cannot change the niceness: {exception}")
+        if self._limits.io_class is not None:
+            try:
+                self._apply_ionice()
+            except (OSError, subprocess.CalledProcessError) as exception:
+                self._logger.info(f"Cannot change the I/O priority: {exception}")
+                in_force = replace(in_force, io_class=None, io_level=None)
+        settings = self._cgroup_settings()
+        if settings:
+            try:
+                self._cgroup.join(
+                    f"ansible-self-service-{self._limits.resource_class.value}",
+                    settings,
+                )
+            except OSError as exception:
+                self._logger.info(f"Cannot apply cgroup limits: {exception}")
+                in_force = replace(
+                    in_force, cpu_weight=None, cpu_quota=None, memory_max=None
+                )
+        return in_force
+
+    def apply(self) -> ResourceLimits:
+        """Apply the limits to the calling thread and the cgroup of this process unless done already, returns the
+        limits in force."""
+        with self._lock:
+            if self._in_force is None:
+                self._in_force = self._apply()
+            return self._in_force
+
+    @contextlib.contextmanager
+    def slot(self) -> Iterator[None]:
+        """Wait until fewer than max_concurrency runs are going on."""
+        if self._semaphore is None:
+            yield
+            return
+        with self._semaphore:
+            yield
+
+    @contextlib.asynccontextmanager
+    async def async_slot(self) -> AsyncIterator[None]:
+        """Like slot but waits on the event loop, runs of different event loops are counted separately."""
+        if self._limits.max_concurrency is None:
+            yield
+            return
+        loop = asyncio.get_event_loop()
+        if loop not in self._async_semaphores:
+            self._async_semaphores[loop] = asyncio.Semaphore(
+                self._limits.max_concurrency
+            )
+        async with self._async_semaphores[loop]:
+            yield
+
+
+class GovernedAnsibleRunner(AnsibleRunnerProtocol):
+    """Run playbooks through another runner within the limits of a resource governor.
+
+    The timeout of a run only starts once it got a slot.
+    """
+
+    def __init__(self, runner: AnsibleRunnerProtocol, governor: ResourceGovernor):
+        self._runner = runner
+        self._governor = governor
+
+    def run(  # pylint: disable=too-many-arguments
+        self,
+        working_directory: Path,
+        playbook_path: Path,
+        tags=tuple(),
+        check_mode: bool = False,
+        inventory: Optional[Path] = None,
+        limit: Optional[Sequence[str]] = None,
+        forks: Optional[int] = None,
+        requirements_directory: Optional[Path] = None,
+        timeout: Optional[float] = None,
+    ) -> AnsibleRunResult:
+        limits = self._governor.apply()
+        with self._governor.slot():
+            result = self._runner.run(
+                working_directory,
+                playbook_path,
+                tags,
+                check_mode,
+                inventory,
+                limit,
+                forks,
+                requirements_directory,
+                timeout=timeout,
+            )
+        return replace(result, resource_limits=limits)
+
+
+class GovernedAsyncAnsibleRunner(AsyncAnsibleRunnerProtocol):
+    """Like GovernedAnsibleRunner but waits for a slot and the result on the event loop."""
+
+    def __init__(self, runner: AsyncAnsibleRunnerProtocol, governor: ResourceGovernor):
+        self._runner = runner
+        self._governor = governor
+
+    async def run(  # pylint: disable=too-many-arguments
+        self,
+        working_directory: Path,
+        playbook_path: Path,
+        tags=tuple(),
+        check_mode: bool = False,
+        inventory: Optional[Path] = None,
+        limit: Optional[Sequence[str]] = None,
+        forks: Optional[int] = None,
+        requirements_directory: Optional[Path] = None,
+        timeout: Optional[float] = None,
+    ) -> AnsibleRunResult:
+        limits = self._governor.apply()
+        async with self._governor.async_slot():
+            result = await self._runner.run(
+                working_directory,
+                playbook_path,
+                tags,
+                check_mode,
+                inventory,
+                limit,
+                forks,
+                requirements_directory,
+                timeout=timeout,
+            )
+        return replace(result, resource_limits=limits)
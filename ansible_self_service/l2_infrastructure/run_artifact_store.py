@@ -0,0 +1,424 @@
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import zlib
+from operator import attrgetter
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import quote, unquote
+
+from ansible_self_service.l4_core.models import (
+    AnsibleRunResult,
+    AppPlaybookTag,
+    Config,
+    RunArtifact,
+)
+from ansible_self_service.l4_core.protocols import (
+    LockManagerProtocol,
+    LoggerProtocol,
+    RunArtifactStoreProtocol,
+)
+from ansible_self_service.l4_core.utils import locked
+
+MEBIBYTE = 1024 * 1024
+
+
+class _Record(NamedTuple):
+    """Fields of an index record as packed by CompressedRunArtifactStore.RECORD."""
+
+    started_at: float
+    duration: float
+    return_code: int
+    tag: int
+    check_mode: bool
+    revision: bytes
+    run_id: bytes
+    stdout_digest: bytes
+    stderr_digest: bytes
+    stdout_size: int
+    stderr_size: int
+    stored_size: int
+
+
+class CompressedRunArtifactStore(RunArtifactStoreProtocol):
+    """Keep the output of Ansible runs as zlib compressed objects named by their digest, with a binary index per app.
+
+    stdout and stderr are stored as separate objects, so identical streams such as an empty stderr or a recurring
+    warning are only stored once and either can be read without decompressing the other. Objects are memory mapped
+    and decompressed in one go. The index of an app is a header followed by one fixed-size record per run ordered by
+    the start of the run, which lets queries find the start of a time range by binary search like the status history.
+    Runs of one app may overlap, so a run is inserted at its position rather than appended when it finishes.
+
+    The store keeps a running total of the bytes of its objects. Once that exceeds max_size, the oldest runs are
+    dropped until the objects they leave take at most prune_to of max_size, objects no run refers to any more are
+    deleted. Putting and pruning hold one lock for the whole store, reading needs none because objects and indexes
+    are only ever replaced atomically.
+    """
+
+    MAGIC = b"ASRA"
+    VERSION = 1
+    # magic, version
+    HEADER = struct.Struct("<4sB3x")
+    # started_at, duration, return_code, tag, check_mode, raw SHA-1 revision (zeros if unknown), run id,
+    # SHA-256 of stdout and stderr, uncompressed size of stdout and stderr, compressed size of both
+    RECORD = struct.Struct("<ddiB?2x20s16s32s32sQQQ")
+    TAGS = tuple(AppPlaybookTag)
+    INDEX_SUFFIX = ".bin"
+    OBJECT_SUFFIX = ".z"
+    LOCK_NAME = "artifacts"
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        config: Config,
+        logger: LoggerProtocol,
+        lock_manager: Optional[LockManagerProtocol] = None,
+        max_size: int = 256 * MEBIBYTE,
+        prune_to: float = 0.8,
+    ):
+        self._config = config
+        self._logger = logger
+        self._lock_manager = lock_manager
+        self._max_size = max_size
+        self._prune_to = prune_to
+
+    @property
+    def _index_directory(self) -> Path:
+        return self._config.run_artifact_store_directory / "index"
+
+    @property
+    def _object_directory(self) -> Path:
+        return self._config.run_artifact_store_directory / "objects"
+
+    @property
+    def _usage_file(self) -> Path:
+        return self._config.run_artifact_store_directory / "usage"
+
+    def _index_file(self, collection_name: str, app_name: str) -> Path:
+        return (
+            self._index_directory
+            / quote(collection_name, safe="")
+            / f"{quote(app_name, safe='')}{self.INDEX_SUFFIX}"
+        )
+
+    def _object_file(self, digest: str) -> Path:
+        return self._object_directory / digest[:2] / f"{digest[2:]}{self.OBJECT_SUFFIX}"
+
+    @classmethod
+    def _pack(cls, artifact: RunArtifact) -> bytes:
+        try:
+            revision = bytes.fromhex(artifact.revision or "")
+        except ValueError:
+            revision = b""
+        return cls.RECORD.pack(
+            artifact.started_at,
+            artifact.duration,
+            artifact.return_code,
+            cls.TAGS.index(artifact.tag),
+            artifact.check_mode,
+            revision if len(revision) == 20 else b"",
+            bytes.fromhex(artifact.run_id),
+            bytes.fromhex(artifact.stdout_digest),
+            bytes.fromhex(artifact.stderr_digest),
+            artifact.stdout_size,
+            artifact.stderr_size,
+            artifact.stored_size,
+        )
+
+    @classmethod
+    def _unpack(
+        cls, collection_name: str, app_name: str, data, offset: int
+    ) -> RunArtifact:
+        record = _Record._make(cls.RECORD.unpack_from(data, offset))
+        return RunArtifact(
+            run_id=record.run_id.hex(),
+            collection_name=collection_name,
+            app_name=app_name,
+            tag=cls.TAGS[record.tag],
+            check_mode=record.check_mode,
+            revision=None if record.revision == bytes(20) else record.revision.hex(),
+            started_at=record.started_at,
+            duration=record.duration,
+            return_code=record.return_code,
+            stdout_digest=record.stdout_digest.hex(),
+            stderr_digest=record.stderr_digest.hex(),
+            stdout_size=record.stdout_size,
+            stderr_size=record.stderr_size,
+            stored_size=record.stored_size,
+        )
+
+    @classmethod
+    def _offset(cls, index: int) -> int:
+        return cls.HEADER.size + index * cls.RECORD.size
+
+    @classmethod
+    def _bisect(cls, data, count: int, since: float, after: bool = False) -> int:
+        """Index of the first of count records started at or after since, or only after it if after is set."""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            started_at = cls.RECORD.unpack_from(data, cls._offset(middle))[0]
+            if started_at < since or (after and started_at == since):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    @classmethod
+    def _positions(cls, data, size: int, since: Optional[float]) -> range:
+        """Positions of the records from the first one started at or after since on, none if the format is unknown."""
+        magic, version = cls.HEADER.unpack_from(data, 0)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            return range(0)
+        count = (size - cls.HEADER.size) // cls.RECORD.size
+        return range(0 if since is None else cls._bisect(data, count, since), count)
+
+    def _read_index(
+        self,
+        index_file: Path,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> List[RunArtifact]:
+        collection_name = unquote(index_file.parent.name)
+        app_name = unquote(index_file.name[: -len(self.INDEX_SUFFIX)])
+        try:
+            with open(index_file, "rb") as infile:
+                size = os.fstat(infile.fileno()).st_size
+                if size <= self.HEADER.size:
+                    return []
+                with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    artifacts = []
+                    for index in self._positions(data, size, since):
+                        artifact = self._unpack(
+                            collection_name, app_name, data, self._offset(index)
+                        )
+                        if until is not None and artifact.started_at > until:
+                            break
+                        artifacts.append(artifact)
+                    return artifacts
+        except FileNotFoundError:
+            return []
+
+    def _index_files(
+        self, collection_name: Optional[str] = None, app_name: Optional[str] = None
+    ) -> List[Path]:
+        if collection_name is not None and app_name is not None:
+            return [self._index_file(collection_name, app_name)]
+        pattern = f"*{self.INDEX_SUFFIX}"
+        if app_name is not None:
+            pattern = f"{quote(app_name, safe='')}{self.INDEX_SUFFIX}"
+        collection_pattern = (
+            "*" if collection_name is None else quote(collection_name, safe="")
+        )
+        return sorted(self._index_directory.glob(f"{collection_pattern}/{pattern}"))
+
+    def query(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        collection_name: Optional[str] = None,
+        app_name: Optional[str] = None,
+    ) -> Iterator[RunArtifact]:
+        return heapq.merge(
+            *(
+                self._read_index(index_file, since, until)
+                for index_file in self._index_files(collection_name, app_name)
+            ),
+            key=attrgetter("started_at"),
+        )
+
+    def _write_object(self, data: bytes) -> Tuple[str, int, int]:
+        """Store data unless an object with its digest exists, returns the digest, the compressed size and the
+        number of bytes that were newly stored."""
+        digest = hashlib.sha256(data).hexdigest()
+        object_file = self._object_file(digest)
+        try:
+            return digest, object_file.stat().st_size, 0
+        except FileNotFoundError:
+            pass
+        compressed = zlib.compress(data)
+        object_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = object_file.with_name(f"{object_file.name}.{os.getpid()}.tmp")
+        tmp_file.write_bytes(compressed)
+        os.replace(tmp_file, object_file)
+        return digest, len(compressed), len(compressed)
+
+    def _write_output(self, result: AnsibleRunResult) -> Tuple[Dict[str, Any], int]:
+        """Store stdout and stderr of a run as objects, returns the fields of its artifact describing them and the
+        number of bytes that were newly stored."""
+        fields: Dict[str, Any] = {"stored_size": 0}
+        new_size = 0
+        for stream, text in (("stdout", result.stdout), ("stderr", result.stderr)):
+            data = text.encode("utf-8", errors="replace")
+            digest, stored_size, stream_new_size = self._write_object(data)
+            fields[f"{stream}_digest"] = digest
+            fields[f"{stream}_size"] = len(data)
+            fields["stored_size"] += stored_size
+            new_size += stream_new_size
+        return fields, new_size
+
+    def _read_object(self, digest: str) -> str:
+        with open(self._object_file(digest), "rb") as infile:
+            if os.fstat(infile.fileno()).st_size == 0:
+                return ""
+            with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return zlib.decompress(data).decode("utf-8", errors="replace")
+
+    def _usage(self) -> int:
+        try:
+            return int(self._usage_file.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _set_usage(self, usage: int):
+        self._usage_file.write_text(str(usage), encoding="utf-8")
+
+    def _write_index(self, index_file: Path, records: bytes):
+        """Replace the index with the header and the records, readers see either the old or the new index."""
+        tmp_file = index_file.with_name(f"{index_file.name}.{os.getpid()}.tmp")
+        with open(tmp_file, "wb") as outfile:
+            outfile.write(self.HEADER.pack(self.MAGIC, self.VERSION))
+            outfile.write(records)
+        os.replace(tmp_file, index_file)
+
+    def _insert(self, artifact: RunArtifact):
+        """Add the record of a run behind all runs of its app that started no later, the caller holds the lock."""
+        index_file = self._index_file(artifact.collection_name, artifact.app_name)
+        index_file.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            data = index_file.read_bytes()
+        except FileNotFoundError:
+            data = b""
+        if data[: self.HEADER.size] != self.HEADER.pack(self.MAGIC, self.VERSION):
+            data = self.HEADER.pack(self.MAGIC, self.VERSION)
+        count = (len(data) - self.HEADER.size) // self.RECORD.size
+        offset = self._offset(
+            self._bisect(data, count, artifact.started_at, after=True)
+        )
+        self._write_index(
+            index_file,
+            data[self.HEADER.size : offset]
+            + self._pack(artifact)
+            + data[offset : self._offset(count)],
+        )
+
+    def put(  # pylint: disable=too-many-arguments
+        self,
+        result: AnsibleRunResult,
+        collection_name: str,
+        app_name: str,
+        tag: AppPlaybookTag,
+        check_mode: bool,
+        started_at: float,
+        duration: float,
+        revision: Optional[str] = None,
+    ) -> Optional[RunArtifact]:
+        try:
+            with locked(self._lock_manager, self.LOCK_NAME, exclusive=True):
+                output, new_size = self._write_output(result)
+                run_id = hashlib.sha1(
+                    f"{collection_name}\0{app_name}\0{tag.value}\0{started_at!r}\0{output['stdout_digest']}".encode(
+                        "utf-8"
+                    )
+                ).digest()[:16]
+                artifact = RunArtifact(
+                    run_id=run_id.hex(),
+                    collection_name=collection_name,
+                    app_name=app_name,
+                    tag=tag,
+                    check_mode=check_mode,
+                    revision=revision,
+                    started_at=started_at,
+                    duration=duration,
+                    return_code=result.return_code,
+                    **output,
+                )
+                self._insert(artifact)
+                usage = self._usage() + new_size
+                self._set_usage(usage)
+                if usage > self._max_size:
+                    self._prune()
+                return artifact
+        except OSError as exception:
+            self._logger.error(
+                f"Could not store the output of {app_name} in {collection_name}: {exception}"
+            )
+            return None
+
+    def read(
+        self, artifact: RunArtifact, stdout: bool = True, stderr: bool = True
+    ) -> Tuple[str, str]:
+        return (
+            self._read_object(artifact.stdout_digest) if stdout else "",
+            self._read_object(artifact.stderr_digest) if stderr else "",
+        )
+
+    def _object_size(self, digest: str) -> int:
+        try:
+            return self._object_file(digest).stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _rewrite_index(self, index_file: Path, artifacts: List[RunArtifact]):
+        if not artifacts:
+            index_file.unlink()
+            return
+        self._write_index(
+            index_file, b"".join(self._pack(artifact) for artifact in artifacts)
+        )
+
+    def _prune(self) -> int:
+        """Drop the oldest runs and unreferenced objects, the caller has to hold the lock of the store."""
+        index = {
+            index_file: self._read_index(index_file)
+            for index_file in self._index_files()
+        }
+        newest_first = sorted(
+            (
+                (artifact.started_at, index_file, position)
+                for index_file, artifacts in index.items()
+                for position, artifact in enumerate(artifacts)
+            ),
+            reverse=True,
+        )
+        referenced: Dict[str, int] = {}
+        kept: Dict[Path, Set[int]] = {index_file: set() for index_file in index}
+        usage = 0
+        for _, index_file, position in newest_first:
+            artifact = index[index_file][position]
+            digests = {artifact.stdout_digest, artifact.stderr_digest} - set(referenced)
+            sizes = {digest: self._object_size(digest) for digest in digests}
+            # always keep the newest run, however large it is
+            if (
+                referenced
+                and usage + sum(sizes.values()) > self._max_size * self._prune_to
+            ):
+                break
+            referenced.update(sizes)
+            usage += sum(sizes.values())
+            kept[index_file].add(position)
+        dropped = 0
+        for index_file, artifacts in index.items():
+            if len(kept[index_file]) < len(artifacts):
+                dropped += len(artifacts) - len(kept[index_file])
+                self._rewrite_index(
+                    index_file,
+                    [
+                        artifact
+                        for position, artifact in enumerate(artifacts)
+                        if position in kept[index_file]
+                    ],
+                )
+        for object_file in self._object_directory.glob(f"*/*{self.OBJECT_SUFFIX}"):
+            digest = (
+                object_file.parent.name + object_file.name[: -len(self.OBJECT_SUFFIX)]
+            )
+            if digest not in referenced:
+                object_file.unlink()
+        self._set_usage(usage)
+        return dropped
+
+    def prune(self) -> int:
+        with locked(self._lock_manager, self.LOCK_NAME, exclusive=True):
+            return self._prune()
@@ -0,0 +1,256 @@
+import heapq
+import mmap
+import os
+import struct
+import time
+from operator import attrgetter
+from pathlib import Path
+from typing import Iterator, List, Optional
+from urllib.parse import quote, unquote
+
+from ansible_self_service.l4_core.models import AppStatus, Config, StatusCheck
+from ansible_self_service.l4_core.protocols import (
+    LockManagerProtocol,
+    StatusHistoryProtocol,
+)
+from ansible_self_service.l4_core.utils import locked
+
+DAY = 24 * 3600.0
+
+
+class BinaryStatusHistory(StatusHistoryProtocol):
+    """Keep the checks of each app as fixed-size binary records in one append-only file per app.
+
+    A file starts with a header holding a magic number, the format version and when it was last compacted, followed
+    by one record per check in the order the checks were made. Fixed-size records let queries find the start of a
+    time range by binary search and read them without parsing. Checks older than compact_after seconds are reduced
+    to the ones that changed the status, so flaps and upgrade onsets survive while duration samples do not, checks
+    older than retention seconds are dropped. A file is compacted while appending to it at most once per
+    compaction_interval seconds.
+    """
+
+    MAGIC = b"ASSH"
+    VERSION = 1
+    # magic, version, epoch seconds of the last compaction
+    HEADER = struct.Struct("<4sB3xd")
+    # checked_at, duration, status, timed_out, changed, raw SHA-1 revision (zeros if unknown)
+    RECORD = struct.Struct("<ddB?H20s")
+    FILE_SUFFIX = ".bin"
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        config: Config,
+        lock_manager: Optional[LockManagerProtocol] = None,
+        compact_after: float = 30 * DAY,
+        retention: float = 365 * DAY,
+        compaction_interval: float = DAY,
+    ):
+        self._config = config
+        self._lock_manager = lock_manager
+        self._compact_after = compact_after
+        self._retention = retention
+        self._compaction_interval = compaction_interval
+
+    @staticmethod
+    def _lock_name(collection_name: str, app_name: str) -> str:
+        return f"history/{collection_name}/{app_name}"
+
+    def _history_file(self, collection_name: str, app_name: str) -> Path:
+        return (
+            self._config.status_history_directory
+            / quote(collection_name, safe="")
+            / f"{quote(app_name, safe='')}{self.FILE_SUFFIX}"
+        )
+
+    @classmethod
+    def _pack(cls, check: StatusCheck) -> bytes:
+        try:
+            revision = bytes.fromhex(check.revision or "")
+        except ValueError:
+            revision = b""
+        return cls.RECORD.pack(
+            check.checked_at,
+            check.duration,
+            check.status.value,
+            check.timed_out,
+            min(check.changed, 0xFFFF),
+            revision if len(revision) == 20 else b"",
+        )
+
+    @classmethod
+    def _unpack(
+        cls, collection_name: str, app_name: str, data, offset: int
+    ) -> StatusCheck:
+        (
+            checked_at,
+            duration,
+            status,
+            timed_out,
+            changed,
+            revision,
+        ) = cls.RECORD.unpack_from(data, offset)
+        return StatusCheck(
+            collection_name=collection_name,
+            app_name=app_name,
+            checked_at=checked_at,
+            status=AppStatus(status),
+            duration=duration,
+            revision=None if revision == bytes(20) else revision.hex(),
+            changed=changed,
+            timed_out=timed_out,
+        )
+
+    @classmethod
+    def _offset(cls, index: int) -> int:
+        return cls.HEADER.size + index * cls.RECORD.size
+
+    @classmethod
+    def _bisect(cls, data, count: int, since: float) -> int:
+        """Index of the first of count records checked at or after since."""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if cls.RECORD.unpack_from(data, cls._offset(middle))[0] < since:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    @classmethod
+    def _positions(cls, data, size: int, since: Optional[float]) -> range:
+        """Positions of the records from the first one checked at or after since on, none if the format is unknown."""
+        magic, version, _ = cls.HEADER.unpack_from(data, 0)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            return range(0)
+        count = (size - cls.HEADER.size) // cls.RECORD.size
+        return range(0 if since is None else cls._bisect(data, count, since), count)
+
+    def _read(
+        self,
+        history_file: Path,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> List[StatusCheck]:
+        """Checks of a file between since and until.
+
+        Files are replaced atomically by compaction and records are appended with a single write, so no lock is
+        needed. A record that is still being written is ignored.
+        """
+        collection_name = unquote(history_file.parent.name)
+        app_name = unquote(history_file.name[: -len(self.FILE_SUFFIX)])
+        try:
+            with open(history_file, "rb") as infile:
+                size = os.fstat(infile.fileno()).st_size
+                if size <= self.HEADER.size:
+                    return []
+                with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    checks = []
+                    for index in self._positions(data, size, since):
+                        check = self._unpack(
+                            collection_name, app_name, data, self._offset(index)
+                        )
+                        if until is not None and check.checked_at > until:
+                            break
+                        checks.append(check)
+                    return checks
+        except FileNotFoundError:
+            return []
+
+    def _compacted_at(self, history_file: Path) -> float:
+        with open(history_file, "rb") as infile:
+            _, _, compacted_at = self.HEADER.unpack(infile.read(self.HEADER.size))
+        return compacted_at
+
+    def append(self, check: StatusCheck):
+        history_file = self._history_file(check.collection_name, check.app_name)
+        with locked(
+            self._lock_manager,
+            self._lock_name(check.collection_name, check.app_name),
+            exclusive=True,
+        ):
+            history_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(history_file, "ab") as outfile:
+                record = self._pack(check)
+                if outfile.tell() == 0:
+                    record = (
+                        self.HEADER.pack(self.MAGIC, self.VERSION, check.checked_at)
+                        + record
+                    )
+                outfile.write(record)
+            if (
+                check.checked_at - self._compacted_at(history_file)
+                > self._compaction_interval
+            ):
+                self._compact_file(history_file, now=check.checked_at)
+
+    def _history_files(
+        self, collection_name: Optional[str] = None, app_name: Optional[str] = None
+    ) -> List[Path]:
+        if collection_name is not None and app_name is not None:
+            return [self._history_file(collection_name, app_name)]
+        history_directory = self._config.status_history_directory
+        pattern = f"*{self.FILE_SUFFIX}"
+        if app_name is not None:
+            pattern = f"{quote(app_name, safe='')}{self.FILE_SUFFIX}"
+        collection_pattern = (
+            "*" if collection_name is None else quote(collection_name, safe="")
+        )
+        return sorted(history_directory.glob(f"{collection_pattern}/{pattern}"))
+
+    def query(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        collection_name: Optional[str] = None,
+        app_name: Optional[str] = None,
+    ) -> Iterator[StatusCheck]:
+        # each app is read at once, so only one file is open at a time however many apps are merged
+        return heapq.merge(
+            *(
+                self._read(history_file, since, until)
+                for history_file in self._history_files(collection_name, app_name)
+            ),
+            key=attrgetter("checked_at"),
+        )
+
+    def _compact_checks(
+        self, checks: List[StatusCheck], now: float
+    ) -> List[StatusCheck]:
+        compact_before = now - self._compact_after
+        drop_before = now - self._retention
+        kept = []
+        previous_status = None
+        for check in checks:
+            if check.checked_at < drop_before:
+                continue
+            if check.checked_at < compact_before and (
+                check.timed_out or check.status == previous_status
+            ):
+                continue
+            kept.append(check)
+            if not check.timed_out:
+                previous_status = check.status
+        return kept
+
+    def _compact_file(self, history_file: Path, now: float) -> int:
+        """Rewrite a file with its compacted checks, the caller has to hold its lock."""
+        checks = self._read(history_file)
+        kept = self._compact_checks(checks, now)
+        tmp_file = history_file.with_name(f"{history_file.name}.{os.getpid()}.tmp")
+        with open(tmp_file, "wb") as outfile:
+            outfile.write(self.HEADER.pack(self.MAGIC, self.VERSION, now))
+            outfile.write(b"".join(self._pack(check) for check in kept))
+        os.replace(tmp_file, history_file)
+        return len(checks) - len(kept)
+
+    def compact(self) -> int:
+        now = time.time()
+        dropped = 0
+        for history_file in self._history_files():
+            lock_name = self._lock_name(
+                unquote(history_file.parent.name),
+                unquote(history_file.name[: -len(self.FILE_SUFFIX)]),
+            )
+            with locked(self._lock_manager, lock_name, exclusive=True):
+                dropped += self._compact_file(history_file, now)
+        return dropped
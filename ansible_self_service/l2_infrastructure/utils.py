@@ -1,9 +1,14 @@
 import contextlib
 import os
+import signal
 import sys
 import traceback
 from functools import wraps
 from multiprocessing import Process, Queue
+from queue import Empty
+from typing import Optional
+
+from ansible_self_service.l2_infrastructure.profiler import profiled
 
 
 @contextlib.contextmanager
@@ -30,17 +35,38 @@ def set_env(**environ: str):
         os.environ.update(old_environ)
 
 
+class ProcessTimeoutError(Exception):
+    """Raised when a processified function did not return in time and its process group was killed."""
+
+
+def _kill_process_group(process: Process):
+    try:
+        if process.pid is not None:
+            os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass  # already gone, or the child has not started its own group yet
+    # the group does not exist before the child called setsid, so kill the child itself as well
+    process.kill()
+    process.join()
+
+
 def processify(func):
     """Decorator to run a function as a process.
     Be sure that every argument and the return value
     is *pickable*.
     The created process is joined, so the code does not
     run in parallel.
+
+    The wrapper accepts an extra keyword argument timeout (in seconds). The child runs in its own process group, so
+    if the timeout expires (or the caller is interrupted) the child and everything it started are killed and
+    ProcessTimeoutError is raised. The timeout is not passed on to func.
     """
 
     def process_func(queue, *args, **kwargs):
+        os.setsid()
         try:
-            ret = func(*args, **kwargs)
+            with profiled(func.__name__):
+                ret = func(*args, **kwargs)
         except Exception:  # pylint: disable=broad-except
             ex_type, ex_value, trace_back = sys.exc_info()
             error = ex_type, ex_value, "".join(traceback.format_tb(trace_back))
@@ -56,13 +82,22 @@ def processify(func):
     setattr(sys.modules[__name__], process_func.__name__, process_func)
 
     @wraps(func)
-    def wrapper(*args, **kwargs):
-        queue = Queue()
+    def wrapper(*args, timeout: Optional[float] = None, **kwargs):
+        queue: Queue = Queue()
         process = Process(
             target=process_func, args=(queue,) + tuple(args), kwargs=kwargs
         )
         process.start()
-        ret, error = queue.get()
+        try:
+            ret, error = queue.get(timeout=timeout)
+        except Empty as exception:
+            _kill_process_group(process)
+            raise ProcessTimeoutError(
+                f"{func.__name__} did not finish within {timeout}s"
+            ) from exception
+        except BaseException:
+            _kill_process_group(process)
+            raise
         process.join()
 
         if error:
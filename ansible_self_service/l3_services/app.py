@@ -1,14 +1,49 @@
-from typing import List
+import asyncio
+import time
+from typing import AsyncIterator, List, Dict, Optional
 
-from ansible_self_service.l3_services.dto import AppCollection, App
-from ansible_self_service.l4_core.models import AppCatalog
+from ansible_self_service.l3_services.dto import (
+    AppCollection,
+    App,
+    AppSearchResult,
+    AppInstallResult,
+    AppRefreshResult,
+    InstallOutcome,
+    StatusStatistics,
+)
+from ansible_self_service.l3_services.exceptions import (
+    AppNotFoundException,
+    AmbiguousAppNameException,
+    AppDependencyCycleException,
+)
+from ansible_self_service.l4_core.exceptions import (
+    AppDependencyCycleException as DomainAppDependencyCycleException,
+)
+from ansible_self_service.l4_core.exceptions import AnsibleRunTimeoutException
+from ansible_self_service.l4_core.install_graph import InstallGraph
+from ansible_self_service.l4_core.models import App as DomainApp
+from ansible_self_service.l4_core.catalog import AppCatalog
+from ansible_self_service.l4_core.models import (
+    StatusStatistics as DomainStatusStatistics,
+)
+from ansible_self_service.l4_core.protocols import (
+    AppSearchIndexProtocol,
+    StatusHistoryProtocol,
+)
 
 
 class AppService:
     """Provide an interface to app related features."""
 
-    def __init__(self, app_catalog: AppCatalog):
+    def __init__(
+        self,
+        app_catalog: AppCatalog,
+        app_search_index: AppSearchIndexProtocol,
+        status_history: Optional[StatusHistoryProtocol] = None,
+    ):
         self._app_catalog = app_catalog
+        self._app_search_index = app_search_index
+        self._status_history = status_history
 
     def get_apps_for_collection(self, app_collection: AppCollection) -> List[App]:
         """Return a list of apps for a collection."""
@@ -17,13 +52,256 @@ class AppService:
         )
         return [
             App.from_domain(app_collection, domain_app)
-            for domain_app in domain_collection.apps.values()
+            for domain_app in domain_collection.list_apps()
         ]
 
-    def refresh_app_state(self, app: App) -> App:
+    def _domain_app(self, app: App) -> DomainApp:
+        return self._app_catalog.get_collection_by_name(app.collection.name)[app.name]
+
+    def get_stale_apps(self, max_age: float = DomainApp.MAX_STATUS_AGE) -> List[App]:
+        """Return the apps of all collections whose status is missing, timed out, older than max_age seconds or
+        was determined at another revision of their collection."""
+        apps = []
+        for domain_collection in self._app_catalog.list():
+            app_collection = AppCollection.from_domain(domain_collection)
+            apps += [
+                App.from_domain(app_collection, domain_app)
+                for domain_app in domain_collection.list_apps()
+                if domain_app.is_stale(app_collection.revision, max_age=max_age)
+            ]
+        return apps
+
+    def get_apps_for_category(self, category_name: str) -> List[App]:
+        """Return a list of apps of all collections that are in a category.
+
+        Only apps in the category are converted to DTOs.
+        """
+        collections: Dict[str, AppCollection] = {}
+        apps = []
+        for domain_app in self._app_catalog.apps_in_category(category_name):
+            domain_collection = domain_app.app_collection
+            if domain_collection.name not in collections:
+                collections[domain_collection.name] = AppCollection.from_domain(
+                    domain_collection
+                )
+            apps.append(
+                App.from_domain(collections[domain_collection.name], domain_app)
+            )
+        return apps
+
+    def get_app(self, name: str, collection_name: Optional[str] = None) -> App:
+        """Find an app by name, optionally restricted to a single collection."""
+        if collection_name is not None:
+            domain_collection = self._app_catalog.get_collection_by_name(
+                collection_name
+            )
+            domain_collections = [domain_collection] if domain_collection else []
+        else:
+            domain_collections = self._app_catalog.list()
+        matches = [
+            (domain_collection, domain_app)
+            for domain_collection in domain_collections
+            for domain_app in domain_collection.list_apps()
+            if domain_app.name == name
+        ]
+        if not matches:
+            raise AppNotFoundException(name)
+        if len(matches) > 1:
+            raise AmbiguousAppNameException(
+                name, [domain_collection.name for domain_collection, _ in matches]
+            )
+        domain_collection, domain_app = matches[0]
+        return App.from_domain(AppCollection.from_domain(domain_collection), domain_app)
+
+    def install(self, apps: List[App], max_workers: int = 1) -> List[AppInstallResult]:
+        """Install apps together with their prerequisites.
+
+        Independent apps are installed in parallel by up to max_workers workers. Apps depending on a failed
+        installation are skipped. Results are returned in installation order.
+        """
+        domain_apps = [
+            self._app_catalog.get_collection_by_name(app.collection.name)[app.name]
+            for app in apps
+        ]
+        try:
+            graph = InstallGraph.for_apps(domain_apps)
+        except DomainAppDependencyCycleException as exception:
+            raise AppDependencyCycleException(str(exception)) from exception
+        outcomes = graph.install(max_workers=max_workers)
+        return [
+            AppInstallResult(
+                collection_name=collection_name,
+                name=name,
+                outcome=InstallOutcome.from_domain(outcomes[(collection_name, name)]),
+            )
+            for collection_name, name in graph.topological_order()
+        ]
+
+    def refresh_app_state(self, app: App, timeout: Optional[float] = None) -> App:
+        """Refresh the status of an app.
+
+        The timeout applies to each Ansible run and overrides the app's configured timeouts. An app whose refresh
+        timed out is returned with timed_out set and an unknown status.
+        """
         domain_collection = self._app_catalog.get_collection_by_name(
             app.collection.name
         )
         domain_app = domain_collection[app.name]
-        domain_app.refresh_status()
+        try:
+            domain_app.refresh_status(timeout=timeout, revision=app.collection.revision)
+        except AnsibleRunTimeoutException:
+            pass  # recorded in the app's state
         return App.from_domain(app.collection, domain_app)
+
+    async def refresh_app_state_async(
+        self, app: App, timeout: Optional[float] = None
+    ) -> App:
+        """Refresh the status of an app without blocking the event loop.
+
+        The timeout applies to each Ansible run of the refresh.
+        """
+        domain_collection = self._app_catalog.get_collection_by_name(
+            app.collection.name
+        )
+        domain_app = domain_collection[app.name]
+        await domain_app.refresh_status_async(
+            timeout=timeout, revision=app.collection.revision
+        )
+        return App.from_domain(app.collection, domain_app)
+
+    async def refresh_app_states(
+        self,
+        apps: List[App],
+        concurrency: int = 8,
+        timeout: Optional[float] = None,
+        budget: Optional[float] = None,
+    ) -> AsyncIterator[AppRefreshResult]:
+        """Refresh the status of many apps with up to concurrency Ansible runs at a time.
+
+        Apps are refreshed in order of their refresh priority, so the stalest, quickest and most used ones come first.
+        Results are yielded as soon as they are known, not in the order of apps. An app whose refresh fails is yielded
+        with the error and keeps its previous status. Runs that are still pending are cancelled (and their processes
+        killed) if the caller stops iterating early. If the whole refresh takes longer than budget seconds, the
+        remaining runs are cancelled as well and their apps are marked as timed out.
+        """
+        now = time.time()
+        apps = sorted(
+            apps,
+            key=lambda app: self._domain_app(app).refresh_priority(
+                app.collection.revision, now
+            ),
+            reverse=True,
+        )
+        # waiters acquire the semaphore in the order the tasks are created
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def refresh(app: App) -> AppRefreshResult:
+            async with semaphore:
+                try:
+                    return AppRefreshResult(
+                        await self.refresh_app_state_async(app, timeout=timeout)
+                    )
+                except AnsibleRunTimeoutException as exception:
+                    return AppRefreshResult(app, error=str(exception))
+                except asyncio.CancelledError:  # pylint: disable=try-except-raise
+                    raise  # a subclass of Exception before Python 3.8, must not be reported as an error of the app
+                except Exception as exception:  # pylint: disable=broad-except
+                    # e.g. a runner that could not start Ansible, must not abort the refresh of the other apps
+                    return AppRefreshResult(
+                        app, error=f"{type(exception).__name__}: {exception}"
+                    )
+
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        tasks = {asyncio.ensure_future(refresh(app)): app for app in apps}
+        pending = set(tasks)
+        try:
+            while pending:
+                remaining = (
+                    None if budget is None else max(0.0, start + budget - loop.time())
+                )
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break  # budget exhausted
+                for task in done:
+                    yield task.result()
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for task in pending:
+                yield self._budget_exhausted(tasks[task], loop.time() - start)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _budget_exhausted(self, app: App, duration: float) -> AppRefreshResult:
+        domain_collection = self._app_catalog.get_collection_by_name(
+            app.collection.name
+        )
+        domain_app = domain_collection[app.name]
+        domain_app.mark_timed_out(duration, app.collection.revision)
+        return AppRefreshResult(
+            App.from_domain(app.collection, domain_app),
+            error=f"refresh budget exhausted after {duration:.1f}s",
+        )
+
+    async def install_async(self, app: App, timeout: Optional[float] = None) -> bool:
+        """Install a single app without its prerequisites and without blocking the event loop.
+
+        Returns True if the installation succeeded.
+        """
+        domain_collection = self._app_catalog.get_collection_by_name(
+            app.collection.name
+        )
+        try:
+            return await domain_collection[app.name].install_async(
+                timeout=timeout, revision=app.collection.revision
+            )
+        except AnsibleRunTimeoutException:
+            return False
+
+    def search(self, query: str, limit: int = 20) -> List[AppSearchResult]:
+        """Search apps of all collections by name, description and category.
+
+        The search index is only rebuilt if the catalog changed since it was built.
+        """
+        catalog_revision = self._app_catalog.revision()
+        if not self._app_search_index.is_current(catalog_revision):
+            self._app_search_index.build(
+                catalog_revision, self._app_catalog.search_documents()
+            )
+        return [
+            AppSearchResult.from_domain(search_document)
+            for search_document in self._app_search_index.search(query, limit)
+        ]
+
+    def get_status_statistics(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        collection_name: Optional[str] = None,
+        app_name: Optional[str] = None,
+    ) -> List[StatusStatistics]:
+        """Summarize the status checks between since and until (epoch seconds) per app, optionally of a single
+        collection or app."""
+        if self._status_history is None:
+            return []
+        checks = self._status_history.query(
+            since=since,
+            until=until,
+            collection_name=collection_name,
+            app_name=app_name,
+        )
+        return [
+            StatusStatistics.from_domain(domain_statistics)
+            for domain_statistics in DomainStatusStatistics.summarize(checks)
+        ]
+
+    def compact_status_history(self) -> int:
+        """Compact the status history of all apps now, returns the number of dropped checks."""
+        if self._status_history is None:
+            return 0
+        return self._status_history.compact()
@@ -1,13 +1,30 @@
-from typing import List, Optional, Tuple
+import asyncio
+from pathlib import Path
+from typing import Callable, List, Optional
 
-from ansible_self_service.l3_services.dto import AppCollection
+from ansible_self_service.l3_services.dto import (
+    AppCollection,
+    AppCollectionUpdate,
+    CatalogChange,
+    CollectionBundle,
+    LockStatistics,
+    MaintenanceReport,
+)
 from ansible_self_service.l3_services.exceptions import (
     AppCollectionsAlreadyExistsException,
+    CollectionBundleException,
+    RequirementsInstallationException,
 )
 from ansible_self_service.l4_core.exceptions import (
     AppCollectionsAlreadyExistsException as DomainAppCollectionsAlreadyExistsException,
 )
-from ansible_self_service.l4_core.models import AppCatalog
+from ansible_self_service.l4_core.exceptions import (
+    CollectionBundleException as DomainCollectionBundleException,
+)
+from ansible_self_service.l4_core.exceptions import (
+    RequirementsInstallationException as DomainRequirementsInstallationException,
+)
+from ansible_self_service.l4_core.catalog import AppCatalog
 
 
 class AppCatalogService:
@@ -28,12 +45,93 @@ class AppCatalogService:
         """Add an app collection via URL."""
         self._app_catalog.remove(name=name)
 
-    def update(self, name: str, revision: Optional[str] = None) -> Tuple[str, str]:
-        """Add an app collection via URL.
+    def update(self, name: str, revision: Optional[str] = None) -> AppCollectionUpdate:
+        """Update an app collection to a revision.
+
+        Only the apps affected by the changes between the old and the new revision have their cached status reset.
+        """
+        collection_update = self._app_catalog.update_collection(name, revision=revision)
+        collection = self._app_catalog.get_collection_by_name(name)
+        return AppCollectionUpdate.from_domain(
+            name,
+            collection_update,
+            requirements_error=collection.requirements_error if collection else None,
+        )
+
+    async def update_async(
+        self, name: str, revision: Optional[str] = None
+    ) -> AppCollectionUpdate:
+        """Update an app collection without blocking the event loop.
 
-        Returns a tuple (old revision, new revision).
+        Git operations block, so they run in the default executor of the loop.
         """
-        return self._app_catalog.get_collection_by_name(name).update(revision=revision)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.update, name, revision)
+
+    def export(
+        self, name: str, bundle_file: Path, revision: Optional[str] = None
+    ) -> CollectionBundle:
+        """Pack a collection with its resolved requirements into a bundle for machines without network access."""
+        try:
+            bundle = self._app_catalog.export_collection(
+                name, bundle_file, revision=revision
+            )
+        except DomainRequirementsInstallationException as exception:
+            raise RequirementsInstallationException(str(exception)) from exception
+        return CollectionBundle.from_domain(bundle)
+
+    def import_bundle(
+        self, bundle_file: Path, name: Optional[str] = None
+    ) -> CollectionBundle:
+        """Add a collection from a bundle without accessing the network."""
+        try:
+            collection, bundle = self._app_catalog.import_collection(
+                bundle_file, name=name
+            )
+        except DomainAppCollectionsAlreadyExistsException as exception:
+            raise AppCollectionsAlreadyExistsException() from exception
+        except DomainCollectionBundleException as exception:
+            raise CollectionBundleException(str(exception)) from exception
+        return CollectionBundle.from_domain(bundle, name=collection.name)
+
+    def maintain(self) -> MaintenanceReport:
+        """Repack the git mirror shared by all collections and remove requirements no collection uses anymore."""
+        size_before, size_after = self._app_catalog.maintain_git_mirror()
+        return MaintenanceReport(
+            mirror_size_before=size_before,
+            mirror_size_after=size_after,
+            removed_requirements=self._app_catalog.collect_requirements_garbage(),
+        )
+
+    def validate(self, name: str, force: bool = False) -> AppCollection:
+        """Syntax check the playbooks of all apps of a collection, including their roles and imports.
+
+        The results are cached per revision, so they are reported by later listings without running Ansible and a
+        revision is only checked again if force is set.
+        """
+        collection = self._app_catalog.get_collection_by_name(name)
+        collection.validate_playbooks(force=force)
+        return AppCollection.from_domain(collection)
+
+    def watch(self, on_change: Callable[[CatalogChange], None]):
+        """Keep the catalog in line with the git directory in the background, for long-running processes.
+
+        on_change is called from a background thread whenever collections were added or removed or apps reloaded.
+        """
+        self._app_catalog.watch(
+            lambda change: on_change(CatalogChange.from_domain(change))
+        )
+
+    def unwatch(self):
+        """Stop keeping the catalog up to date."""
+        self._app_catalog.unwatch()
+
+    def lock_statistics(self) -> List[LockStatistics]:
+        """Locks this process waited for, e.g. because another command was updating a collection."""
+        return [
+            LockStatistics.from_domain(statistics)
+            for statistics in self._app_catalog.lock_statistics()
+        ]
 
     def list_collections(self) -> List[AppCollection]:
         """Get a list of all collections."""
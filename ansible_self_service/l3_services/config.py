@@ -1,13 +1,28 @@
 from pathlib import Path
+from typing import ContextManager, Optional
 
 from ansible_self_service.l4_core.models import Config
+from ansible_self_service.l4_core.protocols import LockManagerProtocol
+from ansible_self_service.l4_core.utils import locked
 
 
 class ConfigService:
     """Provide an interface to app catalog related features."""
 
-    def __init__(self, config: Config):
+    REVALIDATION_LOCK = "revalidation"
+
+    def __init__(
+        self, config: Config, lock_manager: Optional[LockManagerProtocol] = None
+    ):
         self._config = config
+        self._lock_manager = lock_manager
 
     def get_app_data_dir(self) -> Path:
         return self._config.app_data_dir
+
+    def get_revalidation_pid_file(self) -> Path:
+        return self._config.revalidation_pid_file
+
+    def revalidation_lock(self) -> ContextManager:
+        """Exclusive lock to hold while checking for a running background revalidation and starting one."""
+        return locked(self._lock_manager, self.REVALIDATION_LOCK, exclusive=True)
@@ -1,32 +1,192 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Dict
 
+from ansible_self_service.l4_core.catalog_bundle import (
+    CollectionBundle as DomainCollectionBundle,
+)
+from ansible_self_service.l4_core.catalog_watch import (
+    CatalogChange as DomainCatalogChange,
+)
+from ansible_self_service.l4_core.collection import (
+    AppCollection as DomainAppCollection,
+)
+from ansible_self_service.l4_core.collection import (
+    AppCollectionUpdate as DomainAppCollectionUpdate,
+)
+from ansible_self_service.l4_core.fleet import (
+    FleetStatusMatrix as DomainFleetStatusMatrix,
+)
 from ansible_self_service.l4_core.models import App as DomainApp
-from ansible_self_service.l4_core.models import AppCollection as DomainAppCollection
+from ansible_self_service.l4_core.models import (
+    AppSearchDocument as DomainAppSearchDocument,
+)
+from ansible_self_service.l4_core.models import AppState as DomainAppState
 from ansible_self_service.l4_core.models import AppStatus as DomainAppStatus
+from ansible_self_service.l4_core.models import (
+    LockStatistics as DomainLockStatistics,
+)
+from ansible_self_service.l4_core.models import (
+    StatusStatistics as DomainStatusStatistics,
+)
+from ansible_self_service.l4_core.models import RunArtifact as DomainRunArtifact
+from ansible_self_service.l4_core.install_graph import (
+    InstallOutcome as DomainInstallOutcome,
+)
+from ansible_self_service.l4_core.utils import cached_property
 
 
 @dataclass(frozen=True)
 class AppCollection:
-    """Information about a single app collection."""
+    """Information about a single app collection.
+
+    Fields that need git, the config or the validation cache are read from the domain collection on first access
+    and kept from then on, so callers only interested in names never touch the repo.
+    """
 
     name: str
-    revision: str
     path: Path
-    url: str
-    validation_error: Optional[str]
+    _domain_app_collection: DomainAppCollection = field(repr=False, compare=False)
+    requirements_error: Optional[str] = None
+    # playbook errors by the revision they were looked up for, shared by the apps of the collection
+    _playbook_errors: Dict[str, Optional[Dict[str, str]]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+
+    @cached_property
+    def revision(self) -> str:
+        return self._domain_app_collection.revision
+
+    @cached_property
+    def url(self) -> str:
+        return self._domain_app_collection.url
+
+    @cached_property
+    def validation_error(self) -> Optional[str]:
+        # the config is parsed on first use of the domain collection
+        self._domain_app_collection.list_apps()
+        return self._domain_app_collection.validation_error
+
+    @cached_property
+    def playbook_errors(self) -> Optional[Dict[str, str]]:
+        """Errors of apps with invalid playbooks by app name, None if the revision has not been validated."""
+        return self.playbook_errors_at(self.revision)
+
+    def playbook_errors_at(self, revision: str) -> Optional[Dict[str, str]]:
+        """Like playbook_errors, but at a known revision, so the revision is not read from the repo."""
+        if revision not in self._playbook_errors:
+            self._playbook_errors[
+                revision
+            ] = self._domain_app_collection.playbook_errors(revision)
+        return self._playbook_errors[revision]
 
     @classmethod
     def from_domain(cls, domain_app_collection: DomainAppCollection) -> "AppCollection":
         """Parse a domain app collection and instantiate a DTO AppCollection with it."""
         return AppCollection(
             name=domain_app_collection.name,
-            revision=domain_app_collection.revision,
             path=domain_app_collection.directory,
-            url=domain_app_collection.url,
-            validation_error=domain_app_collection.validation_error,
+            requirements_error=domain_app_collection.requirements_error,
+            _domain_app_collection=domain_app_collection,
+        )
+
+
+@dataclass(frozen=True)
+class AppCollectionUpdate:
+    """Result of updating an app collection."""
+
+    name: str
+    old_revision: str
+    new_revision: str
+    affected_apps: List[str]
+    requirements_error: Optional[str] = None
+
+    @classmethod
+    def from_domain(
+        cls,
+        name: str,
+        domain_update: DomainAppCollectionUpdate,
+        requirements_error: Optional[str] = None,
+    ) -> "AppCollectionUpdate":
+        """Instantiate a DTO AppCollectionUpdate from the update result of a domain app collection."""
+        return AppCollectionUpdate(
+            name=name,
+            old_revision=domain_update.old_revision,
+            new_revision=domain_update.new_revision,
+            affected_apps=list(domain_update.affected_apps),
+            requirements_error=requirements_error,
+        )
+
+
+@dataclass(frozen=True)
+class MaintenanceReport:
+    """What the maintenance of the shared caches freed."""
+
+    mirror_size_before: int
+    mirror_size_after: int
+    removed_requirements: List[str]
+
+
+@dataclass(frozen=True)
+class CatalogChange:
+    """Collections added or removed on disk and the apps reloaded because their repo or config changed."""
+
+    added: List[str]
+    removed: List[str]
+    reloaded: Dict[str, List[str]]
+
+    @classmethod
+    def from_domain(cls, domain_change: DomainCatalogChange) -> "CatalogChange":
+        return cls(
+            added=list(domain_change.added),
+            removed=list(domain_change.removed),
+            reloaded=dict(domain_change.reloaded),
+        )
+
+
+@dataclass(frozen=True)
+class LockStatistics:
+    """How often this process acquired a lock shared with other processes and how long it waited, in seconds."""
+
+    name: str
+    acquisitions: int
+    contended: int
+    total_wait: float
+    max_wait: float
+
+    @classmethod
+    def from_domain(cls, domain_statistics: DomainLockStatistics) -> "LockStatistics":
+        return cls(
+            name=domain_statistics.name,
+            acquisitions=domain_statistics.acquisitions,
+            contended=domain_statistics.contended,
+            total_wait=domain_statistics.total_wait,
+            max_wait=domain_statistics.max_wait,
+        )
+
+
+@dataclass(frozen=True)
+class CollectionBundle:
+    """Summary of an exported or imported collection bundle."""
+
+    name: str
+    revision: str
+    apps: List[str]
+    validation_error: Optional[str]
+    has_requirements: bool
+
+    @classmethod
+    def from_domain(
+        cls, domain_bundle: DomainCollectionBundle, name: Optional[str] = None
+    ) -> "CollectionBundle":
+        """Instantiate a DTO CollectionBundle from a bundle manifest, optionally under another collection name."""
+        return CollectionBundle(
+            name=name or domain_bundle.name,
+            revision=domain_bundle.revision,
+            apps=[app["name"] for app in domain_bundle.snapshot["apps"]],
+            validation_error=domain_bundle.snapshot["validation_error"],
+            has_requirements=domain_bundle.requirements_digest is not None,
         )
 
 
@@ -43,26 +203,237 @@ class AppStatus(Enum):
 
 @dataclass(frozen=True)
 class App:
-    """Information about a single app."""
+    """Information about a single app.
+
+    stale and playbook_error are only computed when they are read, from the state the app had when the DTO was
+    created. They go by the revision that state was determined at instead of reading the current one from the repo,
+    updates reset that revision for the apps they affect.
+    """
 
     name: str
     categories: List[str]
     collection: AppCollection
     status: AppStatus
+    # seconds the last check or installation took
+    duration: Optional[float] = None
+    timed_out: bool = False
+    # epoch seconds of the last check
+    checked_at: Optional[float] = None
+    _domain_state: Optional[DomainAppState] = field(
+        default=None, repr=False, compare=False
+    )
+
+    @property
+    def _revision(self) -> Optional[str]:
+        return None if self._domain_state is None else self._domain_state.revision
+
+    @cached_property
+    def stale(self) -> bool:
+        return (
+            self._domain_state is None
+            or self._revision is None
+            or self._domain_state.is_stale(self._revision, DomainApp.MAX_STATUS_AGE)
+        )
+
+    @cached_property
+    def playbook_error(self) -> Optional[str]:
+        if self._revision is None:
+            return None
+        return (self.collection.playbook_errors_at(self._revision) or {}).get(self.name)
 
     @classmethod
     def from_domain(cls, app_collection: AppCollection, domain_app: DomainApp) -> "App":
-        """Parse a domain app and instantiate a DTO App with it."""
-        categories_sorted = [
-            domain_category.name for domain_category in domain_app.categories
-        ]
-        categories_sorted.sort()
+        """Parse a domain app and instantiate a DTO App with it.
+
+        Domain apps keep their categories sorted by name.
+        """
+        domain_state = domain_app.state.snapshot()
         return App(
             name=domain_app.name,
-            categories=categories_sorted,
+            categories=[
+                domain_category.name for domain_category in domain_app.categories
+            ],
             collection=app_collection,
-            status=AppStatus.from_domain(domain_app.state.status),
+            status=AppStatus.from_domain(domain_state.status),
+            duration=domain_state.duration,
+            timed_out=domain_state.timed_out,
+            checked_at=domain_state.checked_at,
+            _domain_state=domain_state,
         )
 
     def __str__(self):
         return self.name
+
+
+@dataclass(frozen=True)
+class StatusStatistics:
+    """Trends of the status checks of an app within a time range, durations in seconds."""
+
+    collection_name: str
+    name: str
+    checks: int
+    timeouts: int
+    flaps: int
+    p50_duration: Optional[float]
+    p95_duration: Optional[float]
+    last_status: AppStatus
+    # epoch seconds since when the last status has been upgradable
+    upgradable_since: Optional[float] = None
+
+    @classmethod
+    def from_domain(
+        cls, domain_statistics: DomainStatusStatistics
+    ) -> "StatusStatistics":
+        return cls(
+            collection_name=domain_statistics.collection_name,
+            name=domain_statistics.app_name,
+            checks=domain_statistics.checks,
+            timeouts=domain_statistics.timeouts,
+            flaps=domain_statistics.flaps,
+            p50_duration=domain_statistics.p50_duration,
+            p95_duration=domain_statistics.p95_duration,
+            last_status=AppStatus.from_domain(domain_statistics.last_status),
+            upgradable_since=domain_statistics.upgradable_since,
+        )
+
+
+@dataclass(frozen=True)
+class Run:
+    """An Ansible run of an app whose output has been kept."""
+
+    run_id: str
+    collection_name: str
+    name: str
+    # playbook tag, i.e. status or install
+    tag: str
+    check_mode: bool
+    revision: Optional[str]
+    # epoch seconds
+    started_at: float
+    duration: float
+    return_code: int
+    # bytes of the uncompressed output and of the output as stored
+    size: int
+    stored_size: int
+
+    @property
+    def was_successful(self) -> bool:
+        return self.return_code == 0
+
+    @classmethod
+    def from_domain(cls, domain_artifact: DomainRunArtifact) -> "Run":
+        return cls(
+            run_id=domain_artifact.run_id,
+            collection_name=domain_artifact.collection_name,
+            name=domain_artifact.app_name,
+            tag=domain_artifact.tag.value,
+            check_mode=domain_artifact.check_mode,
+            revision=domain_artifact.revision,
+            started_at=domain_artifact.started_at,
+            duration=domain_artifact.duration,
+            return_code=domain_artifact.return_code,
+            size=domain_artifact.stdout_size + domain_artifact.stderr_size,
+            stored_size=domain_artifact.stored_size,
+        )
+
+
+@dataclass(frozen=True)
+class RunOutput:
+    """The raw output of a run, stdout holds the result of the JSON callback."""
+
+    run: Run
+    stdout: str
+    stderr: str
+
+
+class InstallOutcome(Enum):
+    INSTALLED = DomainInstallOutcome.INSTALLED.value
+    ALREADY_INSTALLED = DomainInstallOutcome.ALREADY_INSTALLED.value
+    FAILED = DomainInstallOutcome.FAILED.value
+    SKIPPED = DomainInstallOutcome.SKIPPED.value
+
+    @classmethod
+    def from_domain(cls, domain_install_outcome: DomainInstallOutcome):
+        return InstallOutcome(domain_install_outcome.value)
+
+
+@dataclass(frozen=True)
+class AppInstallResult:
+    """Outcome of installing a single app as part of a batch."""
+
+    collection_name: str
+    name: str
+    outcome: InstallOutcome
+
+
+@dataclass(frozen=True)
+class AppRefreshResult:
+    """Outcome of refreshing the status of a single app as part of a batch."""
+
+    app: App
+    error: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class AppSearchResult:
+    """An app matching a search query."""
+
+    name: str
+    collection_name: str
+    description: str
+    categories: List[str]
+
+    @classmethod
+    def from_domain(
+        cls, domain_search_document: DomainAppSearchDocument
+    ) -> "AppSearchResult":
+        """Parse a domain search document and instantiate a DTO AppSearchResult with it."""
+        return AppSearchResult(
+            name=domain_search_document.name,
+            collection_name=domain_search_document.collection_name,
+            description=domain_search_document.description,
+            categories=sorted(domain_search_document.categories),
+        )
+
+
+@dataclass(frozen=True)
+class FleetAppStatus:
+    """Status of a single app on every host of a fleet."""
+
+    collection_name: str
+    name: str
+    statuses: Dict[str, AppStatus]
+
+    def count(self, status: AppStatus) -> int:
+        """Number of hosts on which the app has the status."""
+        return sum(1 for host_status in self.statuses.values() if host_status == status)
+
+
+@dataclass(frozen=True)
+class FleetStatus:
+    """Host x app status matrix of a fleet."""
+
+    inventory: Path
+    hosts: List[str]
+    apps: List[FleetAppStatus]
+
+    @classmethod
+    def from_domain(cls, domain_matrix: DomainFleetStatusMatrix) -> "FleetStatus":
+        """Parse a domain status matrix and instantiate a DTO FleetStatus with it."""
+        return FleetStatus(
+            inventory=domain_matrix.inventory,
+            hosts=domain_matrix.hosts,
+            apps=[
+                FleetAppStatus(
+                    collection_name=collection_name,
+                    name=app_name,
+                    statuses={
+                        host: AppStatus.from_domain(status)
+                        for host, status in host_statuses.items()
+                    },
+                )
+                for (collection_name, app_name), host_statuses in sorted(
+                    domain_matrix.statuses.items()
+                )
+            ],
+        )
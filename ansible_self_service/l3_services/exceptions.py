@@ -4,3 +4,31 @@ class AppCollectionsAlreadyExistsException(Exception):
 
 class AppCollectionsConfigDoesNotExistException(Exception):
     """Raised when an app collection does not have a config file.."""
+
+
+class AppNotFoundException(Exception):
+    """Raised when no app with the requested name exists."""
+
+
+class AmbiguousAppNameException(Exception):
+    """Raised when an app name exists in several collections and no collection was given."""
+
+
+class RunNotFoundException(Exception):
+    """Raised when no kept run matches the requested run id."""
+
+
+class AmbiguousRunIdException(Exception):
+    """Raised when a run id prefix matches several runs."""
+
+
+class AppDependencyCycleException(Exception):
+    """Raised when the apps to install depend on each other in a cycle."""
+
+
+class CollectionBundleException(Exception):
+    """Raised when a collection bundle cannot be read."""
+
+
+class RequirementsInstallationException(Exception):
+    """Raised when the Galaxy requirements of a collection cannot be installed."""
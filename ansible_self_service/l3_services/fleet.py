@@ -0,0 +1,47 @@
+from pathlib import Path
+from typing import Optional
+
+from ansible_self_service.l3_services.dto import FleetStatus
+from ansible_self_service.l4_core.catalog import AppCatalog
+from ansible_self_service.l4_core.fleet import Fleet, FleetStatusMatrix
+from ansible_self_service.l4_core.protocols import FleetStatePersisterProtocol
+
+
+class FleetService:
+    """Provide an interface to check apps on many hosts from one controller."""
+
+    def __init__(
+        self,
+        app_catalog: AppCatalog,
+        fleet_state_persister: FleetStatePersisterProtocol,
+    ):
+        self._app_catalog = app_catalog
+        self._fleet_state_persister = fleet_state_persister
+
+    def get_status(self, inventory: Path) -> FleetStatus:
+        """Return the last known status matrix of the fleet described by the inventory."""
+        return FleetStatus.from_domain(
+            self._fleet_state_persister.load(inventory.resolve())
+        )
+
+    def refresh(self, inventory: Path, forks: Optional[int] = None) -> FleetStatus:
+        """Check all apps on all hosts of the inventory and store the resulting matrix at once.
+
+        Apps that are no longer in the catalog are dropped from the stored matrix.
+        """
+        fleet = Fleet(inventory=inventory.resolve(), forks=forks)
+        apps = [
+            app
+            for collection in self._app_catalog.list()
+            for app in collection.list_apps()
+        ]
+        # check without holding the lock of the matrix, only merging the results has to exclude other writers
+        refreshed = FleetStatusMatrix(inventory=fleet.inventory)
+        refreshed.refresh(fleet, apps)
+        matrix = self._fleet_state_persister.update(
+            fleet.inventory,
+            lambda matrix: matrix.merge(
+                refreshed, ((app.app_collection.name, app.name) for app in apps)
+            ),
+        )
+        return FleetStatus.from_domain(matrix)
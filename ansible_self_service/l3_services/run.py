@@ -0,0 +1,70 @@
+from typing import List, Optional
+
+from ansible_self_service.l3_services.dto import Run, RunOutput
+from ansible_self_service.l3_services.exceptions import (
+    AmbiguousRunIdException,
+    RunNotFoundException,
+)
+from ansible_self_service.l4_core.protocols import RunArtifactStoreProtocol
+
+
+class RunService:
+    """Provide an interface to the kept output of past Ansible runs."""
+
+    def __init__(self, run_artifact_store: RunArtifactStoreProtocol):
+        self._run_artifact_store = run_artifact_store
+
+    def list_runs(  # pylint: disable=too-many-arguments
+        self,
+        since: Optional[float] = None,
+        collection_name: Optional[str] = None,
+        app_name: Optional[str] = None,
+        tag: Optional[str] = None,
+        revision: Optional[str] = None,
+        failed: Optional[bool] = None,
+    ) -> List[Run]:
+        """Return the runs started since (epoch seconds) ordered by time, optionally only those of an app, a playbook
+        tag, a revision or a result. revision may be abbreviated."""
+        return [
+            Run.from_domain(artifact)
+            for artifact in self._run_artifact_store.query(
+                since=since, collection_name=collection_name, app_name=app_name
+            )
+            if (tag is None or artifact.tag.value == tag)
+            and (
+                revision is None
+                or (artifact.revision or "").startswith(revision.lower())
+            )
+            and (failed is None or artifact.was_successful != failed)
+        ]
+
+    def get_run_output(
+        self, run_id: str, stdout: bool = True, stderr: bool = True
+    ) -> RunOutput:
+        """Return the output of the run with the id, which may be abbreviated like a git revision."""
+        matches = [
+            artifact
+            for artifact in self._run_artifact_store.query()
+            if artifact.run_id.startswith(run_id.lower())
+        ]
+        if not matches:
+            raise RunNotFoundException(run_id)
+        if len(matches) > 1:
+            raise AmbiguousRunIdException(
+                run_id, [artifact.run_id for artifact in matches]
+            )
+        artifact = matches[0]
+        try:
+            run_stdout, run_stderr = self._run_artifact_store.read(
+                artifact, stdout=stdout, stderr=stderr
+            )
+        except FileNotFoundError as exception:
+            # pruned by another process in the meantime
+            raise RunNotFoundException(run_id) from exception
+        return RunOutput(
+            run=Run.from_domain(artifact), stdout=run_stdout, stderr=run_stderr
+        )
+
+    def prune_runs(self) -> int:
+        """Drop the oldest runs until the kept output is within its size limit, returns the number of dropped runs."""
+        return self._run_artifact_store.prune()
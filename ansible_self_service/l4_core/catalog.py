@@ -0,0 +1,50 @@
+"""The catalog of all app collections."""
+from typing import Optional
+
+from .catalog_base import BaseAppCatalog
+from .catalog_bundle import CollectionBundleMixin
+from .catalog_maintenance import CatalogMaintenanceMixin
+from .catalog_watch import CatalogWatchMixin
+from .collection import AppCollection, AppCollectionUpdate
+from .exceptions import AppCollectionsAlreadyExistsException
+
+
+class AppCatalog(CatalogWatchMixin, CollectionBundleMixin, CatalogMaintenanceMixin):
+    """ "Contains all known apps."""
+
+    @BaseAppCatalog.Decorators.initialize
+    def add(self, name: str, url: str) -> AppCollection:
+        """Add an app collection."""
+        target_dir = self.get_directory_for_collection(name)
+        with self._write_locked(f"collection/{name}"):
+            if target_dir.exists():
+                raise AppCollectionsAlreadyExistsException()
+            self._git_client.clone_repo(url, target_dir)
+        app_collection = self.create_app_collection(target_dir, name)
+        self._collections[name] = app_collection
+        self._category_index = None
+        self.install_requirements(app_collection)
+        return app_collection
+
+    @BaseAppCatalog.Decorators.initialize
+    def remove(self, name):
+        """Remove an app collection."""
+        target_dir = self.get_directory_for_collection(name)
+        with self._write_locked(f"collection/{name}"):
+            if target_dir.exists():
+                self._git_client.remove_repo(target_dir)
+        self._collections.pop(name)
+        self._category_index = None
+        self.collect_requirements_garbage()
+
+    @BaseAppCatalog.Decorators.initialize
+    def update_collection(
+        self, name: str, revision: Optional[str] = None
+    ) -> AppCollectionUpdate:
+        """Update the repository of a collection, install its requirements and drop catalog-wide indexes."""
+        app_collection = self._collections[name]
+        with self._write_locked(app_collection.lock_name):
+            result = app_collection.update(revision=revision)
+            self._category_index = None
+            self.install_requirements(app_collection)
+        return result
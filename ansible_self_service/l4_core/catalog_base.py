@@ -0,0 +1,225 @@
+"""The part of the app catalog all of its features build on."""
+import contextlib
+import hashlib
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import ClassVar, ContextManager, Dict, Iterator, List, Optional
+
+from .collection import AppCollection
+from .exceptions import RequirementsInstallationException
+from .models import App, AppSearchDocument, Config, LockStatistics
+from .protocols import (
+    AppCollectionConfigParserProtocol,
+    CatalogWatcherProtocol,
+    CollectionBundleArchiveProtocol,
+    GitClientProtocol,
+    LockManagerProtocol,
+    PlaybookDependencyResolverProtocol,
+    PlaybookValidationCacheProtocol,
+    PlaybookValidatorProtocol,
+    RequirementsInstallerProtocol,
+)
+from .utils import locked
+
+
+@dataclass
+class BaseAppCatalog:
+    """The collections of the catalog and the operations its features share.
+
+    The features (watching, bundles, maintenance) are mixins in their own modules, which AppCatalog combines.
+    """
+
+    # repacking the mirror must not happen while repos are cloned from or updated through it
+    GIT_MIRROR_LOCK: ClassVar[str] = "git-mirror"
+
+    _config: Config
+    _git_client: GitClientProtocol
+    _app_collection_config_parser: AppCollectionConfigParserProtocol
+    _playbook_dependency_resolver: PlaybookDependencyResolverProtocol
+    _requirements_installer: RequirementsInstallerProtocol
+    _collection_bundle_archive: CollectionBundleArchiveProtocol
+    _collections: Dict[str, AppCollection] = field(default_factory=dict)
+    _category_index: Optional[Dict[str, List[App]]] = None
+    _initialized: bool = False
+    _playbook_validator: Optional[PlaybookValidatorProtocol] = None
+    _playbook_validation_cache: Optional[PlaybookValidationCacheProtocol] = None
+    _lock_manager: Optional[LockManagerProtocol] = None
+    _catalog_watcher: Optional[CatalogWatcherProtocol] = None
+    _watching: bool = False
+
+    class Decorators:
+        """Nested class with decorators."""
+
+        @classmethod
+        def initialize(cls, func):
+            """Decorator checking if the catalog is initialized before calling the wrapped function."""
+
+            def wrapper(self, *args, **kwargs):
+                if not self._initialized:  # pylint: disable=W0212
+                    self.refresh()
+                    self._initialized = True  # pylint: disable=W0212
+                return func(self, *args, **kwargs)
+
+            return wrapper
+
+    def refresh(self):
+        """Check the git directory for existing repos and add them to the list.py."""
+        collections = {}
+        for child in self._config.git_directory.iterdir():
+            if self._git_client.is_git_directory(child):
+                collection_name = str(child.name)
+                collections[collection_name] = self.create_app_collection(
+                    child, collection_name
+                )
+        self._collections = collections
+        self._category_index = None
+
+    def get_directory_for_collection(self, name):
+        """Locate the target directory for the app repository."""
+        target_dir = self._config.git_directory / name
+        return target_dir
+
+    def create_app_collection(self, directory: Path, collection_name: str):
+        """Factory method for instantiating AppCollection."""
+        return AppCollection(
+            _git_client=self._git_client,
+            _app_collection_config_parser=self._app_collection_config_parser,
+            _playbook_dependency_resolver=self._playbook_dependency_resolver,
+            name=collection_name,
+            directory=directory,
+            requirements_root_directory=self._config.requirements_root_directory,
+            _playbook_validator=self._playbook_validator,
+            _playbook_validation_cache=self._playbook_validation_cache,
+            _lock_manager=self._lock_manager,
+            _track_changes=self._watching,
+        )
+
+    @Decorators.initialize
+    def get_collection_by_name(self, name: str) -> Optional[AppCollection]:
+        """Get an app by name or return none if none exists."""
+        return self._collections.get(name, None)
+
+    @Decorators.initialize
+    def list(self) -> List[AppCollection]:
+        """List all apps."""
+        return [value for key, value in sorted(self._collections.items())]
+
+    @Decorators.initialize
+    def category_index(self) -> Dict[str, List[App]]:
+        """Map each category name to the apps of all collections in that category, sorted by app name.
+
+        Built on first use and dropped whenever collections are added, removed or updated.
+        """
+        if self._category_index is None:
+            category_index: Dict[str, List[App]] = {}
+            for collection in self.list():
+                for app in collection.list_apps():
+                    for category in app.categories:
+                        category_index.setdefault(category.name, []).append(app)
+            for apps in category_index.values():
+                apps.sort(key=lambda app: app.name)
+            self._category_index = category_index
+        return self._category_index
+
+    def apps_in_category(self, category_name: str) -> List[App]:
+        """Return all apps of the catalog in a category without touching the apps of other categories."""
+        return self.category_index().get(category_name, [])
+
+    def _write_locked(self, lock_name: str) -> ContextManager:
+        """Lock a collection exclusively while its repo changes, git operations also need the shared mirror."""
+        stack = contextlib.ExitStack()
+        stack.enter_context(locked(self._lock_manager, lock_name, exclusive=True))
+        stack.enter_context(
+            locked(self._lock_manager, self.GIT_MIRROR_LOCK, exclusive=False)
+        )
+        return stack
+
+    @staticmethod
+    def requirements_lock_name(requirements_digest: str) -> str:
+        return f"requirements/{requirements_digest}"
+
+    def lock_statistics(self) -> List[LockStatistics]:
+        """How often and how long this process waited for locks shared with other processes."""
+        if self._lock_manager is None:
+            return []
+        return self._lock_manager.statistics()
+
+    def install_requirements(self, app_collection: AppCollection) -> Optional[Path]:
+        """Install the Galaxy requirements of a collection unless the same set of requirements is installed already.
+
+        Returns the directory containing the installed roles and collections or None if there are no requirements.
+        """
+        requirements_digest = app_collection.requirements_digest
+        app_collection.requirements_error = None
+        if requirements_digest is None:
+            return None
+        requirements_directory = self._config.requirements_directory(
+            requirements_digest
+        )
+        # collections sharing requirements install them only once, even from different processes
+        with locked(
+            self._lock_manager,
+            self.requirements_lock_name(requirements_digest),
+            exclusive=True,
+        ):
+            if requirements_directory.exists():
+                return requirements_directory
+            # install next to the final location and move it there at once, so an aborted install is never used
+            staging_directory = requirements_directory.with_name(
+                f"{requirements_directory.name}.partial"
+            )
+            shutil.rmtree(staging_directory, ignore_errors=True)
+            try:
+                self._requirements_installer.install(
+                    app_collection.directory,
+                    app_collection.requirements_files,
+                    staging_directory,
+                )
+            except RequirementsInstallationException as exception:
+                # keep the collection usable, like an invalid config the error is reported with the collection
+                app_collection.requirements_error = str(exception)
+                shutil.rmtree(staging_directory, ignore_errors=True)
+                return None
+            staging_directory.rename(requirements_directory)
+        return requirements_directory
+
+    def _repo_directories(self) -> List[Path]:
+        """All repos in the git directory, including those other processes added after this catalog was loaded."""
+        return sorted(
+            child
+            for child in self._config.git_directory.iterdir()
+            if self._git_client.is_git_directory(child)
+        )
+
+    @Decorators.initialize
+    def revision(self) -> str:
+        """Fingerprint of the whole catalog.
+
+        Changes whenever a collection is added, removed or moved to another commit, or its config file is edited.
+        Does not parse any collection config.
+        """
+        digest = hashlib.sha1()
+        for name, collection in sorted(self._collections.items()):
+            digest.update(name.encode("utf-8"))
+            digest.update(
+                self._git_client.get_revision(collection.directory).encode("utf-8")
+            )
+            if collection.config.exists():
+                config_stat = collection.config.stat()
+                digest.update(
+                    f"{config_stat.st_mtime_ns}:{config_stat.st_size}".encode()
+                )
+        return digest.hexdigest()
+
+    @Decorators.initialize
+    def search_documents(self) -> Iterator[AppSearchDocument]:
+        """Yield the searchable fields of every app in the catalog."""
+        for collection in self.list():
+            for app in collection.list_apps():
+                yield AppSearchDocument(
+                    collection_name=collection.name,
+                    name=app.name,
+                    description=app.description,
+                    categories=tuple(category.name for category in app.categories),
+                )
@@ -0,0 +1,162 @@
+"""Carry collections to machines without network access as bundles."""
+import json
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, ClassVar, Dict, Optional, Tuple
+
+from .catalog_base import BaseAppCatalog
+from .collection import AppCollection
+from .exceptions import (
+    AppCollectionsAlreadyExistsException,
+    CollectionBundleException,
+    RequirementsInstallationException,
+)
+from .utils import locked
+
+
+@dataclass(frozen=True)
+class CollectionBundle:
+    """Manifest of a bundle that carries a collection at one revision to machines without network access."""
+
+    FORMAT: ClassVar[int] = 1
+
+    name: str
+    url: str
+    revision: str
+    requirements_digest: Optional[str]
+    snapshot: Dict[str, Any]
+
+    def to_manifest(self) -> Dict[str, Any]:
+        """Serializable form of the manifest."""
+        return {
+            "format": self.FORMAT,
+            "name": self.name,
+            "url": self.url,
+            "revision": self.revision,
+            "requirements_digest": self.requirements_digest,
+            "snapshot": self.snapshot,
+        }
+
+    @classmethod
+    def from_manifest(cls, manifest: Dict[str, Any]) -> "CollectionBundle":
+        """Read a manifest written by to_manifest."""
+        if manifest.get("format") != cls.FORMAT:
+            raise CollectionBundleException(
+                f"Unsupported bundle format {manifest.get('format')}"
+            )
+        return CollectionBundle(
+            name=manifest["name"],
+            url=manifest["url"],
+            revision=manifest["revision"],
+            requirements_digest=manifest["requirements_digest"],
+            snapshot=manifest["snapshot"],
+        )
+
+
+class CollectionBundleMixin(BaseAppCatalog):
+    """Export collections of a catalog into bundles and import them from there."""
+
+    # layout of an exported collection bundle
+    BUNDLE_MANIFEST: ClassVar[str] = "manifest.json"
+    BUNDLE_GIT: ClassVar[str] = "repo.bundle"
+    BUNDLE_REQUIREMENTS: ClassVar[str] = "requirements"
+
+    @BaseAppCatalog.Decorators.initialize
+    def export_collection(
+        self, name: str, bundle_file: Path, revision: Optional[str] = None
+    ) -> CollectionBundle:
+        """Pack a collection at a revision (default: the current one) with its installed requirements into a bundle."""
+        app_collection = self._collections[name]
+        with tempfile.TemporaryDirectory() as tmp:
+            staging_directory = Path(tmp) / "bundle"
+            staging_directory.mkdir()
+            git_bundle = staging_directory / self.BUNDLE_GIT
+            with locked(self._lock_manager, app_collection.lock_name, exclusive=False):
+                self._git_client.create_bundle(
+                    app_collection.directory,
+                    revision or app_collection.revision,
+                    git_bundle,
+                )
+            # inspect the exported revision in a throwaway clone, so the registered collection is left untouched
+            checkout = self.create_app_collection(Path(tmp) / "checkout", name)
+            self._git_client.clone_bundle(
+                git_bundle, app_collection.url, checkout.directory
+            )
+            requirements_directory = self.install_requirements(checkout)
+            if checkout.requirements_error is not None:
+                raise RequirementsInstallationException(checkout.requirements_error)
+            if requirements_directory is not None:
+                shutil.copytree(
+                    requirements_directory,
+                    staging_directory / self.BUNDLE_REQUIREMENTS,
+                    symlinks=True,
+                )
+            bundle = CollectionBundle(
+                name=name,
+                url=app_collection.url,
+                revision=checkout.revision,
+                requirements_digest=checkout.requirements_digest,
+                snapshot=checkout.snapshot(),
+            )
+            (staging_directory / self.BUNDLE_MANIFEST).write_text(
+                json.dumps(bundle.to_manifest(), indent=2), encoding="utf-8"
+            )
+            self._collection_bundle_archive.pack(staging_directory, bundle_file)
+        return bundle
+
+    @BaseAppCatalog.Decorators.initialize
+    def import_collection(
+        self, bundle_file: Path, name: Optional[str] = None
+    ) -> Tuple[AppCollection, CollectionBundle]:
+        """Add a collection from a bundle created by export_collection without accessing the network.
+
+        The collection keeps the URL it was exported from, so it can be updated later on once there is network access.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            staging_directory = Path(tmp)
+            self._collection_bundle_archive.unpack(bundle_file, staging_directory)
+            try:
+                manifest = json.loads(
+                    (staging_directory / self.BUNDLE_MANIFEST).read_text(
+                        encoding="utf-8"
+                    )
+                )
+            except (OSError, ValueError) as exception:
+                raise CollectionBundleException(
+                    f"Missing or invalid manifest: {exception}"
+                ) from exception
+            bundle = CollectionBundle.from_manifest(manifest)
+            name = name or bundle.name
+            target_dir = self.get_directory_for_collection(name)
+            # cloned next to the bundle and only moved into place once checked, so failures leave nothing behind
+            clone_dir = staging_directory / "clone"
+            self._git_client.clone_bundle(
+                staging_directory / self.BUNDLE_GIT, bundle.url, clone_dir
+            )
+            revision = self._git_client.get_revision(clone_dir)
+            if revision != bundle.revision:
+                raise CollectionBundleException(
+                    f"Bundle contains revision {revision} instead of {bundle.revision}"
+                )
+            with self._write_locked(f"collection/{name}"):
+                if target_dir.exists():
+                    raise AppCollectionsAlreadyExistsException()
+                shutil.move(str(clone_dir), str(target_dir))
+            requirements = staging_directory / self.BUNDLE_REQUIREMENTS
+            if bundle.requirements_digest is not None and requirements.is_dir():
+                requirements_directory = self._config.requirements_directory(
+                    bundle.requirements_digest
+                )
+                with locked(
+                    self._lock_manager,
+                    self.requirements_lock_name(bundle.requirements_digest),
+                    exclusive=True,
+                ):
+                    if not requirements_directory.exists():
+                        shutil.move(str(requirements), str(requirements_directory))
+        app_collection = self.create_app_collection(target_dir, name)
+        self._collections[name] = app_collection
+        self._category_index = None
+        return app_collection, bundle
@@ -0,0 +1,50 @@
+"""Free what the shared caches of a catalog hold for collections that no longer need it."""
+import shutil
+from typing import List, Optional, Set, Tuple
+
+from .catalog_base import BaseAppCatalog
+from .utils import locked
+
+
+class CatalogMaintenanceMixin(BaseAppCatalog):
+    """Garbage collect installed requirements and repack the git mirror the collections of a catalog share."""
+
+    @BaseAppCatalog.Decorators.initialize
+    def collect_requirements_garbage(self) -> List[str]:
+        """Remove installed requirements that no collection uses at its current revision anymore.
+
+        Returns the digests of the removed requirement sets. Usage is checked against the repos on disk while holding
+        the lock of each set, so requirements another process just installed for a new collection are kept.
+        """
+        removed = []
+        for requirements_directory in sorted(
+            self._config.requirements_root_directory.iterdir()
+        ):
+            if requirements_directory.suffix == ".partial":
+                continue  # another process may be installing right now
+            with locked(
+                self._lock_manager,
+                self.requirements_lock_name(requirements_directory.name),
+                exclusive=True,
+            ):
+                if requirements_directory.name not in self._used_requirements():
+                    shutil.rmtree(requirements_directory, ignore_errors=True)
+                    removed.append(requirements_directory.name)
+        return removed
+
+    def _used_requirements(self) -> Set[Optional[str]]:
+        """Requirements digests of all repos in the git directory, including those added by other processes."""
+        return {
+            self.create_app_collection(child, child.name).requirements_digest
+            for child in self._repo_directories()
+        }
+
+    @BaseAppCatalog.Decorators.initialize
+    def maintain_git_mirror(self) -> Tuple[int, int]:
+        """Repack the shared git mirror and prune objects no collection has used for git's grace period.
+
+        Returns a tuple (size before, size after) in bytes.
+        """
+        with locked(self._lock_manager, self.GIT_MIRROR_LOCK, exclusive=True):
+            # collections are added while holding the mirror lock shared, so the repos found now are all there are
+            return self._git_client.maintain_mirror(self._repo_directories())
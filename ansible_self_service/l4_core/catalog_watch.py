@@ -0,0 +1,75 @@
+"""Keep a catalog in line with changes other processes make to the git directory."""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set
+
+from .catalog_base import BaseAppCatalog
+
+
+@dataclass
+class CatalogChange:
+    """Changes to the git directory a catalog picked up after it was loaded."""
+
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    # names of the reloaded apps by collection
+    reloaded: Dict[str, List[str]] = field(default_factory=dict)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.reloaded)
+
+
+class CatalogWatchMixin(BaseAppCatalog):
+    """Reload the collections of a catalog that changed on disk, on demand or watched in the background."""
+
+    @BaseAppCatalog.Decorators.initialize
+    def reload_collections(self, names: Set[str]) -> CatalogChange:
+        """Bring the named collections in line with the git directory after they changed on disk.
+
+        Repos that appeared are added and vanished ones dropped. Of the remaining collections only the apps affected
+        by a moved HEAD or an edited config are reloaded, all other app instances are kept.
+        """
+        change = CatalogChange()
+        # swap in a new mapping, so threads iterating the collections never see it change
+        collections = dict(self._collections)
+        for name in sorted(names):
+            directory = self.get_directory_for_collection(name)
+            exists = directory.is_dir() and self._git_client.is_git_directory(directory)
+            app_collection = collections.get(name)
+            if app_collection is None and exists:
+                collections[name] = self.create_app_collection(directory, name)
+                change.added.append(name)
+            elif app_collection is not None and not exists:
+                del collections[name]
+                change.removed.append(name)
+            elif app_collection is not None:
+                reloaded = app_collection.reload()
+                if reloaded:
+                    change.reloaded[name] = sorted(reloaded)
+        if change:
+            self._collections = collections
+            self._category_index = None
+        return change
+
+    def watch(self, on_change: Optional[Callable[[CatalogChange], None]] = None):
+        """Keep the catalog up to date in the background until unwatch is called.
+
+        Meant for long-running processes. on_change is called from the watcher's thread after each change.
+        """
+        if self._catalog_watcher is None:
+            raise RuntimeError("No catalog watcher configured")
+        self._watching = True
+        for app_collection in self.list():
+            app_collection.track_changes()
+
+        def reload(names: Set[str]):
+            change = self.reload_collections(names)
+            if change and on_change is not None:
+                on_change(change)
+
+        self._catalog_watcher.start(self._config.git_directory, reload)
+
+    def unwatch(self):
+        """Stop keeping the catalog up to date."""
+        if self._catalog_watcher is not None:
+            self._catalog_watcher.stop()
+        self._watching = False
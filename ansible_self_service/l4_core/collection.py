@@ -0,0 +1,404 @@
+"""App collections, the git repos apps are defined in."""
+import hashlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, ClassVar, Dict, List, Optional, Set, Tuple
+
+from .exceptions import (
+    AppCollectionConfigValidationException,
+    AppCollectionsConfigDoesNotExistException,
+)
+from .models import App, AppCategory, AppStatus
+from .protocols import (
+    AppCollectionConfigParserProtocol,
+    GitClientProtocol,
+    LockManagerProtocol,
+    PlaybookDependencyResolverProtocol,
+    PlaybookValidationCacheProtocol,
+    PlaybookValidatorProtocol,
+)
+from .utils import locked
+
+
+@dataclass
+class AppCollectionUpdate:
+    """Outcome of updating a collection to another revision."""
+
+    old_revision: str
+    new_revision: str
+    changed_files: List[Path] = field(default_factory=list)
+    affected_apps: List[str] = field(default_factory=list)
+
+
+@dataclass
+class AppCollection:
+    """A collection of apps belonging to the same repository."""
+
+    _git_client: GitClientProtocol
+    _app_collection_config_parser: AppCollectionConfigParserProtocol
+    _playbook_dependency_resolver: PlaybookDependencyResolverProtocol
+    name: str
+    directory: Path
+    categories: Dict[str, AppCategory] = field(default_factory=dict)
+    apps: Dict[str, App] = field(default_factory=dict)
+    requirements_root_directory: Optional[Path] = None
+    validation_error = None
+    requirements_error: Optional[str] = None
+    _initialized: bool = False
+    _playbook_validator: Optional[PlaybookValidatorProtocol] = None
+    _playbook_validation_cache: Optional[PlaybookValidationCacheProtocol] = None
+    _lock_manager: Optional[LockManagerProtocol] = None
+    # while changes are tracked, the revision and config the apps were loaded from, so reload can tell what changed
+    _track_changes: bool = False
+    _loaded_revision: Optional[str] = None
+    _loaded_config_text: Optional[str] = None
+
+    CONFIG_FILE_NAME: ClassVar[str] = "self-service.yaml"
+    REQUIREMENTS_FILES: ClassVar[Tuple[str, ...]] = (
+        "requirements.yml",
+        "collections/requirements.yml",
+        "roles/requirements.yml",
+    )
+    # files that influence every playbook of the collection
+    COLLECTION_WIDE_FILES: ClassVar[Tuple[str, ...]] = (
+        "ansible.cfg",
+    ) + REQUIREMENTS_FILES
+
+    class Decorators:
+        """Nested class with decorators."""
+
+        @classmethod
+        def initialize(cls, func):
+            """Decorator checking if the catalog is initialized before calling the wrapped function."""
+
+            def wrapper(self, *args, **kwargs):
+                if not self._initialized:  # pylint: disable=W0212
+                    self.refresh()
+                    self._initialized = True  # pylint: disable=W0212
+                return func(self, *args, **kwargs)
+
+            return wrapper
+
+    @property
+    def config(self):
+        return self.directory / self.CONFIG_FILE_NAME
+
+    @property
+    def lock_name(self) -> str:
+        """Name of the lock readers of the repo share and updates of the repo hold exclusively."""
+        return f"collection/{self.name}"
+
+    @Decorators.initialize
+    def __getitem__(self, key):
+        return self.apps[key]
+
+    def refresh(self, only: Optional[Set[str]] = None):
+        """Read the repo config and (re-)initialize the collection.
+
+        If only is given, just the apps with these names are re-created (or dropped if they no longer exist) and all
+        other app instances are kept.
+        """
+        with locked(self._lock_manager, self.lock_name, exclusive=False):
+            if not self.config.exists():
+                raise AppCollectionsConfigDoesNotExistException()
+            if only is None and self._track_changes:
+                self._loaded_revision = self._git_client.get_revision(self.directory)
+            self._load_config(only)
+
+    def track_changes(self):
+        """Remember the revision and config the apps are loaded from, so reload only recreates the affected ones.
+
+        Not done by default, as it needs git access that listings can otherwise avoid.
+        """
+        with locked(self._lock_manager, self.lock_name, exclusive=False):
+            self._track_changes = True
+            if self._initialized:
+                self._loaded_revision = self._git_client.get_revision(self.directory)
+                self._loaded_config_text = (
+                    self.config.read_text(encoding="utf-8")
+                    if self.config.exists()
+                    else None
+                )
+
+    def _load_config(self, only: Optional[Set[str]]):
+        if self._track_changes:
+            self._loaded_config_text = self.config.read_text(encoding="utf-8")
+        try:
+            categories, apps = self._app_collection_config_parser.from_file(
+                self, only=only
+            )
+            self.categories = {category.name: category for category in categories}
+            # swap in a new mapping, so threads iterating the apps never see it change
+            if only is None:
+                self.apps = {app.name: app for app in apps}
+            else:
+                updated_apps = {
+                    name: app for name, app in self.apps.items() if name not in only
+                }
+                updated_apps.update({app.name: app for app in apps})
+                self.apps = updated_apps
+            self.validation_error = None
+        except AppCollectionConfigValidationException as exception:
+            self.categories = {}
+            self.apps = {}
+            self.validation_error = str(exception)
+
+    @property  # type: ignore
+    @Decorators.initialize
+    def revision(self):
+        """Return the current revision of the repo."""
+        return self._git_client.get_revision(self.directory)
+
+    @property  # type: ignore
+    @Decorators.initialize
+    def url(self):
+        """Extract the remote URL from the repo."""
+        return self._git_client.get_origin_url(self.directory)
+
+    @Decorators.initialize
+    def list_apps(self) -> List[App]:
+        """List all apps of the collection sorted by name."""
+        return [value for key, value in sorted(self.apps.items())]
+
+    @property
+    def requirements_files(self) -> List[Path]:
+        """The Galaxy requirements files the collection ships."""
+        return [
+            self.directory / name
+            for name in self.REQUIREMENTS_FILES
+            if (self.directory / name).is_file()
+        ]
+
+    @property
+    def requirements_digest(self) -> Optional[str]:
+        """Digest over all requirements files or None if there are none.
+
+        Collections with identical requirements files share the same digest and thus the same installation.
+        """
+        requirements_files = self.requirements_files
+        if not requirements_files:
+            return None
+        digest = hashlib.sha256()
+        for requirements_file in requirements_files:
+            digest.update(
+                requirements_file.relative_to(self.directory).as_posix().encode("utf-8")
+            )
+            digest.update(b"\0")
+            digest.update(requirements_file.read_bytes())
+            digest.update(b"\0")
+        return digest.hexdigest()[:16]
+
+    @property
+    def requirements_directory(self) -> Optional[Path]:
+        """Directory with the installed requirements of the current revision or None if they are not installed."""
+        requirements_digest = self.requirements_digest
+        if self.requirements_root_directory is None or requirements_digest is None:
+            return None
+        requirements_directory = self.requirements_root_directory / requirements_digest
+        return requirements_directory if requirements_directory.is_dir() else None
+
+    def validation_key(self, revision: str) -> str:
+        """Playbooks are validated once per revision and set of requirements, which provide roles and collections."""
+        return f"{revision}-{self.requirements_digest or 'none'}"
+
+    @Decorators.initialize
+    def playbook_errors(
+        self, revision: Optional[str] = None
+    ) -> Optional[Dict[str, str]]:
+        """Errors of the apps with invalid playbooks by app name, as found by validating the current revision.
+
+        Only reads the cached results, None if the current revision has not been validated. Callers that know the
+        current revision pass it, so it is not read from the repo again.
+        """
+        if self._playbook_validation_cache is None:
+            return None
+        return self._playbook_validation_cache.load(
+            self.name, self.validation_key(revision or self.revision)
+        )
+
+    @Decorators.initialize
+    def validate_playbooks(self, force: bool = False) -> Dict[str, str]:
+        """Syntax check the playbooks of all apps including their roles and imports without running them.
+
+        Each playbook is checked once even if several apps share it. Results are cached per validation key, so a
+        revision is only validated again if force is set. Returns the errors of the invalid apps by app name.
+        """
+        revision = self.revision
+        playbook_errors = None if force else self.playbook_errors(revision)
+        if playbook_errors is not None or self._playbook_validator is None:
+            return playbook_errors or {}
+        with locked(self._lock_manager, self.lock_name, exclusive=False):
+            results = self._playbook_validator.validate(
+                self.directory,
+                sorted({app.playbook_path for app in self.apps.values()}),
+                self.requirements_directory,
+            )
+        playbook_errors = {
+            app.name: results[app.playbook_path]
+            for app in self.list_apps()
+            if results.get(app.playbook_path) is not None
+        }
+        if self._playbook_validation_cache is not None:
+            self._playbook_validation_cache.save(
+                self.name, self.validation_key(revision), playbook_errors
+            )
+        return playbook_errors
+
+    def _relative_path(self, path: Path) -> str:
+        try:
+            return path.relative_to(self.directory).as_posix()
+        except ValueError:
+            return str(path)
+
+    @Decorators.initialize
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain data describing the apps of the collection at its current revision."""
+        return {
+            "revision": self.revision,
+            "validation_error": self.validation_error,
+            "categories": sorted(self.categories),
+            "apps": [
+                {
+                    "name": app.name,
+                    "description": app.description,
+                    "categories": [category.name for category in app.categories],
+                    "playbook": self._relative_path(app.playbook_path),
+                    "depends_on": list(app.depends_on),
+                }
+                for app in self.list_apps()
+            ],
+        }
+
+    @staticmethod
+    def _is_affected(changed_file: Path, dependencies: Set[Path]) -> bool:
+        """True if a changed file is one of the dependencies or lies within a dependency directory."""
+        return changed_file in dependencies or any(
+            parent in dependencies for parent in changed_file.parents
+        )
+
+    def _affected_apps(self, changed_files: List[Path], old_revision: str) -> Set[str]:
+        """Map changed files to the names of the apps (old and new ones) whose status or config they affect."""
+        old_config_text = self._git_client.read_file(
+            self.directory, old_revision, Path(self.CONFIG_FILE_NAME)
+        )
+        new_config_text = (
+            self.config.read_text(encoding="utf-8") if self.config.exists() else None
+        )
+        old_items = self._app_collection_config_parser.item_fingerprints(
+            old_config_text
+        )
+        new_items = self._app_collection_config_parser.item_fingerprints(
+            new_config_text
+        )
+        if self.validation_error is not None or any(
+            changed_file.as_posix() in self.COLLECTION_WIDE_FILES
+            for changed_file in changed_files
+        ):
+            return set(old_items) | set(new_items) | set(self.apps)
+
+        affected = {
+            name
+            for name in set(old_items) | set(new_items)
+            if old_items.get(name) != new_items.get(name)
+        }
+        absolute_changed_files = [
+            self.directory / changed_file for changed_file in changed_files
+        ]
+        for app in self.apps.values():
+            if app.name in affected:
+                continue
+            dependencies = self._playbook_dependency_resolver.resolve(
+                self.directory, app.playbook_path
+            )
+            if any(
+                self._is_affected(changed_file, dependencies)
+                for changed_file in absolute_changed_files
+            ):
+                affected.add(app.name)
+        return affected
+
+    def reload(self) -> Set[str]:
+        """Reload the apps affected by changes made to the repo on disk since it was loaded, e.g. by another process.
+
+        Covers moves of HEAD and edits of the config file. Returns the names of the reloaded (or dropped) apps.
+        A collection that was not loaded yet is left alone, it reads the current state once it is used.
+        """
+        if not self._initialized:
+            return set()
+        self._track_changes = True
+        with locked(self._lock_manager, self.lock_name, exclusive=False):
+            old_apps = set(self.apps)
+            if not self.config.exists():
+                self.categories = {}
+                self.apps = {}
+                self._loaded_config_text = None
+                return old_apps
+            new_revision = self._git_client.get_revision(self.directory)
+            config_text = self.config.read_text(encoding="utf-8")
+            if (
+                new_revision == self._loaded_revision
+                and config_text == self._loaded_config_text
+            ):
+                return set()
+            if self.validation_error is not None or self._loaded_revision is None:
+                self.refresh()
+                return old_apps | set(self.apps)
+            old_items = self._app_collection_config_parser.item_fingerprints(
+                self._loaded_config_text
+            )
+            new_items = self._app_collection_config_parser.item_fingerprints(
+                config_text
+            )
+            affected = {
+                name
+                for name in set(old_items) | set(new_items)
+                if old_items.get(name) != new_items.get(name)
+            }
+            if new_revision != self._loaded_revision:
+                changed_files = self._git_client.changed_files(
+                    self.directory, self._loaded_revision, new_revision
+                )
+                affected |= self._affected_apps(changed_files, self._loaded_revision)
+            if affected:
+                self._load_config(only=affected)
+            else:
+                self._loaded_config_text = config_text
+            self._loaded_revision = new_revision
+            return affected
+
+    @Decorators.initialize
+    def update(self, revision: Optional[str]) -> AppCollectionUpdate:
+        """Update the repository.
+
+        Update to latest main/master commit if no revision is provided. Only apps affected by the files changed
+        between the old and the new revision are reloaded from the config and get their cached status reset. The
+        collection's lock is held exclusively, so readers never see a half updated repo.
+        """
+        with locked(self._lock_manager, self.lock_name, exclusive=True):
+            return self._update(revision)
+
+    def _update(self, revision: Optional[str]) -> AppCollectionUpdate:
+        old_revision = self.revision
+        self._git_client.update(directory=self.directory, revision=revision)
+        new_revision = self.revision
+        if old_revision == new_revision:
+            return AppCollectionUpdate(old_revision, new_revision)
+
+        changed_files = self._git_client.changed_files(
+            self.directory, old_revision, new_revision
+        )
+        affected = self._affected_apps(changed_files, old_revision)
+        self.refresh(only=affected)
+        if self._track_changes:
+            self._loaded_revision = new_revision
+        for name in affected:
+            if name in self.apps:
+                # listings go by the revision of the status instead of asking git, so it must not look current
+                self.apps[name].state.revision = None
+                self.apps[name].state.status = AppStatus.UNKNOWN
+        return AppCollectionUpdate(
+            old_revision=old_revision,
+            new_revision=new_revision,
+            changed_files=changed_files,
+            affected_apps=sorted(affected),
+        )
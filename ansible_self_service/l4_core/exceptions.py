@@ -8,3 +8,27 @@ class AppCollectionsConfigDoesNotExistException(Exception):
 
 class AppCollectionConfigValidationException(Exception):
     """Raised when the the config file is invalid."""
+
+
+class AppDependencyCycleException(Exception):
+    """Raised when apps depend on each other in a cycle."""
+
+    def __init__(self, cycle):
+        super().__init__(" -> ".join(str(node) for node in cycle))
+        self.cycle = cycle
+
+
+class CollectionBundleException(Exception):
+    """Raised when a collection bundle cannot be read."""
+
+
+class RequirementsInstallationException(Exception):
+    """Raised when the Galaxy requirements of a collection cannot be installed."""
+
+
+class AnsibleRunTimeoutException(Exception):
+    """Raised when an Ansible run was killed because it exceeded its timeout."""
+
+    def __init__(self, duration: float):
+        super().__init__(f"Ansible run timed out after {duration:.1f}s")
+        self.duration = duration
@@ -1,25 +1,37 @@
 """Factory classes for  complex instance creation."""
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
 
-from ansible_self_service.l4_core.models import App, AppCollection, AppCategory
+from ansible_self_service.l4_core.collection import AppCollection
+from ansible_self_service.l4_core.models import App, AppCategory
 from ansible_self_service.l4_core.protocols import (
     AnsibleRunnerProtocol,
     AppStatePersisterProtocol,
     AnsibleResultAnalyzerProtocol,
+    AsyncAnsibleRunnerProtocol,
+    RunArtifactStoreProtocol,
+    StatusHistoryProtocol,
 )
 
 
 class AppFactory:
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments
         self,
         app_state_persister: AppStatePersisterProtocol,
         ansible_runner: AnsibleRunnerProtocol,
         ansible_result_analyzer: AnsibleResultAnalyzerProtocol,
+        run_artifacts_directory: Optional[Path] = None,
+        async_ansible_runner: Optional[AsyncAnsibleRunnerProtocol] = None,
+        status_history: Optional[StatusHistoryProtocol] = None,
+        run_artifact_store: Optional[RunArtifactStoreProtocol] = None,
     ):
         self._app_state_persister = app_state_persister
         self._ansible_runner = ansible_runner
         self._ansible_result_analyzer = ansible_result_analyzer
+        self._run_artifacts_directory = run_artifacts_directory
+        self._async_ansible_runner = async_ansible_runner
+        self._status_history = status_history
+        self._run_artifact_store = run_artifact_store
 
     def create_app(  # pylint: disable=too-many-arguments
         self,
@@ -28,15 +40,27 @@ class AppFactory:
         description: str,
         categories: List[str],
         playbook_path: Path,
+        depends_on: Optional[List[str]] = None,
+        timeouts: Optional[Dict[str, float]] = None,
     ) -> App:
         app = App(
             app_collection=app_collection,
             name=name,
             description=description,
-            categories=[AppCategory(category_name) for category_name in categories],
+            # sorted once here, so consumers never have to re-sort
+            categories=[
+                AppCategory.intern(category_name)
+                for category_name in sorted(set(categories))
+            ],
             playbook_path=playbook_path,
             _ansible_runner=self._ansible_runner,
             _ansible_result_analyzer=self._ansible_result_analyzer,
+            artifact_directory=self._run_artifacts_directory,
+            depends_on=list(depends_on or []),
+            _async_ansible_runner=self._async_ansible_runner,
+            _status_history=self._status_history,
+            _run_artifact_store=self._run_artifact_store,
+            timeouts={tag: float(seconds) for tag, seconds in (timeouts or {}).items()},
         )
         self._app_state_persister.init_app(app)
         return app
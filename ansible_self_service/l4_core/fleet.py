@@ -0,0 +1,47 @@
+"""Check apps on the hosts of an Ansible inventory."""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import App, AppStatus
+
+
+@dataclass(frozen=True)
+class Fleet:
+    """A set of hosts described by an Ansible inventory that apps are checked on from this controller."""
+
+    inventory: Path
+    forks: Optional[int] = None
+
+
+@dataclass
+class FleetStatusMatrix:
+    """Status of each app on each host of a fleet.
+
+    Apps are keyed by (collection name, app name) and map host names to the app status on that host.
+    """
+
+    inventory: Path
+    statuses: Dict[Tuple[str, str], Dict[str, AppStatus]] = field(default_factory=dict)
+
+    @property
+    def hosts(self) -> List[str]:
+        """All hosts that have a status for at least one app."""
+        return sorted(
+            {host for host_statuses in self.statuses.values() for host in host_statuses}
+        )
+
+    def refresh(self, fleet: Fleet, apps: List[App]):
+        """Check the status of the apps on all hosts of the fleet and replace their entries."""
+        for app in apps:
+            self.statuses[
+                (app.app_collection.name, app.name)
+            ] = app.refresh_fleet_status(fleet)
+
+    def merge(self, refreshed: "FleetStatusMatrix", apps: Iterable[Tuple[str, str]]):
+        """Take over the entries of a refreshed matrix and drop those of apps not among apps, i.e. apps that are no
+        longer in the catalog."""
+        self.statuses.update(refreshed.statuses)
+        known = set(apps)
+        for key in set(self.statuses) - known:
+            del self.statuses[key]
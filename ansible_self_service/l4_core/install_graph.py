@@ -0,0 +1,184 @@
+"""Order and run app installations according to their declared dependencies."""
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from enum import Enum
+from typing import (
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from .exceptions import AppDependencyCycleException
+from .models import App, AppStatus
+
+AppKey = Tuple[str, str]
+Node = TypeVar("Node", bound=Hashable)
+
+
+def find_cycle(dependencies: Mapping[Node, Iterable[Node]]) -> Optional[List[Node]]:
+    """Return a dependency cycle as a list of nodes (first node repeated at the end) or None if there is none."""
+    visiting: Set[Node] = set()
+    done: Set[Node] = set()
+    path: List[Node] = []
+
+    def visit(node: Node) -> Optional[List[Node]]:
+        if node in done:
+            return None
+        if node in visiting:
+            return path[path.index(node) :] + [node]
+        visiting.add(node)
+        path.append(node)
+        for prerequisite in dependencies.get(node, ()):
+            cycle = visit(prerequisite)
+            if cycle:
+                return cycle
+        path.pop()
+        visiting.remove(node)
+        done.add(node)
+        return None
+
+    for start in sorted(dependencies, key=str):
+        cycle = visit(start)
+        if cycle:
+            return cycle
+    return None
+
+
+class InstallOutcome(Enum):
+    INSTALLED = "installed"
+    ALREADY_INSTALLED = "already installed"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+
+class InstallGraph:
+    """DAG of apps to install with an edge from every app to each of its prerequisites.
+
+    Prerequisites are pulled in transitively. A prerequisite that was not requested explicitly and is already known
+    to be installed is not installed again.
+    """
+
+    def __init__(
+        self,
+        apps: Dict[AppKey, App],
+        dependencies: Dict[AppKey, Set[AppKey]],
+        requested: Optional[Set[AppKey]] = None,
+    ):
+        self.apps = apps
+        self.dependencies = dependencies
+        self.requested = set(apps) if requested is None else requested
+        self.dependants: Dict[AppKey, Set[AppKey]] = {key: set() for key in apps}
+        for key, prerequisites in dependencies.items():
+            for prerequisite in prerequisites:
+                self.dependants[prerequisite].add(key)
+        cycle = find_cycle(dependencies)
+        if cycle:
+            raise AppDependencyCycleException(
+                [f"{collection}/{name}" for collection, name in cycle]
+            )
+
+    @staticmethod
+    def key(app: App) -> AppKey:
+        return app.app_collection.name, app.name
+
+    @classmethod
+    def for_apps(cls, requested_apps: Iterable[App]) -> "InstallGraph":
+        """Build the graph for the requested apps and all their (transitive) prerequisites."""
+        apps: Dict[AppKey, App] = {}
+        dependencies: Dict[AppKey, Set[AppKey]] = {}
+        pending = list(requested_apps)
+        requested = {cls.key(app) for app in pending}
+        while pending:
+            app = pending.pop()
+            key = cls.key(app)
+            if key in apps:
+                continue
+            apps[key] = app
+            dependencies[key] = set()
+            for prerequisite_name in app.depends_on:
+                prerequisite = app.app_collection[prerequisite_name]
+                dependencies[key].add(cls.key(prerequisite))
+                pending.append(prerequisite)
+        return cls(apps, dependencies, requested)
+
+    def topological_order(self) -> List[AppKey]:
+        """All apps ordered so that every app comes after its prerequisites."""
+        remaining = {
+            key: len(prerequisites) for key, prerequisites in self.dependencies.items()
+        }
+        ready = sorted(key for key, count in remaining.items() if count == 0)
+        order = []
+        while ready:
+            key = ready.pop(0)
+            order.append(key)
+            for dependant in sorted(self.dependants[key]):
+                remaining[dependant] -= 1
+                if remaining[dependant] == 0:
+                    ready.append(dependant)
+        return order
+
+    def _is_satisfied(self, key: AppKey) -> bool:
+        return key not in self.requested and self.apps[key].state.status in (
+            AppStatus.INSTALLED,
+            AppStatus.UPGRADABLE,
+        )
+
+    def _skip_dependants(self, key: AppKey, outcomes: Dict[AppKey, InstallOutcome]):
+        for dependant in self.dependants[key]:
+            if dependant not in outcomes:
+                outcomes[dependant] = InstallOutcome.SKIPPED
+                self._skip_dependants(dependant, outcomes)
+
+    def install(self, max_workers: int = 1) -> Dict[AppKey, InstallOutcome]:
+        """Install all apps, running independent branches in parallel.
+
+        An app is only started once all its prerequisites are installed. If an installation fails, every app
+        depending on it directly or transitively is skipped.
+        """
+        outcomes: Dict[AppKey, InstallOutcome] = {}
+        remaining = {
+            key: len(prerequisites) for key, prerequisites in self.dependencies.items()
+        }
+        running: Dict[Future, AppKey] = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+
+            def start_ready():
+                for key in self.topological_order():
+                    if key in outcomes or key in running.values() or remaining[key] > 0:
+                        continue
+                    if self._is_satisfied(key):
+                        finish(key, InstallOutcome.ALREADY_INSTALLED)
+                    else:
+                        running[executor.submit(self.apps[key].install)] = key
+
+            def finish(key: AppKey, outcome: InstallOutcome):
+                outcomes[key] = outcome
+                if outcome == InstallOutcome.FAILED:
+                    self._skip_dependants(key, outcomes)
+                else:
+                    for dependant in self.dependants[key]:
+                        remaining[dependant] -= 1
+
+            start_ready()
+            while running:
+                completed, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in completed:
+                    key = running.pop(future)
+                    try:
+                        succeeded = future.result()
+                    except Exception:  # pylint: disable=broad-except
+                        succeeded = False
+                    finish(
+                        key,
+                        InstallOutcome.INSTALLED
+                        if succeeded
+                        else InstallOutcome.FAILED,
+                    )
+                start_ready()
+        return outcomes
@@ -1,27 +1,38 @@
+import hashlib
 import json
-from dataclasses import dataclass, field
+import time
+import weakref
+from dataclasses import asdict, dataclass, field
+from urllib.parse import quote
 from enum import Enum
 
-try:
-    from functools import cached_property
-except ImportError:
-    cached_property = property  # type: ignore # pylint: disable=invalid-name
 from pathlib import Path
-from typing import List, ClassVar, Dict, Optional, Tuple
-
-from .exceptions import (
-    AppCollectionsAlreadyExistsException,
-    AppCollectionsConfigDoesNotExistException,
-    AppCollectionConfigValidationException,
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    List,
+    ClassVar,
+    Dict,
+    Optional,
+    Tuple,
+    FrozenSet,
+    Iterable,
 )
+
+from .exceptions import AnsibleRunTimeoutException
 from .protocols import (
     AppDirLocatorProtocol,
-    GitClientProtocol,
-    AppCollectionConfigParserProtocol,
     AnsibleRunnerProtocol,
     AnsibleResultAnalyzerProtocol,
+    AsyncAnsibleRunnerProtocol,
+    RunArtifactStoreProtocol,
+    StatusHistoryProtocol,
 )
-from .utils import ObservableMixin
+from .utils import ObservableMixin, cached_property, percentile
+
+if TYPE_CHECKING:
+    from .collection import AppCollection
+    from .fleet import Fleet
 
 
 class AppEvent(Enum):
@@ -41,12 +52,222 @@ class AppStatus(Enum):
 
 
 class AppState(ObservableMixin):
-    _observed_attrs = ("status",)
+    _observed_attrs = ("status", "uses")
 
-    def __init__(self, status: AppStatus = AppStatus.UNKNOWN):
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        status: AppStatus = AppStatus.UNKNOWN,
+        duration: Optional[float] = None,
+        timed_out: bool = False,
+        checked_at: Optional[float] = None,
+        revision: Optional[str] = None,
+        uses: int = 0,
+    ):
         super().__init__()
+        self.duration = duration
+        self.timed_out = timed_out
+        # epoch seconds and collection revision of the last run that determined the status
+        self.checked_at = checked_at
+        self.revision = revision
+        self.uses = uses
         self.status = status
 
+    def record(
+        self,
+        status: AppStatus,
+        duration: float,
+        timed_out: bool = False,
+        revision: Optional[str] = None,
+    ):
+        """Set the outcome of a run together with how long it took in seconds and the revision it ran at.
+
+        The status is set last, so observers see all fields of the new outcome.
+        """
+        self.duration = duration
+        self.timed_out = timed_out
+        self.checked_at = time.time()
+        self.revision = revision
+        self.status = status
+
+    def age(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds since the status was determined or None if it never was."""
+        if self.checked_at is None:
+            return None
+        return max(0.0, (now or time.time()) - self.checked_at)
+
+    def is_stale(
+        self, revision: str, max_age: float, now: Optional[float] = None
+    ) -> bool:
+        """True if the status should be re-checked: it is missing, timed out, too old or from another revision."""
+        age = self.age(now)
+        return (
+            age is None or age > max_age or self.timed_out or self.revision != revision
+        )
+
+    def snapshot(self) -> "AppState":
+        """Detached copy without observers, describing the state as it is now."""
+        return AppState(
+            status=self.status,
+            duration=self.duration,
+            timed_out=self.timed_out,
+            checked_at=self.checked_at,
+            revision=self.revision,
+            uses=self.uses,
+        )
+
+
+@dataclass
+class LockStatistics:
+    """How often a process acquired a lock and how long it waited for it, in seconds."""
+
+    name: str
+    acquisitions: int = 0
+    # acquisitions that had to wait for another holder
+    contended: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def record(self, wait: float, contended: bool):
+        self.acquisitions += 1
+        if contended:
+            self.contended += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+@dataclass(frozen=True)
+class StatusCheck:
+    """Outcome of a single status check as kept in the status history."""
+
+    collection_name: str
+    app_name: str
+    # epoch seconds
+    checked_at: float
+    status: AppStatus
+    duration: float
+    revision: Optional[str] = None
+    # tasks the upgrade check would have changed
+    changed: int = 0
+    timed_out: bool = False
+
+    @classmethod
+    def from_state(
+        cls, collection_name: str, app_name: str, state: AppState, changed: int = 0
+    ) -> "StatusCheck":
+        return cls(
+            collection_name=collection_name,
+            app_name=app_name,
+            checked_at=state.checked_at or time.time(),
+            status=state.status,
+            duration=state.duration or 0.0,
+            revision=state.revision,
+            changed=changed,
+            timed_out=state.timed_out,
+        )
+
+
+@dataclass(frozen=True)
+class StatusStatistics:
+    """Trends of the status checks of a single app within a time range.
+
+    Timed out checks did not observe a status, so they only count as timeouts and are left out of everything else.
+    """
+
+    collection_name: str
+    app_name: str
+    checks: int
+    timeouts: int
+    # status changes between consecutive checks
+    flaps: int
+    p50_duration: Optional[float]
+    p95_duration: Optional[float]
+    last_status: AppStatus
+    # epoch seconds of the check that found the upgrade which is still pending at the last check
+    upgradable_since: Optional[float] = None
+
+    @classmethod
+    def from_checks(cls, checks: List[StatusCheck]) -> "StatusStatistics":
+        """Summarize the checks of a single app, ordered by time."""
+        observed = [check for check in checks if not check.timed_out]
+        durations = [check.duration for check in observed]
+        flaps = 0
+        upgradable_since = None
+        for previous, check in zip([None, *observed], observed):
+            if previous is not None and previous.status != check.status:
+                flaps += 1
+            if check.status != AppStatus.UPGRADABLE:
+                upgradable_since = None
+            elif upgradable_since is None:
+                upgradable_since = check.checked_at
+        return cls(
+            collection_name=checks[0].collection_name,
+            app_name=checks[0].app_name,
+            checks=len(checks),
+            timeouts=len(checks) - len(observed),
+            flaps=flaps,
+            p50_duration=percentile(durations, 0.5),
+            p95_duration=percentile(durations, 0.95),
+            last_status=observed[-1].status if observed else AppStatus.UNKNOWN,
+            upgradable_since=upgradable_since,
+        )
+
+    @classmethod
+    def summarize(cls, checks: Iterable[StatusCheck]) -> List["StatusStatistics"]:
+        """Statistics per app of checks ordered by time, sorted by collection and app name."""
+        checks_per_app: Dict[Tuple[str, str], List[StatusCheck]] = {}
+        for check in checks:
+            checks_per_app.setdefault(
+                (check.collection_name, check.app_name), []
+            ).append(check)
+        return [
+            cls.from_checks(app_checks)
+            for _, app_checks in sorted(checks_per_app.items())
+        ]
+
+
+class ResourceClass(str, Enum):
+    """How much of the machine Ansible runs may take, interactive runs are waited for while background runs are not."""
+
+    INTERACTIVE = "interactive"
+    BACKGROUND = "background"
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    """Limits of the Ansible processes of a resource class, None stands for no limit."""
+
+    resource_class: ResourceClass = ResourceClass.INTERACTIVE
+    # niceness of the processes, only ever raised
+    nice: int = 0
+    # ionice scheduling class (1 realtime, 2 best effort, 3 idle) and priority level within it
+    io_class: Optional[int] = None
+    io_level: Optional[int] = None
+    # cgroup v2 cpu.weight (1 to 10000, the default is 100) and cpu.max as a share of one CPU
+    cpu_weight: Optional[int] = None
+    cpu_quota: Optional[float] = None
+    # cgroup v2 memory.max in bytes
+    memory_max: Optional[int] = None
+    # Ansible runs of a process at a time
+    max_concurrency: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        limits = asdict(self)
+        limits["resource_class"] = self.resource_class.value
+        return limits
+
+
+DEFAULT_RESOURCE_LIMITS: Dict[ResourceClass, ResourceLimits] = {
+    ResourceClass.INTERACTIVE: ResourceLimits(ResourceClass.INTERACTIVE),
+    # only use what interactive work leaves idle
+    ResourceClass.BACKGROUND: ResourceLimits(
+        ResourceClass.BACKGROUND,
+        nice=10,
+        io_class=3,
+        cpu_weight=10,
+        max_concurrency=2,
+    ),
+}
+
 
 class AppPlaybookTag(Enum):
     STATUS = "status"
@@ -61,11 +282,90 @@ class Config:
         self,
         app_dir_locator: AppDirLocatorProtocol,
         override_app_data_dir: Optional[Path] = None,
+        keep_run_artifacts: bool = False,
+        resource_class: ResourceClass = ResourceClass.INTERACTIVE,
     ):
         self.app_dir_locator = app_dir_locator
         self.app_data_dir: Path = (
             override_app_data_dir or self.app_dir_locator.get_app_data_dir()
         )
+        # keep caches next to a custom data directory, so they never mix with the default ones
+        self.app_cache_dir: Path = (
+            override_app_data_dir / ".cache"
+            if override_app_data_dir
+            else self.app_dir_locator.get_app_cache_dir()
+        )
+        self.keep_run_artifacts = keep_run_artifacts
+        self.resource_class = resource_class
+
+    @property
+    def resource_limits(self) -> ResourceLimits:
+        """Limits of the Ansible runs of this process."""
+        return DEFAULT_RESOURCE_LIMITS[self.resource_class]
+
+    @property
+    def run_artifacts_directory(self) -> Optional[Path]:
+        """Cache directory receiving the raw output of Ansible runs or None if artifacts should not be kept."""
+        if not self.keep_run_artifacts:
+            return None
+        return self.app_cache_dir / "runs"
+
+    @property
+    def run_artifact_store_directory(self) -> Path:
+        """Cache directory with the compressed output of all Ansible runs and its index."""
+        run_artifact_store_directory = self.app_cache_dir / "artifacts"
+        run_artifact_store_directory.mkdir(parents=True, exist_ok=True)
+        return run_artifact_store_directory
+
+    @property
+    def revalidation_pid_file(self) -> Path:
+        """Cache file with the process id of the running background status revalidation."""
+        self.app_cache_dir.mkdir(parents=True, exist_ok=True)
+        return self.app_cache_dir / "revalidate.pid"
+
+    @property
+    def privileged_helper_socket(self) -> Path:
+        """Cache file of the Unix socket the privileged helper of this user listens on, in a directory only they can
+        access."""
+        helper_directory = self.app_cache_dir / "privileged"
+        helper_directory.mkdir(parents=True, exist_ok=True)
+        helper_directory.chmod(0o700)
+        return helper_directory / "helper.sock"
+
+    @property
+    def search_index_file(self) -> Path:
+        """Cache file containing the search index over all apps of the catalog."""
+        self.app_cache_dir.mkdir(parents=True, exist_ok=True)
+        return self.app_cache_dir / "search-index.json"
+
+    def lock_file(self, name: str) -> Path:
+        """Cache file whose lock stands for the named resource, e.g. a collection or an app state."""
+        lock_directory = self.app_cache_dir / "locks"
+        lock_directory.mkdir(parents=True, exist_ok=True)
+        return lock_directory / f"{quote(name, safe='')}.lock"
+
+    def playbook_validation_file(self, collection_name: str) -> Path:
+        """Cache file with the results of validating the playbooks of a collection at its recent revisions."""
+        validation_directory = self.app_cache_dir / "playbook-validation"
+        validation_directory.mkdir(parents=True, exist_ok=True)
+        return validation_directory / f"{collection_name}.json"
+
+    @property
+    def requirements_root_directory(self) -> Path:
+        """Cache directory with one directory of installed Galaxy roles and collections per set of requirements."""
+        requirements_root = self.app_cache_dir / "requirements"
+        requirements_root.mkdir(parents=True, exist_ok=True)
+        return requirements_root
+
+    def requirements_directory(self, requirements_digest: str) -> Path:
+        """Cache directory with the Galaxy roles and collections installed for one set of requirements."""
+        return self.requirements_root_directory / requirements_digest
+
+    @property
+    def git_mirror_directory(self) -> Path:
+        """Cache directory of the bare repo sharing git objects between all collection clones."""
+        self.app_cache_dir.mkdir(parents=True, exist_ok=True)
+        return self.app_cache_dir / "git-mirror.git"
 
     @property
     def git_directory(self) -> Path:
@@ -83,6 +383,30 @@ class Config:
             app_state_file.touch()
         return app_state_file
 
+    @property
+    def internal_data_dir(self) -> Path:
+        """App data directory for stores that are not per collection, kept apart from the state directories that are
+        named like their collection."""
+        internal_data_dir = self.app_data_dir / ".internal"
+        internal_data_dir.mkdir(parents=True, exist_ok=True)
+        return internal_data_dir
+
+    @property
+    def status_history_directory(self) -> Path:
+        """App data directory with the history of all status checks, one file per app."""
+        status_history_directory = self.internal_data_dir / "history"
+        status_history_directory.mkdir(parents=True, exist_ok=True)
+        return status_history_directory
+
+    def fleet_state_file(self, inventory: Path) -> Path:
+        """Path to a file for saving the status matrix of all apps on the hosts of an inventory."""
+        fleet_state_dir = self.internal_data_dir / "fleet"
+        fleet_state_dir.mkdir(parents=True, exist_ok=True)
+        inventory_digest = hashlib.sha1(
+            str(inventory.resolve()).encode("utf-8")
+        ).hexdigest()[:8]
+        return fleet_state_dir / f"{inventory.stem}-{inventory_digest}.yaml"
+
 
 @dataclass(frozen=True)
 class AnsibleRunResult:
@@ -91,6 +415,8 @@ class AnsibleRunResult:
     stdout: str
     stderr: str
     return_code: int
+    # limits in force during the run, None if it was not governed
+    resource_limits: Optional[ResourceLimits] = None
 
     @property
     def was_successful(self):
@@ -102,6 +428,103 @@ class AnsibleRunResult:
         """Parse the structured data from stdout."""
         return json.loads(self.stdout)
 
+    def write_artifact(self, path: Path):
+        """Spill the raw output of this run to a file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as artifact_file:
+            json.dump(
+                {
+                    "return_code": self.return_code,
+                    "stdout": self.stdout,
+                    "stderr": self.stderr,
+                    "resource_limits": (
+                        self.resource_limits.to_dict() if self.resource_limits else None
+                    ),
+                },
+                artifact_file,
+            )
+
+
+class AnsibleRunSummary:
+    """Compact digest of a completed Ansible run.
+
+    Produced by the result analyzer, so the raw output of a run does not have to be kept around after analysis.
+    """
+
+    __slots__ = (
+        "return_code",
+        "signals",
+        "changed",
+        "failed",
+        "task_durations",
+        "artifact_path",
+        "resource_limits",
+    )
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        return_code: int,
+        signals: FrozenSet[str] = frozenset(),
+        changed: int = 0,
+        failed: int = 0,
+        task_durations: Tuple[Tuple[str, float], ...] = tuple(),
+        artifact_path: Optional[Path] = None,
+        resource_limits: Optional[ResourceLimits] = None,
+    ):
+        self.return_code = return_code
+        self.signals = signals
+        self.changed = changed
+        self.failed = failed
+        self.task_durations = task_durations
+        self.artifact_path = artifact_path
+        self.resource_limits = resource_limits
+
+    @property
+    def was_successful(self) -> bool:
+        """True if this run has been successful."""
+        return self.return_code == 0
+
+    def has_signal(self, signal: str) -> bool:
+        """True if a task of this run emitted the signal message."""
+        return signal in self.signals
+
+    def __repr__(self):
+        return (
+            f"AnsibleRunSummary(return_code={self.return_code}, signals={set(self.signals)}, "
+            f"changed={self.changed}, failed={self.failed})"
+        )
+
+
+@dataclass(frozen=True)
+class RunArtifact:
+    """Where the raw output of an Ansible run of an app is stored and what the run was about.
+
+    The output is addressed by the SHA-256 digests of stdout and stderr, so runs with identical output share it.
+    """
+
+    run_id: str
+    collection_name: str
+    app_name: str
+    tag: AppPlaybookTag
+    check_mode: bool
+    # revision of the collection, None if unknown
+    revision: Optional[str]
+    # epoch seconds
+    started_at: float
+    duration: float
+    return_code: int
+    stdout_digest: str
+    stderr_digest: str
+    # bytes of the uncompressed streams and of both compressed streams together
+    stdout_size: int
+    stderr_size: int
+    stored_size: int
+
+    @property
+    def was_successful(self) -> bool:
+        """True if this run has been successful."""
+        return self.return_code == 0
+
 
 @dataclass(frozen=True)
 class AppCategory:
@@ -109,6 +532,29 @@ class AppCategory:
 
     name: str
 
+    # weak, so categories no longer used by any loaded collection are dropped instead of piling up
+    _interned: ClassVar[
+        "weakref.WeakValueDictionary[str, AppCategory]"
+    ] = weakref.WeakValueDictionary()
+
+    @classmethod
+    def intern(cls, name: str) -> "AppCategory":
+        """Return the one shared instance for a category name instead of creating a new one per app."""
+        try:
+            return cls._interned[name]
+        except KeyError:
+            return cls._interned.setdefault(name, cls(name))
+
+
+@dataclass(frozen=True)
+class AppSearchDocument:
+    """Searchable fields of an app, detached from the domain object."""
+
+    collection_name: str
+    name: str
+    description: str
+    categories: Tuple[str, ...]
+
 
 @dataclass
 class App(ObservableMixin):
@@ -122,183 +568,347 @@ class App(ObservableMixin):
     categories: List[AppCategory]
     playbook_path: Path
     state: AppState = AppState()
+    artifact_directory: Optional[Path] = None
+    depends_on: List[str] = field(default_factory=list)
+    _async_ansible_runner: Optional[AsyncAnsibleRunnerProtocol] = None
+    _status_history: Optional[StatusHistoryProtocol] = None
+    _run_artifact_store: Optional[RunArtifactStoreProtocol] = None
+    # seconds per playbook tag, a missing tag falls back to DEFAULT_TIMEOUTS
+    timeouts: Dict[str, float] = field(default_factory=dict)
+
+    # a status check must never hang forever, while installations may legitimately take long
+    DEFAULT_TIMEOUTS: ClassVar[Dict[str, Optional[float]]] = {
+        AppPlaybookTag.STATUS.value: 300.0,
+        AppPlaybookTag.INSTALL.value: None,
+    }
+    # seconds after which a status is considered stale
+    MAX_STATUS_AGE: ClassVar[float] = 3600.0
+    # assumed duration of checks that never completed, in seconds
+    DEFAULT_CHECK_DURATION: ClassVar[float] = 10.0
+    # age attributed to statuses that are missing or belong to another revision, caps the weight of old statuses
+    UNCHECKED_AGE: ClassVar[float] = 30 * 24 * 3600.0
+
+    def _artifact_path(self, tag: AppPlaybookTag) -> Optional[Path]:
+        if self.artifact_directory is None:
+            return None
+        return (
+            self.artifact_directory
+            / self.app_collection.name
+            / f"{self.name}.{tag.value}.json"
+        )
+
+    def timeout(
+        self, tag: AppPlaybookTag, override: Optional[float] = None
+    ) -> Optional[float]:
+        """Seconds a run of the tag may take: the override if given, else the app's setting, else the default."""
+        if override is not None:
+            return override
+        return self.timeouts.get(tag.value, self.DEFAULT_TIMEOUTS.get(tag.value))
+
+    @property
+    def state_lock_name(self) -> str:
+        return f"state/{self.app_collection.name}/{self.name}"
+
+    @property
+    def playbook_error(self) -> Optional[str]:
+        """Error found by validating the playbook at the current revision, None if it is valid or was not validated."""
+        return self._playbook_error(self.app_collection.revision)
+
+    def _playbook_error(self, revision: str) -> Optional[str]:
+        playbook_errors = self.app_collection.playbook_errors(revision)
+        return None if playbook_errors is None else playbook_errors.get(self.name)
+
+    def _run_arguments(self, tag: AppPlaybookTag, check_mode: bool) -> Dict[str, Any]:
+        return {
+            "working_directory": self.app_collection.directory,
+            "playbook_path": self.playbook_path,
+            "tags": (tag.value,),
+            "check_mode": check_mode,
+            "requirements_directory": self.app_collection.requirements_directory,
+        }
+
+    def _store_run(  # pylint: disable=too-many-arguments
+        self,
+        tag: AppPlaybookTag,
+        check_mode: bool,
+        result: AnsibleRunResult,
+        started_at: float,
+        revision: str,
+    ):
+        """Keep the raw output of a run at a revision in the run artifact store, if there is one."""
+        if self._run_artifact_store is None:
+            return
+        self._run_artifact_store.put(
+            result,
+            collection_name=self.app_collection.name,
+            app_name=self.name,
+            tag=tag,
+            check_mode=check_mode,
+            started_at=started_at,
+            duration=time.time() - started_at,
+            revision=revision,
+        )
 
-    def _check_upgradable(self) -> bool:
+    def _run(
+        self,
+        tag: AppPlaybookTag,
+        check_mode: bool,
+        revision: str,
+        timeout: Optional[float] = None,
+    ) -> AnsibleRunSummary:
+        """Run the playbook for a tag and only keep the summary of the result."""
+        started_at = time.time()
         result = self._ansible_runner.run(
-            working_directory=self.app_collection.directory,
-            playbook_path=self.playbook_path,
-            tags=(AppPlaybookTag.INSTALL.value,),
-            check_mode=True,
+            **self._run_arguments(tag, check_mode), timeout=self.timeout(tag, timeout)
+        )
+        self._store_run(tag, check_mode, result, started_at, revision)
+        return self._ansible_result_analyzer.summarize(
+            result, artifact_path=self._artifact_path(tag)
+        )
+
+    async def _run_async(
+        self,
+        tag: AppPlaybookTag,
+        check_mode: bool,
+        revision: str,
+        timeout: Optional[float] = None,
+    ) -> AnsibleRunSummary:
+        """Like _run but without blocking the event loop."""
+        if self._async_ansible_runner is None:
+            raise RuntimeError(f"No async Ansible runner configured for {self.name}")
+        started_at = time.time()
+        result = await self._async_ansible_runner.run(
+            **self._run_arguments(tag, check_mode), timeout=self.timeout(tag, timeout)
+        )
+        self._store_run(tag, check_mode, result, started_at, revision)
+        return self._ansible_result_analyzer.summarize(
+            result, artifact_path=self._artifact_path(tag)
         )
-        return self._ansible_result_analyzer.has_changes(result)
 
-    def refresh_status(self):
+    def _run_on_fleet(
+        self,
+        tag: AppPlaybookTag,
+        fleet: "Fleet",
+        revision: str,
+        limit: Optional[List[str]] = None,
+    ) -> Dict[str, AnsibleRunSummary]:
+        """Run the playbook for a tag in check mode on the hosts of a fleet and summarize the result per host."""
+        started_at = time.time()
         result = self._ansible_runner.run(
             working_directory=self.app_collection.directory,
             playbook_path=self.playbook_path,
-            tags=(AppPlaybookTag.STATUS.value,),
+            tags=(tag.value,),
             check_mode=True,
+            inventory=fleet.inventory,
+            limit=limit,
+            forks=fleet.forks,
+            requirements_directory=self.app_collection.requirements_directory,
+        )
+        self._store_run(tag, True, result, started_at, revision)
+        return self._ansible_result_analyzer.summarize_hosts(result)
+
+    def _status_from_signals(self, summary: AnsibleRunSummary) -> Optional[AppStatus]:
+        """Translate the signals of a status run. Returns None if the app is installed but might be upgradable."""
+        analyzer = self._ansible_result_analyzer
+        if summary.has_signal(analyzer.SIGNAL_NOT_INSTALLED):
+            return AppStatus.NOT_INSTALLED
+        if summary.has_signal(analyzer.SIGNAL_INSTALLED):
+            return None
+        return AppStatus.UNKNOWN
+
+    @staticmethod
+    def _status_from_upgrade_check(summary: AnsibleRunSummary) -> AppStatus:
+        return AppStatus.UPGRADABLE if summary.changed > 0 else AppStatus.INSTALLED
+
+    def mark_timed_out(self, duration: float, revision: Optional[str] = None):
+        """Record that the status could not be determined in time, revision defaults to the current one."""
+        self._record_check(
+            AppStatus.UNKNOWN,
+            duration,
+            revision or self.app_collection.revision,
+            timed_out=True,
         )
-        if self._ansible_result_analyzer.signaling_not_installed(result):
-            self.state.status = AppStatus.NOT_INSTALLED
-        elif self._ansible_result_analyzer.signaling_installed(result):
-            if self._check_upgradable():
-                self.state.status = AppStatus.UPGRADABLE
-            else:
-                self.state.status = AppStatus.INSTALLED
-        else:
-            self.state.status = AppStatus.UNKNOWN
-
-
-@dataclass
-class AppCollection:
-    """A collection of apps belonging to the same repository."""
-
-    _git_client: GitClientProtocol
-    _app_collection_config_parser: AppCollectionConfigParserProtocol
-    name: str
-    directory: Path
-    categories: Dict[str, AppCategory] = field(default_factory=dict)
-    apps: Dict[str, App] = field(default_factory=dict)
-    validation_error = None
-    _initialized: bool = False
-
-    CONFIG_FILE_NAME: ClassVar[str] = "self-service.yaml"
-
-    class Decorators:
-        """Nested class with decorators."""
-
-        @classmethod
-        def initialize(cls, func):
-            """Decorator checking if the catalog is initialized before calling the wrapped function."""
-
-            def wrapper(self, *args, **kwargs):
-                if not self._initialized:  # pylint: disable=W0212
-                    self.refresh()
-                    self._initialized = True  # pylint: disable=W0212
-                return func(self, *args, **kwargs)
-
-            return wrapper
 
-    @property
-    def config(self):
-        return self.directory / self.CONFIG_FILE_NAME
+    def _record_status(
+        self,
+        status: AppStatus,
+        duration: float,
+        revision: str,
+        timed_out: bool = False,
+    ):
+        self.state.record(status, duration, timed_out=timed_out, revision=revision)
 
-    def __getitem__(self, key):
-        return self.apps[key]
+    def _record_check(  # pylint: disable=too-many-arguments
+        self,
+        status: AppStatus,
+        duration: float,
+        revision: str,
+        changed: int = 0,
+        timed_out: bool = False,
+    ):
+        """Record the outcome of a status check and append it to the status history."""
+        self._record_status(status, duration, revision, timed_out)
+        if self._status_history is not None:
+            self._status_history.append(
+                StatusCheck.from_state(
+                    self.app_collection.name, self.name, self.state, changed
+                )
+            )
 
-    def refresh(self):
-        """Read the repo config and (re-)initialize the collection."""
-        if not self.config.exists():
-            raise AppCollectionsConfigDoesNotExistException()
-        try:
-            categories, apps = self._app_collection_config_parser.from_file(self)
-            self.categories = {category.name: category for category in categories}
-            self.apps = {app.name: app for app in apps}
-            self.validation_error = None
-        except AppCollectionConfigValidationException as exception:
-            self.categories = {}
-            self.apps = {}
-            self.validation_error = str(exception)
-
-    @property  # type: ignore
-    @Decorators.initialize
-    def revision(self):
-        """Return the current revision of the repo."""
-        return self._git_client.get_revision(self.directory)
-
-    @property  # type: ignore
-    @Decorators.initialize
-    def url(self):
-        """Extract the remote URL from the repo."""
-        return self._git_client.get_origin_url(self.directory)
-
-    @Decorators.initialize
-    def update(self, revision: Optional[str]) -> Tuple[str, str]:
-        """Update the repository.
-
-        Update to latest main/master commit if no revision is provided.
+    def is_stale(
+        self,
+        revision: str,
+        max_age: float = MAX_STATUS_AGE,
+        now: Optional[float] = None,
+    ) -> bool:
+        """True if the status should be re-checked: it is missing, timed out, too old or from another revision."""
+        return self.state.is_stale(revision, max_age, now)
+
+    def refresh_priority(self, revision: str, now: Optional[float] = None) -> float:
+        """Higher values should be refreshed first.
+
+        Old statuses of frequently used apps that are quick to check come first. Missing statuses and statuses of
+        another revision count as very old.
         """
-        old_revision = self.revision
-        self._git_client.update(directory=self.directory, revision=revision)
-        new_revision = self.revision
-        return old_revision, new_revision
-
+        age = self.state.age(now)
+        if age is None or self.state.revision != revision:
+            age = self.UNCHECKED_AGE
+        duration = self.state.duration or self.DEFAULT_CHECK_DURATION
+        if self.state.timed_out:
+            duration = max(duration, self.timeout(AppPlaybookTag.STATUS) or duration)
+        return min(age, self.UNCHECKED_AGE) * (1 + self.state.uses) / max(duration, 1.0)
+
+    def refresh_status(
+        self, timeout: Optional[float] = None, revision: Optional[str] = None
+    ):
+        """Determine the status by running the playbook in check mode.
 
-@dataclass
-class AppCatalog:
-    """ "Contains all known apps."""
-
-    _config: Config
-    _git_client: GitClientProtocol
-    _app_collection_config_parser: AppCollectionConfigParserProtocol
-    _collections: Dict[str, AppCollection] = field(default_factory=dict)
-    _initialized: bool = False
-
-    class Decorators:
-        """Nested class with decorators."""
-
-        @classmethod
-        def initialize(cls, func):
-            """Decorator checking if the catalog is initialized before calling the wrapped function."""
-
-            def wrapper(self, *args, **kwargs):
-                if not self._initialized:  # pylint: disable=W0212
-                    self.refresh()
-                    self._initialized = True  # pylint: disable=W0212
-                return func(self, *args, **kwargs)
-
-            return wrapper
-
-    def refresh(self):
-        """Check the git directory for existing repos and add them to the list.py."""
-        self._collections = {}
-        for child in self._config.git_directory.iterdir():
-            if self._git_client.is_git_directory(child):
-                collection_name = str(child.name)
-                self._collections[collection_name] = self.create_app_collection(
-                    child, collection_name
+        The timeout applies to each Ansible run and overrides the app's configured timeouts. If it expires the app is
+        marked as timed out with an unknown status and AnsibleRunTimeoutException is raised. Apps with an invalid
+        playbook get an unknown status without running Ansible. Callers that know the current revision of the
+        collection pass it as revision, otherwise it is read from the repo once.
+        """
+        revision = revision or self.app_collection.revision
+        if self._playbook_error(revision) is not None:
+            self._record_check(AppStatus.UNKNOWN, 0.0, revision)
+            return
+        start = time.monotonic()
+        try:
+            summary = self._run(AppPlaybookTag.STATUS, True, revision, timeout=timeout)
+            status = self._status_from_signals(summary)
+            if status is None:
+                summary = self._run(
+                    AppPlaybookTag.INSTALL, True, revision, timeout=timeout
                 )
-
-    def get_directory_for_collection(self, name):
-        """Locate the target directory for the app repository."""
-        target_dir = self._config.git_directory / name
-        return target_dir
-
-    def create_app_collection(self, directory: Path, collection_name: str):
-        """Factory method for instantiating AppCollection."""
-        return AppCollection(
-            _git_client=self._git_client,
-            _app_collection_config_parser=self._app_collection_config_parser,
-            name=collection_name,
-            directory=directory,
-        )
-
-    @Decorators.initialize
-    def get_collection_by_name(self, name: str) -> Optional[AppCollection]:
-        """Get an app by name or return none if none exists."""
-        return self._collections.get(name, None)
-
-    @Decorators.initialize
-    def list(self) -> List[AppCollection]:
-        """List all apps."""
-        return [value for key, value in sorted(self._collections.items())]
-
-    @Decorators.initialize
-    def add(self, name: str, url: str) -> AppCollection:
-        """Add an app collection."""
-        target_dir = self.get_directory_for_collection(name)
-        if target_dir.exists():
-            raise AppCollectionsAlreadyExistsException()
-        self._git_client.clone_repo(url, target_dir)
-        app_collection = self.create_app_collection(target_dir, name)
-        self._collections[name] = app_collection
-        return app_collection
-
-    @Decorators.initialize
-    def remove(self, name):
-        """Remove an app collection."""
-        target_dir = self.get_directory_for_collection(name)
-        if target_dir.exists():
-            self._git_client.remove_repo(target_dir)
-        self._collections.pop(name)
+                status = self._status_from_upgrade_check(summary)
+        except AnsibleRunTimeoutException:
+            self.mark_timed_out(time.monotonic() - start, revision)
+            raise
+        self._record_check(status, time.monotonic() - start, revision, summary.changed)
+
+    async def refresh_status_async(
+        self, timeout: Optional[float] = None, revision: Optional[str] = None
+    ):
+        """Like refresh_status but without blocking the event loop."""
+        revision = revision or self.app_collection.revision
+        if self._playbook_error(revision) is not None:
+            self._record_check(AppStatus.UNKNOWN, 0.0, revision)
+            return
+        start = time.monotonic()
+        try:
+            summary = await self._run_async(
+                AppPlaybookTag.STATUS, True, revision, timeout=timeout
+            )
+            status = self._status_from_signals(summary)
+            if status is None:
+                summary = await self._run_async(
+                    AppPlaybookTag.INSTALL, True, revision, timeout=timeout
+                )
+                status = self._status_from_upgrade_check(summary)
+        except AnsibleRunTimeoutException:
+            self.mark_timed_out(time.monotonic() - start, revision)
+            raise
+        self._record_check(status, time.monotonic() - start, revision, summary.changed)
+
+    def _record_install(
+        self, summary: AnsibleRunSummary, duration: float, revision: str
+    ) -> bool:
+        succeeded = summary.was_successful and summary.failed == 0
+        if succeeded:
+            self._record_status(AppStatus.INSTALLED, duration, revision)
+        return succeeded
+
+    def install(
+        self, timeout: Optional[float] = None, revision: Optional[str] = None
+    ) -> bool:
+        """Apply the install tag of the playbook. Returns True if the installation succeeded.
+
+        If the timeout expires the app is marked as timed out and AnsibleRunTimeoutException is raised, since a
+        partial installation leaves the status unknown. Apps with an invalid playbook fail without running Ansible.
+        revision is the current revision of the collection if the caller knows it.
+        """
+        self.state.uses += 1
+        revision = revision or self.app_collection.revision
+        if self._playbook_error(revision) is not None:
+            return False
+        start = time.monotonic()
+        try:
+            summary = self._run(
+                AppPlaybookTag.INSTALL, False, revision, timeout=timeout
+            )
+        except AnsibleRunTimeoutException:
+            self._record_status(
+                AppStatus.UNKNOWN, time.monotonic() - start, revision, timed_out=True
+            )
+            raise
+        return self._record_install(summary, time.monotonic() - start, revision)
+
+    async def install_async(
+        self, timeout: Optional[float] = None, revision: Optional[str] = None
+    ) -> bool:
+        """Like install but without blocking the event loop."""
+        self.state.uses += 1
+        revision = revision or self.app_collection.revision
+        if self._playbook_error(revision) is not None:
+            return False
+        start = time.monotonic()
+        try:
+            summary = await self._run_async(
+                AppPlaybookTag.INSTALL, False, revision, timeout=timeout
+            )
+        except AnsibleRunTimeoutException:
+            self._record_status(
+                AppStatus.UNKNOWN, time.monotonic() - start, revision, timed_out=True
+            )
+            raise
+        return self._record_install(summary, time.monotonic() - start, revision)
+
+    def refresh_fleet_status(self, fleet: "Fleet") -> Dict[str, AppStatus]:
+        """Check the status of this app on every host of a fleet.
+
+        The upgrade check only runs on the hosts that signaled an installed app.
+        """
+        statuses = {}
+        installed_hosts = []
+        revision = self.app_collection.revision
+        for host, summary in self._run_on_fleet(
+            AppPlaybookTag.STATUS, fleet, revision
+        ).items():
+            status = self._status_from_signals(summary)
+            if status is None:
+                installed_hosts.append(host)
+            else:
+                statuses[host] = status
+        if installed_hosts:
+            upgrade_summaries = self._run_on_fleet(
+                AppPlaybookTag.INSTALL, fleet, revision, limit=installed_hosts
+            )
+            for host in installed_hosts:
+                upgrade_summary = upgrade_summaries.get(host)
+                if upgrade_summary is None or upgrade_summary.failed > 0:
+                    statuses[host] = AppStatus.UNKNOWN
+                elif upgrade_summary.changed > 0:
+                    statuses[host] = AppStatus.UPGRADABLE
+                else:
+                    statuses[host] = AppStatus.INSTALLED
+        return statuses
@@ -1,9 +1,22 @@
 import sys
+import weakref
 from abc import abstractmethod
 from pathlib import Path
-from typing import List, Callable, Tuple, Optional, Any
-
-from .utils import ObserverProtocol
+from typing import (
+    ContextManager,
+    List,
+    Callable,
+    Tuple,
+    Optional,
+    Any,
+    Dict,
+    Sequence,
+    Iterable,
+    Iterator,
+    Set,
+)
+
+from .utils import ObserverProtocol, locked
 
 if sys.version_info < (3, 8):
     from typing_extensions import Protocol, TYPE_CHECKING
@@ -11,7 +24,7 @@ else:
     from typing import Protocol, TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from . import models
+    from . import collection, fleet, models
 
 
 class AppDirLocatorProtocol(Protocol):
@@ -31,22 +44,176 @@ class AppCollectionConfigParserProtocol(Protocol):
 
     @abstractmethod
     def from_file(
-        self, app_collection: "models.AppCollection"
+        self,
+        app_collection: "collection.AppCollection",
+        only: Optional[Set[str]] = None,
     ) -> Tuple[List["models.AppCategory"], List["models.App"]]:
-        """Read a repo config file, validate it and transform it into domain models."""
+        """Read a repo config file, validate it and transform it into domain models.
+
+        If only is given, just the apps with these names are created.
+        """
+
+    @abstractmethod
+    def item_fingerprints(self, config_text: Optional[str]) -> Dict[str, str]:
+        """Map each item of a config document to a digest of its entry, so changed entries can be detected."""
+
+
+class PlaybookDependencyResolverProtocol(Protocol):
+    """Find the files an Ansible playbook depends on."""
+
+    @abstractmethod
+    def resolve(self, working_directory: Path, playbook_path: Path) -> Set[Path]:
+        """Return absolute paths of all files and directories the playbook uses, including the playbook itself.
+
+        A directory stands for everything within it.
+        """
+
+
+class PlaybookValidatorProtocol(Protocol):
+    """Check playbooks for syntax errors and unresolvable roles and imports without running them."""
+
+    @abstractmethod
+    def validate(
+        self,
+        working_directory: Path,
+        playbook_paths: Sequence[Path],
+        requirements_directory: Optional[Path] = None,
+    ) -> Dict[Path, Optional[str]]:
+        """Check the playbooks in parallel and map each one to its error or None if it is valid."""
+
+
+class PlaybookValidationCacheProtocol(Protocol):
+    """Keep the results of playbook validations per collection and validation key (e.g. revision)."""
+
+    @abstractmethod
+    def load(self, collection_name: str, key: str) -> Optional[Dict[str, str]]:
+        """Return the errors of invalid apps by name or None if the key has not been validated."""
+
+    @abstractmethod
+    def save(self, collection_name: str, key: str, errors: Dict[str, str]):
+        """Persist the errors of invalid apps by name, an empty mapping means all apps are valid."""
+
+
+class LockManagerProtocol(Protocol):
+    """Reader/writer locks on named resources, shared by all processes using the same data directory."""
+
+    @abstractmethod
+    def read(self, name: str) -> ContextManager[None]:
+        """Hold a shared lock within the context, readers only wait for writers of the same name."""
+
+    @abstractmethod
+    def write(self, name: str) -> ContextManager[None]:
+        """Hold an exclusive lock within the context."""
+
+    @abstractmethod
+    def statistics(self) -> List["models.LockStatistics"]:
+        """How often and how long this process waited for each lock, sorted by lock name."""
+
+
+class CatalogWatcherProtocol(Protocol):
+    """Notice changes other processes or users make to the repos of the git directory."""
+
+    @abstractmethod
+    def start(self, git_directory: Path, callback: Callable[[Set[str]], None]):
+        """Watch for added or removed repos, HEAD moves and config edits in a background thread.
+
+        Bursts of changes are debounced, then callback is called with the names of the repo directories that changed.
+        """
+
+    @abstractmethod
+    def stop(self):
+        """Stop watching and wait for the background thread to finish."""
+
+
+class StatusHistoryProtocol(Protocol):
+    """Append-only history of the outcomes of all status checks."""
+
+    @abstractmethod
+    def append(self, check: "models.StatusCheck"):
+        """Add the outcome of a check, old checks are compacted from time to time."""
+
+    @abstractmethod
+    def query(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        collection_name: Optional[str] = None,
+        app_name: Optional[str] = None,
+    ) -> Iterator["models.StatusCheck"]:
+        """Checks made between since and until (epoch seconds, inclusive) ordered by time, optionally of one app."""
+
+    @abstractmethod
+    def compact(self) -> int:
+        """Compact the history of all apps now and return the number of checks that were dropped."""
+
+
+class RunArtifactStoreProtocol(Protocol):
+    """Compressed store of the raw output of all Ansible runs, indexed by app and time."""
+
+    @abstractmethod
+    def put(  # pylint: disable=too-many-arguments
+        self,
+        result: "models.AnsibleRunResult",
+        collection_name: str,
+        app_name: str,
+        tag: "models.AppPlaybookTag",
+        check_mode: bool,
+        started_at: float,
+        duration: float,
+        revision: Optional[str] = None,
+    ) -> Optional["models.RunArtifact"]:
+        """Keep the output of a run, returns None if it could not be stored. The oldest runs are dropped once the
+        store exceeds its size limit."""
+
+    @abstractmethod
+    def query(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        collection_name: Optional[str] = None,
+        app_name: Optional[str] = None,
+    ) -> Iterator["models.RunArtifact"]:
+        """Runs started between since and until (epoch seconds, inclusive) ordered by time, optionally of one app."""
+
+    @abstractmethod
+    def read(
+        self, artifact: "models.RunArtifact", stdout: bool = True, stderr: bool = True
+    ) -> Tuple[str, str]:
+        """The stdout and stderr of a run, a stream that was not requested is returned empty."""
+
+    @abstractmethod
+    def prune(self) -> int:
+        """Drop the oldest runs until the store is within its size limit and return the number of dropped runs."""
 
 
 class AppStatePersisterProtocol(ObserverProtocol):
-    def __init__(self, config: "models.Config"):
+    def __init__(
+        self,
+        config: "models.Config",
+        lock_manager: Optional[LockManagerProtocol] = None,
+    ):
         self._config = config
+        self._lock_manager = lock_manager
+        # the observed state does not know its app, so remember where each state is stored and its lock
+        self._state_files: "weakref.WeakKeyDictionary[models.AppState, Tuple[Path, str]]" = (
+            weakref.WeakKeyDictionary()
+        )
 
     def init_app(self, app):
         """Load state and register for  future updates from an app's state."""
-        app.state = self.load(self._config.app_state_file(app))
+        app_state_file = self._config.app_state_file(app)
+        lock_name = app.state_lock_name
+        with locked(self._lock_manager, lock_name, exclusive=False):
+            app.state = self.load(app_state_file)
+        self._state_files[app.state] = (app_state_file, lock_name)
         app.state.attach(self)
 
     def update(self, observable: Any, attr: str, value: Any):
-        self.save(observable, self._config.app_state_file(observable))
+        state_file = self._state_files.get(observable)
+        if state_file is not None:
+            app_state_file, lock_name = state_file
+            with locked(self._lock_manager, lock_name, exclusive=True):
+                self.save(observable, app_state_file)
 
     @abstractmethod
     def load(self, app_state_file_path: Path) -> "models.AppState":
@@ -59,6 +226,46 @@ class AppStatePersisterProtocol(ObserverProtocol):
         raise NotImplementedError()
 
 
+class FleetStatePersisterProtocol(Protocol):
+    """Store the host x app status matrix of a fleet in bulk."""
+
+    @abstractmethod
+    def load(self, inventory: Path) -> "fleet.FleetStatusMatrix":
+        """Retrieve the last known status matrix of the fleet described by the inventory."""
+
+    @abstractmethod
+    def save(self, matrix: "fleet.FleetStatusMatrix"):
+        """Persist the whole status matrix at once."""
+
+    @abstractmethod
+    def update(
+        self,
+        inventory: Path,
+        change: Callable[["fleet.FleetStatusMatrix"], None],
+    ) -> "fleet.FleetStatusMatrix":
+        """Load the matrix, change it and save it again without another process writing it in between."""
+
+
+class AppSearchIndexProtocol(Protocol):
+    """Full-text index over the apps of the catalog that can be queried without instantiating domain objects."""
+
+    @abstractmethod
+    def is_current(self, catalog_revision: str) -> bool:
+        """True if the index has been built for this catalog revision."""
+
+    @abstractmethod
+    def build(
+        self,
+        catalog_revision: str,
+        documents: Iterable["models.AppSearchDocument"],
+    ):
+        """(Re-)build and persist the index for a catalog revision."""
+
+    @abstractmethod
+    def search(self, query: str, limit: int) -> List["models.AppSearchDocument"]:
+        """Return the best matching apps, best match first."""
+
+
 class GitClientProtocol(Protocol):
     """A git client implementation."""
 
@@ -93,6 +300,57 @@ class GitClientProtocol(Protocol):
     def is_git_directory(self, directory: Path) -> bool:
         """True if the directory is a git repo."""
 
+    @abstractmethod
+    def create_bundle(self, directory: Path, revision: str, bundle_file: Path):
+        """Write a git bundle with the history of a revision."""
+
+    @abstractmethod
+    def clone_bundle(self, bundle_file: Path, url: str, target_dir: Path):
+        """Create a repo with the revision of a bundle checked out and origin pointing to url."""
+
+    @abstractmethod
+    def maintain_mirror(self, directories: List[Path]) -> Tuple[int, int]:
+        """Repack the shared object mirror, dropping objects the repos in the given directories cannot reach once they
+        have been unreferenced for git's grace period.
+
+        Returns a tuple (size before, size after) in bytes.
+        """
+
+    @abstractmethod
+    def changed_files(
+        self, directory: Path, old_revision: str, new_revision: str
+    ) -> List[Path]:
+        """List the paths (relative to the repo root) of files added, modified or removed between two revisions."""
+
+    @abstractmethod
+    def read_file(self, directory: Path, revision: str, path: Path) -> Optional[str]:
+        """Return the content of a file at a revision or None if it did not exist."""
+
+
+class RequirementsInstallerProtocol(Protocol):
+    """Install the Galaxy roles and collections a collection requires."""
+
+    @abstractmethod
+    def install(
+        self,
+        working_directory: Path,
+        requirements_files: List[Path],
+        target_directory: Path,
+    ):
+        """Install everything listed in the requirements files into roles/ and collections/ of target_directory."""
+
+
+class CollectionBundleArchiveProtocol(Protocol):
+    """Compress a directory into a single bundle file and back."""
+
+    @abstractmethod
+    def pack(self, directory: Path, bundle_file: Path):
+        """Write the content of directory to bundle_file."""
+
+    @abstractmethod
+    def unpack(self, bundle_file: Path, directory: Path):
+        """Extract bundle_file into directory."""
+
 
 class GuiProtocol(Protocol):
     """ "Represent the graphical user interface."""
@@ -114,19 +372,53 @@ class AnsibleRunnerProtocol(Protocol):
     """Run ansible-playbook."""
 
     @abstractmethod
-    def run(
+    def run(  # pylint: disable=too-many-arguments
         self,
         working_directory: Path,
         playbook_path: Path,
         tags=tuple(),
         check_mode: bool = False,
+        inventory: Optional[Path] = None,
+        limit: Optional[Sequence[str]] = None,
+        forks: Optional[int] = None,
+        requirements_directory: Optional[Path] = None,
+        timeout: Optional[float] = None,
     ) -> "models.AnsibleRunResult":
-        """Apply a single Ansible playbook."""
+        """Apply a single Ansible playbook.
+
+        Runs against the implicit localhost unless an inventory is given. Roles and collections installed in
+        requirements_directory are found before the default locations. Raises AnsibleRunTimeoutException after
+        killing Ansible and all processes it started if the run takes longer than timeout seconds.
+        """
+
+
+class AsyncAnsibleRunnerProtocol(Protocol):
+    """Run Ansible playbooks without blocking an asyncio event loop."""
+
+    @abstractmethod
+    async def run(  # pylint: disable=too-many-arguments
+        self,
+        working_directory: Path,
+        playbook_path: Path,
+        tags=tuple(),
+        check_mode: bool = False,
+        inventory: Optional[Path] = None,
+        limit: Optional[Sequence[str]] = None,
+        forks: Optional[int] = None,
+        requirements_directory: Optional[Path] = None,
+        timeout: Optional[float] = None,
+    ) -> "models.AnsibleRunResult":
+        """Apply a single Ansible playbook like AnsibleRunnerProtocol.run.
+
+        Raises AnsibleRunTimeoutException if the run takes longer than timeout seconds. Cancelling the awaiting task
+        aborts the run. In both cases Ansible and all processes it started are killed.
+        """
 
 
 class AnsibleResultAnalyzerProtocol(Protocol):
     """Extract information from an Ansible result object."""
 
+    SIGNAL_PREFIX: str = "ANSIBLE_SELF_SERVICE_"
     SIGNAL_INSTALLED: str = "ANSIBLE_SELF_SERVICE_STATUS_INSTALLED"
     SIGNAL_NOT_INSTALLED: str = "ANSIBLE_SELF_SERVICE_STATUS_NOT_INSTALLED"
 
@@ -146,6 +438,23 @@ class AnsibleResultAnalyzerProtocol(Protocol):
     def has_changes(self, ansible_run_result: "models.AnsibleRunResult") -> bool:
         """Return True if the results contain at least one task with result "changed"."""
 
+    @abstractmethod
+    def summarize(
+        self,
+        ansible_run_result: "models.AnsibleRunResult",
+        artifact_path: Optional[Path] = None,
+    ) -> "models.AnsibleRunSummary":
+        """Condense a run into a compact summary.
+
+        The raw output is written to artifact_path if one is given and dropped from memory afterwards.
+        """
+
+    @abstractmethod
+    def summarize_hosts(
+        self, ansible_run_result: "models.AnsibleRunResult"
+    ) -> Dict[str, "models.AnsibleRunSummary"]:
+        """Condense a run against an inventory into one compact summary per host."""
+
 
 class LoggerProtocol(Protocol):
     @abstractmethod
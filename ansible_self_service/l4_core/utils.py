@@ -1,12 +1,37 @@
+import contextlib
+import math
 import sys
 from abc import abstractmethod
-from typing import Tuple
+from typing import ContextManager, Optional, Sequence, Tuple
 
 if sys.version_info < (3, 8):
     from typing_extensions import Protocol, Any
 else:
     from typing import Protocol, Any
 
+if sys.version_info < (3, 8):
+
+    class cached_property:  # pylint: disable=invalid-name
+        """Stand-in for functools.cached_property: computed on first access, then stored on the instance."""
+
+        def __init__(self, func):
+            self.func = func
+            self.attrname = func.__name__
+            self.__doc__ = func.__doc__
+
+        def __set_name__(self, owner, name):
+            self.attrname = name
+
+        def __get__(self, instance, owner=None):
+            if instance is None:
+                return self
+            # the instance attribute shadows this non-data descriptor from now on, also on frozen dataclasses
+            value = instance.__dict__[self.attrname] = self.func(instance)
+            return value
+
+else:
+    from functools import cached_property  # pylint: disable=unused-import
+
 
 class ObserverProtocol(Protocol):
     @abstractmethod
@@ -28,6 +53,24 @@ class ObservableMixin:
 
     def __setattr__(self, key, value):
         super().__setattr__(key, value)
-        if key in self._observed_attrs and hasattr(self, "__observers"):
+        # the observer set is name mangled, so it has to be looked up by its mangled name
+        if key in self._observed_attrs and hasattr(self, "_ObservableMixin__observers"):
             for observer in self.__observers:
                 observer.update(observable=self, attr=key, value=value)
+
+
+def locked(lock_manager: Optional[Any], name: str, exclusive: bool) -> ContextManager:
+    """Lock a named resource via a LockManagerProtocol for reading or writing, without a lock manager do nothing."""
+    if lock_manager is None:
+        return contextlib.nullcontext()
+    if exclusive:
+        return lock_manager.write(name)
+    return lock_manager.read(name)
+
+
+def percentile(values: Sequence[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile, e.g. the median for a fraction of 0.5, or None without values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
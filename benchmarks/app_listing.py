@@ -0,0 +1,136 @@
+"""Measure listing many apps through the service layer and count the git accesses it needs.
+
+Collections are local repos with generated configs, so the numbers show the cost of building DTOs rather than disk
+or network latency:
+
+    poetry run python benchmarks/app_listing.py --collections 10 --apps 1000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from git import Repo  # type: ignore
+
+from ansible_self_service.l2_infrastructure.ansible_result_analyzer import (
+    JMESPathAnsibleResultAnalyzer,
+)
+from ansible_self_service.l2_infrastructure.ansible_runner import AnsibleRunner
+from ansible_self_service.l2_infrastructure.app_collection_config_parser import (
+    YamlAppCollectionConfigParser,
+)
+from ansible_self_service.l2_infrastructure.app_state_persister import (
+    YamlAppStatePersister,
+)
+from ansible_self_service.l2_infrastructure.git_client import GitPythonGitClient
+from ansible_self_service.l2_infrastructure.logger import BasicLogger
+from ansible_self_service.l2_infrastructure.playbook_dependency_resolver import (
+    YamlPlaybookDependencyResolver,
+)
+from ansible_self_service.l3_services.app import AppService
+from ansible_self_service.l3_services.app_catalog import AppCatalogService
+from ansible_self_service.l3_services.dto import App
+from ansible_self_service.l4_core.factories import AppFactory
+from ansible_self_service.l4_core.catalog import AppCatalog
+from ansible_self_service.l4_core.collection import AppCollection
+from ansible_self_service.l4_core.models import Config
+
+
+class CountingGitClient(GitPythonGitClient):
+    """Count the reads of revisions and origin URLs, the git accesses of a listing."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def get_revision(self, directory: Path) -> str:
+        self.calls += 1
+        return super().get_revision(directory)
+
+    def get_origin_url(self, directory: Path) -> str:
+        self.calls += 1
+        return super().get_origin_url(directory)
+
+
+def create_collection(git_directory: Path, name: str, number_of_apps: int):
+    directory = git_directory / name
+    repo = Repo.init(directory, initial_branch="main")
+    repo.create_remote("origin", f"https://example.com/{name}.git")
+    (directory / "playbook.yml").write_text("- hosts: localhost\n", encoding="utf-8")
+    items = "".join(
+        f"  app-{index:05d}:\n"
+        f"    description: App {index}\n"
+        f"    categories: [Category {index % 10}]\n"
+        "    playbook: playbook.yml\n"
+        for index in range(number_of_apps)
+    )
+    categories = "".join(f"  Category {index}: {{}}\n" for index in range(10))
+    (directory / AppCollection.CONFIG_FILE_NAME).write_text(
+        f"categories:\n{categories}items:\n{items}", encoding="utf-8"
+    )
+    repo.index.add(["playbook.yml", AppCollection.CONFIG_FILE_NAME])
+    repo.index.commit("Apps")
+
+
+def create_services(data_directory: Path, git_client: CountingGitClient):
+    config = Config(None, override_app_data_dir=data_directory)  # type: ignore
+    app_factory = AppFactory(
+        app_state_persister=YamlAppStatePersister(config),
+        ansible_runner=AnsibleRunner(),
+        ansible_result_analyzer=JMESPathAnsibleResultAnalyzer(BasicLogger()),
+    )
+    app_catalog = AppCatalog(
+        _config=config,
+        _git_client=git_client,
+        _app_collection_config_parser=YamlAppCollectionConfigParser(app_factory),
+        _playbook_dependency_resolver=YamlPlaybookDependencyResolver(),
+        _requirements_installer=None,  # type: ignore
+        _collection_bundle_archive=None,  # type: ignore
+    )
+    return AppCatalogService(app_catalog), AppService(app_catalog, None)  # type: ignore
+
+
+def list_apps(catalog_service: AppCatalogService, app_service: AppService) -> List[App]:
+    return [
+        app
+        for collection in catalog_service.list_collections()
+        for app in app_service.get_apps_for_collection(collection)
+    ]
+
+
+PROJECTIONS: Dict[str, Optional[Callable[[App], object]]] = {
+    "build DTOs": None,
+    "name, status": lambda app: (app.name, app.status),
+    "all fields": lambda app: (app.name, app.status, app.stale, app.playbook_error),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--collections", type=int, default=10)
+    parser.add_argument("--apps", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_directory = Path(tmp)
+        for index in range(args.collections):
+            create_collection(
+                data_directory / "git", f"collection-{index:03d}", args.apps
+            )
+        print(f"{'projection':>14} {'apps':>7} {'seconds':>9} {'git calls':>10}")
+        for name, projection in PROJECTIONS.items():
+            # a fresh catalog per projection, like a fresh CLI process
+            git_client = CountingGitClient()
+            catalog_service, app_service = create_services(data_directory, git_client)
+            start = time.perf_counter()
+            apps = list_apps(catalog_service, app_service)
+            if projection is not None:
+                for app in apps:
+                    projection(app)
+            duration = time.perf_counter() - start
+            print(f"{name:>14} {len(apps):>7} {duration:>9.3f} {git_client.calls:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Measure how fleet status checks scale with the number of hosts.
+
+Every host of the generated inventory is a pseudo-host using the local connection, so the benchmark needs neither
+SSH nor real lab machines:
+
+    poetry run python benchmarks/fleet_pseudo_hosts.py --hosts 1 10 100 --forks 20
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from ansible_self_service.l2_infrastructure.ansible_result_analyzer import (
+    JMESPathAnsibleResultAnalyzer,
+)
+from ansible_self_service.l2_infrastructure.ansible_runner import AnsibleRunner
+from ansible_self_service.l2_infrastructure.logger import BasicLogger
+
+STATUS_PLAYBOOK = """
+- name: Check pseudo app status
+  hosts: all
+  gather_facts: false
+  tasks:
+    - name: Signal status installed
+      debug:
+        msg: ANSIBLE_SELF_SERVICE_STATUS_INSTALLED
+      tags: [status]
+"""
+
+
+def write_inventory(directory: Path, number_of_hosts: int) -> Path:
+    """Write an INI inventory with pseudo-hosts that all run against the local machine."""
+    inventory = directory / f"inventory-{number_of_hosts}.ini"
+    lines = ["[lab]"] + [
+        f"pseudo-{index:05d} ansible_connection=local ansible_python_interpreter={sys.executable}"
+        for index in range(number_of_hosts)
+    ]
+    inventory.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return inventory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--forks", type=int, default=20)
+    args = parser.parse_args()
+
+    runner = AnsibleRunner()
+    analyzer = JMESPathAnsibleResultAnalyzer(BasicLogger())
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        playbook = directory / "status.yml"
+        playbook.write_text(STATUS_PLAYBOOK, encoding="utf-8")
+        print(
+            f"{'hosts':>8} {'forks':>6} {'seconds':>9} {'hosts/s':>9} {'signaled':>9}"
+        )
+        for number_of_hosts in args.hosts:
+            inventory = write_inventory(directory, number_of_hosts)
+            start = time.perf_counter()
+            result = runner.run(
+                working_directory=directory,
+                playbook_path=playbook,
+                tags=("status",),
+                check_mode=True,
+                inventory=inventory,
+                forks=args.forks,
+            )
+            elapsed = time.perf_counter() - start
+            summaries = analyzer.summarize_hosts(result)
+            signaled = sum(
+                1
+                for summary in summaries.values()
+                if summary.has_signal(analyzer.SIGNAL_INSTALLED)
+            )
+            print(
+                f"{number_of_hosts:>8} {args.forks:>6} {elapsed:>9.2f} "
+                f"{number_of_hosts / elapsed:>9.1f} {signaled:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
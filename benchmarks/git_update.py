@@ -0,0 +1,92 @@
+"""Compare the cost of updating a collection clone with the previous fetch-and-pull approach.
+
+Upstream is a local bare repo, so the numbers show the git overhead of each approach rather than network latency:
+
+    poetry run python benchmarks/git_update.py --commits 200 --rounds 20
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from git import Repo  # type: ignore
+
+from ansible_self_service.l2_infrastructure.git_client import GitPythonGitClient
+
+
+def fetch_and_pull(directory: Path):
+    """The update path before it checked the remote tip first: fetch, then pull (which fetches again)."""
+    repo = Repo(directory)
+    repo.remote().fetch()
+    repo.remote().pull(force=True)
+
+
+def create_upstream(directory: Path, number_of_commits: int) -> Repo:
+    work = Repo.init(directory / "work", initial_branch="main")
+    for index in range(number_of_commits):
+        path = Path(work.working_dir) / f"playbook-{index % 20}.yml"
+        path.write_text(f"- hosts: localhost  # {index}\n", encoding="utf-8")
+        work.index.add([str(path)])
+        work.index.commit(f"Commit {index}")
+    work.git.clone("--bare", work.working_dir, str(directory / "upstream.git"))
+    work.create_remote("upstream", str(directory / "upstream.git"))
+    return work
+
+
+def push_commit(work: Repo, index: int):
+    path = Path(work.working_dir) / "bench.yml"
+    path.write_text(f"- hosts: localhost  # bench {index}\n", encoding="utf-8")
+    work.index.add([str(path)])
+    work.index.commit(f"Bench {index}")
+    work.git.push("upstream", "main")
+
+
+def measure(
+    update: Callable[[Path], None], clone: Path, rounds: int, work=None
+) -> List[float]:
+    durations = []
+    for index in range(rounds):
+        if work is not None:
+            push_commit(work, index)
+        start = time.perf_counter()
+        update(clone)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commits", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        work = create_upstream(directory, args.commits)
+        url = str(directory / "upstream.git")
+        approaches = {
+            "fetch+pull": fetch_and_pull,
+            "single fetch": GitPythonGitClient().update,
+            "single fetch, mirror": GitPythonGitClient(
+                mirror_directory=directory / "mirror.git"
+            ).update,
+        }
+        print(f"{'approach':<22} {'scenario':<12} {'median ms':>10} {'max ms':>8}")
+        for name, update in approaches.items():
+            clone = directory / name.replace(" ", "-").replace(",", "")
+            GitPythonGitClient().clone_repo(url, clone)
+            update(
+                clone
+            )  # bring the clone onto the default branch with tracking set up
+            for scenario, pushing in (("no-op", None), ("new commit", work)):
+                durations = measure(update, clone, args.rounds, pushing)
+                print(
+                    f"{name:<22} {scenario:<12} {statistics.median(durations) * 1000:>10.1f} "
+                    f"{max(durations) * 1000:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
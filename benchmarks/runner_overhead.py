@@ -0,0 +1,299 @@
+"""Measure how much of an Ansible run is runner overhead and compare runners side by side.
+
+All playbooks run against localhost with the local connection, so neither SSH nor lab machines are needed:
+
+    poetry run python benchmarks/runner_overhead.py --rounds 10 --concurrency 1 4 8 --json report.json
+
+Each runner is measured in a fresh process, so the peak memory of one runner's workers does not hide another's.
+Add alternative runners to RUNNERS to compare them with the current ones.
+"""
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from ansible_self_service.l2_infrastructure.ansible_engine import (
+    AnsibleWorkerPool,
+    ReusableAsyncAnsibleRunner,
+)
+from ansible_self_service.l2_infrastructure.ansible_runner import (
+    AnsibleRunner,
+    AsyncAnsibleRunner,
+    playbook_arguments,
+    set_directory,
+)
+from ansible_self_service.l2_infrastructure.utils import processify, set_env
+from ansible_self_service.l4_core.models import AnsibleRunResult
+
+PLAYBOOKS = {
+    # a single task, so the run is dominated by overhead
+    "trivial": """
+- hosts: localhost
+  gather_facts: false
+  tasks:
+    - debug:
+        msg: ANSIBLE_SELF_SERVICE_STATUS_INSTALLED
+      tags: [status]
+""",
+    # what a typical status check in check mode looks like
+    "realistic": """
+- hosts: localhost
+  gather_facts: true
+  gather_subset: [min]
+  vars:
+    packages: [alpha, beta, gamma, delta]
+  tasks:
+    - stat:
+        path: "{{ playbook_dir }}/marker"
+      register: marker
+    - command: "{{ ansible_python_interpreter | default('python3') }} --version"
+      changed_when: false
+      check_mode: false
+    - copy:
+        dest: "{{ playbook_dir }}/out-{{ item }}.txt"
+        content: "{{ item }} {{ ansible_facts.hostname }}\\n"
+      loop: "{{ packages }}"
+      check_mode: true
+    - set_fact:
+        summary: "{{ packages | map('upper') | join(',') }}"
+    - debug:
+        msg: ANSIBLE_SELF_SERVICE_STATUS_INSTALLED
+""",
+}
+
+# an async callable per runner: (working directory, playbook) -> result
+Runner = Callable[[Path, Path], Awaitable[AnsibleRunResult]]
+
+
+def executor_runner(run: Callable[[Path, Path], AnsibleRunResult]) -> Runner:
+    """Adapt a blocking runner, concurrent runs use one thread each like an async caller would."""
+
+    async def runner(working_directory: Path, playbook: Path) -> AnsibleRunResult:
+        return await asyncio.get_event_loop().run_in_executor(
+            None, run, working_directory, playbook
+        )
+
+    return runner
+
+
+# created empty here, so each fresh benchmark process starts its own workers
+worker_pool = AnsibleWorkerPool()
+
+RUNNERS: Dict[str, Callable[[], Runner]] = {
+    "processify": lambda: executor_runner(AnsibleRunner().run),
+    "asyncio-subprocess": lambda: AsyncAnsibleRunner().run,
+    "reusable-context": lambda: ReusableAsyncAnsibleRunner(worker_pool).run,
+}
+
+
+@processify
+def empty_round_trip(payload_size: int) -> AnsibleRunResult:
+    """Spawn a process and pickle a result of a typical size back, without running Ansible."""
+    return AnsibleRunResult("x" * payload_size, "", 0)
+
+
+@processify
+def phases(working_directory: Path, playbook: Path) -> Dict[str, float]:
+    """Time the phases of AnsibleRunner.run within its worker process."""
+    durations = {}
+    start = time.perf_counter()
+    for env_var in list(os.environ):
+        if env_var.startswith("ANSIBLE_"):
+            del os.environ[env_var]
+    durations["clear env"] = time.perf_counter() - start
+    with set_env(ANSIBLE_STDOUT_CALLBACK="ansible.posix.json"):
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            with set_directory(working_directory):
+                start = time.perf_counter()
+                from ansible.cli.playbook import (  # pylint: disable=import-outside-toplevel
+                    PlaybookCLI,
+                )
+
+                durations["import ansible"] = time.perf_counter() - start
+                start = time.perf_counter()
+                cli = PlaybookCLI(playbook_arguments(playbook))
+                durations["construct PlaybookCLI"] = time.perf_counter() - start
+                start = time.perf_counter()
+                cli.run()
+                durations["run playbook"] = time.perf_counter() - start
+    return durations
+
+
+def measure_overhead(working_directory: Path, playbook: Path, rounds: int) -> Dict:
+    """Median seconds per phase, with the spawn and pickling cost measured without Ansible."""
+    payload_size = len(
+        AnsibleRunner().run(working_directory, playbook, tags=("status",)).stdout
+    )
+    round_trips = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        empty_round_trip(payload_size)
+        round_trips.append(time.perf_counter() - start)
+    phase_samples = [phases(working_directory, playbook) for _ in range(rounds)]
+    overhead = {"spawn + pickle result": statistics.median(round_trips)}
+    for phase in phase_samples[0]:
+        overhead[phase] = statistics.median(sample[phase] for sample in phase_samples)
+    return overhead
+
+
+async def run_batch(
+    runner: Runner, working_directory: Path, playbook: Path, runs: int, concurrency: int
+) -> List[Optional[float]]:
+    """Run the playbook runs times with up to concurrency runs at a time and return each run's latency.
+
+    Failed runs are None, so a runner that loses runs is reported instead of aborting the benchmark.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed() -> Optional[float]:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await runner(working_directory, playbook)
+            except Exception:  # pylint: disable=broad-except
+                return None
+            if not result.was_successful:
+                return None
+            return time.perf_counter() - start
+
+    asyncio.get_event_loop().set_default_executor(ThreadPoolExecutor(concurrency))
+    return await asyncio.gather(*(timed() for _ in range(runs)))
+
+
+def benchmark_runner(
+    runner_name: str,
+    working_directory: Path,
+    rounds: int,
+    concurrency_levels: List[int],
+) -> Dict:
+    """Latency, throughput and peak worker memory of one runner for all playbooks."""
+    runner = RUNNERS[runner_name]()
+    report: Dict = {"runner": runner_name, "playbooks": {}}
+    for playbook_name in PLAYBOOKS:
+        playbook = working_directory / f"{playbook_name}.yml"
+        samples = asyncio.run(run_batch(runner, working_directory, playbook, rounds, 1))
+        failures = samples.count(None)
+        throughput = {}
+        for concurrency in concurrency_levels:
+            runs = max(rounds, concurrency * 2)
+            start = time.perf_counter()
+            batch = asyncio.run(
+                run_batch(runner, working_directory, playbook, runs, concurrency)
+            )
+            # only successful runs count towards throughput
+            throughput[concurrency] = (runs - batch.count(None)) / (
+                time.perf_counter() - start
+            )
+            failures += batch.count(None)
+        latencies = sorted(sample for sample in samples if sample is not None) or [
+            float("nan")
+        ]
+        report["playbooks"][playbook_name] = {
+            "median_ms": statistics.median(latencies) * 1000,
+            "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+            "runs_per_second": throughput,
+            "failed_runs": failures,
+        }
+    # workers count towards the children's rusage once they exited, atexit does not run in benchmark processes
+    worker_pool.close()
+    # maxrss is in KiB on Linux
+    report["peak_worker_rss_mib"] = (
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    )
+    report["peak_harness_rss_mib"] = (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    )
+    return report
+
+
+def _benchmark_into_queue(queue, *args):
+    queue.put(benchmark_runner(*args))
+
+
+def benchmark_in_fresh_process(*args) -> Dict:
+    """Run benchmark_runner in a new process, so rusage only covers this runner."""
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    process = context.Process(target=_benchmark_into_queue, args=(queue,) + args)
+    process.start()
+    report = queue.get()
+    process.join()
+    return report
+
+
+def print_report(overhead: Dict, reports: List[Dict], concurrency_levels: List[int]):
+    print("Overhead of AnsibleRunner.run (trivial playbook, median)")
+    for phase, seconds in overhead.items():
+        print(f"  {phase:<24} {seconds * 1000:>8.1f} ms")
+    print()
+    header = f"{'runner':<20} {'playbook':<10} {'median ms':>10} {'p95 ms':>8}"
+    header += "".join(f" {f'runs/s@{level}':>10}" for level in concurrency_levels)
+    header += f" {'worker MiB':>11} {'failed':>7}"
+    print(header)
+    for report in reports:
+        for playbook_name, numbers in report["playbooks"].items():
+            line = (
+                f"{report['runner']:<20} {playbook_name:<10} {numbers['median_ms']:>10.0f} "
+                f"{numbers['p95_ms']:>8.0f}"
+            )
+            line += "".join(
+                f" {numbers['runs_per_second'][level]:>10.2f}"
+                for level in concurrency_levels
+            )
+            line += (
+                f" {report['peak_worker_rss_mib']:>11.0f} {numbers['failed_runs']:>7}"
+            )
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument(
+        "--runners", nargs="+", choices=sorted(RUNNERS), default=sorted(RUNNERS)
+    )
+    parser.add_argument(
+        "--json", type=Path, help="Also write the report to this file as JSON."
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        working_directory = Path(tmp)
+        for playbook_name, content in PLAYBOOKS.items():
+            (working_directory / f"{playbook_name}.yml").write_text(
+                content, encoding="utf-8"
+            )
+        (working_directory / "ansible.cfg").write_text(
+            f"[defaults]\ninterpreter_python = {sys.executable}\n", encoding="utf-8"
+        )
+        overhead = measure_overhead(
+            working_directory, working_directory / "trivial.yml", args.rounds
+        )
+        reports = [
+            benchmark_in_fresh_process(
+                runner_name, working_directory, args.rounds, args.concurrency
+            )
+            for runner_name in args.runners
+        ]
+    print_report(overhead, reports, args.concurrency)
+    if args.json:
+        args.json.write_text(
+            json.dumps({"overhead_seconds": overhead, "runners": reports}, indent=2),
+            encoding="utf-8",
+        )
+
+
+if __name__ == "__main__":
+    main()
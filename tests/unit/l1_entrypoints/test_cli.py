@@ -0,0 +1,213 @@
+import contextlib
+import json
+import subprocess
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from typer.testing import CliRunner
+
+from ansible_self_service.l1_entrypoints import cli
+from ansible_self_service.l1_entrypoints.cli import app as cli_app
+from ansible_self_service.l1_entrypoints.cli import state, typer_app
+from ansible_self_service.l1_entrypoints.cli.app import revalidate_in_background
+from ansible_self_service.l1_entrypoints.cli.output import APP_FIELDS
+from ansible_self_service.l2_infrastructure.git_client import GitPythonGitClient
+from ansible_self_service.l2_infrastructure.resource_governor import ResourceGovernor
+
+CONFIG = """categories:
+  Misc: {}
+items:
+  cowsay:
+    description: Cow
+    categories: [Misc]
+    playbook: cowsay.yml
+  fortune:
+    description: Fortune
+    categories: [Misc]
+    playbook: fortune.yml
+"""
+
+
+@pytest.fixture
+def data_dir(tmp_path: Path) -> Path:
+    data_dir = tmp_path / "data"
+    repo = data_dir / "git" / "tools"
+    repo.mkdir(parents=True)
+    (repo / "self-service.yaml").write_text(CONFIG, encoding="utf-8")
+    for name in ("cowsay", "fortune"):
+        (repo / f"{name}.yml").write_text("- hosts: localhost\n", encoding="utf-8")
+    for command in (
+        ["git", "init", "-q"],
+        ["git", "add", "."],
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+        + ["commit", "-q", "-m", "init"],
+    ):
+        subprocess.run(command, cwd=repo, check=True)
+    return data_dir
+
+
+def invoke(data_dir: Path, *args: str):
+    return CliRunner(mix_stderr=False).invoke(
+        typer_app, ["--data-dir", str(data_dir), *args]
+    )
+
+
+def test_app_list_as_json(data_dir):
+    result = invoke(data_dir, "app", "list", "--no-revalidate", "--output", "json")
+
+    assert result.exit_code == 0, result.output
+    records = json.loads(result.stdout)
+    assert [record["name"] for record in records] == ["cowsay", "fortune"]
+    assert set(records[0]) == set(APP_FIELDS) | {"error"}
+    assert records[0]["collection"] == "tools"
+    assert records[0]["status"] == "unknown"
+
+
+def test_app_list_as_ndjson_with_fields(data_dir):
+    result = invoke(
+        data_dir,
+        "app",
+        "list",
+        "--no-revalidate",
+        "--output",
+        "ndjson",
+        "--field",
+        "name",
+        "--field",
+        "status",
+    )
+
+    assert result.exit_code == 0, result.output
+    assert [json.loads(line) for line in result.stdout.splitlines()] == [
+        {"name": "cowsay", "status": "unknown"},
+        {"name": "fortune", "status": "unknown"},
+    ]
+
+
+def test_unknown_field_is_rejected(data_dir):
+    result = invoke(
+        data_dir, "app", "list", "--no-revalidate", "--output", "json", "--field", "x"
+    )
+
+    assert result.exit_code == 2
+    assert "Unknown fields x" in result.stderr
+
+
+def test_collection_list_with_fields(data_dir):
+    result = invoke(
+        data_dir, "collection", "list", "--output", "json", "--field", "name"
+    )
+
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.stdout) == [{"name": "tools"}]
+
+
+def test_background_revalidation_only_gets_the_given_global_options(
+    monkeypatch, tmp_path
+):
+    popen = MagicMock(return_value=MagicMock(pid=4242))
+    monkeypatch.setattr(subprocess, "Popen", popen)
+    config_service = MagicMock()
+    config_service.get_revalidation_pid_file.return_value = tmp_path / "pid"
+    config_service.revalidation_lock.return_value = contextlib.nullcontext()
+    monkeypatch.setattr(state, "config_service", config_service, raising=False)
+    monkeypatch.setattr(state, "global_options", ["--elevate"], raising=False)
+
+    assert revalidate_in_background(60)
+
+    # without --data-dir the child resolves the same default data and cache directories
+    assert popen.call_args.args[0][3:] == [
+        "--elevate",
+        "--resource-class",
+        "background",
+        "app",
+        "revalidate",
+        "--max-age",
+        "60",
+    ]
+    assert (tmp_path / "pid").read_text(encoding="utf-8") == "4242"
+    config_service.revalidation_lock.assert_called_once_with()
+
+
+def test_app_list_does_not_ask_git_for_the_revision(monkeypatch, data_dir):
+    get_revision = MagicMock(return_value="0" * 40)
+    monkeypatch.setattr(GitPythonGitClient, "get_revision", get_revision)
+
+    result = invoke(data_dir, "app", "list")
+    json_result = invoke(data_dir, "app", "list", "--output", "json")
+
+    assert result.exit_code == 0, result.output
+    assert json_result.exit_code == 0, json_result.output
+    assert all(record["stale"] for record in json.loads(json_result.stdout))
+    get_revision.assert_not_called()
+
+
+def test_global_options_are_forwarded_to_background_processes(
+    monkeypatch, data_dir, tmp_path
+):
+    monkeypatch.setattr(cli, "start_profiling", MagicMock())
+
+    result = invoke(
+        data_dir,
+        "--keep-run-artifacts",
+        "--no-reuse-ansible",
+        "--profile",
+        str(tmp_path / "profile"),
+        "app",
+        "list",
+        "--output",
+        "json",
+    )
+
+    assert result.exit_code == 0, result.output
+    assert state.global_options == [
+        "--data-dir",
+        str(data_dir),
+        "--keep-run-artifacts",
+        "--no-reuse-ansible",
+        "--profile",
+        str(tmp_path / "profile"),
+    ]
+
+
+def test_app_list_does_not_revalidate_in_the_background_by_default(
+    monkeypatch, data_dir
+):
+    revalidate = MagicMock()
+    monkeypatch.setattr(cli_app, "revalidate_in_background", revalidate)
+
+    result = invoke(data_dir, "app", "list", "--output", "json")
+
+    assert result.exit_code == 0, result.output
+    revalidate.assert_not_called()
+
+
+def test_elevated_app_list_does_not_revalidate_in_the_background(monkeypatch, data_dir):
+    revalidate = MagicMock()
+    monkeypatch.setattr(cli_app, "revalidate_in_background", revalidate)
+    monkeypatch.setattr(ResourceGovernor, "apply", MagicMock())
+
+    result = invoke(data_dir, "--elevate", "app", "list", "--revalidate")
+
+    assert result.exit_code == 0, result.output
+    assert "not revalidated in the background" in result.stderr
+    revalidate.assert_not_called()
+
+
+def test_resource_limits_are_applied_on_the_main_thread_at_startup(
+    monkeypatch, data_dir
+):
+    threads = []
+
+    def apply(governor):
+        threads.append(threading.current_thread())
+        return governor._limits  # pylint: disable=protected-access
+
+    monkeypatch.setattr(ResourceGovernor, "apply", apply)
+
+    result = invoke(data_dir, "app", "list", "--no-revalidate", "--output", "json")
+
+    assert result.exit_code == 0, result.output
+    assert threads == [threading.main_thread()]
@@ -0,0 +1,126 @@
+import asyncio
+import json
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from ansible_self_service.l2_infrastructure import ansible_engine
+from ansible_self_service.l2_infrastructure.ansible_engine import (
+    AnsibleWorkerPool,
+    ReusableAnsibleRunner,
+    ReusableAsyncAnsibleRunner,
+)
+from ansible_self_service.l2_infrastructure.playbook_validator import (
+    AnsiblePlaybookValidator,
+)
+from ansible_self_service.l4_core.exceptions import AnsibleRunTimeoutException
+
+FACT_PLAYBOOK = """
+- hosts: localhost
+  gather_facts: false
+  tasks:
+    - name: Report check mode and whether a previous run left its fact behind
+      debug:
+        msg: "{{ ansible_check_mode }} {{ leftover | default('clean') }}"
+    - name: Leave a fact behind
+      set_fact:
+        leftover: dirty
+        cacheable: true
+"""
+
+SLEEP_PLAYBOOK = """
+- hosts: localhost
+  gather_facts: false
+  tasks:
+    - name: Hang
+      command: sleep 60
+"""
+
+
+def debug_message(stdout: str) -> str:
+    result = json.loads(stdout)
+    task = result["plays"][0]["tasks"][0]
+    return task["hosts"]["localhost"]["msg"]
+
+
+@pytest.fixture
+def worker_pool():
+    pool = AnsibleWorkerPool()
+    yield pool
+    pool.close()
+
+
+def test_runs_share_a_worker_without_sharing_state(
+    tmp_path: Path, worker_pool: AnsibleWorkerPool
+):
+    playbook = tmp_path / "facts.yml"
+    playbook.write_text(FACT_PLAYBOOK, encoding="utf-8")
+    runner = ReusableAnsibleRunner(worker_pool)
+
+    first = runner.run(tmp_path, playbook, check_mode=True)
+    worker = worker_pool.acquire(tmp_path, None)
+    worker_pool.release(worker)
+    second = runner.run(tmp_path, playbook)
+
+    assert first.return_code == second.return_code == 0
+    assert debug_message(first.stdout) == "True clean"
+    assert debug_message(second.stdout) == "False clean"
+    assert worker.runs == 2
+
+
+def test_timeout_kills_worker(tmp_path: Path, worker_pool: AnsibleWorkerPool):
+    playbook = tmp_path / "sleep.yml"
+    playbook.write_text(SLEEP_PLAYBOOK, encoding="utf-8")
+    runner = ReusableAsyncAnsibleRunner(worker_pool)
+
+    with pytest.raises(AnsibleRunTimeoutException):
+        asyncio.run(runner.run(tmp_path, playbook, timeout=5))
+
+    worker = worker_pool.acquire(tmp_path, None)
+    worker_pool.release(worker)
+    assert worker.runs == 0
+
+
+def test_syntax_check_reports_missing_role(
+    tmp_path: Path, worker_pool: AnsibleWorkerPool
+):
+    valid = tmp_path / "valid.yml"
+    valid.write_text(FACT_PLAYBOOK, encoding="utf-8")
+    missing_role = tmp_path / "missing_role.yml"
+    missing_role.write_text(
+        "- hosts: localhost\n  roles: [does_not_exist]\n", encoding="utf-8"
+    )
+
+    errors = AnsiblePlaybookValidator(worker_pool).validate(
+        tmp_path, [valid, missing_role]
+    )
+
+    assert errors[valid] is None
+    assert "does_not_exist" in errors[missing_role]
+
+
+def test_installed_ansible_core_supports_reusable_contexts():
+    # the locked ansible-core must not silently fall back to initializing Ansible for every run
+    assert ansible_engine.reusable_contexts_supported()
+
+
+def test_unsupported_ansible_core_falls_back_to_isolated_runs(
+    tmp_path: Path, monkeypatch
+):
+    monkeypatch.setattr(ansible_engine, "reusable_contexts_supported", lambda: False)
+    worker_pool = AnsibleWorkerPool()
+    runner = ReusableAnsibleRunner(worker_pool)
+    isolated_runner = MagicMock()
+    runner._isolated_runner = isolated_runner  # pylint: disable=protected-access
+    playbook = tmp_path / "facts.yml"
+
+    result = runner.run(tmp_path, playbook, check_mode=True)
+
+    assert result is isolated_runner.run.return_value
+    assert isolated_runner.run.call_args.args[:2] == (tmp_path, playbook)
+    # the validator's syntax checks still use the pool, but never reuse a context
+    worker = MagicMock(runs=1)
+    worker_pool.release(worker)
+    worker.close.assert_called_once_with()
+    worker_pool.close()
@@ -5,6 +5,7 @@ import pytest
 from ansible_self_service.l2_infrastructure.ansible_result_analyzer import (
     JMESPathAnsibleResultAnalyzer,
 )
+from ansible_self_service.l4_core.models import AnsibleRunResult
 from ansible_self_service.l4_core.protocols import LoggerProtocol
 
 ANSIBLE_RESULT_NOT_INSTALLED = """
@@ -291,3 +292,104 @@ def test_installed(mocker, logger):
     analyzer = JMESPathAnsibleResultAnalyzer(logger)
     assert analyzer.signaling_not_installed(ansible_result_mock) is False
     assert analyzer.signaling_installed(ansible_result_mock) is True
+
+
+def test_summarize_installed(logger):
+    result = AnsibleRunResult(stdout=ANSIBLE_RESULT_INSTALLED, stderr="", return_code=0)
+    summary = JMESPathAnsibleResultAnalyzer(logger).summarize(result)
+    assert summary.was_successful is True
+    assert summary.has_signal(JMESPathAnsibleResultAnalyzer.SIGNAL_INSTALLED)
+    assert not summary.has_signal(JMESPathAnsibleResultAnalyzer.SIGNAL_NOT_INSTALLED)
+    assert summary.changed == 0
+    assert summary.failed == 0
+    assert [name for name, _ in summary.task_durations] == [
+        "Check if cowsay executable in in PATH",
+        "Signal status installed",
+        "Signal status not installed",
+    ]
+    assert summary.task_durations[0][1] == pytest.approx(0.170068)
+    assert summary.artifact_path is None
+
+
+def test_summarize_not_installed_writes_artifact(tmp_path, logger):
+    result = AnsibleRunResult(
+        stdout=ANSIBLE_RESULT_NOT_INSTALLED, stderr="warning", return_code=0
+    )
+    artifact_path = tmp_path / "runs" / "cowsay.status.json"
+    summary = JMESPathAnsibleResultAnalyzer(logger).summarize(
+        result, artifact_path=artifact_path
+    )
+    assert summary.signals == frozenset(
+        [JMESPathAnsibleResultAnalyzer.SIGNAL_NOT_INSTALLED]
+    )
+    assert summary.changed == 1
+    assert summary.artifact_path == artifact_path
+    artifact = json.loads(artifact_path.read_text(encoding="utf-8"))
+    assert artifact["stderr"] == "warning"
+    assert json.loads(artifact["stdout"]) == json.loads(ANSIBLE_RESULT_NOT_INSTALLED)
+
+
+def test_summarize_unparsable_output(logger):
+    result = AnsibleRunResult(stdout="ERROR! no playbook", stderr="", return_code=1)
+    summary = JMESPathAnsibleResultAnalyzer(logger).summarize(result)
+    assert summary.was_successful is False
+    assert summary.signals == frozenset()
+
+
+ANSIBLE_RESULT_FLEET = """
+{
+    "plays": [
+        {
+            "play": {"id": "1", "name": "Check Cowsay Status"},
+            "tasks": [
+                {
+                    "hosts": {
+                        "lab-01.example.com": {
+                            "action": "debug",
+                            "changed": false,
+                            "msg": "ANSIBLE_SELF_SERVICE_STATUS_INSTALLED"
+                        },
+                        "lab-02.example.com": {
+                            "action": "debug",
+                            "changed": false,
+                            "msg": "ANSIBLE_SELF_SERVICE_STATUS_NOT_INSTALLED"
+                        }
+                    },
+                    "task": {
+                        "duration": {
+                            "end": "2022-02-23T13:36:48.147060Z",
+                            "start": "2022-02-23T13:36:48.139926Z"
+                        },
+                        "id": "2",
+                        "name": "Signal status"
+                    }
+                }
+            ]
+        }
+    ],
+    "stats": {
+        "lab-01.example.com": {"changed": 0, "failures": 0, "unreachable": 0},
+        "lab-02.example.com": {"changed": 2, "failures": 0, "unreachable": 0},
+        "lab-03.example.com": {"changed": 0, "failures": 0, "unreachable": 1}
+    }
+}
+"""
+
+
+def test_summarize_hosts(logger):
+    result = AnsibleRunResult(stdout=ANSIBLE_RESULT_FLEET, stderr="", return_code=4)
+    summaries = JMESPathAnsibleResultAnalyzer(logger).summarize_hosts(result)
+    assert sorted(summaries) == [
+        "lab-01.example.com",
+        "lab-02.example.com",
+        "lab-03.example.com",
+    ]
+    assert summaries["lab-01.example.com"].signals == frozenset(
+        [JMESPathAnsibleResultAnalyzer.SIGNAL_INSTALLED]
+    )
+    assert summaries["lab-02.example.com"].signals == frozenset(
+        [JMESPathAnsibleResultAnalyzer.SIGNAL_NOT_INSTALLED]
+    )
+    assert summaries["lab-02.example.com"].changed == 2
+    assert summaries["lab-03.example.com"].signals == frozenset()
+    assert summaries["lab-03.example.com"].failed == 1
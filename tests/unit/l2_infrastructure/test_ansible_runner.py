@@ -0,0 +1,104 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from ansible_self_service.l2_infrastructure.ansible_runner import (
+    AnsibleRunner,
+    AsyncAnsibleRunner,
+)
+from ansible_self_service.l4_core.exceptions import AnsibleRunTimeoutException
+
+
+def test_requirements_env_without_requirements(tmp_path: Path):
+    assert (
+        AnsibleRunner._requirements_env(tmp_path, None) == {}
+    )  # pylint: disable=protected-access
+
+
+def test_requirements_env_keeps_configured_paths(tmp_path: Path):
+    (tmp_path / "ansible.cfg").write_text(
+        "[defaults]\nroles_path = roles:/opt/roles\n", encoding="utf-8"
+    )
+    requirements = Path("/cache/requirements/abc")
+
+    env = AnsibleRunner._requirements_env(
+        tmp_path, requirements
+    )  # pylint: disable=protected-access
+
+    assert (
+        env["ANSIBLE_ROLES_PATH"]
+        == f"{requirements / 'roles'}:{tmp_path / 'roles'}:/opt/roles"
+    )
+    assert env["ANSIBLE_COLLECTIONS_PATH"] == (
+        f"{requirements / 'collections'}:{AnsibleRunner.DEFAULT_COLLECTIONS_PATH}"
+    )
+
+
+SLEEP_PLAYBOOK = """
+- hosts: localhost
+  gather_facts: false
+  tasks:
+    - name: Write the pid of a grandchild process and hang
+      shell: "sleep 60 & echo $! > {pid_file}; wait"
+"""
+
+
+def process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_async_run_timeout_kills_process_group(tmp_path: Path):
+    pid_file = tmp_path / "sleep.pid"
+    playbook = tmp_path / "sleep.yml"
+    playbook.write_text(SLEEP_PLAYBOOK.format(pid_file=pid_file), encoding="utf-8")
+
+    async def run():
+        await AsyncAnsibleRunner().run(tmp_path, playbook, timeout=5)
+
+    with pytest.raises(AnsibleRunTimeoutException) as exception_info:
+        asyncio.run(run())
+
+    assert exception_info.value.duration >= 5
+    sleep_pid = int(pid_file.read_text(encoding="utf-8"))
+    for _ in range(50):  # the killed process is reaped by init asynchronously
+        if not process_exists(sleep_pid):
+            break
+        time.sleep(0.1)
+    assert not process_exists(sleep_pid)
+
+
+def test_async_run_returns_result(tmp_path: Path):
+    playbook = tmp_path / "status.yml"
+    playbook.write_text(
+        "- hosts: localhost\n  gather_facts: false\n  tasks:\n    - debug: {msg: hi}\n",
+        encoding="utf-8",
+    )
+
+    result = asyncio.run(AsyncAnsibleRunner().run(tmp_path, playbook))
+
+    assert result.was_successful
+    assert result.data["stats"]["localhost"]["ok"] == 1
+
+
+def test_run_timeout_kills_process_group(tmp_path: Path):
+    pid_file = tmp_path / "sleep.pid"
+    playbook = tmp_path / "sleep.yml"
+    playbook.write_text(SLEEP_PLAYBOOK.format(pid_file=pid_file), encoding="utf-8")
+
+    with pytest.raises(AnsibleRunTimeoutException) as exception_info:
+        AnsibleRunner().run(tmp_path, playbook, timeout=5)
+
+    assert exception_info.value.duration >= 5
+    sleep_pid = int(pid_file.read_text(encoding="utf-8"))
+    for _ in range(50):
+        if not process_exists(sleep_pid):
+            break
+        time.sleep(0.1)
+    assert not process_exists(sleep_pid)
@@ -65,6 +65,7 @@ def test_parse_valid_file(tmpdir, mocker: MockerFixture):
     app_collection_mock = create_app_collection(mocker, config_file)
     categories, apps = app_collection_config_parser.from_file(app_collection_mock)
     assert categories == [AppCategory(name=VALID_CATEGORY_NAME)]
+    assert categories[0] is AppCategory.intern(VALID_CATEGORY_NAME)
     assert apps == [app_stub]
 
 
@@ -80,3 +81,98 @@ def test_parse_invalid_file(tmpdir, mocker: MockerFixture):
         app_collection_mock.directory = Path(config_file).parent
         app_collection_mock.config = Path(config_file)
         repo_config_parser.from_file(app_collection_mock)
+
+
+def config_with_dependencies(cowsay_depends_on, fortune_depends_on):
+    return f"""
+categories:
+  {VALID_CATEGORY_NAME}: {{}}
+
+items:
+  Cowsay:
+    description: Cow
+    categories: [{VALID_CATEGORY_NAME}]
+    playbook: playbooks/cowsay.yml
+    depends_on: {cowsay_depends_on}
+  Fortune:
+    description: Fortune
+    categories: [{VALID_CATEGORY_NAME}]
+    playbook: playbooks/fortune.yml
+    depends_on: {fortune_depends_on}
+"""
+
+
+def test_parse_dependencies(tmpdir, mocker: MockerFixture):
+    (
+        config_file,
+        app_factory,
+        app_stub,
+        repo_config_parser,
+    ) = create_yaml_app_collection_config_parser(
+        mocker, tmpdir, config_with_dependencies("[Fortune]", "[]")
+    )
+    repo_config_parser.from_file(create_app_collection(mocker, config_file))
+    depends_on = {
+        call.kwargs["name"]: call.kwargs["depends_on"]
+        for call in app_factory.create_app.call_args_list
+    }
+    assert depends_on == {"Cowsay": ["Fortune"], "Fortune": []}
+
+
+@pytest.mark.parametrize(
+    "cowsay_depends_on,fortune_depends_on",
+    [
+        ("[Unknown]", "[]"),
+        ("[Fortune]", "[Cowsay]"),
+        ("Fortune", "[]"),
+    ],
+)
+def test_parse_invalid_dependencies(
+    tmpdir, mocker: MockerFixture, cowsay_depends_on, fortune_depends_on
+):
+    (config_file, _, _, repo_config_parser,) = create_yaml_app_collection_config_parser(
+        mocker,
+        tmpdir,
+        config_with_dependencies(cowsay_depends_on, fortune_depends_on),
+    )
+    with pytest.raises(AppCollectionConfigValidationException):
+        repo_config_parser.from_file(create_app_collection(mocker, config_file))
+
+
+def config_with_timeouts(timeouts):
+    return f"""
+categories:
+  {VALID_CATEGORY_NAME}: {{}}
+
+items:
+  Cowsay:
+    description: Cow
+    categories: [{VALID_CATEGORY_NAME}]
+    playbook: playbooks/cowsay.yml
+    timeouts: {timeouts}
+"""
+
+
+def test_parse_timeouts(tmpdir, mocker: MockerFixture):
+    (
+        config_file,
+        app_factory,
+        _,
+        repo_config_parser,
+    ) = create_yaml_app_collection_config_parser(
+        mocker, tmpdir, config_with_timeouts("{status: 30, install: 1800}")
+    )
+    repo_config_parser.from_file(create_app_collection(mocker, config_file))
+    assert app_factory.create_app.call_args.kwargs["timeouts"] == {
+        "status": 30,
+        "install": 1800,
+    }
+
+
+@pytest.mark.parametrize("timeouts", ["{uninstall: 30}", "{status: 0}", "30"])
+def test_parse_invalid_timeouts(tmpdir, mocker: MockerFixture, timeouts):
+    (config_file, _, _, repo_config_parser,) = create_yaml_app_collection_config_parser(
+        mocker, tmpdir, config_with_timeouts(timeouts)
+    )
+    with pytest.raises(AppCollectionConfigValidationException):
+        repo_config_parser.from_file(create_app_collection(mocker, config_file))
@@ -0,0 +1,85 @@
+import pytest
+
+from ansible_self_service.l2_infrastructure.app_search_index import (
+    InvertedAppSearchIndex,
+    within_one_edit,
+)
+from ansible_self_service.l4_core.models import AppSearchDocument
+
+DOCUMENTS = [
+    AppSearchDocument("tools", "Cowsay", "Let an ASCII cow say stuff", ("Misc",)),
+    AppSearchDocument("tools", "Jq", "Command-line JSON processor", ("Development",)),
+    AppSearchDocument("office", "LibreOffice", "Office suite", ("Office",)),
+    AppSearchDocument("dev", "Visual Studio Code", "Code editor", ("Development",)),
+]
+
+
+@pytest.fixture
+def search_index(mocker, tmp_path):
+    config = mocker.Mock()
+    config.search_index_file = tmp_path / "search-index.json"
+    index = InvertedAppSearchIndex(config)
+    index.build("rev-1", DOCUMENTS)
+    return index
+
+
+def names(results):
+    return [result.name for result in results]
+
+
+def test_is_current(search_index):
+    assert search_index.is_current("rev-1") is True
+    assert search_index.is_current("rev-2") is False
+
+
+def test_exact_match(search_index):
+    assert names(search_index.search("cowsay", limit=10)) == ["Cowsay"]
+
+
+def test_prefix_match(search_index):
+    assert names(search_index.search("libre", limit=10)) == ["LibreOffice"]
+
+
+def test_fuzzy_match(search_index):
+    assert names(search_index.search("procesor", limit=10)) == ["Jq"]
+
+
+def test_all_terms_must_match(search_index):
+    assert names(search_index.search("development code", limit=10)) == [
+        "Visual Studio Code"
+    ]
+
+
+def test_name_ranks_before_category(search_index):
+    assert names(search_index.search("office", limit=10)) == ["LibreOffice"]
+    assert names(search_index.search("dev", limit=10)) == [
+        "Jq",
+        "Visual Studio Code",
+    ]
+
+
+def test_limit_and_no_match(search_index):
+    assert len(search_index.search("development", limit=1)) == 1
+    assert search_index.search("nothing-matches-this", limit=10) == []
+
+
+def test_index_is_read_from_disk(mocker, search_index):
+    fresh_index = InvertedAppSearchIndex(search_index._config)
+    assert fresh_index.is_current("rev-1") is True
+    assert fresh_index.search("jq", limit=10) == [DOCUMENTS[1]]
+
+
+@pytest.mark.parametrize(
+    "first,second,expected",
+    [
+        ("editor", "editor", True),
+        ("editor", "edtor", True),
+        ("editor", "editors", True),
+        ("editor", "edotor", True),
+        ("editor", "ediotr", True),
+        ("editor", "eidotr", False),
+        ("editor", "edit", False),
+    ],
+)
+def test_within_one_edit(first, second, expected):
+    assert within_one_edit(first, second) is expected
@@ -0,0 +1,47 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from ansible_self_service.l2_infrastructure.app_state_persister import (
+    YamlFleetStatePersister,
+)
+from ansible_self_service.l2_infrastructure.lock_manager import FileLockManager
+from ansible_self_service.l4_core.fleet import FleetStatusMatrix
+from ansible_self_service.l4_core.models import AppStatus, Config
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> Config:
+    return Config(None, override_app_data_dir=tmp_path)  # type: ignore
+
+
+def test_update_merges_refreshed_apps_and_drops_removed_ones(config, tmp_path):
+    inventory = tmp_path / "hosts.ini"
+    persister = YamlFleetStatePersister(config, FileLockManager(config, MagicMock()))
+    persister.save(
+        FleetStatusMatrix(
+            inventory=inventory,
+            statuses={
+                ("tools", "cowsay"): {"web1": AppStatus.INSTALLED},
+                ("tools", "removed"): {"web1": AppStatus.INSTALLED},
+            },
+        )
+    )
+    refreshed = FleetStatusMatrix(
+        inventory=inventory,
+        statuses={("tools", "fortune"): {"web1": AppStatus.NOT_INSTALLED}},
+    )
+
+    persister.update(
+        inventory,
+        lambda matrix: matrix.merge(
+            refreshed, [("tools", "cowsay"), ("tools", "fortune")]
+        ),
+    )
+
+    assert persister.load(inventory).statuses == {
+        ("tools", "cowsay"): {"web1": AppStatus.INSTALLED},
+        ("tools", "fortune"): {"web1": AppStatus.NOT_INSTALLED},
+    }
+    assert config.fleet_state_file(inventory).parent.parent == config.internal_data_dir
@@ -0,0 +1,67 @@
+import queue
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from ansible_self_service.l2_infrastructure.catalog_watcher import (
+    InotifyCatalogWatcher,
+    PollingCatalogWatcher,
+)
+from ansible_self_service.l4_core.collection import AppCollection
+
+
+def create_repo(git_directory: Path, name: str) -> Path:
+    directory = git_directory / name
+    (directory / ".git" / "refs" / "heads").mkdir(parents=True)
+    (directory / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+    (directory / AppCollection.CONFIG_FILE_NAME).write_text("items: {}\n")
+    return directory
+
+
+@pytest.fixture(
+    params=[
+        lambda: InotifyCatalogWatcher(MagicMock(), debounce=0.2),
+        lambda: PollingCatalogWatcher(MagicMock(), interval=0.2),
+    ],
+    ids=["inotify", "polling"],
+)
+def watcher(request):
+    catalog_watcher = request.param()
+    yield catalog_watcher
+    catalog_watcher.stop()
+
+
+def test_reports_changed_repos(tmp_path: Path, watcher):
+    tools = create_repo(tmp_path, "tools")
+    changes: "queue.Queue" = queue.Queue()
+    watcher.start(tmp_path, changes.put)
+
+    for index in range(3):  # a burst of edits is reported at once
+        (tools / AppCollection.CONFIG_FILE_NAME).write_text(
+            f"items: {{a{index}: {{}}}}\n"
+        )
+    (tools / "README.md").write_text("not relevant")
+    assert changes.get(timeout=10) == {"tools"}
+
+    create_repo(tmp_path, "games")
+    assert changes.get(timeout=10) == {"games"}
+
+    (tmp_path / "games" / ".git" / "refs" / "heads" / "main").write_text("abc\n")
+    assert changes.get(timeout=10) == {"games"}
+    assert changes.empty()
+
+
+def test_reports_changes_of_nested_branches(tmp_path: Path, watcher):
+    tools = create_repo(tmp_path, "tools")
+    changes: "queue.Queue" = queue.Queue()
+    watcher.start(tmp_path, changes.put)
+
+    feature = tools / ".git" / "refs" / "heads" / "feature"
+    feature.mkdir()
+    (feature / "x").write_text("abc\n")
+    assert changes.get(timeout=10) == {"tools"}
+
+    (feature / "x").write_text("def\n")
+    assert changes.get(timeout=10) == {"tools"}
+    assert changes.empty()
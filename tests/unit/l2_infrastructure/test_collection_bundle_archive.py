@@ -0,0 +1,47 @@
+import io
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from ansible_self_service.l2_infrastructure.collection_bundle_archive import (
+    TarCollectionBundleArchive,
+)
+from ansible_self_service.l4_core.exceptions import CollectionBundleException
+
+
+def test_pack_and_unpack(tmp_path: Path):
+    source = tmp_path / "source"
+    (source / "requirements" / "roles").mkdir(parents=True)
+    (source / "manifest.json").write_text("{}", encoding="utf-8")
+    (source / "requirements" / "roles" / "main.yml").write_text(
+        "- debug: {}", encoding="utf-8"
+    )
+    archive = TarCollectionBundleArchive()
+
+    archive.pack(source, tmp_path / "bundle.tar.gz")
+    archive.unpack(tmp_path / "bundle.tar.gz", tmp_path / "target")
+
+    assert (tmp_path / "target" / "manifest.json").read_text() == "{}"
+    assert (tmp_path / "target" / "requirements" / "roles" / "main.yml").exists()
+
+
+def test_unpack_refuses_paths_outside_target(tmp_path: Path):
+    bundle_file = tmp_path / "evil.tar.gz"
+    with tarfile.open(bundle_file, "w:gz") as archive:
+        member = tarfile.TarInfo("../escaped.txt")
+        member.size = 4
+        archive.addfile(member, io.BytesIO(b"evil"))
+    (tmp_path / "target").mkdir()
+
+    with pytest.raises(CollectionBundleException):
+        TarCollectionBundleArchive().unpack(bundle_file, tmp_path / "target")
+
+    assert not (tmp_path / "escaped.txt").exists()
+
+
+def test_unpack_invalid_file(tmp_path: Path):
+    (tmp_path / "bundle.tar.gz").write_text("not a bundle", encoding="utf-8")
+
+    with pytest.raises(CollectionBundleException):
+        TarCollectionBundleArchive().unpack(tmp_path / "bundle.tar.gz", tmp_path)
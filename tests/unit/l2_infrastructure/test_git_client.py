@@ -0,0 +1,131 @@
+from pathlib import Path
+
+import pytest
+from git import Repo  # type: ignore
+
+from ansible_self_service.l2_infrastructure.git_client import GitPythonGitClient
+
+
+def commit(repo: Repo, file_name: str, content: str) -> str:
+    path = Path(repo.working_dir) / file_name
+    path.write_text(content, encoding="utf-8")
+    repo.index.add([str(path)])
+    return repo.index.commit(f"Change {file_name}").hexsha
+
+
+@pytest.fixture
+def upstream(tmp_path: Path) -> Repo:
+    repo = Repo.init(tmp_path / "upstream", initial_branch="main")
+    commit(repo, "self-service.yaml", "items: {}\n")
+    return repo
+
+
+def test_clone_and_update_borrow_objects_from_mirror(tmp_path: Path, upstream: Repo):
+    mirror = tmp_path / "mirror.git"
+    client = GitPythonGitClient(mirror_directory=mirror)
+
+    client.clone_repo(upstream.working_dir, tmp_path / "clone")
+    new_revision = commit(upstream, "playbook.yml", "- hosts: localhost\n")
+    client.update(tmp_path / "clone")
+
+    assert client.get_revision(tmp_path / "clone") == new_revision
+    alternates = tmp_path / "clone" / ".git" / "objects" / "info" / "alternates"
+    assert str((mirror / "objects").resolve()) in alternates.read_text()
+    assert Repo(mirror).git.cat_file("-t", new_revision) == "commit"
+
+
+def test_update_adopts_mirror_for_existing_clone(tmp_path: Path, upstream: Repo):
+    GitPythonGitClient().clone_repo(upstream.working_dir, tmp_path / "clone")
+    client = GitPythonGitClient(mirror_directory=tmp_path / "mirror.git")
+
+    new_revision = commit(upstream, "playbook.yml", "- hosts: localhost\n")
+    client.update(tmp_path / "clone")
+
+    assert client.get_revision(tmp_path / "clone") == new_revision
+    assert (tmp_path / "clone" / ".git" / "objects" / "info" / "alternates").exists()
+
+
+def test_maintain_mirror_keeps_objects_of_clones(tmp_path: Path, upstream: Repo):
+    client = GitPythonGitClient(mirror_directory=tmp_path / "mirror.git")
+    commit(upstream, "playbook.yml", "- hosts: localhost\n")
+    client.clone_repo(upstream.working_dir, tmp_path / "clone")
+    checked_out = client.get_revision(tmp_path / "clone")
+    # rewrite upstream history, so the checked out commit is only referenced by the clone
+    upstream.head.reset("HEAD~1", index=True, working_tree=True)
+    commit(upstream, "other.yml", "- hosts: localhost\n")
+    client._fetch_into_mirror(upstream.working_dir)  # pylint: disable=protected-access
+
+    client.maintain_mirror([tmp_path / "clone"])
+
+    clone = Repo(tmp_path / "clone")
+    clone.git.fsck("--connectivity-only", "--no-dangling")  # raises on missing objects
+    assert clone.head.commit.hexsha == checked_out
+
+
+def test_maintain_mirror_keeps_recently_unreferenced_objects(
+    tmp_path: Path, upstream: Repo
+):
+    client = GitPythonGitClient(mirror_directory=tmp_path / "mirror.git")
+    client.clone_repo(upstream.working_dir, tmp_path / "clone")
+    fork = Repo.clone_from(upstream.working_dir, tmp_path / "fork")
+    commit(fork, "fork.yml", "- hosts: localhost\n")
+    # a file URL, as clones of local paths copy the objects instead of borrowing them
+    client.clone_repo(f"file://{fork.working_dir}", tmp_path / "fork-clone")
+
+    # e.g. a collection added by another process while this one listed the repos
+    client.maintain_mirror([tmp_path / "clone"])
+
+    Repo(tmp_path / "fork-clone").git.fsck("--connectivity-only", "--no-dangling")
+
+
+@pytest.mark.parametrize("with_mirror", [False, True])
+def test_update_fetches_at_most_once(
+    tmp_path: Path, upstream: Repo, mocker, with_mirror
+):
+    client = GitPythonGitClient(
+        mirror_directory=tmp_path / "mirror.git" if with_mirror else None
+    )
+    client.clone_repo(upstream.working_dir, tmp_path / "clone")
+    fetch = mocker.spy(client, "_fetch")
+
+    client.update(tmp_path / "clone")
+    assert fetch.call_count == 0  # already at the remote tip
+
+    new_revision = commit(upstream, "playbook.yml", "- hosts: localhost\n")
+    client.update(tmp_path / "clone")
+    assert fetch.call_count == 1
+    assert client.get_revision(tmp_path / "clone") == new_revision
+    assert Repo(tmp_path / "clone").head.ref.name == "main"
+
+
+def test_update_to_known_commit_does_not_fetch(tmp_path: Path, upstream: Repo, mocker):
+    first_revision = upstream.head.commit.hexsha
+    commit(upstream, "playbook.yml", "- hosts: localhost\n")
+    client = GitPythonGitClient()
+    client.clone_repo(upstream.working_dir, tmp_path / "clone")
+    fetch = mocker.spy(client, "_fetch")
+
+    client.update(tmp_path / "clone", revision=first_revision[:10])
+    client.update(tmp_path / "clone", revision=first_revision)
+
+    assert fetch.call_count == 0
+    assert client.get_revision(tmp_path / "clone") == first_revision
+
+
+def test_bundle_round_trip_checks_out_revision_with_origin(
+    tmp_path: Path, upstream: Repo
+):
+    exported_revision = upstream.head.commit.hexsha
+    commit(upstream, "playbook.yml", "- hosts: localhost\n")
+    client = GitPythonGitClient()
+
+    client.create_bundle(
+        Path(upstream.working_dir), exported_revision, tmp_path / "repo.bundle"
+    )
+    client.clone_bundle(
+        tmp_path / "repo.bundle", "https://example.com/apps.git", tmp_path / "clone"
+    )
+
+    assert client.get_revision(tmp_path / "clone") == exported_revision
+    assert client.get_origin_url(tmp_path / "clone") == "https://example.com/apps.git"
+    assert "refs/self-service" not in upstream.git.for_each_ref()
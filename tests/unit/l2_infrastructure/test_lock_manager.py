@@ -0,0 +1,69 @@
+import multiprocessing
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from ansible_self_service.l2_infrastructure.lock_manager import FileLockManager
+from ansible_self_service.l4_core.models import Config
+
+
+def create_lock_manager(data_dir: Path) -> FileLockManager:
+    return FileLockManager(
+        Config(MagicMock(), override_app_data_dir=data_dir), MagicMock()
+    )
+
+
+def hold_write_lock(data_dir: Path, name: str, acquired, seconds: float):
+    with create_lock_manager(data_dir).write(name):
+        acquired.set()
+        time.sleep(seconds)
+
+
+def test_reader_waits_for_writer_of_another_process(tmp_path: Path):
+    lock_manager = create_lock_manager(tmp_path)
+    context = multiprocessing.get_context("spawn")
+    acquired = context.Event()
+    writer = context.Process(
+        target=hold_write_lock, args=(tmp_path, "collection/a", acquired, 0.5)
+    )
+    writer.start()
+    try:
+        assert acquired.wait(timeout=30)
+        with lock_manager.read("collection/b"):
+            pass  # other collections are not blocked
+        with lock_manager.read("collection/a"):
+            pass
+    finally:
+        writer.join()
+
+    contended, unrelated = lock_manager.statistics()
+    assert (contended.name, contended.acquisitions, contended.contended) == (
+        "collection/a",
+        1,
+        1,
+    )
+    assert contended.max_wait > 0.1
+    assert (unrelated.name, unrelated.contended) == ("collection/b", 0)
+
+
+def test_locks_are_reentrant(tmp_path: Path):
+    lock_manager = create_lock_manager(tmp_path)
+
+    with lock_manager.write("state/a/b"):
+        with lock_manager.read("state/a/b"):
+            with lock_manager.write("state/a/b"):
+                pass
+
+    (statistics,) = lock_manager.statistics()
+    assert statistics.acquisitions == 1
+
+
+def test_read_lock_cannot_be_upgraded(tmp_path: Path):
+    lock_manager = create_lock_manager(tmp_path)
+
+    with lock_manager.read("state/a/b"):
+        with pytest.raises(RuntimeError):
+            with lock_manager.write("state/a/b"):
+                pass
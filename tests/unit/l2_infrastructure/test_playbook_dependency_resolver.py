@@ -0,0 +1,74 @@
+from pathlib import Path
+
+from ansible_self_service.l2_infrastructure.playbook_dependency_resolver import (
+    YamlPlaybookDependencyResolver,
+)
+
+PLAYBOOK = """
+- hosts: localhost
+  vars_files:
+    - vars/common.yml
+  roles:
+    - base
+    - community.general.some_role
+  tasks:
+    - include_tasks: tasks/setup.yml
+    - block:
+        - include_vars: "vars/{{ ansible_distribution }}.yml"
+- import_playbook: other.yml
+"""
+SETUP_TASKS = """
+- import_role:
+    name: extra
+- import_tasks: nested.yml
+"""
+BASE_META = """
+dependencies:
+  - role: common
+"""
+
+
+def write(path: Path, content: str = ""):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+
+
+def test_resolve_collects_static_and_dynamic_references(tmp_path: Path):
+    playbook = tmp_path / "playbooks" / "app.yml"
+    write(playbook, PLAYBOOK)
+    write(tmp_path / "playbooks" / "other.yml", "- hosts: localhost\n")
+    write(tmp_path / "playbooks" / "tasks" / "setup.yml", SETUP_TASKS)
+    write(tmp_path / "playbooks" / "tasks" / "nested.yml", "- debug: {}\n")
+    write(tmp_path / "roles" / "base" / "meta" / "main.yml", BASE_META)
+    write(tmp_path / "roles" / "common" / "tasks" / "main.yml")
+    write(tmp_path / "roles" / "extra" / "tasks" / "main.yml")
+
+    dependencies = YamlPlaybookDependencyResolver().resolve(tmp_path, playbook)
+
+    playbook_directory = tmp_path / "playbooks"
+    assert {
+        playbook,
+        playbook_directory / "other.yml",
+        playbook_directory / "vars" / "common.yml",
+        playbook_directory / "tasks" / "setup.yml",
+        playbook_directory / "tasks" / "nested.yml",
+        playbook_directory / "group_vars",
+        tmp_path / "roles" / "base",
+        tmp_path / "roles" / "common",
+        tmp_path / "roles" / "extra",
+        # the templated vars file can only be narrowed down to the directory of the playbook
+        playbook_directory,
+    } <= dependencies
+    assert not any("community.general" in str(path) for path in dependencies)
+
+
+def test_resolve_tolerates_missing_and_broken_files(tmp_path: Path):
+    playbook = tmp_path / "app.yml"
+    write(
+        playbook,
+        "- hosts: localhost\n  tasks:\n    - include_tasks: missing.yml\n  vars_files: [",
+    )
+
+    dependencies = YamlPlaybookDependencyResolver().resolve(tmp_path, playbook)
+
+    assert playbook in dependencies
@@ -0,0 +1,78 @@
+import os
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from ansible_self_service.l2_infrastructure.privileged_helper import (
+    PrivilegedHelper,
+    PrivilegedHelperClient,
+    PrivilegedHelperError,
+    encode_job,
+)
+from ansible_self_service.l4_core.exceptions import AnsibleRunTimeoutException
+from ansible_self_service.l4_core.models import AnsibleRunResult, Config
+
+
+def fake_run(playbook_path, timeout, **_):
+    if playbook_path.name == "slow.yml":
+        raise AnsibleRunTimeoutException(timeout)
+    return AnsibleRunResult(stdout=f"ran {playbook_path}", stderr="", return_code=0)
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> Config:
+    return Config(None, override_app_data_dir=tmp_path)  # type: ignore
+
+
+def start_helper(config: Config, allowed_uid: int, runner) -> PrivilegedHelper:
+    helper = PrivilegedHelper(
+        config.privileged_helper_socket, allowed_uid, runner, idle_timeout=0.5
+    )
+    assert helper.bind()
+    threading.Thread(target=helper.serve, daemon=True).start()
+    return helper
+
+
+def test_batch_runs_in_helper(config, tmp_path):
+    runner = MagicMock()
+    runner.run.side_effect = fake_run
+    start_helper(config, os.getuid(), runner)
+    client = PrivilegedHelperClient(config, MagicMock())
+
+    installed, timed_out, invalid = client.run_batch(
+        [
+            encode_job(tmp_path, Path("site.yml"), tags=["install"]),
+            encode_job(tmp_path, Path("slow.yml"), timeout=5.0),
+            {"playbook_path": "site.yml", "working_directory": "relative"},
+        ]
+    )
+
+    assert installed == AnsibleRunResult("ran site.yml", "", 0)
+    assert runner.run.call_args_list[0].kwargs["tags"] == ("install",)
+    assert isinstance(timed_out, AnsibleRunTimeoutException)
+    assert timed_out.duration == 5.0
+    assert isinstance(invalid, PrivilegedHelperError)
+
+
+def test_other_users_are_refused(config, tmp_path):
+    if os.getuid() == 0:
+        pytest.skip("root is always allowed")
+    runner = MagicMock()
+    start_helper(config, os.getuid() + 1, runner)
+
+    with pytest.raises(PrivilegedHelperError, match="Permission denied"):
+        PrivilegedHelperClient(config, MagicMock()).run_batch(
+            [encode_job(tmp_path, Path("site.yml"))]
+        )
+    runner.run.assert_not_called()
+
+
+def test_second_helper_leaves_running_one_alone(config):
+    start_helper(config, os.getuid(), MagicMock())
+
+    second = PrivilegedHelper(config.privileged_helper_socket, os.getuid(), MagicMock())
+
+    assert not second.bind()
+    assert config.privileged_helper_socket.is_socket()
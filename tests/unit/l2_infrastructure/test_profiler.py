@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from ansible_self_service.l2_infrastructure.profiler import (
+    MERGED_PROFILE,
+    Profiler,
+    profile_directory,
+)
+from ansible_self_service.l2_infrastructure.utils import processify
+
+
+def busy_worker(count: int) -> int:
+    return sum(range(count))
+
+
+@processify
+def processified_busy_worker(count: int) -> int:
+    return busy_worker(count)
+
+
+def test_profiler_covers_worker_processes(tmp_path: Path):
+    profiler = Profiler(tmp_path)
+
+    profiler.start()
+    try:
+        assert processified_busy_worker(1000) == sum(range(1000))
+    finally:
+        profiler.stop()
+    report_file = profiler.report()
+
+    assert profile_directory() is None
+    profiles = sorted(path.name.split("-")[0] for path in tmp_path.glob("*.prof"))
+    assert profiles == ["main", "processified_busy_worker"]
+    assert (tmp_path / MERGED_PROFILE).exists()
+    assert "busy_worker" in report_file.read_text(encoding="utf-8")
@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from ansible_self_service.l2_infrastructure.resource_governor import (
+    CgroupV2,
+    GovernedAnsibleRunner,
+    ResourceGovernor,
+)
+from ansible_self_service.l4_core.models import (
+    AnsibleRunResult,
+    ResourceClass,
+    ResourceLimits,
+)
+
+
+@pytest.fixture
+def cgroup_root(tmp_path: Path) -> Path:
+    root = tmp_path / "cgroup"
+    (root / "user" / "app.scope").mkdir(parents=True)
+    (root / "cgroup.controllers").write_text("cpu io memory", encoding="utf-8")
+    (root / "user" / "cgroup.subtree_control").write_text("memory", encoding="utf-8")
+    (tmp_path / "proc_cgroup").write_text("0::/user/app.scope\n", encoding="utf-8")
+    return root
+
+
+def test_join_creates_limited_sibling(cgroup_root):
+    cgroup = CgroupV2(cgroup_root, cgroup_root.parent / "proc_cgroup")
+
+    cgroup.join("background", {"cpu.weight": "10", "memory.max": "1024"})
+
+    sibling = cgroup_root / "user" / "background"
+    assert (sibling / "cpu.weight").read_text(encoding="utf-8") == "10"
+    assert (sibling / "memory.max").read_text(encoding="utf-8") == "1024"
+    assert (sibling / "cgroup.procs").read_text(encoding="utf-8") == str(os.getpid())
+    subtree_control = cgroup_root / "user" / "cgroup.subtree_control"
+    assert subtree_control.read_text(encoding="utf-8") == "+cpu"
+
+
+def test_join_requires_cgroup_v2(cgroup_root):
+    (cgroup_root / "cgroup.controllers").unlink()
+    cgroup = CgroupV2(cgroup_root, cgroup_root.parent / "proc_cgroup")
+
+    with pytest.raises(OSError):
+        cgroup.join("background", {"cpu.weight": "10"})
+
+
+def test_limits_not_in_force_are_reported(cgroup_root):
+    (cgroup_root / "cgroup.controllers").unlink()
+    limits = ResourceLimits(
+        ResourceClass.BACKGROUND, nice=os.nice(0), cpu_weight=10, memory_max=1024
+    )
+    governor = ResourceGovernor(
+        limits,
+        MagicMock(),
+        CgroupV2(cgroup_root, cgroup_root.parent / "proc_cgroup"),
+    )
+
+    in_force = governor.apply()
+
+    assert in_force.cpu_weight is None
+    assert in_force.memory_max is None
+    assert in_force.nice == limits.nice
+    assert governor.apply() is in_force
+
+
+def test_runs_are_limited_and_report_limits():
+    limits = ResourceLimits(
+        ResourceClass.BACKGROUND, nice=os.nice(0), max_concurrency=2
+    )
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def run(*_, **__):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+        return AnsibleRunResult(stdout="", stderr="", return_code=0)
+
+    inner = MagicMock()
+    inner.run.side_effect = run
+    runner = GovernedAnsibleRunner(inner, ResourceGovernor(limits, MagicMock()))
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(runner.run(Path("."), Path("site.yml")))
+        )
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) == 2
+    assert len(results) == 5
+    assert all(result.resource_limits == limits for result in results)
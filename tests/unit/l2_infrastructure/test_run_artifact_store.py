@@ -0,0 +1,94 @@
+import os
+import zlib
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from ansible_self_service.l2_infrastructure.run_artifact_store import (
+    CompressedRunArtifactStore,
+)
+from ansible_self_service.l4_core.models import (
+    AnsibleRunResult,
+    AppPlaybookTag,
+    Config,
+)
+
+REVISION = "0123456789abcdef0123456789abcdef01234567"
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> Config:
+    return Config(None, override_app_data_dir=tmp_path)  # type: ignore
+
+
+def put(store, started_at, stdout, app_name="cowsay", return_code=0, stderr=""):
+    return store.put(
+        AnsibleRunResult(stdout=stdout, stderr=stderr, return_code=return_code),
+        collection_name="tools",
+        app_name=app_name,
+        tag=AppPlaybookTag.STATUS,
+        check_mode=True,
+        started_at=started_at,
+        duration=1.5,
+        revision=REVISION,
+    )
+
+
+def test_put_query_and_read(config):
+    store = CompressedRunArtifactStore(config, MagicMock())
+    stored = [
+        put(store, float(timestamp), f'{{"run": {timestamp}}}')
+        for timestamp in range(5)
+    ]
+    failed = put(store, 2.5, "{}", app_name="fortune", return_code=2, stderr="boom")
+
+    assert list(store.query(collection_name="tools", app_name="cowsay")) == stored
+    assert [artifact.started_at for artifact in store.query(2, 3)] == [2.0, 2.5, 3.0]
+    (fortune,) = store.query(app_name="fortune")
+    assert fortune == failed
+    assert not fortune.was_successful and fortune.revision == REVISION
+    assert store.read(fortune) == ("{}", "boom")
+    assert store.read(fortune, stdout=False) == ("", "boom")
+    assert store.read(stored[3]) == ('{"run": 3}', "")
+    assert len({artifact.run_id for artifact in store.query()}) == 6
+
+
+def test_overlapping_runs_are_kept_in_start_order(config):
+    store = CompressedRunArtifactStore(config, MagicMock())
+    # an installation finishes after a status check that started later
+    check = put(store, 10.0, "check")
+    install = put(store, 5.0, "install")
+    later = put(store, 20.0, "later")
+
+    assert list(store.query(app_name="cowsay")) == [install, check, later]
+    assert list(store.query(since=6.0)) == [check, later]
+    assert list(store.query(since=4.0, until=10.0)) == [install, check]
+
+
+def test_identical_output_is_stored_once(config):
+    store = CompressedRunArtifactStore(config, MagicMock())
+    first = put(store, 1.0, "same" * 1000)
+    second = put(store, 2.0, "same" * 1000)
+
+    assert first.run_id != second.run_id
+    assert first.stdout_digest == second.stdout_digest
+    assert first.stored_size < first.stdout_size
+    objects = list((config.run_artifact_store_directory / "objects").glob("*/*.z"))
+    assert len(objects) == 2  # stdout and the empty stderr
+
+
+def test_oldest_runs_are_pruned_beyond_max_size(config):
+    outputs = [os.urandom(1000).hex() for _ in range(4)]
+    size = len(zlib.compress(outputs[0].encode("utf-8")))
+    store = CompressedRunArtifactStore(
+        config, MagicMock(), max_size=int(3.5 * size), prune_to=0.7
+    )
+    for timestamp, output in enumerate(outputs):
+        put(store, float(timestamp), output)
+
+    # the fourth run exceeded the limit, the two newest runs fit into 70% of it
+    assert [artifact.started_at for artifact in store.query()] == [2.0, 3.0]
+    objects = list((config.run_artifact_store_directory / "objects").glob("*/*.z"))
+    assert len(objects) == 3  # two stdouts and the shared empty stderr
+    assert store.prune() == 0
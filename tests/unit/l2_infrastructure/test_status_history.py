@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import pytest
+
+from ansible_self_service.l2_infrastructure.status_history import (
+    DAY,
+    BinaryStatusHistory,
+)
+from ansible_self_service.l4_core.models import AppStatus, Config, StatusCheck
+
+REVISION = "0123456789abcdef0123456789abcdef01234567"
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> Config:
+    return Config(None, override_app_data_dir=tmp_path)  # type: ignore
+
+
+def check(checked_at, status=AppStatus.INSTALLED, app_name="cowsay", **kwargs):
+    return StatusCheck("tools", app_name, checked_at, status, 1.5, **kwargs)
+
+
+def test_append_and_query_ranges(config):
+    history = BinaryStatusHistory(config, compaction_interval=float("inf"))
+    appended = [
+        check(float(timestamp), revision=REVISION, changed=3) for timestamp in range(10)
+    ]
+    for status_check in appended:
+        history.append(status_check)
+    history.append(check(4.5, app_name="fortune", timed_out=True))
+
+    assert list(history.query(collection_name="tools", app_name="cowsay")) == appended
+    assert [status_check.checked_at for status_check in history.query(3, 5)] == [
+        3.0,
+        4.0,
+        4.5,
+        5.0,
+    ]
+    (fortune,) = history.query(app_name="fortune")
+    assert fortune.timed_out and fortune.revision is None
+    # a collection named history keeps its own state directory
+    assert config.status_history_directory.parent == config.internal_data_dir
+    assert list(history.query(collection_name="other")) == []
+
+
+def test_compaction_keeps_status_changes_of_old_checks(config):
+    history = BinaryStatusHistory(config, compact_after=10 * DAY, retention=100 * DAY)
+    now = 200 * DAY
+    statuses = [
+        (90 * DAY, AppStatus.INSTALLED),  # older than the retention
+        (180 * DAY, AppStatus.INSTALLED),
+        (181 * DAY, AppStatus.INSTALLED),
+        (182 * DAY, AppStatus.UPGRADABLE),
+        (183 * DAY, AppStatus.UPGRADABLE),
+        (195 * DAY, AppStatus.UPGRADABLE),  # recent
+    ]
+    for checked_at, status in statuses:
+        history.append(check(checked_at, status))
+    history.append(check(now, AppStatus.UPGRADABLE))
+
+    assert [status_check.checked_at for status_check in history.query()] == [
+        180 * DAY,
+        182 * DAY,
+        195 * DAY,
+        now,
+    ]
+    # compacting now drops them all, the checks are decades old
+    assert history.compact() == 4
+    assert list(history.query()) == []
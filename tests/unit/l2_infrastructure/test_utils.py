@@ -0,0 +1,16 @@
+import time
+from multiprocessing import Process
+
+from ansible_self_service.l2_infrastructure.utils import _kill_process_group
+
+
+def test_kill_child_without_own_process_group():
+    # like a processified child killed before it got to call setsid
+    process = Process(target=time.sleep, args=(60,))
+    process.start()
+
+    start = time.monotonic()
+    _kill_process_group(process)
+
+    assert not process.is_alive()
+    assert time.monotonic() - start < 10
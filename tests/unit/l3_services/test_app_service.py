@@ -0,0 +1,134 @@
+import asyncio
+from pathlib import Path
+from typing import Dict, List, Optional
+from unittest.mock import MagicMock
+
+from ansible_self_service.l3_services.app import AppService
+from ansible_self_service.l3_services.dto import AppCollection, AppStatus
+from ansible_self_service.l4_core.models import App as DomainApp
+from ansible_self_service.l4_core.models import AnsibleRunResult, AppState
+
+
+class FakeAsyncAnsibleRunner:
+    """Sleeps instead of running Ansible and records how many runs overlap and which ones were cancelled."""
+
+    def __init__(
+        self, durations: Dict[str, float], failing: Optional[List[str]] = None
+    ):
+        self._durations = durations
+        self._failing = failing or []
+        self.running = 0
+        self.peak = 0
+        self.cancelled: List[str] = []
+
+    async def run(self, working_directory, playbook_path, *_, **__):
+        name = playbook_path.stem
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self._durations.get(name, 0.01))
+            if name in self._failing:
+                raise RuntimeError(f"cannot start Ansible for {name}")
+        except asyncio.CancelledError:
+            self.cancelled.append(name)
+            raise
+        finally:
+            self.running -= 1
+        return AnsibleRunResult(stdout="", stderr="", return_code=0)
+
+
+def create_service(runner: FakeAsyncAnsibleRunner, names: List[str]):
+    analyzer = MagicMock()
+    analyzer.SIGNAL_INSTALLED = "INSTALLED"
+    analyzer.SIGNAL_NOT_INSTALLED = "NOT_INSTALLED"
+    analyzer.summarize.return_value.has_signal.side_effect = (
+        lambda signal: signal == "NOT_INSTALLED"
+    )
+    domain_collection = MagicMock(
+        directory=Path("/collection"),
+        requirements_error=None,
+        revision="abc",
+        **{"playbook_errors.return_value": None},
+    )
+    domain_collection.name = "tools"
+    domain_apps = {
+        name: DomainApp(
+            _ansible_runner=MagicMock(),
+            _ansible_result_analyzer=analyzer,
+            _async_ansible_runner=runner,
+            app_collection=domain_collection,
+            name=name,
+            description=name,
+            categories=[],
+            playbook_path=Path(f"/collection/{name}.yml"),
+            state=AppState(),
+        )
+        for name in names
+    }
+    domain_collection.__getitem__.side_effect = domain_apps.__getitem__
+    domain_collection.list_apps.return_value = list(domain_apps.values())
+    app_catalog = MagicMock()
+    app_catalog.get_collection_by_name.return_value = domain_collection
+    service = AppService(app_catalog, MagicMock())
+    apps = service.get_apps_for_collection(AppCollection.from_domain(domain_collection))
+    return service, apps
+
+
+async def refresh_all(service: AppService, apps, **kwargs):
+    return [result async for result in service.refresh_app_states(apps, **kwargs)]
+
+
+def test_refresh_runs_at_most_concurrency_apps_at_a_time():
+    runner = FakeAsyncAnsibleRunner({})
+    service, apps = create_service(runner, [f"app{number}" for number in range(6)])
+
+    results = asyncio.run(refresh_all(service, apps, concurrency=2))
+
+    assert runner.peak == 2
+    assert len(results) == 6
+    assert all(result.error is None for result in results)
+    assert {result.app.status for result in results} == {AppStatus.NOT_INSTALLED}
+
+
+def test_refresh_budget_cancels_and_times_out_remaining_apps():
+    runner = FakeAsyncAnsibleRunner({"slow": 60.0})
+    service, apps = create_service(runner, ["quick", "slow"])
+
+    results = asyncio.run(refresh_all(service, apps, budget=0.5))
+
+    by_name = {result.app.name: result for result in results}
+    assert by_name["quick"].error is None
+    assert "budget exhausted" in by_name["slow"].error
+    assert by_name["slow"].app.timed_out
+    assert by_name["slow"].app.status == AppStatus.UNKNOWN
+    assert runner.cancelled == ["slow"]
+    assert runner.running == 0
+
+
+def test_refresh_cancels_pending_runs_when_the_caller_stops_early():
+    runner = FakeAsyncAnsibleRunner({"slow1": 60.0, "slow2": 60.0})
+    service, apps = create_service(runner, ["quick", "slow1", "slow2"])
+
+    async def first_result():
+        results = service.refresh_app_states(apps)
+        async for result in results:
+            await results.aclose()
+            return result
+        return None
+
+    result = asyncio.run(first_result())
+
+    assert result.app.name == "quick"
+    assert sorted(runner.cancelled) == ["slow1", "slow2"]
+    assert runner.running == 0
+
+
+def test_refresh_reports_errors_per_app():
+    runner = FakeAsyncAnsibleRunner({}, failing=["broken"])
+    service, apps = create_service(runner, ["broken", "fine"])
+
+    results = asyncio.run(refresh_all(service, apps))
+
+    by_name = {result.app.name: result for result in results}
+    assert by_name["broken"].error == "RuntimeError: cannot start Ansible for broken"
+    assert by_name["fine"].error is None
@@ -0,0 +1,238 @@
+from pathlib import Path
+from unittest.mock import MagicMock, PropertyMock
+
+import pytest
+
+from ansible_self_service.l4_core.exceptions import AnsibleRunTimeoutException
+from ansible_self_service.l4_core.models import (
+    App,
+    AppPlaybookTag,
+    AppState,
+    AppStatus,
+    StatusCheck,
+    StatusStatistics,
+)
+
+
+def create_app(
+    ansible_runner,
+    timeouts=None,
+    playbook_errors=None,
+    status_history=None,
+    run_artifact_store=None,
+) -> App:
+    analyzer = MagicMock()
+    analyzer.SIGNAL_INSTALLED = "INSTALLED"
+    analyzer.SIGNAL_NOT_INSTALLED = "NOT_INSTALLED"
+    analyzer.summarize.return_value.has_signal.side_effect = (
+        lambda signal: signal == "NOT_INSTALLED"
+    )
+    return App(
+        _ansible_runner=ansible_runner,
+        _ansible_result_analyzer=analyzer,
+        app_collection=MagicMock(
+            directory=Path("/collection"),
+            **{"playbook_errors.return_value": playbook_errors},
+        ),
+        name="cowsay",
+        description="Cow",
+        categories=[],
+        playbook_path=Path("/collection/cowsay.yml"),
+        state=AppState(status=AppStatus.INSTALLED),
+        timeouts=timeouts or {},
+        _status_history=status_history,
+        _run_artifact_store=run_artifact_store,
+    )
+
+
+def test_timeout_precedence():
+    app = create_app(MagicMock(), timeouts={"install": 600.0})
+
+    assert app.timeout(AppPlaybookTag.STATUS) == App.DEFAULT_TIMEOUTS["status"]
+    assert app.timeout(AppPlaybookTag.INSTALL) == 600.0
+    assert app.timeout(AppPlaybookTag.INSTALL, override=5.0) == 5.0
+
+
+def test_refresh_status_records_duration():
+    runner = MagicMock()
+    app = create_app(runner, timeouts={"status": 30.0})
+
+    app.refresh_status()
+
+    assert runner.run.call_args.kwargs["timeout"] == 30.0
+    assert app.state.status == AppStatus.NOT_INSTALLED
+    assert app.state.duration is not None
+    assert not app.state.timed_out
+
+
+def test_refresh_status_records_timeout():
+    runner = MagicMock()
+    runner.run.side_effect = AnsibleRunTimeoutException(30.0)
+    app = create_app(runner)
+    observer = MagicMock()
+    app.state.attach(observer)
+
+    with pytest.raises(AnsibleRunTimeoutException):
+        app.refresh_status(timeout=30.0)
+
+    assert app.state.status == AppStatus.UNKNOWN
+    assert app.state.timed_out
+    # observers are only notified once the whole outcome is set
+    observer.update.assert_called_once_with(
+        observable=app.state, attr="status", value=AppStatus.UNKNOWN
+    )
+
+
+def create_checked_app(checked_at, duration=5.0, uses=0, revision="abc") -> App:
+    app = create_app(MagicMock())
+    app.state = AppState(
+        status=AppStatus.INSTALLED,
+        duration=duration,
+        checked_at=checked_at,
+        revision=revision,
+        uses=uses,
+    )
+    return app
+
+
+@pytest.mark.parametrize(
+    "checked_at,revision,stale",
+    [
+        (None, None, True),
+        (900.0, "abc", False),
+        (900.0, "def", True),
+        (-3000.0, "abc", True),
+    ],
+)
+def test_is_stale(checked_at, revision, stale):
+    app = create_checked_app(checked_at, revision=revision)
+    assert app.is_stale("abc", max_age=3600.0, now=1000.0) is stale
+
+
+def test_refresh_priority_orders_stale_quick_and_used_apps_first():
+    now = 100_000.0
+    fresh = create_checked_app(now - 60)
+    old = create_checked_app(now - 7200)
+    old_slow = create_checked_app(now - 7200, duration=120.0)
+    old_used = create_checked_app(now - 7200, uses=5)
+    other_revision = create_checked_app(now - 60, revision="def")
+    apps = [fresh, old, old_slow, old_used, other_revision]
+
+    ordered = sorted(
+        apps, key=lambda app: app.refresh_priority("abc", now), reverse=True
+    )
+
+    assert ordered == [other_revision, old_used, old, old_slow, fresh]
+
+
+def test_install_counts_uses():
+    app = create_app(MagicMock())
+    observer = MagicMock()
+    app.state.attach(observer)
+
+    app.install()
+
+    assert app.state.uses == 1
+    observer.update.assert_any_call(observable=app.state, attr="uses", value=1)
+
+
+def test_invalid_playbook_is_not_run():
+    runner = MagicMock()
+    app = create_app(
+        runner, playbook_errors={"cowsay": "ERROR! the role 'cow' was not found"}
+    )
+
+    app.refresh_status()
+
+    assert not app.install()
+    runner.run.assert_not_called()
+    assert app.state.status == AppStatus.UNKNOWN
+
+
+def test_refresh_status_appends_to_status_history():
+    status_history = MagicMock()
+    runner = MagicMock()
+    runner.run.side_effect = [None, AnsibleRunTimeoutException(30.0)]
+    app = create_app(runner, status_history=status_history)
+    app.app_collection.name = "tools"
+    app.app_collection.revision = "abc"
+
+    app.refresh_status()
+    with pytest.raises(AnsibleRunTimeoutException):
+        app.refresh_status()
+
+    checked, timed_out = [call.args[0] for call in status_history.append.call_args_list]
+    assert (checked.collection_name, checked.app_name) == ("tools", "cowsay")
+    assert checked.status == AppStatus.NOT_INSTALLED
+    assert checked.revision == "abc"
+    assert not checked.timed_out
+    assert timed_out.timed_out and timed_out.status == AppStatus.UNKNOWN
+
+
+def test_runs_are_kept_in_run_artifact_store():
+    run_artifact_store = MagicMock()
+    runner = MagicMock()
+    app = create_app(runner, run_artifact_store=run_artifact_store)
+    app.app_collection.name = "tools"
+    app.app_collection.revision = "abc"
+
+    app.refresh_status()
+
+    (status_run,) = run_artifact_store.put.call_args_list
+    assert status_run.args == (runner.run.return_value,)
+    assert (status_run.kwargs["collection_name"], status_run.kwargs["app_name"]) == (
+        "tools",
+        "cowsay",
+    )
+    assert status_run.kwargs["tag"] == AppPlaybookTag.STATUS
+    assert status_run.kwargs["check_mode"]
+    assert status_run.kwargs["revision"] == "abc"
+    assert status_run.kwargs["duration"] >= 0
+
+
+def test_refresh_status_uses_known_revision():
+    run_artifact_store = MagicMock()
+    status_history = MagicMock()
+    app = create_app(
+        MagicMock(),
+        status_history=status_history,
+        run_artifact_store=run_artifact_store,
+    )
+    revision = PropertyMock(return_value="abc")
+    type(app.app_collection).revision = revision
+
+    app.refresh_status(revision="def")
+
+    # the revision is not read from the repo for the validation, the run artifact or the recorded state
+    revision.assert_not_called()
+    app.app_collection.playbook_errors.assert_called_once_with("def")
+    assert run_artifact_store.put.call_args.kwargs["revision"] == "def"
+    assert status_history.append.call_args.args[0].revision == "def"
+    assert app.state.revision == "def"
+
+
+def test_status_statistics():
+    def check(checked_at, status, duration=1.0, timed_out=False):
+        return StatusCheck(
+            "tools", "cowsay", checked_at, status, duration, timed_out=timed_out
+        )
+
+    statistics = StatusStatistics.from_checks(
+        [
+            check(1, AppStatus.INSTALLED, 2.0),
+            check(2, AppStatus.UPGRADABLE, 4.0),
+            check(3, AppStatus.INSTALLED, 6.0),
+            check(4, AppStatus.UPGRADABLE, 8.0),
+            check(5, AppStatus.UNKNOWN, 300.0, timed_out=True),
+            check(6, AppStatus.UPGRADABLE, 10.0),
+        ]
+    )
+
+    assert statistics.checks == 6
+    assert statistics.timeouts == 1
+    # the timed out check did not observe a status, so it neither flaps nor ends the pending upgrade
+    assert statistics.flaps == 3
+    assert statistics.p50_duration == 6.0
+    assert statistics.p95_duration == 10.0
+    assert statistics.last_status == AppStatus.UPGRADABLE
+    assert statistics.upgradable_since == 4
@@ -0,0 +1,246 @@
+import gc
+import json
+import shutil
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from ansible_self_service.l4_core.exceptions import (
+    CollectionBundleException,
+    RequirementsInstallationException,
+)
+from ansible_self_service.l4_core.catalog import AppCatalog
+from ansible_self_service.l4_core.catalog_bundle import CollectionBundle
+from ansible_self_service.l4_core.collection import AppCollection
+from ansible_self_service.l4_core.factories import AppFactory
+from ansible_self_service.l4_core.models import AppCategory, Config
+
+REQUIREMENTS = "collections:\n  - name: community.general\n"
+
+
+def create_catalog(tmp_path: Path, installer: MagicMock) -> AppCatalog:
+    config = Config(MagicMock(), override_app_data_dir=tmp_path / "data")
+    git_client = MagicMock()
+    git_client.is_git_directory.return_value = True
+    return AppCatalog(
+        _config=config,
+        _git_client=git_client,
+        _app_collection_config_parser=MagicMock(),
+        _playbook_dependency_resolver=MagicMock(),
+        _requirements_installer=installer,
+        _collection_bundle_archive=MagicMock(),
+    )
+
+
+def add_collection(catalog: AppCatalog, name: str, requirements: str):
+    directory = catalog.get_directory_for_collection(name)
+    directory.mkdir(parents=True)
+    (directory / "requirements.yml").write_text(requirements, encoding="utf-8")
+
+
+def fake_install(working_directory, requirements_files, target_directory):
+    (target_directory / "collections").mkdir(parents=True)
+
+
+def test_identical_requirements_are_installed_once(tmp_path: Path):
+    installer = MagicMock()
+    installer.install.side_effect = fake_install
+    catalog = create_catalog(tmp_path, installer)
+    add_collection(catalog, "tools", REQUIREMENTS)
+    add_collection(catalog, "tools-fork", REQUIREMENTS)
+
+    directories = {
+        catalog.install_requirements(collection) for collection in catalog.list()
+    }
+
+    assert installer.install.call_count == 1
+    assert len(directories) == 1
+    assert all(
+        collection.requirements_directory in directories
+        for collection in catalog.list()
+    )
+
+
+def test_failed_install_is_reported_on_collection(tmp_path: Path):
+    installer = MagicMock()
+    installer.install.side_effect = RequirementsInstallationException("offline")
+    catalog = create_catalog(tmp_path, installer)
+    add_collection(catalog, "tools", REQUIREMENTS)
+    collection = catalog.get_collection_by_name("tools")
+
+    assert catalog.install_requirements(collection) is None
+    assert collection.requirements_error == "offline"
+    assert collection.requirements_directory is None
+    assert not any(
+        catalog._config.requirements_root_directory.iterdir()
+    )  # pylint: disable=protected-access
+
+
+def test_garbage_collection_keeps_requirements_in_use(tmp_path: Path):
+    installer = MagicMock()
+    installer.install.side_effect = fake_install
+    catalog = create_catalog(tmp_path, installer)
+    add_collection(catalog, "tools", REQUIREMENTS)
+    collection = catalog.get_collection_by_name("tools")
+    used = catalog.install_requirements(collection)
+    (used.parent / "0123456789abcdef").mkdir()
+
+    removed = catalog.collect_requirements_garbage()
+
+    assert removed == ["0123456789abcdef"]
+    assert used.is_dir()
+
+
+def test_reload_collections_adds_and_drops_repos(tmp_path: Path):
+    catalog = create_catalog(tmp_path, MagicMock())
+    add_collection(catalog, "tools", REQUIREMENTS)
+    assert [collection.name for collection in catalog.list()] == ["tools"]
+    shutil.rmtree(catalog.get_directory_for_collection("tools"))
+    add_collection(catalog, "games", REQUIREMENTS)
+
+    change = catalog.reload_collections({"tools", "games"})
+
+    assert (change.added, change.removed, change.reloaded) == (["games"], ["tools"], {})
+    assert [collection.name for collection in catalog.list()] == ["games"]
+    assert not catalog.reload_collections({"games"})
+
+
+def create_catalog_with_apps(tmp_path: Path, collections: dict) -> AppCatalog:
+    """A catalog of collections whose configs declare apps with their category names."""
+    catalog = create_catalog(tmp_path, MagicMock())
+    for name in collections:
+        add_collection(catalog, name, REQUIREMENTS)
+        config_file = (
+            catalog.get_directory_for_collection(name) / AppCollection.CONFIG_FILE_NAME
+        )
+        config_file.write_text("", encoding="utf-8")
+    app_factory = AppFactory(MagicMock(), MagicMock(), MagicMock())
+
+    def from_file(collection, only=None):
+        return [], [
+            app_factory.create_app(
+                collection, app_name, "", categories, Path(f"{app_name}.yml")
+            )
+            for app_name, categories in collections[collection.name].items()
+        ]
+
+    catalog._app_collection_config_parser.from_file.side_effect = (  # pylint: disable=protected-access
+        from_file
+    )
+    return catalog
+
+
+def test_apps_are_looked_up_by_category(tmp_path: Path):
+    catalog = create_catalog_with_apps(
+        tmp_path,
+        {
+            "tools": {"fortune": ["fun"], "cowsay": ["fun", "cli"]},
+            "games": {"chess": ["fun", "board"]},
+        },
+    )
+
+    assert [app.name for app in catalog.apps_in_category("fun")] == [
+        "chess",
+        "cowsay",
+        "fortune",
+    ]
+    assert [app.app_collection.name for app in catalog.apps_in_category("cli")] == [
+        "tools"
+    ]
+    assert catalog.apps_in_category("unknown") == []
+    assert sorted(catalog.category_index()) == ["board", "cli", "fun"]
+
+
+def test_categories_are_interned_across_apps(tmp_path: Path):
+    catalog = create_catalog_with_apps(
+        tmp_path,
+        {"tools": {"cowsay": ["fun", "cli"]}, "games": {"chess": ["fun", "fun"]}},
+    )
+    (cowsay,) = catalog.get_collection_by_name("tools").list_apps()
+    (chess,) = catalog.get_collection_by_name("games").list_apps()
+
+    assert [category.name for category in cowsay.categories] == ["cli", "fun"]
+    assert [category.name for category in chess.categories] == ["fun"]
+    assert cowsay.categories[1] is chess.categories[0]
+    assert AppCategory.intern("fun") is chess.categories[0]
+
+
+def test_unused_categories_are_no_longer_interned():
+    category = AppCategory.intern("only-used-here")
+    assert AppCategory.intern("only-used-here") is category
+
+    del category
+    gc.collect()
+
+    # pylint: disable=protected-access
+    assert "only-used-here" not in AppCategory._interned
+
+
+def test_mirror_maintenance_keeps_repos_added_by_other_processes(tmp_path: Path):
+    catalog = create_catalog(tmp_path, MagicMock())
+    add_collection(catalog, "tools", REQUIREMENTS)
+    catalog.list()
+    # cloned by another process after this catalog was loaded
+    add_collection(catalog, "games", REQUIREMENTS)
+
+    catalog.maintain_git_mirror()
+
+    catalog._git_client.maintain_mirror.assert_called_once_with(  # pylint: disable=protected-access
+        [
+            catalog.get_directory_for_collection("games"),
+            catalog.get_directory_for_collection("tools"),
+        ]
+    )
+
+
+def fake_unpack(revision: str):
+    def unpack(bundle_file, staging_directory):
+        (staging_directory / AppCatalog.BUNDLE_MANIFEST).write_text(
+            json.dumps(
+                {
+                    "format": CollectionBundle.FORMAT,
+                    "name": "tools",
+                    "url": "https://example.com/tools.git",
+                    "revision": revision,
+                    "requirements_digest": None,
+                    "snapshot": {},
+                }
+            ),
+            encoding="utf-8",
+        )
+
+    return unpack
+
+
+def test_import_with_revision_mismatch_leaves_no_collection_behind(tmp_path: Path):
+    catalog = create_catalog(tmp_path, MagicMock())
+    # pylint: disable=protected-access
+    catalog._collection_bundle_archive.unpack.side_effect = fake_unpack("a" * 40)
+    catalog._git_client.clone_bundle.side_effect = (
+        lambda bundle_file, url, target_dir: target_dir.mkdir()
+    )
+    catalog._git_client.get_revision.return_value = "b" * 40
+
+    with pytest.raises(CollectionBundleException):
+        catalog.import_collection(tmp_path / "tools.tar")
+
+    assert not catalog.get_directory_for_collection("tools").exists()
+    assert catalog.get_collection_by_name("tools") is None
+
+
+def test_import_moves_checked_clone_into_place(tmp_path: Path):
+    catalog = create_catalog(tmp_path, MagicMock())
+    # pylint: disable=protected-access
+    catalog._collection_bundle_archive.unpack.side_effect = fake_unpack("a" * 40)
+    catalog._git_client.clone_bundle.side_effect = (
+        lambda bundle_file, url, target_dir: target_dir.mkdir()
+    )
+    catalog._git_client.get_revision.return_value = "a" * 40
+
+    collection, bundle = catalog.import_collection(tmp_path / "tools.tar")
+
+    assert bundle.revision == "a" * 40
+    assert collection.directory == catalog.get_directory_for_collection("tools")
+    assert collection.directory.is_dir()
+    assert catalog.get_collection_by_name("tools") is collection
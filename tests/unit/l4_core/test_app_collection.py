@@ -0,0 +1,151 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from ansible_self_service.l4_core.collection import AppCollection
+from ansible_self_service.l4_core.models import AppStatus
+
+
+class FakeApp:
+    def __init__(self, name, playbook_path):
+        self.name = name
+        self.playbook_path = playbook_path
+        self.state = MagicMock(status=AppStatus.INSTALLED)
+
+
+def create_collection(tmp_path: Path, changed_files, old_items, new_items):
+    (tmp_path / AppCollection.CONFIG_FILE_NAME).write_text(
+        "items: {}", encoding="utf-8"
+    )
+    git_client = MagicMock()
+    git_client.get_revision.side_effect = ["old", "new"]
+    git_client.changed_files.return_value = [Path(path) for path in changed_files]
+    parser = MagicMock()
+    parser.item_fingerprints.side_effect = [old_items, new_items]
+    apps = {
+        "cowsay": FakeApp("cowsay", tmp_path / "cowsay.yml"),
+        "htop": FakeApp("htop", tmp_path / "htop.yml"),
+    }
+    parser.from_file.side_effect = lambda collection, only=None: (
+        [],
+        [
+            FakeApp(name, tmp_path / f"{name}.yml")
+            for name in sorted(only)
+            if name in new_items
+        ],
+    )
+    resolver = MagicMock()
+    resolver.resolve.side_effect = lambda directory, playbook: {
+        playbook,
+        directory / "roles" / playbook.stem,
+    }
+    collection = AppCollection(
+        _git_client=git_client,
+        _app_collection_config_parser=parser,
+        _playbook_dependency_resolver=resolver,
+        name="tools",
+        directory=tmp_path,
+        apps=dict(apps),
+        _initialized=True,
+    )
+    return collection, apps
+
+
+def test_update_only_invalidates_apps_using_changed_files(tmp_path: Path):
+    fingerprints = {"cowsay": "a", "htop": "b"}
+    collection, apps = create_collection(
+        tmp_path, ["roles/htop/tasks/main.yml", "README.md"], fingerprints, fingerprints
+    )
+
+    update = collection.update(revision=None)
+
+    assert update.affected_apps == ["htop"]
+    assert collection.apps["cowsay"] is apps["cowsay"]
+    assert collection.apps["htop"] is not apps["htop"]
+    assert collection.apps["htop"].state.status == AppStatus.UNKNOWN
+    assert collection.apps["htop"].state.revision is None
+
+
+def test_update_detects_changed_and_removed_config_entries(tmp_path: Path):
+    collection, _ = create_collection(
+        tmp_path,
+        [AppCollection.CONFIG_FILE_NAME],
+        {"cowsay": "a", "htop": "b"},
+        {"cowsay": "changed"},
+    )
+
+    update = collection.update(revision=None)
+
+    assert update.affected_apps == ["cowsay", "htop"]
+    assert set(collection.apps) == {"cowsay"}
+
+
+def test_update_of_collection_wide_file_affects_all_apps(tmp_path: Path):
+    fingerprints = {"cowsay": "a", "htop": "b"}
+    collection, _ = create_collection(
+        tmp_path, ["ansible.cfg"], fingerprints, fingerprints
+    )
+
+    assert collection.update(revision=None).affected_apps == ["cowsay", "htop"]
+
+
+def test_validate_playbooks_once_per_key(tmp_path: Path):
+    collection, _ = create_collection(tmp_path, [], {}, {})
+    collection.apps["cowsay_too"] = FakeApp("cowsay_too", tmp_path / "cowsay.yml")
+    collection._git_client.get_revision.side_effect = None
+    collection._git_client.get_revision.return_value = "abc"
+    validator = MagicMock()
+    validator.validate.return_value = {
+        tmp_path / "cowsay.yml": "ERROR! the role 'cow' was not found",
+        tmp_path / "htop.yml": None,
+    }
+    cache = MagicMock()
+    cache.load.side_effect = [None, {"cowsay": "cached"}]
+    collection._playbook_validator = validator
+    collection._playbook_validation_cache = cache
+
+    errors = collection.validate_playbooks()
+    collection.validate_playbooks()
+
+    validator.validate.assert_called_once_with(
+        tmp_path, [tmp_path / "cowsay.yml", tmp_path / "htop.yml"], None
+    )
+    assert errors == {
+        "cowsay": "ERROR! the role 'cow' was not found",
+        "cowsay_too": "ERROR! the role 'cow' was not found",
+    }
+    cache.save.assert_called_once_with("tools", "abc-none", errors)
+
+
+def test_reload_only_recreates_apps_whose_config_entry_changed(tmp_path: Path):
+    collection, apps = create_collection(
+        tmp_path, [], {"cowsay": "a", "htop": "b"}, {"cowsay": "a", "htop": "changed"}
+    )
+    collection._git_client.get_revision.side_effect = None
+    collection._git_client.get_revision.return_value = "old"
+    collection._loaded_revision = "old"
+    collection._loaded_config_text = "items: {}"
+    collection.config.write_text("items: {htop: {}}", encoding="utf-8")
+
+    assert collection.reload() == {"htop"}
+    assert collection.apps["cowsay"] is apps["cowsay"]
+    assert collection.apps["htop"] is not apps["htop"]
+    assert collection.reload() == set()
+
+
+def test_reload_after_head_moved_recreates_apps_using_changed_files(tmp_path: Path):
+    collection, apps = create_collection(
+        tmp_path, ["roles/cowsay/tasks/main.yml"], {}, {}
+    )
+    collection._git_client.get_revision.side_effect = None
+    collection._git_client.get_revision.return_value = "new"
+    collection._app_collection_config_parser.item_fingerprints.side_effect = None
+    collection._app_collection_config_parser.item_fingerprints.return_value = {
+        "cowsay": "a",
+        "htop": "b",
+    }
+    collection._loaded_revision = "old"
+    collection._loaded_config_text = "items: {}"
+
+    assert collection.reload() == {"cowsay"}
+    collection._git_client.changed_files.assert_called_once_with(tmp_path, "old", "new")
+    assert collection.apps["htop"] is apps["htop"]
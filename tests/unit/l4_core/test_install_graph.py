@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pytest
+
+from ansible_self_service.l4_core.exceptions import AppDependencyCycleException
+from ansible_self_service.l4_core.install_graph import (
+    InstallGraph,
+    InstallOutcome,
+    find_cycle,
+)
+from ansible_self_service.l4_core.models import AppStatus
+
+
+class FakeApp:
+    def __init__(self, collection, name, depends_on=(), succeeds=True, duration=0.0):
+        self.app_collection = collection
+        self.name = name
+        self.depends_on = list(depends_on)
+        self.succeeds = succeeds
+        self.duration = duration
+        self.state = type("State", (), {"status": AppStatus.NOT_INSTALLED})()
+        self.started = None
+        self.finished = None
+
+    def install(self):
+        self.started = time.monotonic()
+        time.sleep(self.duration)
+        self.finished = time.monotonic()
+        return self.succeeds
+
+
+class FakeCollection(dict):
+    name = "tools"
+
+    def add(self, *apps):
+        for app in apps:
+            self[app.name] = app
+
+
+@pytest.fixture
+def collection():
+    return FakeCollection()
+
+
+def test_find_cycle():
+    assert find_cycle({"a": ["b"], "b": ["c"], "c": []}) is None
+    assert find_cycle({"a": ["b"], "b": ["c"], "c": ["a"]}) == ["a", "b", "c", "a"]
+    assert find_cycle({"a": ["a"]}) == ["a", "a"]
+
+
+def test_cycle_raises(collection):
+    first = FakeApp(collection, "first", depends_on=["second"])
+    second = FakeApp(collection, "second", depends_on=["first"])
+    collection.add(first, second)
+    with pytest.raises(AppDependencyCycleException):
+        InstallGraph.for_apps([first])
+
+
+def test_prerequisites_are_pulled_in_and_ordered(collection):
+    runtime = FakeApp(collection, "runtime")
+    tool = FakeApp(collection, "tool", depends_on=["runtime"])
+    plugin = FakeApp(collection, "plugin", depends_on=["tool", "runtime"])
+    collection.add(runtime, tool, plugin)
+    graph = InstallGraph.for_apps([plugin])
+    assert graph.topological_order() == [
+        ("tools", "runtime"),
+        ("tools", "tool"),
+        ("tools", "plugin"),
+    ]
+    outcomes = graph.install(max_workers=4)
+    assert set(outcomes.values()) == {InstallOutcome.INSTALLED}
+    assert runtime.finished <= tool.started
+    assert tool.finished <= plugin.started
+
+
+def test_independent_branches_run_in_parallel(collection):
+    left = FakeApp(collection, "left", duration=0.2)
+    right = FakeApp(collection, "right", duration=0.2)
+    collection.add(left, right)
+    InstallGraph.for_apps([left, right]).install(max_workers=2)
+    assert left.started < right.finished and right.started < left.finished
+
+
+def test_concurrency_limit(collection):
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    class CountingApp(FakeApp):
+        def install(self):
+            with lock:
+                active.append(self)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.remove(self)
+            return True
+
+    apps = [CountingApp(collection, f"app{index}") for index in range(6)]
+    collection.add(*apps)
+    InstallGraph.for_apps(apps).install(max_workers=2)
+    assert max(peak) == 2
+
+
+def test_dependants_of_failed_app_are_skipped(collection):
+    runtime = FakeApp(collection, "runtime", succeeds=False)
+    tool = FakeApp(collection, "tool", depends_on=["runtime"])
+    plugin = FakeApp(collection, "plugin", depends_on=["tool"])
+    other = FakeApp(collection, "other")
+    collection.add(runtime, tool, plugin, other)
+    outcomes = InstallGraph.for_apps([plugin, other]).install(max_workers=2)
+    assert outcomes == {
+        ("tools", "runtime"): InstallOutcome.FAILED,
+        ("tools", "tool"): InstallOutcome.SKIPPED,
+        ("tools", "plugin"): InstallOutcome.SKIPPED,
+        ("tools", "other"): InstallOutcome.INSTALLED,
+    }
+    assert tool.started is None
+
+
+def test_installed_prerequisite_is_not_reinstalled(collection):
+    runtime = FakeApp(collection, "runtime")
+    runtime.state.status = AppStatus.INSTALLED
+    tool = FakeApp(collection, "tool", depends_on=["runtime"])
+    collection.add(runtime, tool)
+    outcomes = InstallGraph.for_apps([tool]).install()
+    assert outcomes[("tools", "runtime")] == InstallOutcome.ALREADY_INSTALLED
+    assert outcomes[("tools", "tool")] == InstallOutcome.INSTALLED
+    assert runtime.started is None